@@ -25,10 +25,85 @@ CREATE TABLE activite (
     sport           VARCHAR(50) NOT NULL,
     detail_sport    VARCHAR(256),
     id_user         INTEGER NOT NULL,
+    empreinte       VARCHAR(64),            -- voir utils/track_fingerprint.py
+    diffusee        BOOLEAN NOT NULL DEFAULT FALSE, -- recopiée dans la timeline
     FOREIGN KEY (id_user) REFERENCES utilisateur(id_user) ON DELETE CASCADE
 );
 
 
+-----------------------------------------------------
+-- Trace GPS d'une activité (points encodés, voir utils/track_codec.py)
+-----------------------------------------------------
+DROP TABLE IF EXISTS activite_trace CASCADE;
+CREATE TABLE activite_trace (
+    id_activite     INTEGER PRIMARY KEY,
+    nb_points       INTEGER NOT NULL,
+    donnees         BYTEA NOT NULL,
+    FOREIGN KEY (id_activite) REFERENCES activite(id_activite) ON DELETE CASCADE
+);
+-- Contenu déjà compressé : stockage hors ligne sans nouvelle compression
+ALTER TABLE activite_trace ALTER COLUMN donnees SET STORAGE EXTERNAL;
+
+
+-----------------------------------------------------
+-- Meilleurs efforts d'une activité (voir utils/best_efforts.py)
+-----------------------------------------------------
+DROP TABLE IF EXISTS activite_effort CASCADE;
+CREATE TABLE activite_effort (
+    id_activite     INTEGER NOT NULL,
+    effort          VARCHAR(20) NOT NULL,
+    duree           FLOAT NOT NULL,
+    PRIMARY KEY (id_activite, effort),
+    FOREIGN KEY (id_activite) REFERENCES activite(id_activite) ON DELETE CASCADE
+);
+
+
+-----------------------------------------------------
+-- Record personnel : meilleur effort d'un utilisateur par sport
+-----------------------------------------------------
+DROP TABLE IF EXISTS record_personnel CASCADE;
+CREATE TABLE record_personnel (
+    id_user         INTEGER NOT NULL,
+    sport           VARCHAR(50) NOT NULL,
+    effort          VARCHAR(20) NOT NULL,
+    duree           FLOAT NOT NULL,
+    id_activite     INTEGER NOT NULL,
+    PRIMARY KEY (id_user, sport, effort),
+    FOREIGN KEY (id_user) REFERENCES utilisateur(id_user) ON DELETE CASCADE,
+    FOREIGN KEY (id_activite) REFERENCES activite(id_activite) ON DELETE CASCADE
+);
+
+
+-----------------------------------------------------
+-- Segment : portion de parcours nommée (points encodés, voir utils/track_codec.py)
+-----------------------------------------------------
+DROP TABLE IF EXISTS segment CASCADE;
+CREATE TABLE segment (
+    id_segment      SERIAL PRIMARY KEY,
+    nom             VARCHAR(256) NOT NULL,
+    sport           VARCHAR(50) NOT NULL,
+    distance        FLOAT NOT NULL,
+    donnees         BYTEA NOT NULL,
+    id_user         INTEGER NOT NULL,
+    FOREIGN KEY (id_user) REFERENCES utilisateur(id_user) ON DELETE CASCADE
+);
+
+
+-----------------------------------------------------
+-- Passage d'une activité sur un segment (voir utils/segment_matching.py)
+-----------------------------------------------------
+DROP TABLE IF EXISTS effort_segment CASCADE;
+CREATE TABLE effort_segment (
+    id_effort       SERIAL PRIMARY KEY,
+    id_segment      INTEGER NOT NULL,
+    id_activite     INTEGER NOT NULL,
+    id_user         INTEGER NOT NULL,
+    duree           FLOAT NOT NULL,
+    FOREIGN KEY (id_segment) REFERENCES segment(id_segment) ON DELETE CASCADE,
+    FOREIGN KEY (id_activite) REFERENCES activite(id_activite) ON DELETE CASCADE
+);
+
+
 -----------------------------------------------------
 -- Commentaire
 -----------------------------------------------------
@@ -74,13 +149,41 @@ CREATE TABLE suivi (
 );
 
 
+-----------------------------------------------------
+-- Timeline : fil pré-calculé, une ligne par activité diffusée et par lecteur
+-- (l'auteur et ses suiveurs), voir dao/timeline_dao.py
+-----------------------------------------------------
+DROP TABLE IF EXISTS timeline CASCADE;
+CREATE TABLE timeline (
+    id_lecteur      INTEGER NOT NULL,
+    id_activite     INTEGER NOT NULL,
+    id_auteur       INTEGER NOT NULL,
+    date_activite   TIMESTAMP NOT NULL,
+    PRIMARY KEY (id_lecteur, id_activite),
+    FOREIGN KEY (id_lecteur) REFERENCES utilisateur(id_user) ON DELETE CASCADE,
+    FOREIGN KEY (id_activite) REFERENCES activite(id_activite) ON DELETE CASCADE
+);
+
+
 -----------------------------------------------------
 -- Index pour améliorer les performances
 -----------------------------------------------------
-CREATE INDEX idx_activite_user ON activite(id_user);
 CREATE INDEX idx_activite_date ON activite(date_activite DESC);
 CREATE INDEX idx_activite_sport ON activite(sport);
+-- Une même sortie n'est enregistrée qu'une fois (activités sans empreinte non concernées)
+CREATE UNIQUE INDEX idx_activite_empreinte ON activite(id_user, empreinte);
+-- Sert aussi aux recherches par utilisateur (préfixe id_user)
+CREATE INDEX idx_activite_feed ON activite(id_user, date_activite DESC, id_activite DESC);
+-- Activités encore lues à la demande (en attente de diffusion ou d'auteurs très suivis)
+CREATE INDEX idx_activite_non_diffusee ON activite(id_user, date_activite DESC, id_activite DESC)
+    WHERE NOT diffusee;
+CREATE INDEX idx_record_activite ON record_personnel(id_activite);
+CREATE INDEX idx_effort_segment_classement ON effort_segment(id_segment, duree);
+CREATE INDEX idx_effort_segment_activite ON effort_segment(id_activite);
 CREATE INDEX idx_commentaire_activite ON commentaire(id_activite);
 CREATE INDEX idx_liker_activite ON liker(id_activite);
 CREATE INDEX idx_suivi_suiveur ON suivi(id_suiveur);
 CREATE INDEX idx_suivi_suivi ON suivi(id_suivi);
+CREATE INDEX idx_timeline_lecture ON timeline(id_lecteur, date_activite DESC, id_activite DESC);
+CREATE INDEX idx_timeline_auteur ON timeline(id_lecteur, id_auteur);
+CREATE INDEX idx_timeline_activite ON timeline(id_activite);
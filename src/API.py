@@ -1,6 +1,6 @@
 from fastapi import FastAPI
 
-from routers import activities, auth, comments, feed, followers, likes, stats
+from routers import activities, auth, comments, feed, followers, heatmap, likes, segments, stats
 
 app = FastAPI(title="Striv API - Application de sport connectee", root_path="/proxy/5100")
 
@@ -12,6 +12,8 @@ app.include_router(comments.router)
 app.include_router(followers.router)
 app.include_router(stats.router)
 app.include_router(feed.router)
+app.include_router(segments.router)
+app.include_router(heatmap.router)
 
 
 @app.get("/health")
@@ -8,7 +8,7 @@ import requests
 import streamlit as st
 
 from routers import activities, comments, followers, stats
-from utils.format import format_h_m
+from utils.format import format_chrono, format_h_m
 
 color_map = {
     "Course": "#EF476F",
@@ -55,6 +55,7 @@ st.set_page_config(
 
 # URL de base de l'API
 API_URL = "http://localhost:5100"
+TAILLE_PAGE_FEED = 20
 
 # Initialisation de la session
 if "authenticated" not in st.session_state:
@@ -1132,6 +1133,27 @@ else:
 
                 st.divider()
 
+                # Records personnels, tenus a jour a chaque ajout ou suppression d'activite
+                response_records = requests.get(f"{API_URL}/stats/records", auth=get_auth())
+                if response_records.status_code == 200 and response_records.json():
+                    st.subheader("🏆 Records personnels")
+                    df_records = pd.DataFrame(
+                        [
+                            {
+                                "Sport": f"{SPORT_ICONS.get(record['sport'], '🏃')} "
+                                f"{record['sport'].capitalize()}",
+                                "Distance": record["effort"],
+                                "Temps": format_chrono(record["duree_s"]),
+                                "Allure (min/km)": format_chrono(
+                                    record["duree_s"] / record["distance_m"] * 1000
+                                ),
+                            }
+                            for record in response_records.json()
+                        ]
+                    )
+                    st.dataframe(df_records, hide_index=True, use_container_width=True)
+                    st.divider()
+
                 # Graphiques par sport
                 if stats.get("par_sport"):
                     st.subheader("📊 Répartition par sport")
@@ -1190,10 +1212,21 @@ else:
         st.markdown("*Activités des utilisateurs que vous suivez*")
 
         try:
-            response = requests.get(f"{API_URL}/feed", auth=get_auth())
+            # Les pages déjà chargées restent en session ; "Voir plus" ajoute la suivante
+            if st.button("🔄 Actualiser", key="feed_actualiser"):
+                st.session_state.pop("feed_activites", None)
 
-            if response.status_code == 200:
-                activities = response.json()
+            if "feed_activites" not in st.session_state:
+                response = requests.get(
+                    f"{API_URL}/feed", params={"limit": TAILLE_PAGE_FEED}, auth=get_auth()
+                )
+                if response.status_code == 200:
+                    page = response.json()
+                    st.session_state.feed_activites = page["activities"]
+                    st.session_state.feed_curseur = page["next_cursor"]
+
+            if "feed_activites" in st.session_state:
+                activities = st.session_state.feed_activites
 
                 if not activities:
                     st.info(
@@ -1307,6 +1340,25 @@ else:
                                             st.rerun()
 
                             st.divider()
+
+                    if st.session_state.feed_curseur and st.button(
+                        "⬇️ Voir plus", key="feed_plus"
+                    ):
+                        response_plus = requests.get(
+                            f"{API_URL}/feed",
+                            params={
+                                "limit": TAILLE_PAGE_FEED,
+                                "before": st.session_state.feed_curseur,
+                            },
+                            auth=get_auth(),
+                        )
+                        if response_plus.status_code == 200:
+                            page = response_plus.json()
+                            st.session_state.feed_activites.extend(page["activities"])
+                            st.session_state.feed_curseur = page["next_cursor"]
+                            st.rerun()
+                        else:
+                            st.error("Erreur lors de la récupération du fil d'actualité")
             else:
                 st.error("Erreur lors de la récupération du fil d'actualité")
 
@@ -1322,7 +1374,8 @@ else:
         # Section d'import GPX
         st.subheader("📁 Importer un fichier GPX (optionnel)")
         uploaded_file = st.file_uploader(
-            "Choisir un fichier GPX pour pré-remplir le formulaire", type=["gpx"]
+            "Choisir un fichier GPX pour pré-remplir le formulaire",
+            type=["gpx", "gz", "bz2", "zip"],
         )
 
         # ========== SECTION 1: Télécharger GPX (ligne ~430) ==========
@@ -1336,7 +1389,16 @@ else:
                 )  # ✅ CHANGÉ
 
                 if response.status_code == 200:
-                    st.session_state.gpx_data = response.json()
+                    gpx_data = response.json()
+                    st.session_state.gpx_fichier_unique = "fichiers" not in gpx_data
+                    if "fichiers" in gpx_data:
+                        # Archive de plusieurs traces : seule la première pré-remplit le formulaire
+                        st.info(
+                            f"Archive de {len(gpx_data['fichiers'])} fichiers GPX : "
+                            "le premier est utilisé pour pré-remplir le formulaire."
+                        )
+                        gpx_data = gpx_data["fichiers"][0] if gpx_data["fichiers"] else None
+                    st.session_state.gpx_data = gpx_data
                     st.success(
                         "✅ Fichier GPX analysé! Les données ont été chargées dans le formulaire ci-dessous."
                     )
@@ -1436,8 +1498,21 @@ else:
                         if duree and duree > 0:
                             params["duree"] = duree
 
+                        # Renvoyer le fichier GPX : son analyse est déjà en cache côté API
+                        files = None
+                        if uploaded_file is not None and st.session_state.get(
+                            "gpx_fichier_unique", True
+                        ):
+                            files = {
+                                "gpx_file": (
+                                    uploaded_file.name,
+                                    uploaded_file.getvalue(),
+                                    "application/gpx+xml",
+                                )
+                            }
+
                         response = requests.post(
-                            f"{API_URL}/activities", params=params, auth=get_auth()
+                            f"{API_URL}/activities", params=params, files=files, auth=get_auth()
                         )
 
                         if response.status_code == 200:
@@ -1445,6 +1520,8 @@ else:
                             st.balloons()
                             # Réinitialiser les données GPX après création
                             st.session_state.gpx_data = None
+                        elif response.status_code == 409:
+                            st.warning(f"⚠️ {response.json().get('detail')}")
                         else:
                             st.error(f"Erreur: {response.json().get('detail', 'Erreur inconnue')}")
                     except Exception as e:
@@ -1526,6 +1603,13 @@ else:
                                         st.session_state[f"confirm_delete_{activity_id}"] = True
                                         st.warning("Cliquez à nouveau pour confirmer")
 
+                                # Bouton profil (altitude et vitesse)
+                                if st.button("📈 Profil", key=f"profil_{activity_id}"):
+                                    cle_profil = f"profil_ouvert_{activity_id}"
+                                    st.session_state[cle_profil] = not st.session_state.get(
+                                        cle_profil
+                                    )
+
                             # Formulaire de modification
                             if st.session_state.get(f"editing_{activity_id}"):
                                 st.divider()
@@ -1580,6 +1664,35 @@ else:
                                     if cancel_edit:
                                         del st.session_state[f"editing_{activity_id}"]
                                         st.rerun()
+
+                            # Profils d'altitude et de vitesse, réduits côté API
+                            if st.session_state.get(f"profil_ouvert_{activity_id}"):
+                                st.divider()
+                                response_profil = requests.get(
+                                    f"{API_URL}/activities/{activity_id}/graphique",
+                                    params={"abscisse": "distance", "nb_points": 1000},
+                                    auth=get_auth(),
+                                )
+                                if response_profil.status_code == 200:
+                                    profil = response_profil.json()
+                                    for cle, titre, unite in (
+                                        ("altitude", "Altitude", "Altitude (m)"),
+                                        ("vitesse", "Vitesse", "Vitesse (km/h)"),
+                                    ):
+                                        serie = profil[cle]
+                                        if not serie["y"]:
+                                            continue
+                                        fig_profil = px.line(
+                                            x=serie["x"],
+                                            y=serie["y"],
+                                            title=titre,
+                                            labels={"x": "Distance (km)", "y": unite},
+                                        )
+                                        st.plotly_chart(fig_profil, width="stretch")
+                                elif response_profil.status_code == 404:
+                                    st.info("Pas de trace GPS pour cette activité")
+                                else:
+                                    st.error("Erreur lors de la récupération du profil")
             else:
                 st.error("Erreur lors de la récupération des activités")
 
@@ -1597,6 +1710,9 @@ else:
         from streamlit_folium import st_folium
 
         from utils.geolocation import get_coordinates, get_route
+        from utils.track_simplification import PyramideLOD
+
+        zoom_carte = 13
 
         col1, col2 = st.columns(2)
 
@@ -1630,6 +1746,10 @@ else:
                         route_data = get_route(start_coords, end_coords, vitesse)
 
                         if route_data:
+                            # Niveaux de détail calculés une fois, réutilisés à chaque affichage
+                            route_data["pyramide"] = PyramideLOD.depuis_coordonnees(
+                                route_data["coordinates"]
+                            )
                             st.session_state.route_data = route_data
                             st.session_state.start_coords = start_coords
                             st.session_state.end_coords = end_coords
@@ -1651,7 +1771,9 @@ else:
             center_lat = (start_coords[0] + end_coords[0]) / 2
             center_lon = (start_coords[1] + end_coords[1]) / 2
 
-            m = folium.Map(location=[center_lat, center_lon], zoom_start=13, tiles="OpenStreetMap")
+            m = folium.Map(
+                location=[center_lat, center_lon], zoom_start=zoom_carte, tiles="OpenStreetMap"
+            )
 
             # Ajouter les points de départ et d'arrivée
             folium.Marker(
@@ -1668,9 +1790,12 @@ else:
                 icon=folium.Icon(color="red", icon="stop"),
             ).add_to(m)
 
-            # Ajouter la route
+            # Ajouter la route, simplifiée au niveau de détail du zoom
             folium.PolyLine(
-                locations=route_data["coordinates"], color="#667eea", weight=4, opacity=0.8
+                locations=route_data["pyramide"].coordonnees(zoom_carte),
+                color="#667eea",
+                weight=4,
+                opacity=0.8,
             ).add_to(m)
 
             # Afficher la carte
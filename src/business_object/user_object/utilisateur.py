@@ -1,12 +1,12 @@
 from datetime import datetime
 from business_object.base import Base
-import gpxpy
 
 from business_object.Activity_object.course_a_pieds import CoursePied
 from business_object.Activity_object.cyclisme import Cyclisme
 from business_object.Activity_object.natation import Natation
 from business_object.Activity_object.randonnee import Randonnee
 from business_object.user_object.statistiques import Statistiques
+from utils.gpx_ingestion import ingest_gpx
 
 
 from sqlalchemy import Column, Integer, String
@@ -77,11 +77,10 @@ class Utilisateur(Base):
         return : AbstractActivity
             renvoie l'activité créée
         """
-        with open(fichier_gpx, "r", encoding="utf-8") as f:
-            gpx = gpxpy.parse(f)
+        ingestion = ingest_gpx(fichier_gpx)
 
-        distance_m = gpx.length_3d()
-        duree = gpx.get_duration()
+        distance_m = ingestion.distance
+        duree = ingestion.duree
 
         # Génération d’un id d’activité arbitraire
         id_activite = int(datetime.now().timestamp())
@@ -1,12 +1,81 @@
 from __future__ import annotations
 
-from typing import List, Optional, Type
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple, Type
 
-from sqlalchemy import func
+from sqlalchemy import (
+    Integer,
+    column,
+    func,
+    literal,
+    select,
+    table,
+    true,
+    tuple_,
+    union_all,
+)
+from sqlalchemy.dialects.postgresql import aggregate_order_by, insert
 from sqlalchemy.orm import Session, sessionmaker
 
 from dao.activity_model import ActivityModel
 from dao.db_connection import DBConnection
+from dao.effort_model import EffortModel
+from dao.record_model import RecordModel
+from dao.trace_model import TraceModel
+from utils.track_codec import nb_points_trace
+
+# Table des abonnements, lue sans passer par le modele ORM `Suivi`
+SUIVI = table("suivi", column("id_suiveur", Integer), column("id_suivi", Integer))
+
+
+def activites_auteurs(
+    model: Type[ActivityModel],
+    user_id: int,
+    limite: Optional[int] = None,
+    avant: Optional[Tuple[datetime, int]] = None,
+    filtres: Sequence = (),
+):
+    """Requete (id_activite, date_activite) des `limite` activites les plus recentes
+    (strictement avant `avant`) de chaque auteur du fil : les suivis de
+    l'utilisateur et lui-meme.
+
+    Une sous-requete LATERAL par auteur parcourt l'index (id_user, date_activite
+    DESC, id_activite DESC) ; `filtres` s'ajoutent a sa clause WHERE.
+    """
+    auteurs = union_all(
+        select(SUIVI.c.id_suivi.label("id_user")).where(SUIVI.c.id_suiveur == user_id),
+        select(literal(user_id, Integer).label("id_user")),
+    ).subquery("auteurs")
+
+    recentes = select(model.id.label("id_activite"), model.date_activite).where(
+        model.id_user == auteurs.c.id_user, *filtres
+    )
+    if avant is not None:
+        recentes = recentes.where(tuple_(model.date_activite, model.id) < tuple_(*avant))
+    recentes = recentes.order_by(model.date_activite.desc(), model.id.desc())
+    if limite is not None:
+        recentes = recentes.limit(limite)
+    recentes = recentes.lateral("recentes")
+
+    return (
+        select(recentes.c.id_activite, recentes.c.date_activite)
+        .select_from(auteurs)
+        .join(recentes, true())
+    )
+
+
+def page_fil(activites, limite: Optional[int] = None):
+    """Requete des ID des `limite` premieres lignes (id_activite, date_activite)
+    de `activites` dans l'ordre du fil.
+
+    La page est fixee avant de lire les lignes de `activite` : le planificateur
+    n'en attend que `limite` et les lit par la cle primaire.
+    """
+    activites = activites.subquery("fil")
+    page = select(activites.c.id_activite).order_by(
+        activites.c.date_activite.desc(), activites.c.id_activite.desc()
+    )
+    return page.limit(limite) if limite is not None else page
 
 
 class ActivityDAO:
@@ -26,22 +95,184 @@ class ActivityDAO:
     def _query(self, session: Session):
         return session.query(self._model)
 
-    def save(self, activity: ActivityModel) -> ActivityModel:
-        """Enregistre une activite et renvoie son instance rafraichie."""
+    def save(
+        self,
+        activity: ActivityModel,
+        trace: Optional[bytes] = None,
+        efforts: Optional[Dict[str, float]] = None,
+    ) -> ActivityModel:
+        """Enregistre une activite (avec sa trace encodee et ses meilleurs efforts)
+        et renvoie son instance rafraichie."""
         with self._session_factory() as session:
             session.add(activity)
+            if trace is not None or efforts:
+                session.flush()
+            if trace is not None:
+                session.add(self._trace_model(activity.id, trace))
+            if efforts:
+                self._enregistrer_efforts(
+                    session, [(activity.id, activity.id_user, activity.sport, efforts)]
+                )
             session.commit()
             session.refresh(activity)
             return activity
 
+    def save_all(
+        self,
+        activities: List[ActivityModel],
+        traces: Optional[List[Optional[bytes]]] = None,
+        efforts: Optional[List[Optional[Dict[str, float]]]] = None,
+    ) -> List[int]:
+        """Enregistre plusieurs activites (traces et efforts compris) dans une seule
+        transaction et renvoie leurs ID."""
+        with self._session_factory() as session:
+            session.add_all(activities)
+            # Le flush insere par lots et recupere les ID sans relire chaque ligne
+            session.flush()
+            ids = [activity.id for activity in activities]
+            if traces:
+                session.add_all(
+                    self._trace_model(id_activite, trace)
+                    for id_activite, trace in zip(ids, traces)
+                    if trace is not None
+                )
+            if efforts:
+                self._enregistrer_efforts(
+                    session,
+                    [
+                        (id_activite, activity.id_user, activity.sport, efforts_activite)
+                        for id_activite, activity, efforts_activite in zip(ids, activities, efforts)
+                        if efforts_activite
+                    ],
+                )
+            session.commit()
+            return ids
+
+    @staticmethod
+    def _trace_model(id_activite: int, trace: bytes) -> TraceModel:
+        return TraceModel(id_activite=id_activite, nb_points=nb_points_trace(trace), donnees=trace)
+
+    @staticmethod
+    def _enregistrer_efforts(
+        session: Session, activites: List[Tuple[int, int, str, Dict[str, float]]]
+    ) -> None:
+        """Insere les efforts (id_activite, id_user, sport, efforts) et ameliore les
+        records personnels concernes."""
+        lignes, meilleurs = [], {}
+        for id_activite, id_user, sport, efforts in activites:
+            for effort, duree in efforts.items():
+                lignes.append({"id_activite": id_activite, "effort": effort, "duree": duree})
+                cle = (id_user, sport, effort)
+                if cle not in meilleurs or duree < meilleurs[cle]["duree"]:
+                    meilleurs[cle] = {
+                        "id_user": id_user,
+                        "sport": sport,
+                        "effort": effort,
+                        "duree": duree,
+                        "id_activite": id_activite,
+                    }
+        if not lignes:
+            return
+        session.execute(insert(EffortModel), lignes)
+        # Un record n'est remplace que par un temps plus court
+        records = insert(RecordModel).values(list(meilleurs.values()))
+        session.execute(
+            records.on_conflict_do_update(
+                index_elements=["id_user", "sport", "effort"],
+                set_={"duree": records.excluded.duree, "id_activite": records.excluded.id_activite},
+                where=records.excluded.duree < RecordModel.duree,
+            )
+        )
+
+    def _completer_records(self, session: Session, id_user: int, sport: str) -> None:
+        """Remplace les records disparus avec une activite par le meilleur effort
+        restant, lu dans `activite_effort` sans relire aucune trace."""
+        meilleurs = (
+            select(
+                self._model.id_user,
+                self._model.sport,
+                EffortModel.effort,
+                EffortModel.duree,
+                EffortModel.id_activite,
+            )
+            .join(self._model, self._model.id == EffortModel.id_activite)
+            .where(self._model.id_user == id_user, self._model.sport == sport)
+            .distinct(EffortModel.effort)
+            .order_by(EffortModel.effort, EffortModel.duree, EffortModel.id_activite)
+        )
+        colonnes = ["id_user", "sport", "effort", "duree", "id_activite"]
+        session.execute(
+            insert(RecordModel).from_select(colonnes, meilleurs).on_conflict_do_nothing()
+        )
+
+    def get_efforts(self, activity_id: int) -> Dict[str, float]:
+        """Retourne les meilleurs efforts d'une activite (secondes par nom d'effort)."""
+        with self._session_factory() as session:
+            query = session.query(EffortModel.effort, EffortModel.duree).filter(
+                EffortModel.id_activite == activity_id
+            )
+            return dict(query.all())
+
+    def get_records(self, user_id: int) -> List[RecordModel]:
+        """Liste les records personnels d'un utilisateur, par sport."""
+        with self._session_factory() as session:
+            return (
+                session.query(RecordModel)
+                .filter(RecordModel.id_user == user_id)
+                .order_by(RecordModel.sport, RecordModel.duree)
+                .all()
+            )
+
+    def get_trace(self, activity_id: int) -> Optional[bytes]:
+        """Retourne la trace encodee d'une activite, ou None si elle n'en a pas."""
+        with self._session_factory() as session:
+            return (
+                session.query(TraceModel.donnees)
+                .filter(TraceModel.id_activite == activity_id)
+                .scalar()
+            )
+
+    def iter_traces(self, taille_lot: int = 500) -> Iterator[Tuple[int, bytes]]:
+        """Parcourt toutes les traces encodees par ID croissant, lues par lots."""
+        with self._session_factory() as session:
+            query = (
+                session.query(TraceModel.id_activite, TraceModel.donnees)
+                .order_by(TraceModel.id_activite)
+                .yield_per(taille_lot)
+            )
+            for id_activite, donnees in query:
+                yield id_activite, donnees
+
+    def iter_traces_utilisateurs(self, taille_lot: int = 500) -> Iterator[Tuple[int, int, bytes]]:
+        """Parcourt toutes les traces encodees (id_activite, id_user, donnees) par ID
+        croissant, lues par lots."""
+        with self._session_factory() as session:
+            query = (
+                session.query(TraceModel.id_activite, self._model.id_user, TraceModel.donnees)
+                .join(self._model, self._model.id == TraceModel.id_activite)
+                .order_by(TraceModel.id_activite)
+                .yield_per(taille_lot)
+            )
+            for id_activite, id_user, donnees in query:
+                yield id_activite, id_user, donnees
+
     def get_by_id(self, activity_id: int) -> Optional[ActivityModel]:
         """Retourne l'activite identifiee, ou None si absente."""
         with self._session_factory() as session:
             return session.get(self._model, activity_id)
 
-    def get_by_user(
-        self, user_id: int, type_activite: Optional[str] = None
-    ) -> List[ActivityModel]:
+    def trouver_doublons(self, user_id: int, empreintes: List[str]) -> Dict[str, int]:
+        """Activites de l'utilisateur dont l'empreinte figure dans la liste, en une
+        requete sur l'index (id_user, empreinte) : {empreinte: id_activite}."""
+        if not empreintes:
+            return {}
+        with self._session_factory() as session:
+            query = session.query(self._model.empreinte, self._model.id).filter(
+                self._model.id_user == user_id, self._model.empreinte.in_(set(empreintes))
+            )
+            return dict(query.all())
+
+    def get_by_user(self, user_id: int, type_activite: Optional[str] = None) -> List[ActivityModel]:
         """Liste les activites d'un utilisateur, optionnellement filtrees par sport."""
         with self._session_factory() as session:
             query = self._query(session).filter(self._model.id_user == user_id)
@@ -49,23 +280,40 @@ class ActivityDAO:
                 query = query.filter(self._model.sport == type_activite)
             return query.order_by(self._model.date_activite.desc()).all()
 
-    def get_feed(self, user_id: int) -> List[ActivityModel]:
-        """Retourne le fil (utilisateur + suivis)."""
-        from dao.suivi_dao import SuiviDAO
+    def requete_feed(
+        self,
+        session: Session,
+        user_id: int,
+        limite: Optional[int] = None,
+        avant: Optional[Tuple[datetime, int]] = None,
+    ):
+        """Requete du fil, en une seule instruction SQL.
 
-        suivi_dao = SuiviDAO(session_factory=self._session_factory)
-        following_ids = set(suivi_dao.get_following(user_id))
-        following_ids.add(user_id)
-        if not following_ids:
-            return []
+        Les auteurs (suivis de l'utilisateur, plus lui-meme) viennent d'une
+        sous-requete sur `suivi` ; pour chacun, une sous-requete LATERAL lit au
+        plus `limite` activites dans idx_activite_feed. Le cout ne depend donc
+        ni de l'historique, ni du nombre d'activites des autres auteurs.
+        """
+        activites = activites_auteurs(self._model, user_id, limite, avant)
+        return (
+            self._query(session)
+            .filter(self._model.id.in_(page_fil(activites, limite)))
+            .order_by(self._model.date_activite.desc(), self._model.id.desc())
+        )
+
+    def get_feed(
+        self,
+        user_id: int,
+        limite: Optional[int] = None,
+        avant: Optional[Tuple[datetime, int]] = None,
+    ) -> List[ActivityModel]:
+        """Retourne le fil (utilisateur + suivis), du plus recent au plus ancien.
 
+        Pagination par cle : `avant` = (date_activite, id_activite) de la
+        derniere activite deja vue, `limite` = taille de la page.
+        """
         with self._session_factory() as session:
-            return (
-                self._query(session)
-                .filter(self._model.id_user.in_(following_ids))
-                .order_by(self._model.date_activite.desc())
-                .all()
-            )
+            return self.requete_feed(session, user_id, limite, avant).all()
 
     def get_monthly_activities(
         self, user_id: int, year: int, month: int, type_activite: Optional[str] = None
@@ -81,12 +329,99 @@ class ActivityDAO:
                 query = query.filter(self._model.sport == type_activite)
             return query.order_by(self._model.date_activite.desc()).all()
 
+    def _requete_agregats(
+        self,
+        session: Session,
+        user_id: int,
+        debut: Optional[datetime],
+        fin: Optional[datetime],
+        *groupes,
+    ):
+        """Requete (groupes..., nombre, distance, duree, premiere date, derniere date)
+        des activites datees dans [debut, fin), groupees par `groupes`.
+
+        Les sommes (float8) sont faites de la plus recente a la plus ancienne
+        activite, dans l'ordre ou le service les faisait en Python : memes valeurs
+        au bit pres, quel que soit le plan choisi par la base.
+        """
+        date = self._model.date_activite
+        ordre = (date.desc(), self._model.id.desc())
+        distance = func.sum(aggregate_order_by(self._model.distance, *ordre))
+        duree = func.sum(aggregate_order_by(self._model.duree, *ordre))
+        query = session.query(
+            *groupes,
+            func.count(),
+            func.coalesce(distance, 0.0),
+            func.coalesce(duree, 0.0),
+            func.min(date),
+            func.max(date),
+        ).filter(self._model.id_user == user_id)
+        if debut is not None:
+            query = query.filter(date >= debut)
+        if fin is not None:
+            query = query.filter(date < fin)
+        return query.group_by(*groupes) if groupes else query
+
+    def _requete_statistiques(
+        self,
+        session: Session,
+        user_id: int,
+        debut: Optional[datetime],
+        fin: Optional[datetime],
+        *groupes,
+    ):
+        """Requete des agregats par `groupes` puis par sport ; dans chaque groupe, le
+        sport de l'activite la plus recente vient en tete."""
+        sport = func.coalesce(func.nullif(self._model.sport, ""), "inconnu")
+        return self._requete_agregats(session, user_id, debut, fin, *groupes, sport).order_by(
+            *groupes, func.max(self._model.date_activite).desc()
+        )
+
+    def get_totaux(
+        self, user_id: int, debut: Optional[datetime] = None, fin: Optional[datetime] = None
+    ) -> Tuple[int, float, float]:
+        """(nombre, distance, duree) des activites d'un utilisateur datees dans
+        [debut, fin) si precise, tous sports confondus."""
+        with self._session_factory() as session:
+            return tuple(self._requete_agregats(session, user_id, debut, fin).one()[:3])
+
+    def get_statistiques_par_sport(
+        self, user_id: int, debut: Optional[datetime] = None, fin: Optional[datetime] = None
+    ) -> List[Tuple[str, int, float, float, datetime, datetime]]:
+        """Agregats par sport des activites d'un utilisateur, datees dans [debut, fin)
+        si precise : (sport, nombre, distance, duree, premiere date, derniere date).
+
+        Le sport de l'activite la plus recente vient en tete, puis les autres dans
+        l'ordre de leur derniere activite.
+        """
+        with self._session_factory() as session:
+            return self._requete_statistiques(session, user_id, debut, fin).all()
+
+    def get_statistiques_par_mois(
+        self, user_id: int, debut: Optional[datetime] = None, fin: Optional[datetime] = None
+    ) -> List[Tuple[datetime, str, int, float, float, datetime, datetime]]:
+        """Memes agregats que get_statistiques_par_sport, mois par mois, en une seule
+        requete : (debut du mois, sport, nombre, distance, duree, premiere date,
+        derniere date), par mois croissant.
+
+        Les sommes de chaque mois sont faites dans le meme ordre que celles de
+        get_statistiques_par_sport sur ce mois : une annee calculee d'une requete
+        donne les memes valeurs que douze requetes mensuelles."""
+        mois = func.date_trunc("month", self._model.date_activite)
+        with self._session_factory() as session:
+            return self._requete_statistiques(session, user_id, debut, fin, mois).all()
+
     def delete(self, activity_id: int) -> bool:
-        """Supprime une activite par son ID et confirme l'operation."""
+        """Supprime une activite par son ID et confirme l'operation.
+
+        Les records personnels qu'elle detenait passent au meilleur effort restant.
+        """
         with self._session_factory() as session:
             activity = session.get(self._model, activity_id)
             if activity is None:
                 return False
             session.delete(activity)
+            session.flush()
+            self._completer_records(session, activity.id_user, activity.sport)
             session.commit()
             return True
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, DateTime, Float, Integer, String
+from sqlalchemy import Boolean, Column, DateTime, Float, Integer, String
 from business_object.base import Base
 
 
@@ -17,6 +17,9 @@ class ActivityModel(Base):
     distance = Column(Float, nullable=False)
     duree = Column(Float, nullable=True)  # heures
     id_user = Column(Integer, nullable=False)
+    empreinte = Column(String)  # voir utils/track_fingerprint.py
+    # Recopiee dans la timeline des lecteurs, voir dao/timeline_dao.py
+    diffusee = Column(Boolean, nullable=False, default=False)
 
     def __repr__(self) -> str:
         return f"<Activity id={self.id} sport={self.sport} user={self.id_user}>"
@@ -0,0 +1,18 @@
+from sqlalchemy import Column, Float, ForeignKey, Integer, String
+
+from business_object.base import Base
+
+
+class EffortModel(Base):
+    """Modele ORM de la table `activite_effort` (meilleurs efforts d'une activite)."""
+
+    __tablename__ = "activite_effort"
+
+    id_activite = Column(
+        Integer, ForeignKey("activite.id_activite", ondelete="CASCADE"), primary_key=True
+    )
+    effort = Column(String, primary_key=True)
+    duree = Column(Float, nullable=False)  # secondes
+
+    def __repr__(self) -> str:
+        return f"<Effort activite={self.id_activite} {self.effort}={self.duree}s>"
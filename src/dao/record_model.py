@@ -0,0 +1,20 @@
+from sqlalchemy import Column, Float, ForeignKey, Integer, String
+
+from business_object.base import Base
+
+
+class RecordModel(Base):
+    """Modele ORM de la table `record_personnel` (meilleur effort par utilisateur et sport)."""
+
+    __tablename__ = "record_personnel"
+
+    id_user = Column(Integer, primary_key=True)
+    sport = Column(String, primary_key=True)
+    effort = Column(String, primary_key=True)
+    duree = Column(Float, nullable=False)  # secondes
+    id_activite = Column(
+        Integer, ForeignKey("activite.id_activite", ondelete="CASCADE"), nullable=False
+    )
+
+    def __repr__(self) -> str:
+        return f"<Record user={self.id_user} {self.sport} {self.effort}={self.duree}s>"
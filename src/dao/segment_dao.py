@@ -0,0 +1,99 @@
+from __future__ import annotations
+
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import func, insert
+from sqlalchemy.orm import sessionmaker
+
+from dao.activity_model import ActivityModel
+from dao.db_connection import DBConnection
+from dao.segment_model import EffortSegmentModel, SegmentModel
+
+
+class SegmentDAO:
+    """Operations sur les segments (table `segment`) et leurs passages (`effort_segment`)."""
+
+    def __init__(self, session_factory: sessionmaker | None = None):
+        self._session_factory = session_factory or DBConnection().session_factory
+
+    def save(self, segment: SegmentModel) -> SegmentModel:
+        """Enregistre un segment et renvoie son instance rafraichie."""
+        with self._session_factory() as session:
+            session.add(segment)
+            session.commit()
+            session.refresh(segment)
+            return segment
+
+    def get_by_id(self, segment_id: int) -> Optional[SegmentModel]:
+        """Retourne le segment identifie, ou None si absent."""
+        with self._session_factory() as session:
+            return session.get(SegmentModel, segment_id)
+
+    def get_formes(self, apres: Optional[int] = None) -> List[Tuple[int, str, bytes]]:
+        """Liste (id_segment, sport, polyligne encodee) des segments, tous ou ceux
+        d'ID superieur a `apres`."""
+        with self._session_factory() as session:
+            query = session.query(SegmentModel.id, SegmentModel.sport, SegmentModel.donnees)
+            if apres is not None:
+                query = query.filter(SegmentModel.id > apres)
+            return [tuple(ligne) for ligne in query]
+
+    def get_version(self) -> Tuple[int, int]:
+        """(nombre de segments, plus grand ID) : change a chaque creation ou
+        suppression de segment, lu en une requete sur la cle primaire."""
+        with self._session_factory() as session:
+            nombre, dernier = session.query(
+                func.count(SegmentModel.id), func.coalesce(func.max(SegmentModel.id), 0)
+            ).one()
+            return nombre, dernier
+
+    def save_efforts(self, efforts: List[Dict]) -> None:
+        """Insere des passages (id_segment, id_activite, id_user, duree) en une requete."""
+        if not efforts:
+            return
+        with self._session_factory() as session:
+            session.execute(insert(EffortSegmentModel), efforts)
+            session.commit()
+
+    def get_classement(self, segment_id: int, limite: int = 10) -> List[Tuple]:
+        """Meilleur passage de chaque utilisateur sur un segment, du plus rapide au
+        plus lent : (id_user, duree, id_activite, date_activite)."""
+        with self._session_factory() as session:
+            meilleurs = (
+                session.query(
+                    EffortSegmentModel.id_user,
+                    EffortSegmentModel.duree,
+                    EffortSegmentModel.id_activite,
+                )
+                .filter(EffortSegmentModel.id_segment == segment_id)
+                .distinct(EffortSegmentModel.id_user)
+                .order_by(
+                    EffortSegmentModel.id_user, EffortSegmentModel.duree, EffortSegmentModel.id
+                )
+                .subquery()
+            )
+            query = (
+                session.query(
+                    meilleurs.c.id_user,
+                    meilleurs.c.duree,
+                    meilleurs.c.id_activite,
+                    ActivityModel.date_activite,
+                )
+                .join(ActivityModel, ActivityModel.id == meilleurs.c.id_activite)
+                .order_by(meilleurs.c.duree, ActivityModel.date_activite)
+                .limit(limite)
+            )
+            return [tuple(ligne) for ligne in query.all()]
+
+    def get_efforts_activite(self, activity_id: int) -> List[Tuple]:
+        """Passages d'une activite sur les segments : (id_segment, nom, duree)."""
+        with self._session_factory() as session:
+            query = (
+                session.query(
+                    EffortSegmentModel.id_segment, SegmentModel.nom, EffortSegmentModel.duree
+                )
+                .join(SegmentModel, SegmentModel.id == EffortSegmentModel.id_segment)
+                .filter(EffortSegmentModel.id_activite == activity_id)
+                .order_by(EffortSegmentModel.id)
+            )
+            return [tuple(ligne) for ligne in query.all()]
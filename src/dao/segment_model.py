@@ -0,0 +1,40 @@
+from sqlalchemy import Column, Float, ForeignKey, Integer, LargeBinary, String
+
+from business_object.base import Base
+
+
+class SegmentModel(Base):
+    """Modele ORM de la table `segment` (portion de parcours nommee)."""
+
+    __tablename__ = "segment"
+
+    id = Column("id_segment", Integer, primary_key=True, autoincrement=True)
+    nom = Column(String, nullable=False)
+    sport = Column(String, nullable=False)
+    distance = Column(Float, nullable=False)  # metres
+    donnees = Column(LargeBinary, nullable=False)  # polyligne encodee (utils/track_codec.py)
+    id_user = Column(Integer, nullable=False)
+
+    def __repr__(self) -> str:
+        return f"<Segment id={self.id} nom={self.nom!r} sport={self.sport}>"
+
+
+class EffortSegmentModel(Base):
+    """Modele ORM de la table `effort_segment` (passage d'une activite sur un segment)."""
+
+    __tablename__ = "effort_segment"
+
+    id = Column("id_effort", Integer, primary_key=True, autoincrement=True)
+    id_segment = Column(
+        Integer, ForeignKey("segment.id_segment", ondelete="CASCADE"), nullable=False
+    )
+    id_activite = Column(
+        Integer, ForeignKey("activite.id_activite", ondelete="CASCADE"), nullable=False
+    )
+    id_user = Column(Integer, nullable=False)
+    duree = Column(Float, nullable=False)  # secondes
+
+    def __repr__(self) -> str:
+        return (
+            f"<EffortSegment segment={self.id_segment} activite={self.id_activite} {self.duree}s>"
+        )
@@ -0,0 +1,146 @@
+from __future__ import annotations
+
+from datetime import datetime
+from typing import List, Optional, Tuple, Type
+
+from sqlalchemy import Integer, delete, exists, literal, select, tuple_, union_all, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session, sessionmaker
+
+from dao.activite_dao import SUIVI, activites_auteurs, page_fil
+from dao.activity_model import ActivityModel
+from dao.db_connection import DBConnection
+from dao.timeline_model import TimelineModel
+
+# Au-dela de ce nombre de suiveurs, les activites d'un auteur ne sont pas
+# recopiees : elles restent lues a la demande, comme dans ActivityDAO.get_feed
+SEUIL_DIFFUSION = 1000
+
+_COLONNES = ["id_lecteur", "id_activite", "id_auteur", "date_activite"]
+
+
+class TimelineDAO:
+    """Fil pre-calcule (table `timeline`) : chaque activite diffusee y est recopiee
+    pour son auteur et chacun de ses suiveurs, le fil se lit alors d'un seul
+    parcours de idx_timeline_lecture.
+
+    Une activite non diffusee (`activite.diffusee` faux : diffusion pas encore
+    faite, ou auteur suivi par plus de SEUIL_DIFFUSION utilisateurs) est lue a
+    la demande dans idx_activite_non_diffusee : le fil reste complet quel que
+    soit l'etat de la diffusion.
+    """
+
+    def __init__(
+        self,
+        session_factory: sessionmaker | None = None,
+        activity_base_cls: Type[ActivityModel] | None = None,
+    ):
+        self._session_factory = session_factory or DBConnection().session_factory
+        self._model = activity_base_cls or ActivityModel
+
+    def diffuser(self, ids: List[int], seuil: int = SEUIL_DIFFUSION) -> int:
+        """Recopie les activites dans la timeline de leur auteur et de ses suiveurs,
+        sauf celles des auteurs suivis par plus de `seuil` utilisateurs, et renvoie
+        le nombre d'activites diffusees."""
+        if not ids:
+            return 0
+        activite = self._model
+        # Au plus seuil + 1 lignes de l'index idx_suivi_suivi lues par auteur
+        tres_suivi = exists(
+            select(SUIVI.c.id_suiveur).where(SUIVI.c.id_suivi == activite.id_user).offset(seuil)
+        )
+        with self._session_factory() as session:
+            diffusees = (
+                session.execute(
+                    update(activite)
+                    .where(activite.id.in_(ids), ~activite.diffusee, ~tres_suivi)
+                    .values(diffusee=True)
+                    .returning(activite.id)
+                )
+                .scalars()
+                .all()
+            )
+            if diffusees:
+                auteur = select(
+                    activite.id_user, activite.id, activite.id_user, activite.date_activite
+                ).where(activite.id.in_(diffusees))
+                suiveurs = (
+                    select(
+                        SUIVI.c.id_suiveur, activite.id, activite.id_user, activite.date_activite
+                    )
+                    .join(SUIVI, SUIVI.c.id_suivi == activite.id_user)
+                    .where(activite.id.in_(diffusees))
+                )
+                session.execute(
+                    insert(TimelineModel)
+                    .from_select(_COLONNES, union_all(auteur, suiveurs))
+                    .on_conflict_do_nothing()
+                )
+            session.commit()
+            return len(diffusees)
+
+    def ajouter_suivi(self, id_lecteur: int, id_auteur: int) -> None:
+        """Recopie les activites diffusees de l'auteur dans la timeline d'un
+        nouveau suiveur."""
+        activite = self._model
+        with self._session_factory() as session:
+            historique = select(
+                literal(id_lecteur, Integer), activite.id, activite.id_user, activite.date_activite
+            ).where(activite.id_user == id_auteur, activite.diffusee)
+            session.execute(
+                insert(TimelineModel).from_select(_COLONNES, historique).on_conflict_do_nothing()
+            )
+            session.commit()
+
+    def retirer_suivi(self, id_lecteur: int, id_auteur: int) -> None:
+        """Retire de la timeline d'un lecteur les activites d'un auteur qu'il ne suit plus."""
+        with self._session_factory() as session:
+            session.execute(
+                delete(TimelineModel).where(
+                    TimelineModel.id_lecteur == id_lecteur, TimelineModel.id_auteur == id_auteur
+                )
+            )
+            session.commit()
+
+    def requete_feed(
+        self,
+        session: Session,
+        user_id: int,
+        limite: Optional[int] = None,
+        avant: Optional[Tuple[datetime, int]] = None,
+    ):
+        """Requete du fil : la page lue dans la timeline, completee des activites
+        non diffusees des auteurs suivis."""
+        poussees = select(TimelineModel.id_activite, TimelineModel.date_activite).where(
+            TimelineModel.id_lecteur == user_id
+        )
+        if avant is not None:
+            poussees = poussees.where(
+                tuple_(TimelineModel.date_activite, TimelineModel.id_activite) < tuple_(*avant)
+            )
+        poussees = poussees.order_by(
+            TimelineModel.date_activite.desc(), TimelineModel.id_activite.desc()
+        )
+        if limite is not None:
+            poussees = poussees.limit(limite)
+        # `~diffusee` reprend le predicat de idx_activite_non_diffusee
+        en_attente = activites_auteurs(
+            self._model, user_id, limite, avant, filtres=(~self._model.diffusee,)
+        )
+
+        return (
+            session.query(self._model)
+            .filter(self._model.id.in_(page_fil(union_all(poussees, en_attente), limite)))
+            .order_by(self._model.date_activite.desc(), self._model.id.desc())
+        )
+
+    def get_feed(
+        self,
+        user_id: int,
+        limite: Optional[int] = None,
+        avant: Optional[Tuple[datetime, int]] = None,
+    ) -> List[ActivityModel]:
+        """Retourne le fil (utilisateur + suivis), du plus recent au plus ancien,
+        avec la meme pagination par cle que ActivityDAO.get_feed."""
+        with self._session_factory() as session:
+            return self.requete_feed(session, user_id, limite, avant).all()
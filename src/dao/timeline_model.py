@@ -0,0 +1,22 @@
+from sqlalchemy import Column, DateTime, ForeignKey, Integer
+
+from business_object.base import Base
+
+
+class TimelineModel(Base):
+    """Modele ORM de la table `timeline` : une ligne par activite et par lecteur
+    de son fil (l'auteur et ses suiveurs), recopiee a l'enregistrement."""
+
+    __tablename__ = "timeline"
+
+    id_lecteur = Column(
+        Integer, ForeignKey("utilisateur.id_user", ondelete="CASCADE"), primary_key=True
+    )
+    id_activite = Column(
+        Integer, ForeignKey("activite.id_activite", ondelete="CASCADE"), primary_key=True
+    )
+    id_auteur = Column(Integer, nullable=False)
+    date_activite = Column(DateTime, nullable=False)
+
+    def __repr__(self) -> str:
+        return f"<Timeline lecteur={self.id_lecteur} activite={self.id_activite}>"
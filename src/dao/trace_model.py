@@ -0,0 +1,20 @@
+from sqlalchemy import Column, ForeignKey, Integer, LargeBinary
+from sqlalchemy.orm import deferred
+
+from business_object.base import Base
+
+
+class TraceModel(Base):
+    """Modele ORM de la table `activite_trace` (points GPS encodes d'une activite)."""
+
+    __tablename__ = "activite_trace"
+
+    id_activite = Column(
+        Integer, ForeignKey("activite.id_activite", ondelete="CASCADE"), primary_key=True
+    )
+    nb_points = Column(Integer, nullable=False)
+    # Charge uniquement a la lecture de l'attribut
+    donnees = deferred(Column(LargeBinary, nullable=False))
+
+    def __repr__(self) -> str:
+        return f"<Trace activite={self.id_activite} points={self.nb_points}>"
@@ -1,13 +1,125 @@
+import os
+import xml.etree.ElementTree as ET
+from contextlib import contextmanager
 from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List, Optional
 
-from fastapi import APIRouter, Depends, File, HTTPException, UploadFile
+from fastapi import APIRouter, Depends, File, HTTPException, Request, UploadFile
+from fastapi.concurrency import run_in_threadpool
 
 from routers.auth import get_current_user
 from service.activity_service import ActivityService
-from utils.gpx_parser import _activity_to_dict, _coerce_float, _parse_date, parse_strava_gpx
+from service.segment_service import SegmentService
+from utils.gpx_cache import GPXCache
+from utils.gpx_compression import FORMAT_ZIP
+from utils.gpx_ingestion import IngestionIncrementale, TailleMaxDepassee
+from utils.gpx_parser import GPXStreamReader, _activity_to_dict, _coerce_float, _parse_date
+from utils.track_simplification import PyramideLOD
+from utils.track_resampling import ABSCISSES, NB_POINTS_GRAPHIQUE, serie_graphique
+from utils.track_splits import LONGUEURS_SPLIT, splits_trace
 
 router = APIRouter(prefix="/activities", tags=["Activities"])
 
+# Taille maximale d'un fichier GPX envoye (octets)
+TAILLE_MAX_GPX = int(os.environ.get("GPX_UPLOAD_MAX_BYTES", 50 * 1024 * 1024))
+# Import en lot : nombre de fichiers GPX (archives zip depliees) et octets
+# (decompresses pour les archives zip) autorises
+NB_FICHIERS_LOT_MAX = int(os.environ.get("GPX_BULK_MAX_FILES", 500))
+TAILLE_MAX_LOT = int(os.environ.get("GPX_BULK_MAX_BYTES", 4 * TAILLE_MAX_GPX))
+
+
+def _verifier_taille(taille) -> None:
+    """Refuse d'emblee un envoi dont la taille annoncee depasse le maximum."""
+    if taille is not None and int(taille) > TAILLE_MAX_GPX:
+        raise HTTPException(
+            status_code=413, detail=f"Fichier trop volumineux (maximum {TAILLE_MAX_GPX} octets)"
+        )
+
+
+def _verifier_unite(unite: str) -> None:
+    """Refuse une unite de split inconnue."""
+    if unite not in LONGUEURS_SPLIT:
+        raise HTTPException(
+            status_code=400, detail=f"unite doit valoir {' ou '.join(LONGUEURS_SPLIT)}"
+        )
+
+
+async def _blocs_upload(upload: UploadFile) -> AsyncIterator[bytes]:
+    """Lit un fichier envoye bloc par bloc, sans le charger entierement."""
+    while bloc := await upload.read(GPXStreamReader.TAILLE_BLOC):
+        yield bloc
+
+
+@contextmanager
+def _erreurs_gpx():
+    """Traduit les erreurs de lecture GPX en reponses HTTP (413 ou 400)."""
+    try:
+        yield
+    except TailleMaxDepassee as exc:
+        raise HTTPException(status_code=413, detail=str(exc)) from exc
+    except (ET.ParseError, ValueError) as exc:
+        raise HTTPException(status_code=400, detail=f"Fichier GPX invalide: {exc}") from exc
+
+
+async def _recevoir_blocs(blocs: AsyncIterator[bytes]) -> IngestionIncrementale:
+    """Analyse les blocs au fur et a mesure de leur reception."""
+    flux = IngestionIncrementale(TAILLE_MAX_GPX)
+    with _erreurs_gpx():
+        async for bloc in blocs:
+            flux.feed(bloc)
+    return flux
+
+
+async def _ingerer_blocs(blocs: AsyncIterator[bytes]):
+    """Analyse un fichier GPX recu par blocs et renvoie (ingestion, cache_hit)."""
+    flux = await _recevoir_blocs(blocs)
+    with _erreurs_gpx():
+        return GPXCache().finish(flux)
+
+
+def _resume(ingestion, zoom: Optional[float], unite: str = "km") -> Dict[str, Any]:
+    """Resume d'une ingestion et ses splits, avec la trace simplifiee pour ce zoom si demande."""
+    resume = ingestion.as_strava_dict()
+    resume["splits"] = splits_trace(ingestion.track, unite)
+    if zoom is not None:
+        resume["trace"] = ingestion.pyramide.coordonnees(zoom)
+    return resume
+
+
+async def _resume_blocs(
+    blocs: AsyncIterator[bytes], zoom: Optional[float] = None, unite: str = "km"
+) -> Dict[str, Any]:
+    """Resume d'un fichier GPX (brut ou compresse) recu par blocs
+
+    Une archive zip de plusieurs fichiers GPX donne un resume par fichier.
+    """
+    flux = await _recevoir_blocs(blocs)
+    with _erreurs_gpx():
+        if flux.format == FORMAT_ZIP:
+            lot = flux.finish_lot()
+            if len(lot) != 1:
+                return {
+                    "fichiers": [
+                        {"fichier": nom, **_resume(ingestion, zoom, unite)}
+                        for nom, ingestion in lot
+                    ],
+                    "cache_hit": False,
+                }
+        ingestion, cache_hit = GPXCache().finish(flux)
+    return {**_resume(ingestion, zoom, unite), "cache_hit": cache_hit}
+
+
+async def _lire_upload(upload: UploadFile) -> bytes:
+    """Contenu complet d'un fichier envoye, dans la limite de TAILLE_MAX_GPX."""
+    _verifier_taille(upload.size)
+    blocs = []
+    taille = 0
+    async for bloc in _blocs_upload(upload):
+        taille += len(bloc)
+        _verifier_taille(taille)
+        blocs.append(bloc)
+    return b"".join(blocs)
+
 
 @router.post("")
 async def create_activity(
@@ -24,8 +136,14 @@ async def create_activity(
     """Creer une activite (manuelle ou via fichier GPX)"""
     try:
         gpx_data = None
+        cache_hit = None
+        trace = None
         if gpx_file:
-            gpx_data = parse_strava_gpx(await gpx_file.read())
+            # Le fichier a souvent deja ete analyse par /upload-gpx (pre-remplissage)
+            _verifier_taille(gpx_file.size)
+            ingestion, cache_hit = await _ingerer_blocs(_blocs_upload(gpx_file))
+            gpx_data = ingestion.as_strava_dict()
+            trace = ingestion.track
 
         titre_final = titre or (gpx_data.get("nom") if gpx_data else None) or "Activite importee"
         sport_final = (sport or (gpx_data.get("type") if gpx_data else "course")).lower()
@@ -70,12 +188,16 @@ async def create_activity(
             "distance": distance_km,
             "duree": duree_heures,
             "id_user": current_user["id"],
+            "trace": trace,
         }
 
-        if not ActivityService().creer_activite_from_dict(activity_data):
+        id_activite, doublon = ActivityService().enregistrer_activite(activity_data)
+        if doublon is not None:
+            raise HTTPException(status_code=409, detail=f"Activite deja enregistree (id {doublon})")
+        if id_activite is None:
             raise HTTPException(status_code=500, detail="Erreur lors de la creation de l'activite")
 
-        return {
+        response = {
             "message": "Activite creee avec succes",
             "activity": {
                 "titre": titre_final,
@@ -86,6 +208,9 @@ async def create_activity(
                 "lieu": lieu or "",
             },
         }
+        if gpx_file:
+            response["cache_hit"] = cache_hit
+        return response
     except HTTPException:
         raise
     except Exception as exc:
@@ -109,6 +234,95 @@ def get_activity(activity_id: int, current_user: dict = Depends(get_current_user
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.get("/{activity_id}/track")
+def get_activity_track(
+    activity_id: int, zoom: Optional[float] = None, current_user: dict = Depends(get_current_user)
+):
+    """Recuperer la trace GPS d'une activite
+
+    Sans `zoom`, tous les points sont renvoyes ; avec `zoom` (niveau de zoom
+    de la carte), la trace est simplifiee a ce niveau de detail.
+    """
+    try:
+        track = _trace_activite(activity_id)
+        return {
+            "id_activite": activity_id,
+            "nb_points": len(track),
+            "trace": PyramideLOD(track.lat, track.lon).coordonnees(zoom),
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/{activity_id}/splits")
+def get_activity_splits(
+    activity_id: int, unite: str = "km", current_user: dict = Depends(get_current_user)
+):
+    """Recuperer les splits (par km ou par mile) d'une activite"""
+    _verifier_unite(unite)
+    try:
+        track = _trace_activite(activity_id)
+        return {
+            "id_activite": activity_id,
+            "unite": unite,
+            "splits": splits_trace(track, unite),
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/{activity_id}/graphique")
+def get_activity_graphique(
+    activity_id: int,
+    abscisse: str = "distance",
+    nb_points: int = NB_POINTS_GRAPHIQUE,
+    current_user: dict = Depends(get_current_user),
+):
+    """Profils d'altitude et de vitesse d'une activite, reduits a nb_points points"""
+    if abscisse not in ABSCISSES:
+        raise HTTPException(
+            status_code=400, detail=f"abscisse doit valoir {' ou '.join(ABSCISSES)}"
+        )
+    if not 3 <= nb_points <= 5000:
+        raise HTTPException(status_code=400, detail="nb_points doit etre entre 3 et 5000")
+    try:
+        track = _trace_activite(activity_id)
+        return {"id_activite": activity_id, **serie_graphique(track, abscisse, nb_points)}
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/{activity_id}/segments")
+def get_activity_segments(activity_id: int, current_user: dict = Depends(get_current_user)):
+    """Passages d'une activite sur les segments"""
+    if not ActivityService().get_activite_by_id(activity_id):
+        raise HTTPException(status_code=404, detail="Activite non trouvee")
+    return [
+        {"id_segment": id_segment, "nom": nom, "duree_s": duree}
+        for id_segment, nom, duree in SegmentService().get_efforts_activite(activity_id)
+    ]
+
+
+def _trace_activite(activity_id: int):
+    """Trace GPS enregistree d'une activite ; 404 si l'activite ou sa trace manque."""
+    activity_service = ActivityService()
+    if not activity_service.get_activite_by_id(activity_id):
+        raise HTTPException(status_code=404, detail="Activite non trouvee")
+
+    track = activity_service.get_trace(activity_id)
+    if track is None:
+        raise HTTPException(status_code=404, detail="Aucune trace GPS pour cette activite")
+    return track
+
+
 @router.put("/{activity_id}")
 def update_activity(
     activity_id: int,
@@ -184,7 +398,77 @@ def delete_activity(activity_id: int, current_user: dict = Depends(get_current_u
 
 
 @router.post("/upload-gpx")
-async def upload_gpx(file: UploadFile = File(...)):
-    """Uploader et parser un fichier GPX"""
-    content = await file.read()
-    return parse_strava_gpx(content)
+async def upload_gpx(file: UploadFile = File(...), zoom: Optional[float] = None, unite: str = "km"):
+    """Uploader et parser un fichier GPX (eventuellement .gpx.gz, .gpx.bz2 ou .zip)
+
+    La reponse contient les splits par `unite` (km ou mile). Avec `zoom`
+    (niveau de zoom de la carte), elle contient aussi la trace simplifiee a
+    ce niveau de detail.
+    """
+    _verifier_taille(file.size)
+    _verifier_unite(unite)
+    return await _resume_blocs(_blocs_upload(file), zoom, unite)
+
+
+@router.post("/upload-gpx/stream")
+async def upload_gpx_stream(request: Request, zoom: Optional[float] = None, unite: str = "km"):
+    """Parser un fichier GPX envoye brut dans le corps de la requete
+
+    L'analyse avance pendant la reception du corps, sans attendre la fin du
+    transfert.
+    """
+    _verifier_taille(request.headers.get("content-length"))
+    _verifier_unite(unite)
+    return await _resume_blocs(request.stream(), zoom, unite)
+
+
+@router.post("/bulk-gpx")
+async def bulk_import_gpx(
+    files: List[UploadFile] = File(...),
+    sport: str = None,
+    current_user: dict = Depends(get_current_user),
+):
+    """Importer un lot de fichiers GPX (ou des archives zip)
+
+    Le sport est deduit du type de chaque trace ; `sport` sert pour les
+    fichiers dont le type est absent ou inconnu. Au-dela de NB_FICHIERS_LOT_MAX
+    fichiers ou TAILLE_MAX_LOT octets envoyes, le lot est refuse (413).
+    """
+    try:
+        if len(files) > NB_FICHIERS_LOT_MAX:
+            raise HTTPException(
+                status_code=413,
+                detail=f"Lot trop volumineux (maximum {NB_FICHIERS_LOT_MAX} fichiers)",
+            )
+        fichiers = []
+        taille_lot = 0
+        for f in files:
+            fichiers.append((f.filename, await _lire_upload(f)))
+            taille_lot += len(fichiers[-1][1])
+            if taille_lot > TAILLE_MAX_LOT:
+                raise HTTPException(
+                    status_code=413, detail=f"Lot trop volumineux (maximum {TAILLE_MAX_LOT} octets)"
+                )
+        # L'analyse attend le pool de processus : ne pas bloquer la boucle d'evenements
+        statuts = await run_in_threadpool(
+            ActivityService().importer_gpx,
+            fichiers,
+            current_user["id"],
+            sport,
+            taille_max=TAILLE_MAX_GPX,
+            nb_fichiers_max=NB_FICHIERS_LOT_MAX,
+            taille_totale_max=TAILLE_MAX_LOT,
+        )
+        importes = sum(1 for statut in statuts if statut["statut"] == "importe")
+        doublons = sum(1 for statut in statuts if statut["statut"] == "doublon")
+        return {
+            "total": len(statuts),
+            "importes": importes,
+            "doublons": doublons,
+            "erreurs": len(statuts) - importes - doublons,
+            "fichiers": statuts,
+        }
+    except HTTPException:
+        raise
+    except Exception as exc:
+        raise HTTPException(status_code=500, detail=str(exc))
@@ -1,17 +1,44 @@
+from typing import Optional
+
 from fastapi import APIRouter, Depends, HTTPException
 
 from routers.auth import get_current_user
 from service.activity_service import ActivityService
 from utils.gpx_parser import _activity_to_dict
+from utils.pagination import decoder_curseur, encoder_curseur
 
 router = APIRouter(tags=["Feed"])
 
+# Taille de page du fil : par defaut et maximale
+LIMITE_FEED = 20
+LIMITE_FEED_MAX = 100
+
 
 @router.get("/feed")
-def get_feed_endpoint(current_user: dict = Depends(get_current_user)):
-    """Recuperer le feed des activites"""
+def get_feed_endpoint(
+    limit: int = LIMITE_FEED,
+    before: Optional[str] = None,
+    current_user: dict = Depends(get_current_user),
+):
+    """Recuperer une page du feed des activites
+
+    `before` est le `next_cursor` de la page precedente ; `next_cursor` vaut
+    None sur la derniere page.
+    """
+    if not 1 <= limit <= LIMITE_FEED_MAX:
+        raise HTTPException(status_code=400, detail=f"limit doit etre entre 1 et {LIMITE_FEED_MAX}")
+    try:
+        avant = decoder_curseur(before) if before else None
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
     try:
-        activities = ActivityService().get_feed(current_user["id"])
-        return [_activity_to_dict(a) for a in activities]
+        activities, encore = ActivityService().get_feed_page(current_user["id"], limit, avant)
+        derniere = activities[-1] if activities and encore else None
+        return {
+            "activities": [_activity_to_dict(a) for a in activities],
+            "next_cursor": (
+                encoder_curseur(derniere.date_activite, derniere.id) if derniere else None
+            ),
+        }
     except Exception as exc:
         raise HTTPException(status_code=500, detail=str(exc))
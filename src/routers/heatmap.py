@@ -0,0 +1,30 @@
+from fastapi import APIRouter, Depends, HTTPException, Response
+
+from routers.auth import get_current_user
+from service.heatmap_service import HeatmapService
+from utils.heatmap import tuile_valide
+
+router = APIRouter(prefix="/heatmap", tags=["Heatmap"])
+
+
+def _reponse_tuile(z: int, x: int, y: int, id_user: int | None = None) -> Response:
+    """Tuile PNG, ou 404 si ses coordonnees sortent de la pyramide."""
+    service = HeatmapService()
+    if not tuile_valide(z, x, y, service.cache.zoom_max):
+        raise HTTPException(status_code=404, detail="Tuile hors limites")
+    image = service.tuile(z, x, y, id_user)
+    if image is None:
+        raise HTTPException(status_code=500, detail="Erreur lors du rendu de la tuile")
+    return Response(content=image, media_type="image/png", headers={"Cache-Control": "max-age=300"})
+
+
+@router.get("/moi/{z}/{x}/{y}.png")
+def heatmap_tile_user(z: int, x: int, y: int, current_user: dict = Depends(get_current_user)):
+    """Tuile de la heatmap des activites de l'utilisateur connecte"""
+    return _reponse_tuile(z, x, y, current_user["id"])
+
+
+@router.get("/{z}/{x}/{y}.png")
+def heatmap_tile(z: int, x: int, y: int, current_user: dict = Depends(get_current_user)):
+    """Tuile de la heatmap de toutes les activites, reservee aux utilisateurs connectes"""
+    return _reponse_tuile(z, x, y)
@@ -0,0 +1,96 @@
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException
+
+from routers.auth import get_current_user
+from service.activity_service import ActivityService
+from service.segment_service import SegmentService
+from utils.segment_matching import portion
+
+router = APIRouter(prefix="/segments", tags=["Segments"])
+
+
+@router.post("")
+def create_segment(
+    nom: str,
+    id_activite: int,
+    debut_km: float = 0.0,
+    fin_km: Optional[float] = None,
+    current_user: dict = Depends(get_current_user),
+):
+    """Creer un segment a partir d'une portion d'une de ses activites
+
+    La portion va de `debut_km` a `fin_km` (fin de la trace par defaut) ; le
+    segment prend le sport de l'activite. Les passages sont detectes sur les
+    activites enregistrees ensuite.
+    """
+    if fin_km is not None and fin_km <= debut_km:
+        raise HTTPException(status_code=400, detail="fin_km doit etre superieur a debut_km")
+    try:
+        activity_service = ActivityService()
+        activity = activity_service.get_activite_by_id(id_activite)
+        if not activity:
+            raise HTTPException(status_code=404, detail="Activite non trouvee")
+        if activity.id_user != current_user["id"]:
+            raise HTTPException(status_code=403, detail="Acces refuse")
+
+        track = activity_service.get_trace(id_activite)
+        if track is None:
+            raise HTTPException(status_code=404, detail="Aucune trace GPS pour cette activite")
+        fin = float("inf") if fin_km is None else fin_km * 1000
+        try:
+            forme = portion(track, debut_km * 1000, fin)
+        except ValueError as exc:
+            raise HTTPException(status_code=400, detail=str(exc))
+
+        segment = SegmentService().creer_segment(nom, activity.sport, current_user["id"], forme)
+        if segment is None:
+            raise HTTPException(status_code=500, detail="Erreur lors de la creation du segment")
+        return _segment_to_dict(segment)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/{segment_id}")
+def get_segment(segment_id: int, current_user: dict = Depends(get_current_user)):
+    """Recuperer un segment par son ID"""
+    segment = SegmentService().get_segment(segment_id)
+    if not segment:
+        raise HTTPException(status_code=404, detail="Segment non trouve")
+    return _segment_to_dict(segment)
+
+
+@router.get("/{segment_id}/classement")
+def get_segment_leaderboard(
+    segment_id: int, limite: int = 10, current_user: dict = Depends(get_current_user)
+):
+    """Classement d'un segment : meilleur passage de chaque utilisateur"""
+    if limite < 1:
+        raise HTTPException(status_code=400, detail="limite doit etre positive")
+    service = SegmentService()
+    if not service.get_segment(segment_id):
+        raise HTTPException(status_code=404, detail="Segment non trouve")
+    return [
+        {
+            "rang": rang,
+            "id_user": id_user,
+            "duree_s": duree,
+            "id_activite": id_activite,
+            "date_activite": date_activite,
+        }
+        for rang, (id_user, duree, id_activite, date_activite) in enumerate(
+            service.get_classement(segment_id, limite), start=1
+        )
+    ]
+
+
+def _segment_to_dict(segment) -> dict:
+    return {
+        "id_segment": segment.id,
+        "nom": segment.nom,
+        "sport": segment.sport,
+        "distance_m": round(segment.distance, 1),
+        "id_user": segment.id_user,
+    }
@@ -3,6 +3,7 @@ from fastapi import APIRouter, Depends, HTTPException
 from routers.auth import get_current_user
 from service.activity_service import ActivityService
 from service.statistiques_service import StatistiquesService
+from utils.best_efforts import DISTANCES_EFFORT
 
 router = APIRouter(prefix="/stats", tags=["Statistics"])
 
@@ -51,6 +52,22 @@ def stats_weekly_average(nb_semaines: int = 4, current_user: dict = Depends(get_
     return stats
 
 
+@router.get("/records")
+def stats_records(current_user: dict = Depends(get_current_user)):
+    """Records personnels (meilleurs efforts par sport)"""
+    records = ActivityService().get_records(current_user["id"])
+    return [
+        {
+            "sport": record.sport,
+            "effort": record.effort,
+            "distance_m": DISTANCES_EFFORT.get(record.effort),
+            "duree_s": record.duree,
+            "id_activite": record.id_activite,
+        }
+        for record in records
+    ]
+
+
 @router.get("/user/{user_id}/monthly")
 def user_activities_monthly(
     user_id: int,
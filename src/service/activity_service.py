@@ -1,17 +1,62 @@
 import logging
-from typing import Any, Dict, Optional
+import os
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy.exc import IntegrityError
 
 from dao.activite_dao import ActivityDAO
 from dao.activity_model import ActivityModel
+from dao.timeline_dao import SEUIL_DIFFUSION, TimelineDAO
+from service.heatmap_service import HeatmapService
+from service.segment_service import SegmentService
+from utils.best_efforts import meilleurs_efforts
+from utils.gpx_import import activite_depuis_analyse, analyser_lot, est_zip, extraire_zip
 from utils.log_decorator import log
 from utils.singleton import Singleton
+from utils.track import Track
+from utils.track_codec import decoder_trace, encoder_trace
+from utils.track_fingerprint import empreinte_trace, empreintes_proches
+
+_diffusion: Optional[ThreadPoolExecutor] = None
+_heatmap: Optional[ThreadPoolExecutor] = None
+
+
+def _executeur_diffusion() -> ThreadPoolExecutor:
+    """Thread de diffusion des activites dans les timelines, cree a la premiere utilisation."""
+    global _diffusion
+    if _diffusion is None:
+        _diffusion = ThreadPoolExecutor(max_workers=1, thread_name_prefix="diffusion")
+    return _diffusion
+
+
+def _executeur_heatmap() -> ThreadPoolExecutor:
+    """Thread de mise a jour de la heatmap, cree a la premiere utilisation."""
+    global _heatmap
+    if _heatmap is None:
+        _heatmap = ThreadPoolExecutor(max_workers=1, thread_name_prefix="heatmap")
+    return _heatmap
+
+
+def _reste(maximum: Optional[int], utilise: int) -> Optional[int]:
+    """Part encore disponible d'une limite (None : pas de limite)."""
+    return None if maximum is None else maximum - utilise
 
 
 class ActivityService(metaclass=Singleton):
-    """Service gerant les operations liees aux activites."""
+    """Service gerant les operations liees aux activites.
+
+    Avec FEED_FANOUT=1, chaque activite enregistree est recopiee en arriere-plan
+    dans la timeline de ses lecteurs (voir TimelineDAO), ou le fil est lu ; les
+    auteurs suivis par plus de FEED_FANOUT_MAX_FOLLOWERS utilisateurs restent lus
+    a la demande.
+    """
 
     def __init__(self):
         self.activity_dao = ActivityDAO()
+        self.fil_pousse = bool(int(os.environ.get("FEED_FANOUT", 0)))
+        self.seuil_diffusion = int(os.environ.get("FEED_FANOUT_MAX_FOLLOWERS", SEUIL_DIFFUSION))
+        self.timeline_dao = TimelineDAO() if self.fil_pousse else None
 
     @staticmethod
     def _normalize_duration(value: Any) -> Optional[float]:
@@ -51,6 +96,92 @@ class ActivityService(metaclass=Singleton):
             id_user=payload["id_user"],
         )
 
+    @staticmethod
+    def _trace_from_mapping(payload: Dict[str, Any]) -> Optional[bytes]:
+        """Trace encodee d'une activite : `trace` peut etre une Track ou deja encodee."""
+        trace = payload.get("trace")
+        if isinstance(trace, Track):
+            return encoder_trace(trace) if len(trace) else None
+        return trace
+
+    @staticmethod
+    def _efforts_from_mapping(payload: Dict[str, Any]) -> Optional[Dict[str, float]]:
+        """Meilleurs efforts d'une activite : fournis (`efforts`) ou tires de sa trace."""
+        if payload.get("efforts") is not None:
+            return payload["efforts"]
+        trace = payload.get("trace")
+        if isinstance(trace, Track):
+            return meilleurs_efforts(trace)
+        return None
+
+    @staticmethod
+    def _empreinte_from_mapping(payload: Dict[str, Any]) -> Optional[str]:
+        """Empreinte d'une activite : fournie (`empreinte`) ou tiree de sa trace."""
+        if "empreinte" in payload:
+            return payload["empreinte"]
+        trace = payload.get("trace")
+        if isinstance(trace, Track):
+            return empreinte_trace(trace, payload.get("date_activite"))
+        return None
+
+    def _doublons(self, id_user: int, empreintes: List[Optional[str]]) -> Dict[str, int]:
+        """Activite deja enregistree pour chaque empreinte, tranches voisines comprises,
+        en une seule requete : {empreinte: id_activite}."""
+        proches = {empreinte: empreintes_proches(empreinte) for empreinte in empreintes if empreinte}
+        if not proches:
+            return {}
+        existantes = self.activity_dao.trouver_doublons(
+            id_user, [voisine for voisines in proches.values() for voisine in voisines]
+        )
+        doublons = {}
+        for empreinte, voisines in proches.items():
+            for voisine in voisines:
+                if voisine in existantes:
+                    doublons[empreinte] = existantes[voisine]
+                    break
+        return doublons
+
+    @staticmethod
+    def _indexer_trace(
+        id_activite: int, id_user: int, sport: str, trace, heatmap: bool = True
+    ) -> None:
+        """Enregistre les passages d'une activite sur les segments et ajoute ses points
+        a la heatmap, sans faire echouer l'enregistrement de l'activite en cas d'erreur.
+
+        La heatmap est mise a jour en arriere-plan : la requete n'attend pas le
+        verrou des tuiles."""
+        if trace is None:
+            return
+        try:
+            if not isinstance(trace, Track):
+                trace = decoder_trace(trace)
+            if not len(trace):
+                return
+            SegmentService().detecter_efforts(id_activite, id_user, sport, trace)
+            if heatmap:
+                _executeur_heatmap().submit(HeatmapService().ajouter_trace, id_user, trace)
+        except Exception as exc:
+            logging.error(f"Erreur lors de l'indexation de la trace: {exc}")
+
+    def _diffuser(self, ids: List[int]) -> Optional[Future]:
+        """Lance la diffusion des activites dans les timelines, sans attendre : d'ici
+        la, le fil les lit a la demande."""
+        if not self.fil_pousse or not ids:
+            return None
+        return _executeur_diffusion().submit(self._diffuser_maintenant, ids)
+
+    def _diffuser_maintenant(self, ids: List[int]) -> int:
+        """Diffuse les activites ; en cas d'erreur, elles restent lues a la demande."""
+        try:
+            return self.timeline_dao.diffuser(ids, self.seuil_diffusion)
+        except Exception as exc:
+            logging.error(f"Erreur lors de la diffusion des activites {ids}: {exc}")
+            return 0
+
+    def _fil_dao(self):
+        """DAO du fil : la timeline si les activites y sont diffusees."""
+        return self.timeline_dao if self.fil_pousse else self.activity_dao
+
     @log
     def creer_activite(self, activity) -> bool:
         """Cree une activite a partir d'un business object."""
@@ -73,13 +204,169 @@ class ActivityService(metaclass=Singleton):
 
     @log
     def creer_activite_from_dict(self, activity_data: Dict[str, Any]) -> bool:
-        """Cree une activite a partir d'un dictionnaire."""
+        """Cree une activite (et sa trace GPS eventuelle) a partir d'un dictionnaire.
+
+        Une activite deja enregistree (meme empreinte) n'est pas creee une seconde fois.
+        """
+        id_activite, doublon = self.enregistrer_activite(activity_data)
+        if doublon is not None:
+            logging.warning(f"Activite deja enregistree: {doublon}")
+        return id_activite is not None
+
+    @log
+    def enregistrer_activite(
+        self, activity_data: Dict[str, Any]
+    ) -> Tuple[Optional[int], Optional[int]]:
+        """Cree une activite a partir d'un dictionnaire et renvoie (id de l'activite, None),
+        ou (None, id du doublon) si elle est deja enregistree, (None, None) en cas d'erreur.
+
+        Le doublon est cherche une seule fois, tranches voisines comprises. Deux envois
+        simultanes d'une meme empreinte sont departages par l'index unique
+        idx_activite_empreinte : le second recoit l'activite enregistree par le premier.
+        """
         try:
             model = self._model_from_mapping(activity_data)
-            return self.activity_dao.save(model) is not None
+            model.empreinte = self._empreinte_from_mapping(activity_data)
+            doublon = self._doublons(model.id_user, [model.empreinte]).get(model.empreinte)
+            if doublon is not None:
+                return None, doublon
+            trace = self._trace_from_mapping(activity_data)
+            efforts = self._efforts_from_mapping(activity_data)
+            try:
+                if self.activity_dao.save(model, trace=trace, efforts=efforts) is None:
+                    return None, None
+            except IntegrityError:
+                doublon = self._doublons(model.id_user, [model.empreinte]).get(model.empreinte)
+                if doublon is None:
+                    raise
+                return None, doublon
         except Exception as exc:  # pragma: no cover - log error path
             logging.error(f"Erreur lors de la creation de l'activite: {exc}")
-            return False
+            return None, None
+        self._indexer_trace(model.id, model.id_user, model.sport, activity_data.get("trace"))
+        self._diffuser([model.id])
+        return model.id, None
+
+    @log
+    def creer_activites_from_dicts(self, activities_data: List[Dict[str, Any]]) -> List[int]:
+        """Cree plusieurs activites en une transaction et renvoie leurs ID."""
+        try:
+            models = [self._model_from_mapping(data) for data in activities_data]
+            for model, data in zip(models, activities_data):
+                model.empreinte = self._empreinte_from_mapping(data)
+            traces = [self._trace_from_mapping(data) for data in activities_data]
+            efforts = [self._efforts_from_mapping(data) for data in activities_data]
+            ids = self.activity_dao.save_all(models, traces, efforts)
+        except Exception as exc:
+            logging.error(f"Erreur lors de la creation des activites: {exc}")
+            return []
+        for id_activite, model, data in zip(ids, models, activities_data):
+            self._indexer_trace(id_activite, model.id_user, model.sport, data.get("trace"))
+        self._diffuser(ids)
+        return ids
+
+    @log
+    def importer_gpx(
+        self,
+        fichiers: List[Tuple[str, bytes]],
+        id_user: int,
+        sport: Optional[str] = None,
+        taille_max: Optional[int] = None,
+        nb_fichiers_max: Optional[int] = None,
+        taille_totale_max: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """Importe un lot de fichiers GPX (nom, contenu) et renvoie le statut de chaque fichier.
+
+        Les archives zip sont depliees, les fichiers analyses en parallele,
+        puis les activites valides enregistrees en une seule transaction. Les
+        doublons (activite deja enregistree, ou fichier repete dans le lot) sont
+        signales avec le statut "doublon".
+
+        Une archive qui ferait depasser au lot `nb_fichiers_max` fichiers ou
+        `taille_totale_max` octets decompresses est refusee (statut "erreur"),
+        comme un fichier decompresse au-dela du ratio autorise pour `taille_max`.
+        """
+        statuts = []
+        a_creer = []
+        lot = []
+        taille_lot = 0
+        for nom, contenu in fichiers:
+            if not est_zip(contenu):
+                lot.append((nom, contenu))
+                taille_lot += len(contenu)
+                continue
+            try:
+                extraits = extraire_zip(
+                    nom,
+                    contenu,
+                    taille_max,
+                    _reste(taille_totale_max, taille_lot),
+                    _reste(nb_fichiers_max, len(lot)),
+                )
+            except ValueError as exc:
+                statuts.append({"fichier": nom, "statut": "erreur", "detail": str(exc)})
+                continue
+            lot.extend(extraits)
+            taille_lot += sum(len(donnees) for _, donnees in extraits)
+
+        for analyse in analyser_lot(lot, taille_max):
+            statut = {"fichier": analyse["fichier"], "statut": "erreur"}
+            statuts.append(statut)
+            if "erreur" in analyse:
+                statut["detail"] = analyse["erreur"]
+                continue
+            try:
+                activity_data = activite_depuis_analyse(analyse, id_user, sport)
+            except ValueError as exc:
+                statut["detail"] = str(exc)
+                continue
+            statut.update(
+                titre=activity_data["titre"],
+                sport=activity_data["sport"],
+                distance=activity_data["distance"],
+            )
+            a_creer.append((statut, activity_data))
+
+        a_creer = self._ecarter_doublons(id_user, a_creer)
+        if not a_creer:
+            return statuts
+
+        ids = self.creer_activites_from_dicts([data for _, data in a_creer])
+        if len(ids) != len(a_creer):
+            for statut, _ in a_creer:
+                statut["detail"] = "Erreur lors de l'enregistrement"
+            return statuts
+
+        for (statut, _), id_activite in zip(a_creer, ids):
+            statut.update(statut="importe", id_activite=id_activite)
+        return statuts
+
+    def _ecarter_doublons(
+        self, id_user: int, a_creer: List[Tuple[Dict[str, Any], Dict[str, Any]]]
+    ) -> List[Tuple[Dict[str, Any], Dict[str, Any]]]:
+        """Marque les doublons d'un lot (statut, activite) et renvoie les autres."""
+        doublons = self._doublons(id_user, [data.get("empreinte") for _, data in a_creer])
+        retenus, vues = [], {}
+        for statut, data in a_creer:
+            empreinte = data.get("empreinte")
+            if empreinte in doublons:
+                statut.update(
+                    statut="doublon",
+                    detail="Activite deja enregistree",
+                    id_activite=doublons[empreinte],
+                )
+                continue
+            if empreinte:
+                premier = next(
+                    (vues[voisine] for voisine in empreintes_proches(empreinte) if voisine in vues),
+                    None,
+                )
+                if premier is not None:
+                    statut.update(statut="doublon", detail=f"Meme activite que {premier}")
+                    continue
+                vues[empreinte] = statut["fichier"]
+            retenus.append((statut, data))
+        return retenus
 
     @log
     def get_activite_by_id(self, activity_id: int):
@@ -90,6 +377,25 @@ class ActivityService(metaclass=Singleton):
             logging.error(f"Erreur lors de la recuperation de l'activite: {exc}")
             return None
 
+    @log
+    def get_trace(self, activity_id: int) -> Optional[Track]:
+        """Recupere la trace GPS d'une activite, None si elle n'en a pas."""
+        try:
+            donnees = self.activity_dao.get_trace(activity_id)
+            return decoder_trace(donnees) if donnees is not None else None
+        except Exception as exc:
+            logging.error(f"Erreur lors de la recuperation de la trace: {exc}")
+            return None
+
+    @log
+    def get_records(self, user_id: int):
+        """Recupere les records personnels d'un utilisateur."""
+        try:
+            return self.activity_dao.get_records(user_id)
+        except Exception as exc:
+            logging.error(f"Erreur lors de la recuperation des records: {exc}")
+            return []
+
     @log
     def get_activites_by_user(self, user_id: int, type_activite: str | None = None):
         """Recupere toutes les activites d'un utilisateur."""
@@ -103,11 +409,24 @@ class ActivityService(metaclass=Singleton):
     def get_feed(self, user_id: int):
         """Recupere le fil d'activites de l'utilisateur et de ses suivis."""
         try:
-            return self.activity_dao.get_feed(user_id)
+            return self._fil_dao().get_feed(user_id)
         except Exception as exc:
             logging.error(f"Erreur lors de la recuperation du fil: {exc}")
             return []
 
+    @log
+    def get_feed_page(self, user_id: int, limite: int, avant=None):
+        """Recupere une page du fil, strictement avant la position `avant`.
+
+        Retourne (activites, encore) ; `encore` indique qu'une page suit.
+        """
+        try:
+            activites = self._fil_dao().get_feed(user_id, limite=limite + 1, avant=avant)
+            return activites[:limite], len(activites) > limite
+        except Exception as exc:
+            logging.error(f"Erreur lors de la recuperation du fil: {exc}")
+            return [], False
+
     @log
     def get_monthly_activities(
         self,
@@ -154,10 +473,7 @@ class ActivityService(metaclass=Singleton):
                 "detail_sport": self._extract_detail_sport(activity),
             }
             model = self._model_from_mapping(payload)
-
-            if self.activity_dao.delete(activity_id):
-                return self.activity_dao.save(model) is not None
-            return False
+            return self._remplacer(activity_id, model)
         except Exception as exc:
             logging.error(f"Erreur lors de la modification de l'activite: {exc}")
             return False
@@ -173,9 +489,29 @@ class ActivityService(metaclass=Singleton):
                 logging.warning("Impossible de modifier une activite sans identifiant")
                 return False
 
-            if self.activity_dao.delete(activity_id):
-                return self.activity_dao.save(model) is not None
-            return False
+            return self._remplacer(activity_id, model)
         except Exception as exc:
             logging.error(f"Erreur lors de la modification de l'activite: {exc}")
             return False
+
+    def _remplacer(self, activity_id: int, model: ActivityModel) -> bool:
+        """Supprime l'activite puis enregistre `model` a sa place.
+
+        La trace, les efforts et l'empreinte disparaissent avec la ligne supprimee :
+        ils sont repris tels quels, et les records comme les passages sur les segments
+        suivent le sport de la nouvelle version.
+        """
+        ancienne = self.activity_dao.get_by_id(activity_id)
+        if ancienne is None:
+            return False
+        trace = self.activity_dao.get_trace(activity_id)
+        efforts = self.activity_dao.get_efforts(activity_id)
+        model.empreinte = ancienne.empreinte
+        if not self.activity_dao.delete(activity_id):
+            return False
+        if self.activity_dao.save(model, trace=trace, efforts=efforts) is None:
+            return False
+        # Memes points : la heatmap les compte deja
+        self._indexer_trace(model.id, model.id_user, model.sport, trace, heatmap=False)
+        self._diffuser([model.id])
+        return True
@@ -0,0 +1,100 @@
+import logging
+import os
+import tempfile
+from itertools import islice
+from typing import Optional, Tuple
+
+import numpy as np
+
+from utils.heatmap import ZOOM_MAX, CacheHeatmap
+from utils.log_decorator import log
+from utils.singleton import Singleton
+from utils.track import Track
+from utils.track_codec import decoder_trace
+
+COUCHE_GLOBALE = "global"
+
+
+def couche_utilisateur(id_user: int) -> str:
+    """Nom de la couche de heatmap d'un utilisateur."""
+    return f"utilisateur_{id_user}"
+
+
+class HeatmapService(metaclass=Singleton):
+    """Service gerant les tuiles de heatmap : couche globale et couche de chaque utilisateur.
+
+    Les tuiles sont gardees dans HEATMAP_DIR (dossier temporaire par defaut),
+    jusqu'au zoom HEATMAP_ZOOM_MAX. Le cache les verrouille lui-meme : plusieurs
+    processus peuvent partager le dossier.
+
+    Sur la couche globale, un pixel n'apparait que si au moins
+    HEATMAP_UTILISATEURS_MIN utilisateurs (2 par defaut) y sont passes : aux
+    zooms fins, un pixel d'un seul utilisateur revelerait son trajet ou son
+    domicile.
+    """
+
+    def __init__(self):
+        dossier = os.environ.get(
+            "HEATMAP_DIR", os.path.join(tempfile.gettempdir(), "striv_heatmap")
+        )
+        zoom_max = int(os.environ.get("HEATMAP_ZOOM_MAX", ZOOM_MAX))
+        self.cache = CacheHeatmap(dossier, zoom_max)
+        self.utilisateurs_min = int(os.environ.get("HEATMAP_UTILISATEURS_MIN", 2))
+
+    @log
+    def ajouter_trace(self, id_user: int, track: Track) -> bool:
+        """Ajoute les points d'une nouvelle activite a la couche globale et a celle
+        de son utilisateur, et invalide les tuiles touchees."""
+        try:
+            self.cache.ajouter(
+                couche_utilisateur(id_user), track.lat, track.lon, globale=COUCHE_GLOBALE
+            )
+            return True
+        except Exception as exc:
+            logging.error(f"Erreur lors de la mise a jour de la heatmap: {exc}")
+            return False
+
+    def tuile(self, z: int, x: int, y: int, id_user: Optional[int] = None) -> Optional[bytes]:
+        """Image PNG d'une tuile de la couche globale, ou de celle d'un utilisateur."""
+        try:
+            if id_user is None:
+                return self.cache.png(COUCHE_GLOBALE, z, x, y, self.utilisateurs_min)
+            return self.cache.png(couche_utilisateur(id_user), z, x, y)
+        except Exception as exc:
+            logging.error(f"Erreur lors du rendu de la tuile {z}/{x}/{y}: {exc}")
+            return None
+
+    @log
+    def reconstruire(self, activity_dao=None, taille_lot: int = 500) -> Tuple[int, int]:
+        """Regenere toutes les couches a partir des traces stockees en base
+
+        Les traces sont lues et comptees par lots de `taille_lot` ; les activites
+        enregistrees pendant la reconstruction attendent qu'elle se termine.
+
+        Returns
+        -------
+        tuple
+            (nombre de points, nombre de tuiles generees)
+        """
+        if activity_dao is None:
+            from dao.activite_dao import ActivityDAO
+
+            activity_dao = ActivityDAO()
+        nb_points = 0
+
+        def lots():
+            nonlocal nb_points
+            traces = activity_dao.iter_traces_utilisateurs(taille_lot)
+            while lot := list(islice(traces, taille_lot)):
+                # Points du lot regroupes par utilisateur, une couche chacun
+                par_utilisateur = {}
+                for _, id_user, donnees in lot:
+                    par_utilisateur.setdefault(id_user, []).append(decoder_trace(donnees))
+                for id_user, tracks in par_utilisateur.items():
+                    lat = np.concatenate([track.lat for track in tracks])
+                    lon = np.concatenate([track.lon for track in tracks])
+                    nb_points += len(lat)
+                    yield couche_utilisateur(id_user), lat, lon
+
+        nb_tuiles = self.cache.reconstruire(lots(), globale=COUCHE_GLOBALE)
+        return nb_points, nb_tuiles
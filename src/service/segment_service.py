@@ -0,0 +1,143 @@
+import logging
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from dao.segment_dao import SegmentDAO
+from dao.segment_model import SegmentModel
+from utils import track_metrics
+from utils.log_decorator import log
+from utils.segment_matching import IndexSegments, longueur
+from utils.singleton import Singleton
+from utils.track import Track
+from utils.track_codec import decoder_trace, encoder_trace
+
+
+class SegmentService(metaclass=Singleton):
+    """Service gerant les segments et la detection des passages des activites."""
+
+    def __init__(self):
+        self.segment_dao = SegmentDAO()
+        self._index: Optional[IndexSegments] = None
+        self._version: Tuple[int, int] = (0, 0)
+        self._verrou = threading.Lock()
+
+    def _index_segments(self) -> IndexSegments:
+        """Index spatial de tous les segments, a jour de ceux crees depuis n'importe
+        quel processus.
+
+        La version des segments (nombre, plus grand ID) est relue a chaque appel :
+        l'index est complete des nouveaux segments, ou reconstruit si des segments
+        ont ete supprimes ou sont apparus sous un ID deja depasse.
+        """
+        version = self.segment_dao.get_version()
+        with self._verrou:
+            if self._index is not None and version == self._version:
+                return self._index
+            index, (nombre, dernier) = self._index, self._version
+            nouveaux = self.segment_dao.get_formes(apres=dernier) if index is not None else []
+            if index is None or nombre + len(nouveaux) != version[0]:
+                index, nombre, dernier = IndexSegments(), 0, 0
+                nouveaux = self.segment_dao.get_formes()
+            formes = []
+            for id_segment, sport, donnees in nouveaux:
+                trace = decoder_trace(donnees)
+                formes.append((id_segment, sport, trace.lat, trace.lon))
+            index.ajouter_tous(formes)
+            self._index = index
+            self._version = (
+                nombre + len(nouveaux),
+                max((id_segment for id_segment, _, _ in nouveaux), default=dernier),
+            )
+            return self._index
+
+    @log
+    def creer_segment(self, nom: str, sport: str, id_user: int, track: Track):
+        """Cree un segment a partir des points d'une trace.
+
+        Chaque processus l'ajoute a son index a sa prochaine detection ; seules les
+        activites enregistrees ensuite y sont comparees.
+        """
+        try:
+            forme = Track(track.lat, track.lon)
+            segment = self.segment_dao.save(
+                SegmentModel(
+                    nom=nom,
+                    sport=sport,
+                    distance=longueur(forme.lat, forme.lon),
+                    donnees=encoder_trace(forme),
+                    id_user=id_user,
+                )
+            )
+            return segment
+        except Exception as exc:
+            logging.error(f"Erreur lors de la creation du segment: {exc}")
+            return None
+
+    @log
+    def get_segment(self, segment_id: int):
+        """Recupere un segment par son identifiant."""
+        try:
+            return self.segment_dao.get_by_id(segment_id)
+        except Exception as exc:
+            logging.error(f"Erreur lors de la recuperation du segment: {exc}")
+            return None
+
+    @log
+    def detecter_efforts(
+        self, id_activite: int, id_user: int, sport: str, track: Track
+    ) -> List[Dict]:
+        """Detecte et enregistre les passages d'une activite sur les segments de son sport.
+
+        Les temps manquants sont interpoles ; une trace sans horodatage n'a aucun passage.
+        """
+        try:
+            index = self._index_segments()
+            # L'index peut etre complete par un autre thread : lecture sous verrou
+            with self._verrou:
+                passages = index.passages(track, sport)
+            if not passages:
+                return []
+            temps = track_metrics.interpoler_manquants(
+                track_metrics.secondes_ecoulees(track.time),
+                np.concatenate(
+                    ([0.0], np.cumsum(track_metrics.segment_distances(track.lat, track.lon)))
+                ),
+                minimum=2,
+            )
+            efforts = []
+            for id_segment, debut, fin in passages:
+                duree = float(temps[fin] - temps[debut])
+                if np.isfinite(duree) and duree > 0:
+                    efforts.append(
+                        {
+                            "id_segment": id_segment,
+                            "id_activite": id_activite,
+                            "id_user": id_user,
+                            "duree": round(duree, 1),
+                        }
+                    )
+            self.segment_dao.save_efforts(efforts)
+            return efforts
+        except Exception as exc:
+            logging.error(f"Erreur lors de la detection des segments: {exc}")
+            return []
+
+    @log
+    def get_classement(self, segment_id: int, limite: int = 10):
+        """Recupere le classement d'un segment (meilleur passage par utilisateur)."""
+        try:
+            return self.segment_dao.get_classement(segment_id, limite)
+        except Exception as exc:
+            logging.error(f"Erreur lors de la recuperation du classement: {exc}")
+            return []
+
+    @log
+    def get_efforts_activite(self, activity_id: int):
+        """Recupere les passages d'une activite sur les segments."""
+        try:
+            return self.segment_dao.get_efforts_activite(activity_id)
+        except Exception as exc:
+            logging.error(f"Erreur lors de la recuperation des passages: {exc}")
+            return []
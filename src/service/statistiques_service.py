@@ -1,7 +1,7 @@
 import logging
 from collections import defaultdict
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional
+from typing import Dict, Optional, Tuple
 
 from dao.activite_dao import ActivityDAO
 from utils.log_decorator import log
@@ -14,44 +14,46 @@ class StatistiquesService(metaclass=Singleton):
     def __init__(self):
         self.activity_dao = ActivityDAO()
 
+    def _par_sport(
+        self, id_user: int, debut: Optional[datetime] = None, fin: Optional[datetime] = None
+    ) -> Tuple[Dict[str, Dict[str, float]], Optional[datetime], Optional[datetime]]:
+        """Agregats par sport calcules par la base (GROUP BY sport), avec les dates
+        de la premiere et de la derniere activite."""
+        lignes = self.activity_dao.get_statistiques_par_sport(id_user, debut, fin)
+        par_sport = {sport: self._valeurs(*ligne) for sport, *ligne, _, _ in lignes}
+        if not lignes:
+            return par_sport, None, None
+        return par_sport, min(ligne[4] for ligne in lignes), max(ligne[5] for ligne in lignes)
+
     @staticmethod
-    def _distance_km(activity) -> float:
-        value = getattr(activity, "distance", 0) or 0
-        try:
-            return float(value)
-        except (TypeError, ValueError):
-            return 0.0
+    def _valeurs(count: int, distance: float, duree: float) -> Dict[str, float]:
+        return {"count": count, "distance": float(distance), "duree": float(duree)}
 
     @staticmethod
-    def _duree_heures(activity) -> float:
-        value = getattr(activity, "duree", None)
-        if value is None:
-            return 0.0
-        if hasattr(value, "total_seconds"):
-            try:
-                return float(value.total_seconds()) / 3600
-            except Exception:  # pragma: no cover
-                return 0.0
-        try:
-            return float(value)
-        except (TypeError, ValueError):
-            return 0.0
+    def _totaux(par_sport: Dict[str, Dict[str, float]]) -> Tuple[int, float, float]:
+        """(nombre, distance, duree) tous sports confondus."""
+        return tuple(
+            sum((values[cle] for values in par_sport.values()), depart)
+            for cle, depart in (("count", 0), ("distance", 0.0), ("duree", 0.0))
+        )
 
     @staticmethod
-    def _sport(activity) -> str:
-        return getattr(activity, "sport", "inconnu") or "inconnu"
-
-    def _aggregate(self, activities) -> Dict[str, Dict[str, float]]:
-        data = defaultdict(lambda: {"count": 0, "distance": 0.0, "duree": 0.0})
-        for activity in activities:
-            sport = self._sport(activity)
-            distance = self._distance_km(activity)
-            duree = self._duree_heures(activity)
-            bucket = data[sport]
-            bucket["count"] += 1
-            bucket["distance"] += distance
-            bucket["duree"] += duree
-        return data
+    def _sport_favori(par_sport: Dict[str, Dict[str, float]]) -> Optional[str]:
+        if not par_sport:
+            return None
+        return max(par_sport.items(), key=lambda item: item[1]["count"])[0]
+
+    def _stats_mois(self, year: int, month: int, par_sport: Dict[str, Dict[str, float]]):
+        total, distance, duree = self._totaux(par_sport)
+        return {
+            "year": year,
+            "month": month,
+            "total_activites": total,
+            "distance_totale": distance,
+            "duree_totale": duree,
+            "par_sport": par_sport,
+            "sport_favori": self._sport_favori(par_sport),
+        }
 
     @log
     def get_statistiques_mensuelles(
@@ -64,42 +66,29 @@ class StatistiquesService(metaclass=Singleton):
                 year = year or now.year
                 month = month or now.month
 
-            activities = self.activity_dao.get_monthly_activities(id_user, year, month)
-            stats = {
-                "year": year,
-                "month": month,
-                "total_activites": len(activities),
-                "distance_totale": 0.0,
-                "duree_totale": 0.0,
-                "par_sport": defaultdict(lambda: {"count": 0, "distance": 0.0, "duree": 0.0}),
-                "sport_favori": None
-            }
-
-            aggregated = self._aggregate(activities)
-            for sport, values in aggregated.items():
-                stats["par_sport"][sport]["count"] = values["count"]
-                stats["par_sport"][sport]["distance"] = values["distance"]
-                stats["par_sport"][sport]["duree"] = values["duree"]
-                stats["distance_totale"] += values["distance"]
-                stats["duree_totale"] += values["duree"]
-
-            if stats["par_sport"]:
-                stats["sport_favori"] = max(
-                    stats["par_sport"].items(),
-                    key=lambda item: item[1]["count"],
-                )[0]
-
-            stats["par_sport"] = dict(stats["par_sport"])
-            return stats
+            debut = datetime(year, month, 1)
+            fin = datetime(year + month // 12, month % 12 + 1, 1)
+            par_sport, _, _ = self._par_sport(id_user, debut, fin)
+            return self._stats_mois(year, month, par_sport)
         except Exception as exc:
             logging.error(f"Erreur lors du calcul des statistiques mensuelles: {exc}")
             return None
 
     @log
     def get_statistiques_annuelles(self, id_user: int, year: Optional[int] = None):
-        """Retourne les stats agregees sur 12 mois."""
+        """Retourne les stats agregees sur 12 mois.
+
+        Les agregats de chaque mois viennent d'une seule requete (GROUP BY mois, sport).
+        """
         try:
             year = year or datetime.now().year
+            lignes = self.activity_dao.get_statistiques_par_mois(
+                id_user, datetime(year, 1, 1), datetime(year + 1, 1, 1)
+            )
+            par_mois_sport = {month: {} for month in range(1, 13)}
+            for mois, sport, *ligne, _, _ in lignes:
+                par_mois_sport[mois.month][sport] = self._valeurs(*ligne)
+
             stats = {
                 "year": year,
                 "total_activites": 0,
@@ -110,10 +99,8 @@ class StatistiquesService(metaclass=Singleton):
                 "sport_favori": None
             }
 
-            for month in range(1, 13):
-                monthly = self.get_statistiques_mensuelles(id_user, year, month)
-                if not monthly:
-                    continue
+            for month, par_sport in par_mois_sport.items():
+                monthly = self._stats_mois(year, month, par_sport)
                 stats["par_mois"][month] = monthly
                 stats["total_activites"] += monthly["total_activites"]
                 stats["distance_totale"] += monthly["distance_totale"]
@@ -140,39 +127,17 @@ class StatistiquesService(metaclass=Singleton):
     def get_statistiques_globales(self, id_user: int):
         """Retourne les stats globales (toute l'historique)."""
         try:
-            activities = self.activity_dao.get_by_user(id_user)
-            stats = {
-                "total_activites": len(activities),
-                "distance_totale": 0.0,
-                "duree_totale": 0.0,
-                "par_sport": defaultdict(lambda: {"count": 0, "distance": 0.0, "duree": 0.0}),
-                "premiere_activite": None,
-                "derniere_activite": None,
-                "sport_favori": None
+            par_sport, premiere, derniere = self._par_sport(id_user)
+            total, distance, duree = self._totaux(par_sport)
+            return {
+                "total_activites": total,
+                "distance_totale": distance,
+                "duree_totale": duree,
+                "par_sport": par_sport,
+                "premiere_activite": premiere,
+                "derniere_activite": derniere,
+                "sport_favori": self._sport_favori(par_sport),
             }
-
-            aggregated = self._aggregate(activities)
-            for sport, values in aggregated.items():
-                stats["par_sport"][sport] = values
-                stats["distance_totale"] += values["distance"]
-                stats["duree_totale"] += values["duree"]
-
-            if activities:
-                dates = [
-                    a.date_activite for a in activities if getattr(a, "date_activite", None)
-                ]
-                if dates:
-                    stats["premiere_activite"] = min(dates)
-                    stats["derniere_activite"] = max(dates)
-
-            if stats["par_sport"]:
-                stats["sport_favori"] = max(
-                    stats["par_sport"].items(),
-                    key=lambda item: item[1]["count"],
-                )[0]
-
-            stats["par_sport"] = dict(stats["par_sport"])
-            return stats
         except Exception as exc:
             logging.error(f"Erreur lors du calcul des statistiques globales: {exc}")
             return None
@@ -196,26 +161,16 @@ class StatistiquesService(metaclass=Singleton):
     def get_moyenne_par_semaine(self, id_user: int, nb_semaines: int = 4):
         """Calcule les moyennes hebdomadaires sur les N dernieres semaines."""
         try:
-            activities = self.activity_dao.get_by_user(id_user)
             if nb_semaines <= 0:
                 return {"nb_semaines": 0, "activites_par_semaine": 0, "distance_par_semaine": 0, "duree_par_semaine": 0}
 
-            now = datetime.now()
-            date_limite = now - timedelta(weeks=nb_semaines)
-            recentes = [
-                a
-                for a in activities
-                if getattr(a, "date_activite", None) and a.date_activite >= date_limite
-            ]
-
-            total_distance = sum(self._distance_km(a) for a in recentes)
-            total_duree = sum(self._duree_heures(a) for a in recentes)
-
+            date_limite = datetime.now() - timedelta(weeks=nb_semaines)
+            total, distance, duree = self.activity_dao.get_totaux(id_user, debut=date_limite)
             return {
                 "nb_semaines": nb_semaines,
-                "activites_par_semaine": len(recentes) / nb_semaines,
-                "distance_par_semaine": total_distance / nb_semaines,
-                "duree_par_semaine": total_duree / nb_semaines,
+                "activites_par_semaine": total / nb_semaines,
+                "distance_par_semaine": distance / nb_semaines,
+                "duree_par_semaine": duree / nb_semaines,
             }
         except Exception as exc:
             logging.error(f"Erreur lors du calcul des moyennes par semaine: {exc}")
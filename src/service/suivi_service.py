@@ -1,6 +1,7 @@
 import logging
 
 from dao.suivi_dao import SuiviDAO
+from dao.timeline_dao import TimelineDAO
 from dao.utilisateur_dao import UtilisateurDAO
 from utils.log_decorator import log
 from utils.singleton import Singleton
@@ -12,6 +13,7 @@ class SuiviService(metaclass=Singleton):
     def __init__(self):
         self.suivi_dao = SuiviDAO()
         self.utilisateur_dao = UtilisateurDAO()
+        self.timeline_dao = TimelineDAO()
 
     @log
     def suivre_utilisateur(self, id_suiveur: int, id_suivi: int) -> bool:
@@ -43,7 +45,11 @@ class SuiviService(metaclass=Singleton):
                 logging.info(f"L'utilisateur {id_suiveur} suit déjà {id_suivi}")
                 return False
 
-            return self.suivi_dao.creer_suivi(id_suiveur, id_suivi)
+            if not self.suivi_dao.creer_suivi(id_suiveur, id_suivi):
+                return False
+            # Les activites deja diffusees du nouveau suivi rejoignent le fil du suiveur
+            self.timeline_dao.ajouter_suivi(id_suiveur, id_suivi)
+            return True
         except Exception as e:
             logging.error(f"Erreur lors de la création du suivi: {e}")
             return False
@@ -65,7 +71,10 @@ class SuiviService(metaclass=Singleton):
             True si le suivi est supprimé avec succès
         """
         try:
-            return self.suivi_dao.supprimer_suivi(id_suiveur, id_suivi)
+            if not self.suivi_dao.supprimer_suivi(id_suiveur, id_suivi):
+                return False
+            self.timeline_dao.retirer_suivi(id_suiveur, id_suivi)
+            return True
         except Exception as e:
             logging.error(f"Erreur lors de la suppression du suivi: {e}")
             return False
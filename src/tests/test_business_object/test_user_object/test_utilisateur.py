@@ -3,7 +3,7 @@ Tests unitaires pour la classe Utilisateur
 """
 
 import sys
-from unittest.mock import MagicMock, Mock, mock_open, patch
+from unittest.mock import MagicMock, Mock, patch
 from utils.session import Session
 import pytest
 
@@ -82,15 +82,11 @@ class TestUtilisateurAsList:
 class TestCreerActivite:
     """Tests de la méthode creer_activite"""
 
-    @patch("builtins.open", new_callable=mock_open, read_data="<gpx></gpx>")
-    @patch("gpxpy.parse")
-    def test_creer_activite_course_pied(self, mock_gpx_parse, mock_file):
+    @patch("business_object.user_object.utilisateur.ingest_gpx")
+    def test_creer_activite_course_pied(self, mock_ingest_gpx):
         # GIVEN - Un utilisateur et des données de course à pied
         user = Utilisateur(1, "Runner", "runner@test.fr", "pass")
-        mock_gpx = Mock()
-        mock_gpx.length_3d.return_value = 5000.0
-        mock_gpx.get_duration.return_value = 1800
-        mock_gpx_parse.return_value = mock_gpx
+        mock_ingest_gpx.return_value = Mock(distance=5000.0, duree=1800)
 
         # WHEN - On crée une activité de course
         activite = user.creer_activite(
@@ -101,21 +97,17 @@ class TestCreerActivite:
             fichier_gpx="test.gpx",
         )
 
-        # THEN - Une activité est créée et le fichier GPX a été lu
+        # THEN - Une activité est créée et le fichier GPX a été ingéré
         assert activite is not None
-        mock_file.assert_called_once_with("test.gpx", "r", encoding="utf-8")
-        mock_gpx.length_3d.assert_called_once()
-        mock_gpx.get_duration.assert_called_once()
+        mock_ingest_gpx.assert_called_once_with("test.gpx")
+        assert activite.distance == 5000.0
+        assert activite.duree == 1800
 
-    @patch("builtins.open", new_callable=mock_open, read_data="<gpx></gpx>")
-    @patch("gpxpy.parse")
-    def test_creer_activite_cyclisme(self, mock_gpx_parse, mock_file):
+    @patch("business_object.user_object.utilisateur.ingest_gpx")
+    def test_creer_activite_cyclisme(self, mock_ingest_gpx):
         # GIVEN - Un utilisateur et des données de cyclisme
         user = Utilisateur(2, "Cyclist", "cyclist@test.fr", "pass")
-        mock_gpx = Mock()
-        mock_gpx.length_3d.return_value = 30000.0
-        mock_gpx.get_duration.return_value = 3600
-        mock_gpx_parse.return_value = mock_gpx
+        mock_ingest_gpx.return_value = Mock(distance=30000.0, duree=3600)
 
         # WHEN - On crée une activité de cyclisme avec type de vélo
         activite = user.creer_activite(
@@ -127,19 +119,15 @@ class TestCreerActivite:
             type_velo="route",
         )
 
-        # THEN - Une activité est créée et le fichier GPX a été lu
+        # THEN - Une activité est créée et le fichier GPX a été ingéré
         assert activite is not None
-        mock_file.assert_called_once_with("velo.gpx", "r", encoding="utf-8")
+        mock_ingest_gpx.assert_called_once_with("velo.gpx")
 
-    @patch("builtins.open", new_callable=mock_open, read_data="<gpx></gpx>")
-    @patch("gpxpy.parse")
-    def test_creer_activite_natation(self, mock_gpx_parse, mock_file):
+    @patch("business_object.user_object.utilisateur.ingest_gpx")
+    def test_creer_activite_natation(self, mock_ingest_gpx):
         # GIVEN - Un utilisateur et des données de natation
         user = Utilisateur(3, "Swimmer", "swim@test.fr", "pass")
-        mock_gpx = Mock()
-        mock_gpx.length_3d.return_value = 1000.0
-        mock_gpx.get_duration.return_value = 1200
-        mock_gpx_parse.return_value = mock_gpx
+        mock_ingest_gpx.return_value = Mock(distance=1000.0, duree=1200)
 
         # WHEN - On crée une activité de natation
         activite = user.creer_activite(
@@ -151,19 +139,15 @@ class TestCreerActivite:
             type_nage="crawl",
         )
 
-        # THEN - Une activité est créée et le fichier GPX a été lu
+        # THEN - Une activité est créée et le fichier GPX a été ingéré
         assert activite is not None
-        mock_file.assert_called_once_with("natation.gpx", "r", encoding="utf-8")
+        mock_ingest_gpx.assert_called_once_with("natation.gpx")
 
-    @patch("builtins.open", new_callable=mock_open, read_data="<gpx></gpx>")
-    @patch("gpxpy.parse")
-    def test_creer_activite_randonnee(self, mock_gpx_parse, mock_file):
+    @patch("business_object.user_object.utilisateur.ingest_gpx")
+    def test_creer_activite_randonnee(self, mock_ingest_gpx):
         # GIVEN - Un utilisateur et des données de randonnée
         user = Utilisateur(4, "Hiker", "hiker@test.fr", "pass")
-        mock_gpx = Mock()
-        mock_gpx.length_3d.return_value = 10000.0
-        mock_gpx.get_duration.return_value = 7200
-        mock_gpx_parse.return_value = mock_gpx
+        mock_ingest_gpx.return_value = Mock(distance=10000.0, duree=7200)
 
         # WHEN - On crée une activité de randonnée
         activite = user.creer_activite(
@@ -175,19 +159,15 @@ class TestCreerActivite:
             type_terrain="montagne",
         )
 
-        # THEN - Une activité est créée et le fichier GPX a été lu
+        # THEN - Une activité est créée et le fichier GPX a été ingéré
         assert activite is not None
-        mock_file.assert_called_once_with("rando.gpx", "r", encoding="utf-8")
+        mock_ingest_gpx.assert_called_once_with("rando.gpx")
 
-    @patch("builtins.open", new_callable=mock_open, read_data="<gpx></gpx>")
-    @patch("gpxpy.parse")
-    def test_creer_activite_type_inconnu(self, mock_gpx_parse, mock_file):
+    @patch("business_object.user_object.utilisateur.ingest_gpx")
+    def test_creer_activite_type_inconnu(self, mock_ingest_gpx):
         # GIVEN - Un utilisateur et un type d'activité invalide
         user = Utilisateur(5, "User", "user@test.fr", "pass")
-        mock_gpx = Mock()
-        mock_gpx.length_3d.return_value = 5000.0
-        mock_gpx.get_duration.return_value = 1800
-        mock_gpx_parse.return_value = mock_gpx
+        mock_ingest_gpx.return_value = Mock(distance=5000.0, duree=1800)
 
         # WHEN / THEN - On tente de créer une activité avec un type invalide
         with pytest.raises(ValueError) as exc_info:
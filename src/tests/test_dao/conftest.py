@@ -0,0 +1,32 @@
+import importlib
+import sys
+
+import pytest
+from sqlalchemy import create_engine
+
+from dao.db_connection import DBConnection
+
+# Modules que les tests des objets métier remplacent par des MagicMock dans sys.modules
+MODULES_DAO = ["dao.activite_dao", "dao.timeline_dao"]
+
+
+@pytest.fixture(scope="module")
+def connexion():
+    """Connexion au schéma de test ; tout ce qui y est écrit est annulé en fin de module."""
+    engine = create_engine(
+        DBConnection().engine.url, connect_args={"options": "-c search_path=projet_test_dao"}
+    )
+    with engine.connect() as connexion:
+        transaction = connexion.begin()
+        yield connexion
+        transaction.rollback()
+    engine.dispose()
+
+
+@pytest.fixture(scope="module")
+def modules_dao():
+    """Vrais modules DAO, importés à nouveau pour le module de tests, puis les
+    entrées remplacées de sys.modules sont remises en place."""
+    remplaces = {nom: sys.modules.pop(nom) for nom in MODULES_DAO if nom in sys.modules}
+    yield {nom: importlib.import_module(nom) for nom in MODULES_DAO}
+    sys.modules.update(remplaces)
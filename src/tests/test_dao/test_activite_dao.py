@@ -0,0 +1,322 @@
+import random
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import sessionmaker
+
+NB_AUTEURS = 40
+NB_SUIVIS = 10
+NB_ACTIVITES = 200
+DEBUT = datetime(2024, 1, 1)
+
+
+@pytest.fixture(scope="module")
+def lecteur(connexion):
+    """Id d'un utilisateur suivant NB_SUIVIS auteurs parmi NB_AUTEURS, chacun
+    avec NB_ACTIVITES activités (deux par jour, à la même heure)."""
+    ids = (
+        connexion.execute(
+            text(
+                "INSERT INTO utilisateur (nom_user, mail_user, mdp) "
+                "SELECT 'feed_' || g, 'feed_' || g || '@example.com', 'x' "
+                "FROM generate_series(1, :n) g RETURNING id_user"
+            ),
+            {"n": NB_AUTEURS + 1},
+        )
+        .scalars()
+        .all()
+    )
+    lecteur, auteurs = ids[0], ids[1:]
+    connexion.execute(
+        text("INSERT INTO suivi (id_suiveur, id_suivi) VALUES (:lecteur, :suivi)"),
+        [{"lecteur": lecteur, "suivi": suivi} for suivi in auteurs[:NB_SUIVIS]],
+    )
+    connexion.execute(
+        text(
+            "INSERT INTO activite (titre, date_activite, distance, sport, id_user) "
+            "SELECT 'sortie', :debut + (g / 2) * interval '1 day', 10, 'course', u "
+            "FROM generate_series(1, :n) g, unnest(CAST(:auteurs AS integer[])) u"
+        ),
+        {"debut": DEBUT, "n": NB_ACTIVITES, "auteurs": [lecteur, *auteurs]},
+    )
+    connexion.execute(text("ANALYZE utilisateur, suivi, activite"))
+    return lecteur
+
+
+@pytest.fixture
+def dao(modules_dao, connexion):
+    return modules_dao["dao.activite_dao"].ActivityDAO(
+        session_factory=sessionmaker(bind=connexion, join_transaction_mode="create_savepoint")
+    )
+
+
+class TestFeed:
+    """Tests du fil d'activités (lecteur et auteurs suivis)"""
+
+    def test_pages_completes_et_ordonnees(self, dao, lecteur):
+        # WHEN - Parcours du fil page par page
+        vues, avant = [], None
+        while page := dao.get_feed(lecteur, limite=150, avant=avant):
+            vues.extend(page)
+            avant = (page[-1].date_activite, page[-1].id)
+
+        # THEN - Chaque activité du lecteur et de ses suivis une fois, de la plus récente à la plus ancienne
+        cles = [(a.date_activite, a.id) for a in vues]
+        assert len(vues) == len(set(cles)) == (NB_SUIVIS + 1) * NB_ACTIVITES
+        assert cles == sorted(cles, reverse=True)
+
+    def test_une_seule_requete_indexee(self, dao, lecteur, connexion):
+        # GIVEN
+        avant = (DEBUT + timedelta(days=50), 0)
+
+        # WHEN - Plan de la requête du fil
+        with dao._session_factory() as session:
+            requete = dao.requete_feed(session, lecteur, 20, avant).statement.compile(
+                dialect=connexion.dialect
+            )
+        plan = "\n".join(
+            ligne[0] for ligne in connexion.exec_driver_sql(f"EXPLAIN {requete}", requete.params)
+        )
+
+        # THEN - Lecture par l'index du fil, jamais de parcours complet de la table
+        assert "idx_activite_feed" in plan
+        assert "Seq Scan on activite" not in plan
+
+
+class TestEmpreinte:
+    """Tests de l'index unique des empreintes"""
+
+    def test_meme_empreinte_refusee(self, dao, lecteur):
+        # GIVEN - Une sortie enregistrée avec son empreinte
+        def sortie(empreinte):
+            return dao._model(
+                titre="sortie",
+                sport="course",
+                date_activite=DEBUT,
+                distance=10,
+                id_user=lecteur,
+                empreinte=empreinte,
+            )
+
+        id_activite = dao.save(sortie("2890000:47:0123456789abcdef")).id
+
+        # WHEN / THEN - La même empreinte est refusée par la base, l'activité reste unique
+        with pytest.raises(IntegrityError):
+            dao.save(sortie("2890000:47:0123456789abcdef"))
+        assert dao.trouver_doublons(lecteur, ["2890000:47:0123456789abcdef"]) == {
+            "2890000:47:0123456789abcdef": id_activite
+        }
+        # Les activités sans empreinte (saisies à la main) ne sont pas concernées
+        assert dao.save(sortie(None)).id != dao.save(sortie(None)).id
+
+
+class TestStatistiquesParSport:
+    """Tests des agrégats par sport calculés par la base"""
+
+    @pytest.fixture(scope="class")
+    def sportif(self, connexion):
+        """Id d'un utilisateur avec deux sorties à vélo et une course (la plus
+        récente, sans durée) en mars, puis une course en avril."""
+        id_user = connexion.execute(
+            text(
+                "INSERT INTO utilisateur (nom_user, mail_user, mdp) "
+                "VALUES ('stats', 'stats@example.com', 'x') RETURNING id_user"
+            )
+        ).scalar()
+        sorties = [
+            (datetime(2025, 3, 2), 40.0, 1.5, "cyclisme"),
+            (datetime(2025, 3, 9), 60.0, 2.5, "cyclisme"),
+            (datetime(2025, 3, 31, 20), 10.0, None, "course"),
+            (datetime(2025, 4, 1), 12.0, 1.0, "course"),
+        ]
+        connexion.execute(
+            text(
+                "INSERT INTO activite (titre, date_activite, distance, duree, sport, id_user) "
+                "VALUES ('sortie', :date, :distance, :duree, :sport, :id_user)"
+            ),
+            [
+                {
+                    "date": date,
+                    "distance": distance,
+                    "duree": duree,
+                    "sport": sport,
+                    "id_user": id_user,
+                }
+                for date, distance, duree, sport in sorties
+            ],
+        )
+        return id_user
+
+    def test_mois(self, dao, sportif):
+        # WHEN - Agrégats de mars
+        lignes = dao.get_statistiques_par_sport(sportif, datetime(2025, 3, 1), datetime(2025, 4, 1))
+
+        # THEN - Sport de l'activité la plus récente en tête, durée absente comptée pour 0
+        assert [tuple(ligne) for ligne in lignes] == [
+            ("course", 1, 10.0, 0.0, datetime(2025, 3, 31, 20), datetime(2025, 3, 31, 20)),
+            ("cyclisme", 2, 100.0, 4.0, datetime(2025, 3, 2), datetime(2025, 3, 9)),
+        ]
+
+    def test_tout_l_historique(self, dao, sportif):
+        # WHEN
+        lignes = dao.get_statistiques_par_sport(sportif)
+
+        # THEN
+        assert [(sport, nombre, distance) for sport, nombre, distance, *_ in lignes] == [
+            ("course", 2, 22.0),
+            ("cyclisme", 2, 100.0),
+        ]
+
+    def test_sans_activite(self, dao, sportif):
+        assert dao.get_statistiques_par_sport(sportif, debut=datetime(2026, 1, 1)) == []
+
+    def test_par_mois(self, dao, sportif):
+        # WHEN - Agrégats de l'année, en une requête
+        lignes = dao.get_statistiques_par_mois(sportif, datetime(2025, 1, 1), datetime(2026, 1, 1))
+
+        # THEN - Par mois croissant, puis dans l'ordre des agrégats par sport
+        assert [tuple(ligne[:5]) for ligne in lignes] == [
+            (datetime(2025, 3, 1), "course", 1, 10.0, 0.0),
+            (datetime(2025, 3, 1), "cyclisme", 2, 100.0, 4.0),
+            (datetime(2025, 4, 1), "course", 1, 12.0, 1.0),
+        ]
+
+
+def _stats_en_python(activites, debut=None, fin=None):
+    """(par sport, distance totale, duree totale) calcules comme le faisait le service
+    avant le GROUP BY : activites de la plus recente a la plus ancienne, sommes
+    flottantes dans cet ordre."""
+    retenues = [
+        a
+        for a in activites
+        if (debut is None or a.date_activite >= debut) and (fin is None or a.date_activite < fin)
+    ]
+    par_sport = {}
+    for activite in sorted(retenues, key=lambda a: (a.date_activite, a.id), reverse=True):
+        valeurs = par_sport.setdefault(
+            activite.sport or "inconnu", {"count": 0, "distance": 0.0, "duree": 0.0}
+        )
+        valeurs["count"] += 1
+        valeurs["distance"] += activite.distance
+        valeurs["duree"] += activite.duree or 0.0
+    distance = duree = 0.0
+    for valeurs in par_sport.values():
+        distance += valeurs["distance"]
+        duree += valeurs["duree"]
+    return par_sport, distance, duree
+
+
+class TestStatistiquesCommeEnPython:
+    """Statistiques du service identiques, au bit pres, au calcul en Python"""
+
+    @pytest.fixture(scope="class")
+    def sportif(self, connexion):
+        """Id d'un utilisateur avec 120 activites aux distances et durees non
+        representables (0.1, 0.2, 1/3...), sur deux ans et jusqu'a aujourd'hui."""
+        id_user = connexion.execute(
+            text(
+                "INSERT INTO utilisateur (nom_user, mail_user, mdp) "
+                "VALUES ('stats_py', 'stats_py@example.com', 'x') RETURNING id_user"
+            )
+        ).scalar()
+        rng = random.Random(24)
+        maintenant = datetime.now().replace(microsecond=0)
+        connexion.execute(
+            text(
+                "INSERT INTO activite (titre, date_activite, distance, duree, sport, id_user) "
+                "VALUES ('sortie', :date, :distance, :duree, :sport, :id_user)"
+            ),
+            [
+                {
+                    "date": maintenant - timedelta(hours=rng.randrange(2 * 365 * 24)),
+                    "distance": rng.choice([0.1, 0.2, 0.3, 1 / 3, 0.7]) * rng.randrange(1, 200),
+                    "duree": rng.choice([None, 0.1, 0.2, 1 / 3, rng.random()]),
+                    "sport": rng.choice(["course", "cyclisme", "natation", ""]),
+                    "id_user": id_user,
+                }
+                for _ in range(120)
+            ],
+        )
+        return id_user
+
+    @pytest.fixture
+    def service(self, dao, monkeypatch):
+        from service.statistiques_service import StatistiquesService
+
+        service = StatistiquesService()
+        monkeypatch.setattr(service, "activity_dao", dao)
+        return service
+
+    def test_globales(self, dao, service, sportif):
+        # GIVEN
+        par_sport, distance, duree = _stats_en_python(dao.get_by_user(sportif))
+
+        # WHEN
+        stats = service.get_statistiques_globales(sportif)
+
+        # THEN - Memes sports, dans le meme ordre, memes flottants
+        assert list(stats["par_sport"].items()) == list(par_sport.items())
+        assert (stats["distance_totale"], stats["duree_totale"]) == (distance, duree)
+
+    def test_mensuelles(self, dao, service, sportif):
+        # GIVEN - Le mois de l'activite la plus recente
+        activites = dao.get_by_user(sportif)
+        dernier = activites[0].date_activite
+        debut = datetime(dernier.year, dernier.month, 1)
+        fin = datetime(dernier.year + dernier.month // 12, dernier.month % 12 + 1, 1)
+        par_sport, distance, duree = _stats_en_python(activites, debut, fin)
+
+        # WHEN
+        stats = service.get_statistiques_mensuelles(sportif, dernier.year, dernier.month)
+
+        # THEN
+        assert list(stats["par_sport"].items()) == list(par_sport.items())
+        assert (stats["distance_totale"], stats["duree_totale"]) == (distance, duree)
+
+    def test_moyenne_par_semaine(self, dao, service, sportif):
+        # GIVEN - Les activites des 8 dernieres semaines, toutes sommees dans l'ordre
+        date_limite = datetime.now() - timedelta(weeks=8)
+        recentes = [a for a in dao.get_by_user(sportif) if a.date_activite >= date_limite]
+        recentes.sort(key=lambda a: (a.date_activite, a.id), reverse=True)
+
+        # WHEN
+        stats = service.get_moyenne_par_semaine(sportif, nb_semaines=8)
+
+        # THEN
+        assert stats["activites_par_semaine"] == len(recentes) / 8
+        assert stats["distance_par_semaine"] == sum(a.distance for a in recentes) / 8
+        assert stats["duree_par_semaine"] == sum(a.duree or 0.0 for a in recentes) / 8
+
+    def test_annuelles(self, dao, service, sportif):
+        # GIVEN - L'annee derniere, cumulee mois par mois comme le faisait le service
+        year = datetime.now().year - 1
+        activites = dao.get_by_user(sportif)
+        par_mois = {
+            month: _stats_en_python(
+                activites,
+                datetime(year, month, 1),
+                datetime(year + month // 12, month % 12 + 1, 1),
+            )
+            for month in range(1, 13)
+        }
+        par_sport, distance, duree = {}, 0.0, 0.0
+        for valeurs_mois, distance_mois, duree_mois in par_mois.values():
+            distance += distance_mois
+            duree += duree_mois
+            for sport, valeurs in valeurs_mois.items():
+                cumul = par_sport.setdefault(sport, {"count": 0, "distance": 0.0, "duree": 0.0})
+                for cle in cumul:
+                    cumul[cle] += valeurs[cle]
+
+        # WHEN - Une seule requete GROUP BY mois, sport
+        stats = service.get_statistiques_annuelles(sportif, year)
+
+        # THEN - Chaque mois et le cumul de l'annee, aux memes flottants
+        for month, (valeurs_mois, distance_mois, duree_mois) in par_mois.items():
+            mois = stats["par_mois"][month]
+            assert list(mois["par_sport"].items()) == list(valeurs_mois.items())
+            assert (mois["distance_totale"], mois["duree_totale"]) == (distance_mois, duree_mois)
+        assert list(stats["par_sport"].items()) == list(par_sport.items())
+        assert (stats["distance_totale"], stats["duree_totale"]) == (distance, duree)
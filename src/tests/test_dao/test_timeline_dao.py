@@ -0,0 +1,177 @@
+from datetime import datetime
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.orm import sessionmaker
+
+NB_AUTEURS = 40
+NB_SUIVIS = 10
+NB_ACTIVITES = 500
+SEUIL = 20
+DEBUT = datetime(2024, 1, 1)
+
+
+def _parcourir(dao, lecteur):
+    """ID des activités du fil, page par page."""
+    vues, avant = [], None
+    while page := dao.get_feed(lecteur, limite=70, avant=avant):
+        vues.extend(a.id for a in page)
+        avant = (page[-1].date_activite, page[-1].id)
+    return vues
+
+
+@pytest.fixture(scope="module")
+def session_factory(connexion):
+    return sessionmaker(bind=connexion, join_transaction_mode="create_savepoint")
+
+
+@pytest.fixture(scope="module")
+def dao(modules_dao, session_factory):
+    return modules_dao["dao.timeline_dao"].TimelineDAO(session_factory=session_factory)
+
+
+@pytest.fixture(scope="module")
+def activite_dao(modules_dao, session_factory):
+    return modules_dao["dao.activite_dao"].ActivityDAO(session_factory=session_factory)
+
+
+@pytest.fixture(scope="module")
+def utilisateurs(connexion, dao):
+    """(lecteur, auteurs) : le lecteur suit NB_SUIVIS auteurs parmi NB_AUTEURS ;
+    le premier est suivi par tous les autres utilisateurs (plus de SEUIL).
+    Toutes les activités enregistrées sont ensuite diffusées."""
+    ids = (
+        connexion.execute(
+            text(
+                "INSERT INTO utilisateur (nom_user, mail_user, mdp) "
+                "SELECT 'timeline_' || g, 'timeline_' || g || '@example.com', 'x' "
+                "FROM generate_series(1, :n) g RETURNING id_user"
+            ),
+            {"n": NB_AUTEURS + 1},
+        )
+        .scalars()
+        .all()
+    )
+    lecteur, auteurs = ids[0], ids[1:]
+    suivis = {(lecteur, auteur) for auteur in auteurs[:NB_SUIVIS]}
+    suivis |= {(suiveur, auteurs[0]) for suiveur in ids if suiveur != auteurs[0]}
+    connexion.execute(
+        text("INSERT INTO suivi (id_suiveur, id_suivi) VALUES (:suiveur, :suivi)"),
+        [{"suiveur": suiveur, "suivi": suivi} for suiveur, suivi in suivis],
+    )
+    activites = (
+        connexion.execute(
+            text(
+                "INSERT INTO activite (titre, date_activite, distance, sport, id_user) "
+                "SELECT 'sortie', :debut + (g / 2) * interval '1 day', 10, 'course', u "
+                "FROM generate_series(1, :n) g, unnest(CAST(:auteurs AS integer[])) u "
+                "RETURNING id_activite"
+            ),
+            {"debut": DEBUT, "n": NB_ACTIVITES, "auteurs": ids},
+        )
+        .scalars()
+        .all()
+    )
+    dao.diffuser(activites, seuil=SEUIL)
+    connexion.execute(text("ANALYZE utilisateur, suivi, activite, timeline"))
+    return lecteur, auteurs
+
+
+def _nb_lignes(connexion, **filtres):
+    clause = " AND ".join(f"{colonne} = :{colonne}" for colonne in filtres)
+    return connexion.execute(
+        text(f"SELECT count(*) FROM timeline WHERE {clause}"), filtres
+    ).scalar()
+
+
+class TestDiffusion:
+    """Tests de la recopie des activités dans la timeline"""
+
+    def test_auteur_et_suiveurs(self, connexion, utilisateurs):
+        # GIVEN
+        lecteur, auteurs = utilisateurs
+
+        # THEN - Une ligne par activité pour l'auteur et pour chacun de ses suiveurs
+        assert _nb_lignes(connexion, id_auteur=auteurs[1]) == 2 * NB_ACTIVITES
+        assert _nb_lignes(connexion, id_lecteur=lecteur) == NB_SUIVIS * NB_ACTIVITES
+
+    def test_auteur_tres_suivi_non_recopie(self, connexion, utilisateurs):
+        # GIVEN
+        _, auteurs = utilisateurs
+
+        # THEN
+        assert _nb_lignes(connexion, id_auteur=auteurs[0]) == 0
+
+
+class TestFeed:
+    """Tests du fil lu dans la timeline"""
+
+    def test_identique_au_fil_calcule(self, dao, activite_dao, utilisateurs):
+        # GIVEN
+        lecteur, _ = utilisateurs
+
+        # WHEN
+        vues = _parcourir(dao, lecteur)
+
+        # THEN - Activités recopiées et activités du très suivi lues à la demande
+        assert vues == _parcourir(activite_dao, lecteur)
+        assert len(vues) == (NB_SUIVIS + 1) * NB_ACTIVITES
+
+    def test_activite_en_attente_de_diffusion(self, dao, connexion, utilisateurs):
+        # GIVEN - Une activité pas encore diffusée
+        lecteur, auteurs = utilisateurs
+        id_activite = connexion.execute(
+            text(
+                "INSERT INTO activite (titre, date_activite, distance, sport, id_user) "
+                "VALUES ('nouvelle', :date, 5, 'course', :auteur) RETURNING id_activite"
+            ),
+            {"date": datetime(2030, 1, 1), "auteur": auteurs[1]},
+        ).scalar()
+
+        # WHEN / THEN - Visible avant comme après la diffusion
+        assert dao.get_feed(lecteur, limite=1)[0].id == id_activite
+        assert dao.diffuser([id_activite], seuil=SEUIL) == 1
+        assert dao.get_feed(lecteur, limite=1)[0].id == id_activite
+        assert _nb_lignes(connexion, id_activite=id_activite) == 2
+
+    def test_suivi_et_abandon(self, dao, connexion, utilisateurs):
+        # GIVEN - Un auteur que le lecteur ne suit pas
+        lecteur, auteurs = utilisateurs
+        auteur = auteurs[-1]
+        suivi = {"suiveur": lecteur, "suivi": auteur}
+
+        # WHEN - Le lecteur le suit
+        connexion.execute(text("INSERT INTO suivi VALUES (:suiveur, :suivi)"), suivi)
+        dao.ajouter_suivi(lecteur, auteur)
+
+        # THEN - Son historique rejoint la timeline du lecteur
+        assert _nb_lignes(connexion, id_lecteur=lecteur, id_auteur=auteur) == NB_ACTIVITES
+
+        # WHEN - Puis ne le suit plus
+        connexion.execute(
+            text("DELETE FROM suivi WHERE id_suiveur = :suiveur AND id_suivi = :suivi"), suivi
+        )
+        dao.retirer_suivi(lecteur, auteur)
+
+        # THEN
+        assert _nb_lignes(connexion, id_lecteur=lecteur, id_auteur=auteur) == 0
+        assert auteur not in {a.id_user for a in dao.get_feed(lecteur)}
+
+    def test_lecture_indexee(self, dao, connexion, utilisateurs):
+        # GIVEN
+        lecteur, _ = utilisateurs
+
+        # WHEN - Plan de la requête d'une page du fil
+        with dao._session_factory() as session:
+            requete = dao.requete_feed(session, lecteur, 20).statement.compile(
+                dialect=connexion.dialect
+            )
+        plan = "\n".join(
+            ligne[0] for ligne in connexion.exec_driver_sql(f"EXPLAIN {requete}", requete.params)
+        )
+
+        # THEN - Un parcours de la timeline du lecteur et de l'index des activités non diffusées
+        assert "idx_timeline_lecture" in plan
+        assert "idx_activite_non_diffusee" in plan
+        assert "Seq Scan on activite" not in plan
+        assert "Seq Scan on timeline" not in plan
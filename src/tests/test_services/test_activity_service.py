@@ -3,10 +3,14 @@ Tests unitaires pour la classe ActivityService
 """
 
 import sys
-from datetime import timedelta
+from datetime import datetime, timedelta
 from unittest.mock import MagicMock, Mock, patch
 import pytest
 
+from utils.gpx_import import analyser_fichier
+from utils.track import Track
+from utils.track_codec import decoder_trace
+
 # Sauvegarder les modules originaux avant de les mocker
 _original_modules = {}
 _modules_to_mock = ["dao.activite_dao", "dao.activity_model", "utils.log_decorator", "utils.singleton"]
@@ -302,6 +306,110 @@ class TestCreerActiviteFromDict:
         # THEN - La création échoue
         assert result is False
 
+    @patch("service.activity_service.HeatmapService")
+    @patch("service.activity_service.SegmentService")
+    @patch("service.activity_service.ActivityDAO")
+    @patch("service.activity_service.ActivityModel")
+    def test_creer_activite_from_dict_trace(
+        self, mock_model, mock_dao_class, mock_segments, mock_heatmap, activity_service_module
+    ):
+        # GIVEN - Une activité accompagnée de sa trace GPS
+        ActivityService = activity_service_module
+        mock_dao = Mock()
+        mock_dao.trouver_doublons.return_value = {}
+        mock_dao_class.return_value = mock_dao
+        service = ActivityService()
+        # Environ 13,4 km en 8 000 s
+        trace = Track([48.1, 48.2], [-1.6, -1.7], time=[0, 8_000_000])
+        activity_data = {
+            "titre": "Test",
+            "sport": "course",
+            "date_activite": "2025-01-15",
+            "distance": 5.0,
+            "id_user": 1,
+            "trace": trace,
+        }
+
+        # WHEN - L'activité est créée, puis la heatmap mise à jour en arrière-plan
+        from service.activity_service import _executeur_heatmap
+
+        result = service.creer_activite_from_dict(activity_data)
+        _executeur_heatmap().submit(int).result()
+
+        # THEN - La trace est enregistrée encodée, avec ses meilleurs efforts
+        assert result is True
+        octets = mock_dao.save.call_args.kwargs["trace"]
+        assert decoder_trace(octets).lat.tolist() == [48.1, 48.2]
+        assert list(mock_dao.save.call_args.kwargs["efforts"]) == ["1k", "5k", "10k"]
+        # Passages sur les segments et heatmap alimentés par la trace elle-même
+        detecter = mock_segments.return_value.detecter_efforts
+        assert detecter.call_args.args[3] is trace
+        assert mock_heatmap.return_value.ajouter_trace.call_args.args[1] is trace
+
+    @patch("service.activity_service.ActivityDAO")
+    @patch("service.activity_service.ActivityModel")
+    def test_creer_activite_from_dict_doublon(
+        self, mock_model, mock_dao_class, activity_service_module
+    ):
+        # GIVEN - La même trace, déjà enregistrée depuis un autre appareil
+        ActivityService = activity_service_module
+        mock_dao = Mock()
+        mock_dao_class.return_value = mock_dao
+        service = ActivityService()
+        trace = Track([48.1, 48.2], [-1.6, -1.7], time=[0, 8_000_000])
+        mock_dao.trouver_doublons.side_effect = lambda id_user, empreintes: {empreintes[4]: 9}
+        activity_data = {
+            "titre": "Test",
+            "sport": "course",
+            "date_activite": "2025-01-15",
+            "distance": 5.0,
+            "id_user": 1,
+            "trace": trace,
+        }
+
+        # WHEN
+        resultat = service.enregistrer_activite(activity_data)
+
+        # THEN - Trouvée dans une tranche voisine en une recherche, et non recréée
+        assert resultat == (None, 9)
+        mock_dao.trouver_doublons.assert_called_once()
+        mock_dao.save.assert_not_called()
+        assert service.creer_activite_from_dict(activity_data) is False
+
+    @patch("service.activity_service.HeatmapService", Mock())
+    @patch("service.activity_service.SegmentService", Mock())
+    @patch("service.activity_service.ActivityDAO")
+    @patch("service.activity_service.ActivityModel")
+    def test_enregistrer_activite_envois_simultanes(
+        self, mock_model, mock_dao_class, activity_service_module
+    ):
+        # GIVEN - La même sortie enregistrée par un autre envoi entre la recherche
+        # de doublon et l'insertion (refusée par l'index unique)
+        from sqlalchemy.exc import IntegrityError
+
+        ActivityService = activity_service_module
+        mock_dao = Mock()
+        mock_dao_class.return_value = mock_dao
+        service = ActivityService()
+        mock_dao.trouver_doublons.side_effect = lambda id_user, empreintes: (
+            {empreintes[0]: 12} if mock_dao.save.called else {}
+        )
+        mock_dao.save.side_effect = IntegrityError("INSERT", {}, Exception("unique"))
+        activity_data = {
+            "titre": "Test",
+            "sport": "course",
+            "date_activite": "2025-01-15",
+            "distance": 5.0,
+            "id_user": 1,
+            "trace": Track([48.1, 48.2], [-1.6, -1.7], time=[0, 8_000_000]),
+        }
+
+        # WHEN
+        resultat = service.enregistrer_activite(activity_data)
+
+        # THEN - Le doublon enregistré entre-temps est renvoyé
+        assert resultat == (None, 12)
+
 
 class TestGetActiviteById:
     """Tests de la méthode get_activite_by_id"""
@@ -435,6 +543,132 @@ class TestGetFeed:
         assert result == []
 
 
+class TestGetFeedPage:
+    """Tests de la méthode get_feed_page"""
+
+    @patch("service.activity_service.ActivityDAO")
+    def test_page_suivie(self, mock_dao_class, activity_service_module):
+        # GIVEN - Le DAO renvoie une activité de plus que la page
+        ActivityService = activity_service_module
+        mock_dao = Mock()
+        mock_feed = [Mock(), Mock(), Mock()]
+        mock_dao.get_feed.return_value = mock_feed
+        mock_dao_class.return_value = mock_dao
+        avant = (datetime(2025, 5, 1, 8, 0), 42)
+
+        service = ActivityService()
+
+        # WHEN
+        activites, encore = service.get_feed_page(1, 2, avant)
+
+        # THEN - Une ligne de plus est demandée pour savoir si une page suit
+        assert activites == mock_feed[:2]
+        assert encore is True
+        mock_dao.get_feed.assert_called_once_with(1, limite=3, avant=avant)
+
+    @patch("service.activity_service.ActivityDAO")
+    def test_derniere_page(self, mock_dao_class, activity_service_module):
+        # GIVEN
+        ActivityService = activity_service_module
+        mock_dao = Mock()
+        mock_dao.get_feed.return_value = [Mock()]
+        mock_dao_class.return_value = mock_dao
+
+        service = ActivityService()
+
+        # WHEN
+        activites, encore = service.get_feed_page(1, 2)
+
+        # THEN
+        assert len(activites) == 1
+        assert encore is False
+
+    @patch("service.activity_service.ActivityDAO")
+    def test_erreur(self, mock_dao_class, activity_service_module):
+        # GIVEN
+        ActivityService = activity_service_module
+        mock_dao = Mock()
+        mock_dao.get_feed.side_effect = Exception("Erreur DB")
+        mock_dao_class.return_value = mock_dao
+
+        service = ActivityService()
+
+        # WHEN / THEN
+        assert service.get_feed_page(1, 20) == ([], False)
+
+
+class TestFilPousse:
+    """Tests de la diffusion des activités dans les timelines (FEED_FANOUT=1)"""
+
+    @patch("service.activity_service.TimelineDAO")
+    @patch("service.activity_service.ActivityDAO")
+    @patch("service.activity_service.ActivityModel")
+    def test_diffusion_apres_creation(
+        self, mock_model, mock_dao_class, mock_timeline_class, activity_service_module, monkeypatch
+    ):
+        # GIVEN - Le fil poussé activé, avec un seuil de suiveurs
+        from service.activity_service import _executeur_diffusion
+
+        monkeypatch.setenv("FEED_FANOUT", "1")
+        monkeypatch.setenv("FEED_FANOUT_MAX_FOLLOWERS", "50")
+        mock_model.return_value = Mock(id=7, id_user=1, sport="course")
+        mock_dao_class.return_value = Mock()
+        mock_timeline = mock_timeline_class.return_value
+
+        ActivityService = activity_service_module
+        service = ActivityService()
+        activity_data = {
+            "titre": "Footing",
+            "sport": "course",
+            "date_activite": "2025-01-15",
+            "distance": 5.0,
+            "id_user": 1,
+        }
+
+        # WHEN - L'activité est créée, puis la diffusion en arrière-plan terminée
+        assert service.creer_activite_from_dict(activity_data) is True
+        _executeur_diffusion().submit(int).result()
+
+        # THEN
+        mock_timeline.diffuser.assert_called_once_with([7], 50)
+        assert service.seuil_diffusion == 50
+
+    @patch("service.activity_service.TimelineDAO")
+    @patch("service.activity_service.ActivityDAO")
+    def test_fil_lu_dans_la_timeline(
+        self, mock_dao_class, mock_timeline_class, activity_service_module, monkeypatch
+    ):
+        # GIVEN
+        monkeypatch.setenv("FEED_FANOUT", "1")
+        mock_timeline = mock_timeline_class.return_value
+        mock_timeline.get_feed.return_value = [Mock()]
+
+        service = activity_service_module()
+
+        # WHEN
+        activites, encore = service.get_feed_page(1, 20)
+
+        # THEN
+        assert len(activites) == 1 and encore is False
+        mock_timeline.get_feed.assert_called_once_with(1, limite=21, avant=None)
+        mock_dao_class.return_value.get_feed.assert_not_called()
+
+    @patch("service.activity_service.TimelineDAO")
+    @patch("service.activity_service.ActivityDAO")
+    def test_desactive_par_defaut(
+        self, mock_dao_class, mock_timeline_class, activity_service_module, monkeypatch
+    ):
+        # GIVEN
+        monkeypatch.delenv("FEED_FANOUT", raising=False)
+
+        service = activity_service_module()
+
+        # WHEN / THEN - Aucune diffusion, le fil reste calculé à la lecture
+        assert service._diffuser([1]) is None
+        assert service.timeline_dao is None
+        mock_timeline_class.assert_not_called()
+
+
 class TestGetMonthlyActivities:
     """Tests de la méthode get_monthly_activities"""
 
@@ -683,4 +917,86 @@ class TestModifierActiviteFromDict:
         result = service.modifier_activite_from_dict(activity_data)
 
         # THEN - La modification échoue
-        assert result is False
\ No newline at end of file
+        assert result is False
+
+class TestImporterGpx:
+    """Tests de l'import de fichiers GPX en lot"""
+
+    GPX = (
+        b'<gpx version="1.1" xmlns="http://www.topografix.com/GPX/1/1"><trk>'
+        b"<name>Sortie</name><type>cycling</type><trkseg>"
+        b'<trkpt lat="48.10" lon="-1.68"><time>2025-05-01T08:00:00Z</time></trkpt>'
+        b'<trkpt lat="48.11" lon="-1.68"><time>2025-05-01T08:05:00Z</time></trkpt>'
+        b"</trkseg></trk></gpx>"
+    )
+    # La même sortie, le lendemain
+    GPX_LENDEMAIN = GPX.replace(b"2025-05-01", b"2025-05-02")
+
+    @patch("service.activity_service.HeatmapService", Mock())
+    @patch("service.activity_service.SegmentService", Mock())
+    @patch("service.activity_service.ActivityDAO")
+    def test_importer_gpx_une_transaction(self, mock_dao_class, activity_service_module):
+        # GIVEN - Deux fichiers valides et un fichier illisible
+        ActivityService = activity_service_module
+        mock_dao = Mock()
+        mock_dao.trouver_doublons.return_value = {}
+        mock_dao.save_all.return_value = [11, 12]
+        mock_dao_class.return_value = mock_dao
+        service = ActivityService()
+        fichiers = [("a.gpx", self.GPX), ("casse.gpx", b"<gpx>"), ("b.gpx", self.GPX_LENDEMAIN)]
+
+        # WHEN
+        statuts = service.importer_gpx(fichiers, id_user=3)
+
+        # THEN - Un seul enregistrement groupé, un statut par fichier
+        mock_dao.save_all.assert_called_once()
+        assert len(mock_dao.save_all.call_args[0][0]) == 2
+        assert [s["statut"] for s in statuts] == ["importe", "erreur", "importe"]
+        assert [s.get("id_activite") for s in statuts] == [11, None, 12]
+        assert statuts[0]["sport"] == "cyclisme"
+
+    @patch("service.activity_service.HeatmapService", Mock())
+    @patch("service.activity_service.SegmentService", Mock())
+    @patch("service.activity_service.ActivityDAO")
+    def test_importer_gpx_erreur_enregistrement(self, mock_dao_class, activity_service_module):
+        # GIVEN - Une base qui refuse l'insertion
+        ActivityService = activity_service_module
+        mock_dao = Mock()
+        mock_dao.trouver_doublons.return_value = {}
+        mock_dao.save_all.side_effect = Exception("Erreur DB")
+        mock_dao_class.return_value = mock_dao
+        service = ActivityService()
+
+        # WHEN
+        statuts = service.importer_gpx([("a.gpx", self.GPX)], id_user=3)
+
+        # THEN - Aucun fichier n'est marqué comme importé
+        assert statuts[0]["statut"] == "erreur"
+        assert statuts[0]["detail"] == "Erreur lors de l'enregistrement"
+
+    @patch("service.activity_service.HeatmapService", Mock())
+    @patch("service.activity_service.SegmentService", Mock())
+    @patch("service.activity_service.ActivityDAO")
+    def test_importer_gpx_doublons(self, mock_dao_class, activity_service_module):
+        # GIVEN - Une sortie déjà en base, une autre envoyée deux fois dans le lot
+        ActivityService = activity_service_module
+        mock_dao = Mock()
+        mock_dao_class.return_value = mock_dao
+        service = ActivityService()
+        empreinte = analyser_fichier(("a.gpx", self.GPX))["empreinte"]
+        mock_dao.trouver_doublons.return_value = {empreinte: 7}
+        mock_dao.save_all.return_value = [12]
+        fichiers = [
+            ("a.gpx", self.GPX),
+            ("b.gpx", self.GPX_LENDEMAIN),
+            ("b_telephone.gpx", self.GPX_LENDEMAIN),
+        ]
+
+        # WHEN
+        statuts = service.importer_gpx(fichiers, id_user=3)
+
+        # THEN - Seule la sortie du lendemain est enregistrée, une fois
+        assert len(mock_dao.save_all.call_args[0][0]) == 1
+        assert [s["statut"] for s in statuts] == ["doublon", "importe", "doublon"]
+        assert statuts[0]["id_activite"] == 7
+        assert statuts[2]["detail"] == "Meme activite que b.gpx"
@@ -0,0 +1,91 @@
+"""
+Tests unitaires pour la classe SegmentService
+"""
+
+from pathlib import Path
+
+import pytest
+
+from service.segment_service import SegmentService
+from utils.gpx_ingestion import ingest_gpx
+from utils.track import Track
+
+GPX = Path(__file__).parent.parent / "test_utils" / "gpx"
+
+
+class SegmentDAOPartage:
+    """Table `segment` en memoire, partagee par plusieurs processus simules."""
+
+    def __init__(self):
+        self.segments = {}
+        self.efforts = []
+        self.appels_formes = []
+
+    def save(self, segment):
+        segment.id = max(self.segments, default=0) + 1
+        self.segments[segment.id] = segment
+        return segment
+
+    def get_version(self):
+        return len(self.segments), max(self.segments, default=0)
+
+    def get_formes(self, apres=None):
+        self.appels_formes.append(apres)
+        return [
+            (id_segment, segment.sport, segment.donnees)
+            for id_segment, segment in sorted(self.segments.items())
+            if apres is None or id_segment > apres
+        ]
+
+    def save_efforts(self, efforts):
+        self.efforts.extend(efforts)
+
+
+@pytest.fixture(scope="module")
+def trace():
+    return ingest_gpx(str(GPX / "course.gpx")).track
+
+
+@pytest.fixture
+def dao():
+    return SegmentDAOPartage()
+
+
+def _worker(dao) -> SegmentService:
+    """Instance propre a un processus (hors Singleton), sur la base partagee."""
+    service = type.__call__(SegmentService)
+    service.segment_dao = dao
+    return service
+
+
+class TestIndexPartage:
+    """Tests de l'index des segments entre plusieurs workers"""
+
+    def test_segment_cree_par_un_autre_worker(self, dao, trace):
+        # GIVEN - Deux workers, dont l'un a deja charge son index (vide)
+        createur, detecteur = _worker(dao), _worker(dao)
+        assert detecteur.detecter_efforts(1, 1, "course", trace) == []
+
+        # WHEN - L'autre worker cree un segment
+        forme = Track(trace.lat[50:150], trace.lon[50:150])
+        segment = createur.creer_segment("Montee", "course", 1, forme)
+        efforts = detecteur.detecter_efforts(2, 1, "course", trace)
+
+        # THEN - Le passage est detecte, l'index complete sans tout relire
+        assert [effort["id_segment"] for effort in efforts] == [segment.id]
+        assert dao.appels_formes == [None, 0]
+
+    def test_segment_supprime(self, dao, trace):
+        # GIVEN - Un worker dont l'index contient un segment
+        service = _worker(dao)
+        segment = service.creer_segment(
+            "Montee", "course", 1, Track(trace.lat[50:150], trace.lon[50:150])
+        )
+        assert service.detecter_efforts(1, 1, "course", trace)
+
+        # WHEN - Le segment est supprime depuis un autre processus
+        del dao.segments[segment.id]
+
+        # THEN - L'index est reconstruit
+        assert service.detecter_efforts(2, 1, "course", trace) == []
+        assert dao.appels_formes[-1] is None
@@ -0,0 +1,86 @@
+from pathlib import Path
+
+import numpy as np
+
+from utils.best_efforts import meilleur_temps, meilleurs_efforts
+from utils.gpx_ingestion import ingest_gpx
+from utils.track import Track
+
+GPX = Path(__file__).parent / "gpx"
+
+
+def meilleur_temps_naif(distance_cumulee, temps, distance):
+    """Référence en O(n²) : toutes les paires de points, passage interpolé."""
+    meilleur = None
+    for i in range(len(distance_cumulee)):
+        for j in range(i + 1, len(distance_cumulee)):
+            for depart, arrivee in ((i, None), (None, j)):
+                if depart is not None:
+                    fin = distance_cumulee[depart] + distance
+                    duree = np.interp(fin, distance_cumulee, temps) - temps[depart]
+                    valide = fin <= distance_cumulee[-1]
+                else:
+                    debut = distance_cumulee[arrivee] - distance
+                    duree = temps[arrivee] - np.interp(debut, distance_cumulee, temps)
+                    valide = debut >= distance_cumulee[0]
+                if valide and duree > 0 and (meilleur is None or duree < meilleur):
+                    meilleur = duree
+    return meilleur
+
+
+class TestMeilleurTemps:
+    """Tests de la fenêtre glissante"""
+
+    def test_allure_reguliere(self):
+        # GIVEN - 5 km à 4 m/s
+        distance = np.arange(0, 5001, 20.0)
+
+        # WHEN / THEN
+        assert meilleur_temps(distance, distance / 4, 1000) == 250
+
+    def test_passage_interpole(self):
+        # GIVEN - Un kilomètre rapide au milieu, entre des points espacés
+        distance = np.array([0.0, 300.0, 700.0, 1100.0, 1500.0, 2000.0])
+        temps = np.array([0.0, 100.0, 150.0, 200.0, 300.0, 500.0])
+
+        # WHEN / THEN - 1 000 m en 150 s, de 300 m à 1 300 m (arrivée interpolée)
+        assert meilleur_temps(distance, temps, 1000) == 150
+
+    def test_trace_trop_courte(self):
+        distance = np.linspace(0, 900, 10)
+        assert meilleur_temps(distance, distance, 1000) is None
+
+    def test_comme_la_reference(self):
+        # GIVEN - Des traces irrégulières, avec arrêts (distance constante)
+        generateur = np.random.default_rng(3)
+        for _ in range(50):
+            pas = generateur.choice([0.0, 1.0, 5.0], size=30) * generateur.random(30) * 100
+            distance = np.concatenate(([0.0], np.cumsum(pas)))
+            temps = np.concatenate(([0.0], np.cumsum(generateur.random(30) * 60 + 1)))
+            cible = float(generateur.random() * distance[-1]) or 1.0
+
+            # THEN
+            attendu = meilleur_temps_naif(distance, temps, cible)
+            obtenu = meilleur_temps(distance, temps, cible)
+            assert (obtenu is None) == (attendu is None)
+            if attendu is not None:
+                np.testing.assert_allclose(obtenu, attendu)
+
+
+class TestMeilleursEfforts:
+    """Tests des efforts d'une trace"""
+
+    def test_corpus(self):
+        # WHEN
+        efforts = meilleurs_efforts(ingest_gpx(str(GPX / "velo_segments.gpx")).track)
+
+        # THEN - Seules les distances couvertes, de plus en plus longues
+        assert list(efforts) == ["1k", "5k"]
+        assert efforts["1k"] < efforts["5k"]
+
+    def test_sans_horodatage(self):
+        # GIVEN
+        lat = np.linspace(48.0, 48.1, 100)
+
+        # WHEN / THEN
+        assert meilleurs_efforts(Track(lat, np.full(100, -1.6))) == {}
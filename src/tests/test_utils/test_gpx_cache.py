@@ -0,0 +1,87 @@
+from pathlib import Path
+
+import pytest
+
+from utils.gpx_cache import TAILLE_ENTREE_MIN, GPXCache
+from utils.gpx_ingestion import IngestionIncrementale
+from utils.singleton import Singleton
+
+CORPUS = Path(__file__).parent / "gpx"
+
+
+@pytest.fixture
+def nouveau_cache():
+    """Crée une instance neuve du singleton avec le budget demandé."""
+
+    def creer(budget_octets):
+        Singleton._instances.pop(GPXCache, None)
+        return GPXCache(budget_octets)
+
+    yield creer
+    Singleton._instances.pop(GPXCache, None)
+
+
+def contenu(nom: str) -> bytes:
+    return (CORPUS / nom).read_bytes()
+
+
+class TestGPXCache:
+    """Tests du cache LRU des ingestions"""
+
+    def test_second_envoi_sans_analyse(self, nouveau_cache, monkeypatch):
+        # GIVEN - Un fichier déjà analysé une fois
+        cache = nouveau_cache(10 * 1024 * 1024)
+        premiere, hit_1 = cache.get_or_ingest(contenu("course.gpx"))
+
+        # WHEN - Le même contenu est renvoyé, l'analyse étant rendue impossible
+        monkeypatch.setattr("utils.gpx_cache.ingest_gpx", None)
+        seconde, hit_2 = cache.get_or_ingest(contenu("course.gpx"))
+
+        # THEN
+        assert (hit_1, hit_2) == (False, True)
+        assert seconde is premiere
+        assert (cache.hits, cache.misses) == (1, 1)
+
+    def test_eviction_lru_selon_le_budget(self, nouveau_cache):
+        # GIVEN - Un budget pour deux petites traces seulement
+        course, _ = nouveau_cache(10**9).get_or_ingest(contenu("course.gpx"))
+        route, _ = GPXCache().get_or_ingest(contenu("route.gpx"))
+        budget = course.track.nbytes + route.track.nbytes + 2 * TAILLE_ENTREE_MIN
+        cache = nouveau_cache(budget)
+        cache.get_or_ingest(contenu("course.gpx"))
+        cache.get_or_ingest(contenu("route.gpx"))
+
+        # WHEN - course.gpx est relu, puis un troisième fichier arrive
+        cache.get_or_ingest(contenu("course.gpx"))
+        cache.get_or_ingest(contenu("longue_distance.gpx"))
+
+        # THEN - route.gpx, le moins récemment utilisé, a été évincé
+        assert cache.get(GPXCache.cle(contenu("course.gpx"))) is not None
+        assert cache.get(GPXCache.cle(contenu("route.gpx"))) is None
+        assert cache.taille <= budget
+
+    def test_entree_plus_grande_que_le_budget(self, nouveau_cache):
+        # GIVEN
+        cache = nouveau_cache(TAILLE_ENTREE_MIN)
+
+        # WHEN
+        _, hit_1 = cache.get_or_ingest(contenu("course.gpx"))
+        _, hit_2 = cache.get_or_ingest(contenu("course.gpx"))
+
+        # THEN - Rien n'est conservé
+        assert (hit_1, hit_2) == (False, False)
+        assert len(cache) == 0
+
+    def test_ingestion_incrementale_puis_cache(self, nouveau_cache):
+        # GIVEN - Un fichier reçu par blocs
+        cache = nouveau_cache(10 * 1024 * 1024)
+        flux = IngestionIncrementale()
+        flux.feed(contenu("course.gpx"))
+
+        # WHEN
+        ingestion, hit_1 = cache.finish(flux)
+        _, hit_2 = cache.get_or_ingest(contenu("course.gpx"))
+
+        # THEN - Le résultat est partagé avec les envois complets
+        assert (hit_1, hit_2) == (False, True)
+        assert ingestion.nb_points == 300
@@ -0,0 +1,146 @@
+import bz2
+import gzip
+import io
+import zipfile
+from pathlib import Path
+
+import pytest
+
+from utils.gpx_compression import (
+    FORMAT_BZIP2,
+    FORMAT_GZIP,
+    FORMAT_ZIP,
+    TAILLE_BLOC,
+    DecompresseurFlux,
+    detecter_format,
+)
+from utils.gpx_ingestion import (
+    BACKEND_GPXPY,
+    BACKEND_RAPIDE,
+    IngestionIncrementale,
+    TailleMaxDepassee,
+    ingest_gpx,
+)
+from utils.gpx_parser import parse_strava_gpx
+
+CORPUS = Path(__file__).parent / "gpx"
+COURSE = (CORPUS / "course.gpx").read_bytes()
+VELO = (CORPUS / "velo_segments.gpx").read_bytes()
+
+
+def archive_zip(**fichiers) -> bytes:
+    tampon = io.BytesIO()
+    with zipfile.ZipFile(tampon, "w", zipfile.ZIP_DEFLATED) as archive:
+        for nom, contenu in fichiers.items():
+            archive.writestr(nom.replace("_", "."), contenu)
+    return tampon.getvalue()
+
+
+def par_blocs(contenu: bytes, taille: int = 1000, **kwargs) -> IngestionIncrementale:
+    flux = IngestionIncrementale(**kwargs)
+    for debut in range(0, len(contenu), taille):
+        flux.feed(contenu[debut : debut + taille])
+    return flux
+
+
+class TestDetection:
+    """Tests de la reconnaissance du format"""
+
+    def test_signatures(self):
+        assert detecter_format(gzip.compress(COURSE)) == FORMAT_GZIP
+        assert detecter_format(bz2.compress(COURSE)) == FORMAT_BZIP2
+        assert detecter_format(archive_zip(course_gpx=COURSE)) == FORMAT_ZIP
+        assert detecter_format(COURSE) is None
+
+
+class TestDecompresseurFlux:
+    """Tests de la décompression par blocs"""
+
+    @pytest.mark.parametrize(
+        "format_, compresser", [(FORMAT_GZIP, gzip.compress), (FORMAT_BZIP2, bz2.compress)]
+    )
+    def test_blocs_bornes_et_membres_multiples(self, format_, compresser):
+        # GIVEN - Deux membres concaténés, reçus par blocs de 100 octets
+        contenu = compresser(VELO * 3) + compresser(COURSE)
+        decompresseur = DecompresseurFlux(format_)
+
+        # WHEN
+        blocs = [
+            bloc
+            for debut in range(0, len(contenu), 100)
+            for bloc in decompresseur.decompresser(contenu[debut : debut + 100])
+        ]
+
+        # THEN - Aucun bloc ne dépasse TAILLE_BLOC, le contenu est intact
+        assert max(len(bloc) for bloc in blocs) <= TAILLE_BLOC
+        assert b"".join(blocs) == VELO * 3 + COURSE
+        assert decompresseur.termine
+
+    def test_flux_corrompu(self):
+        with pytest.raises(ValueError):
+            list(DecompresseurFlux(FORMAT_GZIP).decompresser(b"\x1f\x8b\x08\x00corrompu" * 10))
+
+
+class TestIngestionCompressee:
+    """Les fichiers compressés donnent le même résultat que le XML brut"""
+
+    @pytest.mark.parametrize(
+        "compresser", [gzip.compress, bz2.compress, lambda c: archive_zip(trace_gpx=c)]
+    )
+    def test_flux_identique_au_brut(self, compresser):
+        # WHEN
+        ingestion = par_blocs(compresser(VELO)).finish()
+
+        # THEN
+        assert ingestion.resume == ingest_gpx(VELO).resume
+
+    @pytest.mark.parametrize("backend", [BACKEND_RAPIDE, BACKEND_GPXPY])
+    def test_parse_strava_gpx_gz(self, backend):
+        assert parse_strava_gpx(gzip.compress(COURSE), backend) == parse_strava_gpx(COURSE)
+
+    def test_chemin_vers_fichier_gz(self, tmp_path):
+        # GIVEN
+        chemin = tmp_path / "course.gpx.gz"
+        chemin.write_bytes(gzip.compress(COURSE))
+
+        # THEN
+        assert ingest_gpx(str(chemin)).resume == ingest_gpx(COURSE).resume
+
+    def test_flux_tronque(self):
+        # GIVEN - Un fichier gzip amputé de sa fin
+        flux = par_blocs(gzip.compress(COURSE)[:-20])
+
+        # WHEN / THEN
+        with pytest.raises(ValueError):
+            flux.finish()
+
+    def test_bombe_de_decompression(self):
+        # GIVEN - Un contenu qui se décompresse bien au-delà du ratio autorisé
+        contenu = gzip.compress(COURSE * 200)
+
+        # WHEN / THEN
+        with pytest.raises(TailleMaxDepassee):
+            par_blocs(contenu, taille_max=len(contenu), taille_max_xml=len(COURSE))
+
+
+class TestArchiveZip:
+    """Tests des archives de plusieurs fichiers"""
+
+    def test_lot_de_fichiers(self):
+        # GIVEN - Une archive avec un GPX brut et un GPX compressé
+        contenu = archive_zip(course_gpx=COURSE, velo_gpx_gz=gzip.compress(VELO))
+
+        # WHEN
+        lot = par_blocs(contenu).finish_lot()
+
+        # THEN
+        assert [nom for nom, _ in lot] == ["course.gpx", "velo.gpx.gz"]
+        assert lot[1][1].resume == ingest_gpx(VELO).resume
+
+    def test_finish_refuse_plusieurs_fichiers(self):
+        # GIVEN
+        flux = par_blocs(archive_zip(course_gpx=COURSE, velo_gpx=VELO))
+
+        # WHEN / THEN
+        with pytest.raises(ValueError):
+            flux.finish()
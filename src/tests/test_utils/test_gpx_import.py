@@ -0,0 +1,135 @@
+import gzip
+import io
+import zipfile
+from pathlib import Path
+
+import pytest
+
+from utils import gpx_import
+from utils.gpx_import import (
+    activite_depuis_analyse,
+    analyser_fichier,
+    analyser_lot,
+    extraire_zip,
+    sport_depuis_type,
+)
+from utils.gpx_ingestion import TailleMaxDepassee
+
+CORPUS = sorted((Path(__file__).parent / "gpx").glob("*.gpx"))
+
+# Quelques kilo-octets une fois compressés, 10 Mo de XML une fois décompressés
+BOMBE = b"<gpx>" + b" " * 10 * 1024 * 1024 + b"</gpx>"
+
+
+def lot_corpus():
+    return [(chemin.name, chemin.read_bytes()) for chemin in CORPUS]
+
+
+class TestAnalyserLot:
+    """Tests de l'analyse en parallèle"""
+
+    def test_parallele_identique_au_sequentiel(self, monkeypatch):
+        # GIVEN - Un lot assez grand pour passer par le pool de processus
+        lot = lot_corpus() * 2 + [("casse.gpx", b"<gpx><trk>")]
+        monkeypatch.setenv("GPX_IMPORT_WORKERS", "2")
+
+        # WHEN
+        resultats = analyser_lot(lot)
+
+        # THEN - Mêmes résultats, dans l'ordre des fichiers
+        assert resultats == [analyser_fichier(f) for f in lot]
+        assert "erreur" in resultats[-1]
+
+    def test_bombe_gzip_refusee(self):
+        # GIVEN - Un fichier gzip très compressible
+        fichier = ("bombe.gpx.gz", gzip.compress(BOMBE))
+
+        # WHEN - Au plus 30 fois 1 Ko de XML pour un fichier de 1 Ko
+        resultat = analyser_fichier(fichier, taille_max=1024)
+
+        # THEN
+        assert "trop volumineux" in resultat["erreur"]
+
+    def test_petit_lot_sans_pool(self, monkeypatch):
+        # GIVEN
+        monkeypatch.setattr(gpx_import, "_executor", None)
+
+        # WHEN - Le lot est sous le seuil de parallélisation
+        resultats = analyser_lot(lot_corpus()[:2])
+
+        # THEN
+        assert [r["fichier"] for r in resultats] == [c.name for c in CORPUS[:2]]
+
+
+class TestExtraireZip:
+    """Tests de la lecture des archives"""
+
+    def test_seuls_les_gpx_sont_extraits(self):
+        # GIVEN - Une archive avec un GPX, un autre fichier et des métadonnées macOS
+        tampon = io.BytesIO()
+        with zipfile.ZipFile(tampon, "w") as archive:
+            archive.writestr("sorties/course.gpx", CORPUS[0].read_bytes())
+            archive.writestr("lisez-moi.txt", "texte")
+            archive.writestr("__MACOSX/sorties/._course.gpx", "meta")
+
+        # WHEN
+        fichiers = extraire_zip("export.zip", tampon.getvalue())
+
+        # THEN
+        assert [nom for nom, _ in fichiers] == ["export.zip/sorties/course.gpx"]
+
+    def test_archive_invalide(self):
+        with pytest.raises(ValueError):
+            extraire_zip("casse.zip", b"PK\x03\x04pas un zip")
+
+    def test_bombe_refusee(self):
+        # GIVEN - Une archive de quelques Ko dont un fichier fait 10 Mo décompressé
+        tampon = io.BytesIO()
+        with zipfile.ZipFile(tampon, "w", zipfile.ZIP_DEFLATED) as archive:
+            archive.writestr("course.gpx", CORPUS[0].read_bytes())
+            archive.writestr("bombe.gpx", BOMBE)
+        contenu = tampon.getvalue()
+
+        # WHEN / THEN - Au plus 30 fois la taille maximale d'un envoi par fichier
+        with pytest.raises(TailleMaxDepassee, match="bombe.gpx"):
+            extraire_zip("export.zip", contenu, taille_max=len(contenu))
+
+    def test_limites_de_l_archive(self):
+        # GIVEN - Une archive de deux fichiers GPX
+        tampon = io.BytesIO()
+        with zipfile.ZipFile(tampon, "w") as archive:
+            for chemin in CORPUS[:2]:
+                archive.writestr(chemin.name, chemin.read_bytes())
+        taille = sum(len(chemin.read_bytes()) for chemin in CORPUS[:2])
+
+        # WHEN / THEN - Nombre de fichiers et octets décompressés de l'ensemble
+        with pytest.raises(TailleMaxDepassee):
+            extraire_zip("export.zip", tampon.getvalue(), nb_max=1)
+        with pytest.raises(TailleMaxDepassee):
+            extraire_zip("export.zip", tampon.getvalue(), taille_totale_max=taille - 1)
+        assert len(extraire_zip("export.zip", tampon.getvalue(), taille_totale_max=taille)) == 2
+
+
+class TestActiviteDepuisAnalyse:
+    """Tests de la conversion d'une analyse en activité"""
+
+    def test_sport_depuis_type(self):
+        assert sport_depuis_type("Running") == "course"
+        assert sport_depuis_type("cyclisme") == "cyclisme"
+        assert sport_depuis_type(None, "natation") == "natation"
+        with pytest.raises(ValueError):
+            sport_depuis_type("kitesurf")
+
+    def test_activite_complete(self):
+        # GIVEN
+        analyse = analyser_fichier(("course.gpx", (CORPUS[0].parent / "course.gpx").read_bytes()))
+
+        # WHEN
+        activite = activite_depuis_analyse(analyse, id_user=7)
+
+        # THEN
+        assert activite["titre"] == "Footing du matin"
+        assert activite["sport"] == "course"
+        assert activite["distance"] == analyse["resume"]["distance_km"]
+        assert activite["date_activite"] == analyse["date_debut"].replace(tzinfo=None)
+        assert activite["id_user"] == 7
@@ -0,0 +1,156 @@
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from utils.gpx_cache import GPXCache
+from utils.gpx_ingestion import (
+    BACKEND_GPXPY,
+    BACKEND_RAPIDE,
+    IngestionIncrementale,
+    TailleMaxDepassee,
+    ingest_gpx,
+)
+from utils.gpx_parser import GPXParser, parse_strava_gpx
+
+CORPUS = sorted((Path(__file__).parent / "gpx").glob("*.gpx"))
+
+
+@pytest.fixture(params=CORPUS, ids=lambda chemin: chemin.stem)
+def fichier_corpus(request):
+    return str(request.param)
+
+
+class TestEquivalenceBackends:
+    """Le backend rapide et le backend gpxpy donnent les mêmes résultats"""
+
+    def test_memes_metriques(self, fichier_corpus):
+        # GIVEN / WHEN - Le même fichier lu par les deux backends
+        rapide = ingest_gpx(fichier_corpus, BACKEND_RAPIDE)
+        reference = ingest_gpx(fichier_corpus, BACKEND_GPXPY)
+
+        # THEN
+        assert (rapide.nom, rapide.type) == (reference.nom, reference.type)
+        assert rapide.nb_points == reference.nb_points > 0
+        assert rapide.date_debut == reference.date_debut
+        for cle, valeur in reference.resume.items():
+            if valeur is None:
+                assert rapide.resume[cle] is None, cle
+            else:
+                assert rapide.resume[cle] == pytest.approx(valeur, rel=1e-9), cle
+
+    def test_memes_traces(self, fichier_corpus):
+        # GIVEN / WHEN
+        rapide = ingest_gpx(fichier_corpus, BACKEND_RAPIDE).track
+        reference = ingest_gpx(fichier_corpus, BACKEND_GPXPY).track
+
+        # THEN - Mêmes colonnes (NaN compris) et mêmes segments
+        for colonne in ("lat", "lon", "ele", "time", "segments"):
+            np.testing.assert_array_equal(getattr(rapide, colonne), getattr(reference, colonne))
+
+    def test_memes_resumes_strava(self, fichier_corpus):
+        # GIVEN
+        with open(fichier_corpus, "rb") as f:
+            contenu = f.read()
+
+        # WHEN
+        rapide = parse_strava_gpx(contenu, BACKEND_RAPIDE)
+        reference = parse_strava_gpx(contenu, BACKEND_GPXPY)
+
+        # THEN
+        assert rapide == pytest.approx(reference, rel=1e-9)
+
+
+class TestPointsEntree:
+    """Tous les points d'entrée donnent la même distance pour un fichier"""
+
+    def test_distance_identique(self, fichier_corpus):
+        # GIVEN
+        with open(fichier_corpus, "rb") as f:
+            contenu = f.read()
+
+        # WHEN
+        ingestion = ingest_gpx(fichier_corpus)
+        complet = GPXParser.parse_gpx_file(fichier_corpus)
+        stream = GPXParser.parse_gpx_stream(fichier_corpus)
+        strava = parse_strava_gpx(contenu)
+
+        # THEN
+        assert complet["distance"] == pytest.approx(ingestion.distance)
+        assert stream["distance"] == pytest.approx(ingestion.distance)
+        assert strava["distance_km"] == round(ingestion.distance / 1000, 3)
+        assert complet["duree"] == stream["duree"] == ingestion.duree_timedelta
+        assert complet["date_activite"] == stream["date_activite"] == ingestion.date_debut
+        assert stream["denivele_positif"] == pytest.approx(ingestion.denivele[0])
+
+    def test_stream_par_petits_blocs(self, fichier_corpus, monkeypatch):
+        # GIVEN - Un tampon plus petit que les segments du corpus
+        from utils import gpx_parser
+
+        monkeypatch.setattr(gpx_parser._TraceAccumulator, "TAILLE_TAMPON", 7)
+
+        # WHEN
+        stream = GPXParser.parse_gpx_stream(fichier_corpus)
+
+        # THEN - Le découpage en blocs ne change pas les cumuls
+        ingestion = ingest_gpx(fichier_corpus)
+        assert stream["distance"] == pytest.approx(ingestion.distance)
+        assert stream["nb_points"] == ingestion.nb_points
+        assert stream["denivele_negatif"] == pytest.approx(ingestion.denivele[1])
+
+
+class TestIngestGpx:
+    """Tests du choix de backend"""
+
+    def test_backend_inconnu(self):
+        # WHEN / THEN
+        with pytest.raises(ValueError):
+            ingest_gpx(b"<gpx/>", "lxml")
+
+    def test_backend_par_variable_environnement(self, monkeypatch):
+        # GIVEN
+        monkeypatch.setenv("GPX_BACKEND", BACKEND_GPXPY)
+
+        # WHEN
+        ingestion = ingest_gpx(str(CORPUS[0]))
+
+        # THEN
+        assert ingestion.backend == BACKEND_GPXPY
+
+    def test_route_en_dernier_recours(self):
+        # WHEN - Le corpus contient un fichier sans trace
+        ingestion = ingest_gpx(str(Path(__file__).parent / "gpx" / "route.gpx"))
+
+        # THEN
+        assert ingestion.nb_points == 60
+        assert ingestion.nom is None
+        assert ingestion.distance > 0
+
+
+class TestIngestionIncrementale:
+    """Tests de l'analyse par blocs, au fil de la réception"""
+
+    def test_blocs_identiques_a_la_lecture_complete(self, fichier_corpus):
+        # GIVEN - Le contenu découpé en petits blocs irréguliers
+        with open(fichier_corpus, "rb") as f:
+            contenu = f.read()
+        flux = IngestionIncrementale()
+
+        # WHEN
+        for debut in range(0, len(contenu), 997):
+            flux.feed(contenu[debut : debut + 997])
+        ingestion = flux.finish()
+
+        # THEN - Même résultat, même clé de cache que le contenu complet
+        assert ingestion.resume == ingest_gpx(contenu).resume
+        assert flux.cle == GPXCache.cle(contenu)
+
+    def test_taille_maximale(self):
+        # GIVEN
+        flux = IngestionIncrementale(taille_max=1000)
+        contenu = CORPUS[0].read_bytes()
+
+        # WHEN / THEN - L'erreur survient dès le bloc qui dépasse
+        flux.feed(contenu[:600])
+        with pytest.raises(TailleMaxDepassee):
+            flux.feed(contenu[600:1200])
@@ -0,0 +1,224 @@
+from datetime import timedelta
+
+import gpxpy
+import numpy as np
+import pytest
+
+from utils.gpx_parser import GPXParser, parse_strava_gpx
+from utils.track import Track
+
+GPX_TRACE = """<?xml version="1.0" encoding="UTF-8"?>
+<gpx version="1.1" creator="test" xmlns="http://www.topografix.com/GPX/1/1">
+  <trk>
+    <name>Sortie test</name>
+    <type>running</type>
+    <trkseg>
+      <trkpt lat="48.1000" lon="-1.6800"><ele>30.0</ele><time>2025-05-01T08:00:00Z</time></trkpt>
+      <trkpt lat="48.1010" lon="-1.6790"><ele>35.0</ele><time>2025-05-01T08:00:30Z</time></trkpt>
+      <trkpt lat="48.1020" lon="-1.6780"><ele>32.0</ele><time>2025-05-01T08:01:00Z</time></trkpt>
+      <trkpt lat="48.1030" lon="-1.6770"><ele>40.0</ele><time>2025-05-01T08:01:30Z</time></trkpt>
+    </trkseg>
+  </trk>
+</gpx>
+"""
+
+GPX_ROUTE = """<?xml version="1.0" encoding="UTF-8"?>
+<gpx version="1.1" creator="test" xmlns="http://www.topografix.com/GPX/1/1">
+  <rte>
+    <rtept lat="48.1000" lon="-1.6800"/>
+    <rtept lat="48.1100" lon="-1.6800"/>
+  </rte>
+</gpx>
+"""
+
+
+@pytest.fixture
+def fichier_gpx(tmp_path):
+    chemin = tmp_path / "trace.gpx"
+    chemin.write_text(GPX_TRACE, encoding="utf-8")
+    return str(chemin)
+
+
+class TestParseGpxStream:
+    """Tests du mode de lecture incrémental"""
+
+    def test_stream_identique_au_parsing_complet(self, fichier_gpx):
+        # GIVEN - Un fichier GPX avec une trace
+        complet = GPXParser.parse_gpx_file(fichier_gpx)
+
+        # WHEN - On le lit en mode streaming
+        stream = GPXParser.parse_gpx_file(fichier_gpx, streaming=True)
+
+        # THEN - Les métriques sont identiques, sans les points
+        assert stream["distance"] == pytest.approx(complet["distance"])
+        assert stream["duree"] == complet["duree"] == timedelta(seconds=90)
+        assert stream["date_activite"] == complet["date_activite"]
+        assert stream["nb_points"] == complet["nb_points"] == 4
+        assert "points" not in stream
+
+    def test_stream_denivele_et_bbox(self, fichier_gpx):
+        # WHEN
+        stream = GPXParser.parse_gpx_stream(fichier_gpx)
+
+        # THEN - +5 -3 +8 pour le dénivelé, emprise des 4 points
+        assert stream["denivele_positif"] == pytest.approx(13.0)
+        assert stream["denivele_negatif"] == pytest.approx(3.0)
+        assert stream["bbox"] == (48.1, -1.68, 48.103, -1.677)
+
+    def test_stream_route_en_dernier_recours(self, tmp_path):
+        # GIVEN - Un fichier sans trace mais avec une route de ~1.1 km
+        chemin = tmp_path / "route.gpx"
+        chemin.write_text(GPX_ROUTE, encoding="utf-8")
+
+        # WHEN
+        stream = GPXParser.parse_gpx_stream(str(chemin))
+
+        # THEN
+        assert stream["nb_points"] == 2
+        assert stream["distance"] == pytest.approx(1113, abs=1)
+        assert stream["duree"] is None
+
+    def test_stream_xml_invalide(self, tmp_path):
+        # GIVEN
+        chemin = tmp_path / "invalide.gpx"
+        chemin.write_text("<gpx><trk>", encoding="utf-8")
+
+        # WHEN / THEN
+        assert GPXParser.parse_gpx_stream(str(chemin)) is None
+
+
+class TestComputeMetrics:
+    """Tests du noyau de métriques vectorisé"""
+
+    def test_metriques_coherentes_avec_les_boucles(self, fichier_gpx):
+        # GIVEN - La trace du fichier, en colonnes
+        trace = GPXParser.parse_gpx_file(fichier_gpx)["points"]
+        points = list(trace)
+
+        # WHEN
+        metriques = GPXParser.compute_metrics(trace.lat, trace.lon, trace.ele, trace.time)
+
+        # THEN - Même distance que la formule de Haversine point par point
+        attendu = sum(
+            GPXParser._haversine_distance(a["lat"], a["lon"], b["lat"], b["lon"])
+            for a, b in zip(points, points[1:])
+        )
+        assert metriques["distance"] == pytest.approx(attendu)
+        assert metriques["distance_cumulee"][-1] == pytest.approx(attendu)
+        assert metriques["duree"] == 90.0
+        assert metriques["vitesses"] == pytest.approx(metriques["distances"] / 30.0)
+        assert (metriques["denivele_positif"], metriques["denivele_negatif"]) == (13.0, 3.0)
+
+    def test_metriques_valeurs_manquantes(self):
+        # GIVEN - Une élévation et un temps manquants (NaN)
+        lat = np.array([48.0, 48.001, 48.002])
+        lon = np.array([-1.6, -1.6, -1.6])
+        ele = np.array([10.0, np.nan, 4.0])
+        temps = np.array([0.0, np.nan, 20.0])
+
+        # WHEN
+        metriques = GPXParser.compute_metrics(lat, lon, ele, temps)
+
+        # THEN - Les NaN sont ignorés, les vitesses correspondantes inconnues
+        assert metriques["denivele_negatif"] == 6.0
+        assert metriques["duree"] == 20.0
+        assert np.isnan(metriques["vitesses"]).all()
+
+
+class TestTrack:
+    """Tests de la représentation en colonnes"""
+
+    def test_parse_gpx_file_renvoie_une_trace(self, fichier_gpx):
+        # WHEN
+        resultat = GPXParser.parse_gpx_file(fichier_gpx)
+        trace = resultat["points"]
+
+        # THEN - 4 colonnes float64, soit 32 octets par point
+        assert isinstance(trace, Track)
+        assert len(trace) == resultat["nb_points"] == 4
+        assert trace.nbytes == 32 * len(trace)
+        assert trace[0]["time"] == resultat["date_activite"]
+        assert trace[1] == {
+            "lat": 48.101,
+            "lon": -1.679,
+            "ele": 35.0,
+            "time": trace.datetime_at(1),
+        }
+
+    def test_tranche_sans_copie(self, fichier_gpx):
+        # GIVEN
+        trace = GPXParser.parse_gpx_file(fichier_gpx)["points"]
+
+        # WHEN
+        vue = trace[1:3]
+
+        # THEN - La tranche partage la mémoire de la trace
+        assert len(vue) == 2
+        assert np.shares_memory(vue.lat, trace.lat)
+        assert vue.lat[0] == trace.lat[1]
+
+    def test_masques_de_validite(self):
+        # GIVEN - Des points sans élévation ni temps pour certains
+        trace = Track.from_points(
+            [
+                {"lat": 48.0, "lon": -1.6, "ele": 12.0},
+                {"lat": 48.1, "lon": -1.6},
+            ]
+        )
+
+        # THEN
+        assert trace.has_ele.tolist() == [True, False]
+        assert not trace.has_time.any()
+        assert trace.first_datetime() is None
+        assert GPXParser._calculate_duration(trace) is None
+
+
+GPX_DEUX_SEGMENTS = """<?xml version="1.0" encoding="UTF-8"?>
+<gpx version="1.1" creator="test" xmlns="http://www.topografix.com/GPX/1/1">
+  <trk>
+    <name>Deux segments</name>
+    <type>cycling</type>
+    <trkseg>
+      <trkpt lat="48.1000" lon="-1.6800"><ele>30.0</ele><time>2025-05-01T08:00:00Z</time></trkpt>
+      <trkpt lat="48.1010" lon="-1.6790"><ele>35.0</ele><time>2025-05-01T08:00:20Z</time></trkpt>
+      <trkpt lat="48.1010" lon="-1.6790"><ele>35.0</ele><time>2025-05-01T08:01:20Z</time></trkpt>
+      <trkpt lat="48.1020" lon="-1.6780"><ele>32.0</ele><time>2025-05-01T08:01:40Z</time></trkpt>
+    </trkseg>
+    <trkseg>
+      <trkpt lat="48.2000" lon="-1.6000"><time>2025-05-01T09:00:00Z</time></trkpt>
+      <trkpt lat="48.2010" lon="-1.6000"><time>2025-05-01T09:00:30Z</time></trkpt>
+      <trkpt lat="48.2020" lon="-1.6000"><time>2025-05-01T09:01:00Z</time></trkpt>
+    </trkseg>
+  </trk>
+</gpx>
+"""
+
+
+class TestParseStravaGpx:
+    """Tests du résumé calculé en une passe"""
+
+    def test_resultats_identiques_a_gpxpy(self):
+        # GIVEN - Une trace à deux segments avec un arrêt, et le calcul gpxpy
+        gpx = gpxpy.parse(GPX_DEUX_SEGMENTS)
+        moving = gpx.get_moving_data()
+
+        # WHEN
+        resume = parse_strava_gpx(GPX_DEUX_SEGMENTS.encode())
+
+        # THEN
+        assert resume["nom"] == "Deux segments"
+        assert resume["type"] == "cycling"
+        assert resume["distance_km"] == round(gpx.length_3d() / 1000, 3)
+        assert resume["duree totale (min)"] == round(gpx.get_duration() / 60, 3)
+        assert resume["temps en mouvement (min)"] == round(moving.moving_time / 60, 3)
+        assert resume["distance en mouvement (km)"] == round(moving.moving_distance / 1000, 3)
+        # Vitesse maximale lissée (médiane glissante) : jamais au-dessus de celle de gpxpy ici
+        assert 0 < resume["vitesse max (km/h)"] <= moving.max_speed * 3.6
+
+    def test_segments_non_relies(self):
+        # WHEN - Les deux segments sont éloignés d'une dizaine de kilomètres
+        resume = parse_strava_gpx(GPX_DEUX_SEGMENTS.encode())
+
+        # THEN - La distance ne compte pas le saut entre segments
+        assert resume["distance_km"] < 1.0
+        assert resume["duree totale (min)"] == pytest.approx(2.667, abs=1e-3)
@@ -0,0 +1,213 @@
+import multiprocessing
+import os
+import struct
+import threading
+import time
+import zlib
+
+import numpy as np
+import pytest
+
+from utils.heatmap import (
+    TUILE_VIDE,
+    CacheHeatmap,
+    encoder_png,
+    pyramide_comptes,
+    tuile_valide,
+    tuiles,
+)
+
+
+def _lire_png(contenu: bytes) -> np.ndarray:
+    """Pixels RGBA d'un PNG produit par encoder_png."""
+    assert contenu[:8] == b"\x89PNG\r\n\x1a\n"
+    largeur, hauteur = struct.unpack(">II", contenu[16:24])
+    debut = contenu.index(b"IDAT") + 4
+    taille = struct.unpack(">I", contenu[debut - 8 : debut - 4])[0]
+    lignes = np.frombuffer(zlib.decompress(contenu[debut : debut + taille]), dtype=np.uint8)
+    return lignes.reshape(hauteur, largeur * 4 + 1)[:, 1:].reshape(hauteur, largeur, 4)
+
+
+def _ajouter_plusieurs_fois(dossier: str, lat, lon, fois: int):
+    """Ajouts successifs depuis un autre processus."""
+    cache = CacheHeatmap(dossier, zoom_max=3)
+    for _ in range(fois):
+        cache.ajouter("global", lat, lon)
+
+
+@pytest.fixture
+def points():
+    rng = np.random.default_rng(0)
+    return 48.1 + rng.normal(0, 0.01, 5000), -1.68 + rng.normal(0, 0.01, 5000)
+
+
+class TestPyramide:
+    """Tests du dénombrement des points par pixel et par tuile"""
+
+    def test_points_conserves_a_chaque_zoom(self, points):
+        # WHEN
+        niveaux = list(pyramide_comptes(*points, zoom_max=12))
+
+        # THEN - Du zoom 12 au zoom 0, aucun point perdu ni compté deux fois
+        assert [zoom for zoom, _, _, _ in niveaux] == list(range(12, -1, -1))
+        assert all(comptes.sum() == 5000 for _, _, _, comptes in niveaux)
+
+    def test_pixel_d_un_point(self):
+        # GIVEN - Juste au sud-est de (0, 0) : coin haut-gauche de la tuile (1, 1) au zoom 1
+        zoom, px, py, comptes = next(pyramide_comptes([-1e-9], [1e-9], zoom_max=1))
+
+        # WHEN
+        [(x, y, donnees)] = list(tuiles(px, py, comptes))
+
+        # THEN
+        assert (zoom, x, y) == (1, 1, 1)
+        assert donnees["pixel"].tolist() == [0]
+        assert donnees["compte"].tolist() == [1]
+
+    def test_tuile_valide(self):
+        assert tuile_valide(0, 0, 0)
+        assert not tuile_valide(2, 4, 0)
+        assert not tuile_valide(17, 0, 0, zoom_max=16)
+
+
+class TestCacheHeatmap:
+    """Tests des tuiles gardées sur disque"""
+
+    def test_png_lisible(self, tmp_path, points):
+        # GIVEN
+        cache = CacheHeatmap(str(tmp_path), zoom_max=3)
+        cache.ajouter("global", *points)
+
+        # WHEN - Tuile de la Bretagne au zoom 3
+        image = _lire_png(cache.png("global", 3, 3, 2))
+
+        # THEN - Des pixels colorés, le reste transparent
+        assert image.shape == (256, 256, 4)
+        assert 0 < (image[..., 3] > 0).sum() < 256 * 256
+
+    def test_tuile_sans_point(self, tmp_path):
+        # WHEN / THEN
+        assert CacheHeatmap(str(tmp_path)).png("global", 5, 1, 1) == TUILE_VIDE
+        assert not _lire_png(TUILE_VIDE).any()
+
+    def test_ajout_invalide_les_images(self, tmp_path, points):
+        # GIVEN - Une tuile déjà rendue
+        cache = CacheHeatmap(str(tmp_path), zoom_max=3)
+        cache.ajouter("global", *points)
+        cache.png("global", 0, 0, 0)
+        image = tmp_path / "global" / "0" / "0" / "0.png"
+        assert image.exists()
+
+        # WHEN - Une nouvelle activité passe par cette tuile
+        cache.ajouter("global", *points)
+
+        # THEN - Comptes cumulés, image à refaire
+        assert cache.comptes("global", 0, 0, 0)["compte"].sum() == 10000
+        assert not image.exists()
+
+    def test_reconstruire_remplace_la_couche(self, tmp_path, points):
+        # GIVEN
+        cache = CacheHeatmap(str(tmp_path), zoom_max=3)
+        cache.ajouter("global", *points)
+
+        # WHEN
+        cache.reconstruire([("global", points[0][:10], points[1][:10])])
+
+        # THEN - Seuls les nouveaux points restent, sans dossier provisoire
+        assert cache.comptes("global", 0, 0, 0)["compte"].sum() == 10
+        assert os.listdir(tmp_path) == ["global"]
+
+    def test_reconstruire_par_lots(self, tmp_path, points):
+        # GIVEN - Une couche qui n'aura plus aucun point
+        cache = CacheHeatmap(str(tmp_path), zoom_max=3)
+        cache.ajouter("utilisateur_3", *points)
+        lat, lon = points
+
+        # WHEN - Trois lots de deux utilisateurs
+        cache.reconstruire(
+            [
+                ("utilisateur_1", lat[:2000], lon[:2000]),
+                ("utilisateur_2", lat[2000:3000], lon[2000:3000]),
+                ("utilisateur_1", lat[3000:], lon[3000:]),
+            ],
+            globale="global",
+        )
+
+        # THEN - Lots cumulés par couche et dans la couche globale
+        assert cache.comptes("utilisateur_1", 0, 0, 0)["compte"].sum() == 4000
+        assert cache.comptes("utilisateur_2", 0, 0, 0)["compte"].sum() == 1000
+        assert cache.comptes("global", 0, 0, 0)["compte"].sum() == 5000
+        assert sorted(os.listdir(tmp_path)) == ["global", "utilisateur_1", "utilisateur_2"]
+
+    def test_ajout_pendant_la_reconstruction(self, tmp_path, points):
+        # GIVEN - Un ajout lancé pendant la lecture des lots
+        cache = CacheHeatmap(str(tmp_path), zoom_max=3)
+        lat, lon = points
+        ajout = threading.Thread(target=cache.ajouter, args=("global", lat[:100], lon[:100]))
+
+        def lots():
+            yield "global", lat, lon
+            ajout.start()
+            time.sleep(0.2)
+
+        # WHEN
+        cache.reconstruire(lots())
+        ajout.join()
+
+        # THEN - L'ajout a attendu la nouvelle couche au lieu d'être perdu
+        assert cache.comptes("global", 0, 0, 0)["compte"].sum() == 5100
+
+    def test_utilisateurs_distincts_par_pixel(self, tmp_path, points):
+        # GIVEN - Un utilisateur passe deux fois au même endroit
+        cache = CacheHeatmap(str(tmp_path), zoom_max=8)
+        lat, lon = points
+        cache.ajouter("utilisateur_1", lat, lon, globale="global")
+        cache.ajouter("utilisateur_1", lat, lon, globale="global")
+
+        # WHEN / THEN - Un seul utilisateur (tuile de Rennes au zoom 8) : rien d'affiché au seuil de deux
+        assert cache.comptes("global", 8, 126, 88)["utilisateurs"].max() == 1
+        assert not _lire_png(cache.png("global", 8, 126, 88, utilisateurs_min=2)).any()
+
+        # WHEN - Un deuxième utilisateur sur une partie du trajet
+        cache.ajouter("utilisateur_2", lat[:10], lon[:10], globale="global")
+
+        # THEN - Seuls les pixels communs apparaissent
+        comptes = cache.comptes("global", 8, 126, 88)
+        assert comptes["compte"].sum() == 10010
+        communs = comptes[comptes["utilisateurs"] == 2]
+        assert 0 < len(communs) < len(comptes)
+        image = _lire_png(cache.png("global", 8, 126, 88, utilisateurs_min=2))
+        assert (image[..., 3] > 0).sum() == len(communs)
+        assert cache.comptes("utilisateur_1", 8, 126, 88)["utilisateurs"].max() == 1
+
+    @pytest.mark.skipif(os.name != "posix", reason="verrou flock")
+    def test_ajouts_concurrents_de_plusieurs_processus(self, tmp_path, points):
+        # GIVEN - Quatre processus (workers) qui ajoutent des traces aux mêmes tuiles
+        lat, lon = points[0][:100], points[1][:100]
+        contexte = multiprocessing.get_context("fork")
+        processus = [
+            contexte.Process(target=_ajouter_plusieurs_fois, args=(str(tmp_path), lat, lon, 20))
+            for _ in range(4)
+        ]
+
+        # WHEN
+        for p in processus:
+            p.start()
+        for p in processus:
+            p.join()
+
+        # THEN - Aucun ajout perdu
+        assert [p.exitcode for p in processus] == [0] * 4
+        cache = CacheHeatmap(str(tmp_path), zoom_max=3)
+        assert cache.comptes("global", 0, 0, 0)["compte"].sum() == 4 * 20 * 100
+
+
+class TestEncoderPng:
+    """Tests de l'encodage PNG"""
+
+    def test_aller_retour(self):
+        # GIVEN
+        rgba = np.arange(2 * 3 * 4, dtype=np.uint8).reshape(2, 3, 4)
+
+        # WHEN / THEN
+        np.testing.assert_array_equal(_lire_png(encoder_png(rgba)), rgba)
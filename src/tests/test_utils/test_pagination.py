@@ -0,0 +1,25 @@
+from datetime import datetime
+
+import pytest
+
+from utils.pagination import decoder_curseur, encoder_curseur
+
+
+class TestCurseur:
+    """Tests des curseurs du fil d'activités"""
+
+    def test_aller_retour(self):
+        # GIVEN
+        position = (datetime(2025, 5, 1, 8, 30, 12, 345678), 1234)
+
+        # WHEN
+        curseur = encoder_curseur(*position)
+
+        # THEN - Opaque, utilisable tel quel dans une URL
+        assert "|" not in curseur and "=" not in curseur
+        assert decoder_curseur(curseur) == position
+
+    @pytest.mark.parametrize("curseur", ["", "pas un curseur", "bWFs", "MjAyNS0wNS0wMXx4"])
+    def test_curseur_invalide(self, curseur):
+        with pytest.raises(ValueError):
+            decoder_curseur(curseur)
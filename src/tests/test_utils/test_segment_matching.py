@@ -0,0 +1,143 @@
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from utils.gpx_ingestion import ingest_gpx
+from utils.segment_matching import IndexSegments, longueur, portion
+from utils.track import Track
+
+GPX = Path(__file__).parent / "gpx"
+
+
+@pytest.fixture(scope="module")
+def trace():
+    return ingest_gpx(str(GPX / "course.gpx")).track
+
+
+def _decalee(track: Track, metres: float) -> Track:
+    """Copie de la trace décalée vers le nord."""
+    return Track(track.lat + metres / 111_195, track.lon, time=track.time)
+
+
+class TestIndexSegments:
+    """Tests de la détection des passages sur les segments"""
+
+    def test_passage_detecte(self, trace):
+        # GIVEN - Un segment tiré de la trace elle-même
+        index = IndexSegments([(1, "course", trace.lat[50:150], trace.lon[50:150])])
+
+        # WHEN
+        passages = index.passages(trace, "course")
+
+        # THEN - Début et fin retrouvés sur les points du segment
+        assert passages == [(1, 50, 149)]
+
+    def test_trace_proche_acceptee(self, trace):
+        # GIVEN - La même sortie, enregistrée par un GPS décalé de 10 m
+        index = IndexSegments([(1, "course", trace.lat[50:150], trace.lon[50:150])])
+
+        # WHEN
+        passages = index.passages(_decalee(trace, 10), "course")
+
+        # THEN
+        assert [id_segment for id_segment, _, _ in passages] == [1]
+
+    def test_trace_hors_couloir_refusee(self, trace):
+        # GIVEN - Une trace parallèle, à 80 m du segment
+        index = IndexSegments([(1, "course", trace.lat[50:150], trace.lon[50:150])])
+
+        # WHEN / THEN
+        assert index.passages(_decalee(trace, 80), "course") == []
+
+    def test_sens_inverse_refuse(self, trace):
+        # GIVEN - Le segment parcouru dans l'autre sens
+        index = IndexSegments([(1, "course", trace.lat[149:49:-1], trace.lon[149:49:-1])])
+
+        # WHEN / THEN
+        assert index.passages(trace, "course") == []
+
+    def test_detour_refuse(self, trace):
+        # GIVEN - Une trace qui quitte le parcours au milieu du segment
+        lat = trace.lat.copy()
+        lat[90:110] += 300 / 111_195
+        detour = Track(lat, trace.lon)
+        index = IndexSegments([(1, "course", trace.lat[50:150], trace.lon[50:150])])
+
+        # WHEN / THEN
+        assert index.passages(detour, "course") == []
+
+    def test_filtre_sport(self, trace):
+        # GIVEN
+        index = IndexSegments([(1, "cyclisme", trace.lat[50:150], trace.lon[50:150])])
+
+        # WHEN / THEN - Seuls les segments du sport demandé sont cherchés
+        assert index.passages(trace, "course") == []
+        assert len(index.passages(trace)) == 1
+
+    def test_plusieurs_tours(self, trace):
+        # GIVEN - Deux tours du même parcours
+        deux_tours = Track(np.tile(trace.lat, 2), np.tile(trace.lon, 2))
+        index = IndexSegments([(1, "course", trace.lat[50:150], trace.lon[50:150])])
+
+        # WHEN
+        passages = index.passages(deux_tours, "course")
+
+        # THEN - Un passage par tour
+        n = len(trace)
+        assert passages == [(1, 50, 149), (1, n + 50, n + 149)]
+
+    def test_segments_eloignes_ecartes(self, trace):
+        # GIVEN - Le bon segment parmi des segments situés à plusieurs kilomètres
+        rng = np.random.default_rng(0)
+        segments = [
+            (
+                id_segment,
+                "course",
+                trace.lat[50:150] + rng.uniform(0.05, 0.5),
+                trace.lon[50:150] + rng.uniform(-0.5, 0.5),
+            )
+            for id_segment in range(2, 1000)
+        ]
+        index = IndexSegments(segments + [(1, "course", trace.lat[50:150], trace.lon[50:150])])
+
+        # WHEN
+        candidats = index.candidats(trace, "course")
+
+        # THEN - Le préfiltre ne garde que le segment parcouru
+        assert index.ids[candidats].tolist() == [1]
+
+    def test_retirer(self, trace):
+        # GIVEN
+        index = IndexSegments(
+            [
+                (1, "course", trace.lat[50:150], trace.lon[50:150]),
+                (2, "course", trace.lat[150:250], trace.lon[150:250]),
+            ]
+        )
+
+        # WHEN
+        index.retirer(1)
+
+        # THEN
+        assert len(index) == 1
+        assert [id_segment for id_segment, _, _ in index.passages(trace)] == [2]
+
+    def test_index_vide(self, trace):
+        assert IndexSegments().passages(trace) == []
+
+
+class TestPortion:
+    """Tests de l'extraction d'une portion de trace"""
+
+    def test_portion_par_distance(self, trace):
+        # WHEN
+        morceau = portion(trace, 1000, 2000)
+
+        # THEN - Environ un kilomètre, pris sur les points de la trace
+        assert 950 <= longueur(morceau.lat, morceau.lon) <= 1050
+        assert morceau.lat[0] in trace.lat
+
+    def test_portion_trop_courte(self, trace):
+        with pytest.raises(ValueError):
+            portion(trace, 1000, 1000.5)
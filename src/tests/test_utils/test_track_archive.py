@@ -0,0 +1,95 @@
+from pathlib import Path
+from unittest.mock import Mock
+
+import numpy as np
+import pytest
+
+from utils.gpx_ingestion import ingest_gpx
+from utils.track import Track
+from utils.track_archive import ArchiveTraces, EcrivainArchive, exporter_archive
+from utils.track_codec import encoder_trace
+
+CORPUS = sorted((Path(__file__).parent / "gpx").glob("*.gpx"))
+
+
+@pytest.fixture(scope="module")
+def traces():
+    """Traces du corpus, indexées par des ID d'activité dans le désordre."""
+    return {
+        id_activite: ingest_gpx(str(chemin)).track
+        for id_activite, chemin in zip((40, 3, 17, 8, 25, 1, 12), CORPUS)
+    }
+
+
+@pytest.fixture
+def archive(tmp_path, traces):
+    chemin = tmp_path / "traces.trk"
+    with EcrivainArchive(str(chemin)) as ecrivain:
+        for id_activite, track in traces.items():
+            ecrivain.ajouter(id_activite, track)
+    return ArchiveTraces(str(chemin))
+
+
+class TestArchiveTraces:
+    """Tests de l'écriture et de la lecture de l'archive"""
+
+    def test_aller_retour(self, archive, traces):
+        # THEN - Chaque trace est relue à l'identique, segments compris
+        assert archive.ids.tolist() == sorted(traces)
+        for id_activite, track in traces.items():
+            relue = archive.trace(id_activite)
+            for colonne in ("lat", "lon", "ele", "time", "segments"):
+                np.testing.assert_array_equal(getattr(relue, colonne), getattr(track, colonne))
+
+    def test_vues_sans_copie(self, archive):
+        # WHEN
+        track = archive.trace(archive.ids[2])
+
+        # THEN - Les colonnes partagent la mémoire projetée de l'archive
+        assert np.shares_memory(track.lat, archive.lat)
+        assert not track.lat.flags.writeable
+
+    def test_colonnes_globales(self, archive, traces):
+        # THEN - Toutes les traces bout à bout, pour les parcours en lot
+        assert len(archive.lat) == sum(len(track) for track in traces.values())
+        assert [id_activite for id_activite, _ in archive] == sorted(traces)
+
+    def test_activite_absente(self, archive):
+        assert 2 not in archive
+        with pytest.raises(KeyError):
+            archive.trace(2)
+
+    def test_id_en_double(self, tmp_path):
+        with EcrivainArchive(str(tmp_path / "doublon.trk")) as ecrivain:
+            ecrivain.ajouter(1, Track([48.0], [-1.6]))
+            with pytest.raises(ValueError):
+                ecrivain.ajouter(1, Track([48.0], [-1.6]))
+
+    def test_fichier_inconnu(self, tmp_path):
+        # GIVEN
+        chemin = tmp_path / "autre.bin"
+        chemin.write_bytes(b"\x00" * 128)
+
+        # THEN
+        with pytest.raises(ValueError):
+            ArchiveTraces(str(chemin))
+
+
+class TestExporterArchive:
+    """Tests de l'export des traces stockées en base"""
+
+    def test_export(self, tmp_path, traces):
+        # GIVEN - Un DAO qui renvoie les traces encodées
+        dao = Mock()
+        dao.iter_traces.return_value = iter(
+            (id_activite, encoder_trace(track)) for id_activite, track in sorted(traces.items())
+        )
+        chemin = str(tmp_path / "export.trk")
+
+        # WHEN
+        nombre = exporter_archive(chemin, dao, taille_lot=2)
+
+        # THEN
+        dao.iter_traces.assert_called_once_with(2)
+        assert nombre == len(traces)
+        np.testing.assert_array_equal(ArchiveTraces(chemin).trace(40).time, traces[40].time)
@@ -0,0 +1,53 @@
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from utils.gpx_ingestion import ingest_gpx
+from utils.track import Track
+from utils.track_codec import decoder_trace, encoder_trace, nb_points_trace
+
+CORPUS = sorted((Path(__file__).parent / "gpx").glob("*.gpx"))
+
+# Place d'un point stocké en ligne : en-tête de tuple (24 octets), id_activite,
+# lat, lon, ele, time, plus l'entrée d'index, soit au moins 70 octets
+OCTETS_PAR_LIGNE = 70
+
+
+@pytest.fixture(params=CORPUS, ids=lambda chemin: chemin.stem)
+def trace_corpus(request):
+    return ingest_gpx(str(request.param)).track
+
+
+class TestCodecTrace:
+    """Tests de l'encodage compact des traces"""
+
+    def test_aller_retour_exact(self, trace_corpus):
+        # WHEN
+        relue = decoder_trace(encoder_trace(trace_corpus))
+
+        # THEN - Colonnes identiques, valeurs manquantes comprises
+        for colonne in ("lat", "lon", "ele", "time", "segments"):
+            np.testing.assert_array_equal(getattr(relue, colonne), getattr(trace_corpus, colonne))
+
+    def test_dix_fois_plus_compact(self):
+        # GIVEN - La plus longue trace du corpus (l'en-tête pèse sur les petites)
+        trace = ingest_gpx(str(CORPUS[0].with_name("velo_segments.gpx"))).track
+
+        # WHEN
+        donnees = encoder_trace(trace)
+
+        # THEN
+        assert len(donnees) * 10 <= len(trace) * OCTETS_PAR_LIGNE
+        assert nb_points_trace(donnees) == len(trace)
+
+    def test_trace_vide(self):
+        # WHEN
+        relue = decoder_trace(encoder_trace(Track([], [])))
+
+        # THEN
+        assert len(relue) == 0
+
+    def test_contenu_illisible(self):
+        with pytest.raises(ValueError):
+            decoder_trace(b"pas une trace")
@@ -0,0 +1,146 @@
+import numpy as np
+import pytest
+
+from utils.track import Track
+from utils.track_filter import etats_mouvement, mouvement, points_aberrants
+
+METRES_PAR_DEGRE = 111_319.49
+
+
+def _trace(vitesses_kmh, segments=(0,)) -> Track:
+    """Trace d'un point par seconde vers le nord, aux vitesses données (une par intervalle)."""
+    pas = np.asarray(vitesses_kmh, dtype=float) / 3.6 / METRES_PAR_DEGRE
+    lat = 48.0 + np.concatenate(([0.0], np.cumsum(pas)))
+    time = 1_746_086_400_000 + 1000 * np.arange(len(lat), dtype=np.int64)
+    return Track(lat, np.full(len(lat), -1.6), time=time, segments=list(segments))
+
+
+def _mouvement(track: Track) -> dict:
+    return mouvement(track.lat, track.lon, track.ele, track.time, track.segments)
+
+
+class TestPointsAberrants:
+    """Tests du rejet des sauts GPS"""
+
+    def test_saut_isole_ecarte(self):
+        # GIVEN - Un point projeté à 500 m de la trace
+        track = _trace([10.0] * 20)
+        track.lon[10] += 0.007
+
+        # WHEN
+        ecartes = points_aberrants(track.lat, track.lon, track.time, track.segments)
+
+        # THEN
+        assert np.flatnonzero(ecartes).tolist() == [10]
+
+    def test_saut_de_deux_points(self):
+        # GIVEN
+        track = _trace([10.0] * 20)
+        track.lon[10:12] += 0.007
+
+        # WHEN
+        ecartes = points_aberrants(track.lat, track.lon, track.time, track.segments)
+
+        # THEN
+        assert np.flatnonzero(ecartes).tolist() == [10, 11]
+
+    def test_saut_aux_extremites(self):
+        # GIVEN - Premier et dernier points décalés
+        track = _trace([10.0] * 20)
+        track.lon[[0, -1]] += 0.007
+
+        # WHEN
+        ecartes = points_aberrants(track.lat, track.lon, track.time, track.segments)
+
+        # THEN
+        assert np.flatnonzero(ecartes).tolist() == [0, 20]
+
+    def test_vitesse_elevee_conservee(self):
+        # GIVEN - Une trace régulière à 300 km/h (train) : aucun point isolé
+        track = _trace([300.0] * 20)
+
+        # WHEN / THEN
+        assert not points_aberrants(track.lat, track.lon, track.time, track.segments).any()
+
+
+class TestMouvement:
+    """Tests du temps en mouvement et de la vitesse maximale"""
+
+    def test_allure_reguliere(self):
+        # WHEN
+        resume = _mouvement(_trace([12.0] * 60))
+
+        # THEN
+        assert resume["temps_mouvement"] == 60.0
+        assert resume["distance_mouvement"] == pytest.approx(200.0, rel=1e-3)
+        assert resume["vitesse_max"] * 3.6 == pytest.approx(12.0, rel=1e-3)
+
+    def test_pic_ignore(self):
+        # GIVEN - Un saut aberrant et un pic modéré (2 s à 40 km/h) dans une course à 12 km/h
+        track = _trace([12.0] * 30 + [40.0, 40.0] + [12.0] * 30)
+        track.lon[10] += 0.007
+
+        # WHEN
+        resume = _mouvement(track)
+
+        # THEN
+        assert resume["vitesse_max"] * 3.6 == pytest.approx(12.0, rel=1e-3)
+        assert resume["temps_mouvement"] == 62.0
+
+    def test_arret_exclu(self):
+        # GIVEN - Une minute à l'arrêt, avec la dérive du GPS, entre deux minutes de course
+        derive = np.tile([0.6, -0.6], 30)
+        track = _trace(np.concatenate(([12.0] * 60, derive, [12.0] * 60)))
+
+        # WHEN
+        resume = _mouvement(track)
+
+        # THEN
+        assert resume["temps_mouvement"] == pytest.approx(120.0, abs=2)
+        assert resume["distance_mouvement"] == pytest.approx(400.0, rel=0.01)
+
+    def test_segments_separes(self):
+        # GIVEN - Deux segments, le second commence loin du premier
+        track = _trace([12.0] * 61, segments=(0, 31))
+        track.lat[31:] += 0.1
+
+        # WHEN
+        resume = _mouvement(track)
+
+        # THEN - Le passage d'un segment à l'autre ne compte pas
+        assert resume["temps_mouvement"] == 60.0
+        assert resume["vitesse_max"] * 3.6 == pytest.approx(12.0, rel=1e-3)
+
+    def test_trace_sans_temps(self):
+        # GIVEN
+        track = _trace([12.0] * 10)
+
+        # WHEN
+        resume = mouvement(track.lat, track.lon, track.ele, np.full(11, np.nan), [0])
+
+        # THEN
+        assert resume == {"temps_mouvement": 0.0, "distance_mouvement": 0.0, "vitesse_max": 0.0}
+
+
+class TestHysteresis:
+    """Tests de la détection des arrêts"""
+
+    def test_etat_garde_entre_les_seuils(self):
+        # GIVEN - Départ, allure entre les deux seuils, arrêt, même allure
+        kmh = np.array([0.5, 5.0, 2.0, 1.5, 0.5, 2.0, 1.5])
+
+        # WHEN
+        etats = etats_mouvement(kmh / 3.6, np.zeros(len(kmh), dtype=np.int64))
+
+        # THEN
+        assert etats.tolist() == [False, True, True, True, False, False, False]
+
+    def test_chaque_segment_demarre_a_l_arret(self):
+        # GIVEN
+        kmh = np.array([5.0, 2.0, 2.0, 2.0])
+
+        # WHEN
+        etats = etats_mouvement(kmh / 3.6, np.array([0, 0, 1, 1]))
+
+        # THEN
+        assert etats.tolist() == [True, True, False, False]
@@ -0,0 +1,110 @@
+import math
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from utils import track_metrics
+from utils.gpx_ingestion import ingest_gpx
+from utils.track import Track
+from utils.track_fingerprint import (
+    RAPPORT_DISTANCE,
+    empreinte_trace,
+    empreintes_proches,
+    geohash,
+)
+
+
+@pytest.fixture(scope="module")
+def trace():
+    return ingest_gpx(str(Path(__file__).parent / "gpx" / "course.gpx")).track
+
+
+def _autre_appareil(track: Track, decalage_ms: int = 4000) -> Track:
+    """Même sortie vue par un autre GPS : décalée de quelques mètres, un point sur
+    deux, départ quelques secondes plus tard."""
+    return Track(
+        track.lat[1::2] + 4e-5,
+        track.lon[1::2] - 3e-5,
+        time=track.time[1::2] + decalage_ms,
+    )
+
+
+class TestEmpreinte:
+    """Tests de l'empreinte des activités"""
+
+    def test_geohash(self):
+        assert geohash(57.64911, 10.40744) == "u4pru"
+
+    def test_meme_sortie_reconnue(self, trace):
+        # WHEN
+        montre = empreinte_trace(trace)
+        telephone = empreinte_trace(_autre_appareil(trace))
+
+        # THEN
+        assert telephone in empreintes_proches(montre)
+
+    def test_autre_jour_distincte(self, trace):
+        # GIVEN - Le même parcours, le lendemain
+        lendemain = _autre_appareil(trace, decalage_ms=86_400_000)
+
+        # WHEN / THEN
+        assert empreinte_trace(lendemain) not in empreintes_proches(empreinte_trace(trace))
+
+    def test_autre_parcours_distinct(self, trace):
+        # GIVEN - Même départ, parcours décalé de 20 km vers l'est
+        ailleurs = Track(trace.lat, trace.lon + 0.27, time=trace.time)
+
+        # WHEN / THEN
+        assert empreinte_trace(ailleurs) not in empreintes_proches(empreinte_trace(trace))
+
+    def test_trace_sans_horodatage(self, trace):
+        # GIVEN
+        sans_temps = Track(trace.lat, trace.lon)
+
+        # WHEN / THEN - Heure de départ de l'activité, à défaut rien
+        assert empreinte_trace(sans_temps) is None
+        assert empreinte_trace(sans_temps, datetime(2025, 5, 1, 8)) is not None
+        assert empreinte_trace(Track([], [])) is None
+
+    def test_virage_sur_la_cellule_voisine(self):
+        # GIVEN - 14 km vers l'est, 550 m au sud d'une limite de cellule geohash,
+        # avec un virage qui la franchit de 30 m ; le second appareil, 45 m plus
+        # au sud, reste dans les cellules du bas
+        hauteur = 180 / (1 << 12)
+        limite = -90 + math.ceil((48.1 + 90) / hauteur) * hauteur
+        i = np.arange(2000)
+        virage = np.clip(1 - np.abs(i - 1000) / 100, 0, None)
+        lat = limite - 0.005 + virage * 0.0053
+        lon = -1.70 + i * 7e-5
+        time = 1_746_086_400_000 + i * 1000
+        montre = Track(lat, lon, time=time)
+        telephone = Track(lat[1::2] - 4e-4, lon[1::2], time=time[1::2] + 3000)
+
+        # WHEN / THEN - La cellule à peine effleurée ne compte pas
+        assert empreinte_trace(telephone) in empreintes_proches(empreinte_trace(montre))
+
+    def test_ecart_entre_segments_non_compte(self, trace):
+        # GIVEN - La sortie reprise 3 km plus loin après une pause (nouveau segment)
+        n = len(trace) // 2
+        lon = np.concatenate((trace.lon[:n], trace.lon[n:] + 0.04))
+        reprise = Track(trace.lat, lon, time=trace.time, segments=[0, n])
+
+        # WHEN
+        tranche = int(empreinte_trace(reprise).split(":")[1])
+
+        # THEN - Distance des deux segments seuls
+        distance = sum(
+            track_metrics.gpxpy_distance_cumulee(morceau.lat, morceau.lon, morceau.ele, [0])[-1]
+            for morceau in (reprise[:n], reprise[n:])
+        )
+        assert tranche == math.floor(math.log(distance) / math.log(RAPPORT_DISTANCE))
+
+    def test_empreintes_proches(self, trace):
+        # WHEN
+        proches = empreintes_proches(empreinte_trace(trace))
+
+        # THEN - L'empreinte en premier, puis ses 8 voisines
+        assert proches[0] == empreinte_trace(trace)
+        assert len(set(proches)) == 9
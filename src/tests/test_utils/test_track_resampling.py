@@ -0,0 +1,131 @@
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from utils.gpx_ingestion import ingest_gpx
+from utils.track import Track
+from utils.track_resampling import grille, lttb, par_distance, par_temps, serie_graphique
+
+METRES_PAR_DEGRE = 111_319.49
+
+
+@pytest.fixture(scope="module")
+def ingestion():
+    return ingest_gpx(str(Path(__file__).parent / "gpx" / "course.gpx"))
+
+
+@pytest.fixture
+def course(ingestion):
+    return ingestion.track
+
+
+def _ligne_droite(nb_points: int, vitesse_kmh: float = 36.0) -> Track:
+    """Trace vers le nord à vitesse constante, un point par seconde, en faux plat (1 cm/s)."""
+    pas = vitesse_kmh / 3.6 / METRES_PAR_DEGRE
+    lat = 48.0 + pas * np.arange(nb_points)
+    time = 1_746_086_400_000 + 1000 * np.arange(nb_points, dtype=np.int64)
+    return Track(lat, np.full(nb_points, -1.6), np.arange(nb_points) / 100, time)
+
+
+class TestGrille:
+    """Tests des grilles régulières"""
+
+    def test_nombre_de_points(self):
+        assert grille(10.0, nb_points=5).tolist() == [0.0, 2.5, 5.0, 7.5, 10.0]
+
+    def test_pas_avec_reliquat(self):
+        assert grille(10.0, pas=4.0).tolist() == [0.0, 4.0, 8.0, 10.0]
+
+    def test_parametres_exclusifs(self):
+        with pytest.raises(ValueError):
+            grille(10.0)
+        with pytest.raises(ValueError):
+            grille(10.0, nb_points=5, pas=1.0)
+
+
+class TestReechantillonnage:
+    """Tests du rééchantillonnage par temps et par distance"""
+
+    def test_par_temps(self):
+        # GIVEN - 100 s à 10 m/s
+        track = _ligne_droite(101)
+
+        # WHEN
+        colonnes = par_temps(track, pas=10.0)
+
+        # THEN
+        np.testing.assert_allclose(colonnes["temps"], np.arange(0, 101, 10))
+        np.testing.assert_allclose(colonnes["distance"], np.arange(0, 1001, 100), rtol=1e-3)
+        np.testing.assert_allclose(colonnes["altitude"], np.arange(0, 101, 10) / 100)
+
+    def test_par_distance_taille_fixe(self, ingestion):
+        # WHEN
+        colonnes = par_distance(ingestion.track, nb_points=200)
+
+        # THEN - Taille fixe, temps croissant de 0 à la durée
+        assert all(len(colonne) == 200 for colonne in colonnes.values())
+        assert colonnes["distance"][-1] == pytest.approx(ingestion.distance)
+        assert (np.diff(colonnes["temps"]) >= 0).all()
+
+    def test_vitesse(self):
+        # WHEN
+        colonnes = par_distance(_ligne_droite(101), pas=100.0)
+
+        # THEN
+        np.testing.assert_allclose(colonnes["vitesse"], 36.0, rtol=1e-3)
+
+    def test_trace_sans_temps(self):
+        # GIVEN
+        track = Track([48.0, 48.001, 48.002], [-1.6] * 3)
+
+        # WHEN / THEN
+        with pytest.raises(ValueError):
+            par_temps(track, nb_points=10)
+        assert np.isnan(par_distance(track, nb_points=10)["temps"]).all()
+
+
+class TestLTTB:
+    """Tests de la réduction des séries pour les graphiques"""
+
+    def test_taille_et_extremites(self):
+        # GIVEN
+        x = np.arange(10_000.0)
+        y = np.sin(x / 300)
+
+        # WHEN
+        indices = lttb(x, y, 500)
+
+        # THEN
+        assert len(indices) == 500
+        assert indices[0] == 0 and indices[-1] == 9_999
+        assert (np.diff(indices) > 0).all()
+
+    def test_pic_conserve(self):
+        # GIVEN - Un pic isolé dans une série plate
+        x = np.arange(10_000.0)
+        y = np.zeros(10_000)
+        y[4321] = 50.0
+
+        # WHEN / THEN
+        assert 4321 in lttb(x, y, 100)
+
+    def test_serie_courte_inchangee(self):
+        assert lttb(np.arange(5.0), np.arange(5.0), 100).tolist() == [0, 1, 2, 3, 4]
+
+
+class TestSerieGraphique:
+    """Tests des profils renvoyés à l'application"""
+
+    def test_profils(self, course):
+        # WHEN
+        serie = serie_graphique(course, nb_points=50)
+
+        # THEN
+        assert serie["abscisse"] == "distance"
+        for cle in ("altitude", "vitesse"):
+            assert len(serie[cle]["x"]) == len(serie[cle]["y"]) == 50
+
+    def test_abscisse_inconnue(self, course):
+        with pytest.raises(ValueError):
+            serie_graphique(course, abscisse="cadence")
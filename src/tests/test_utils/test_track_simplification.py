@@ -0,0 +1,82 @@
+import json
+
+import numpy as np
+
+from utils.track_simplification import PyramideLOD, rangs_visvalingam
+
+
+def trace_sinueuse(nb_points: int):
+    """Boucle d'environ 20 km parcourue avec de petits lacets."""
+    t = np.linspace(0, 2 * np.pi, nb_points)
+    lat = 48.1 + 0.05 * np.sin(t) + 0.0005 * np.sin(40 * t)
+    lon = -1.68 + 0.08 * np.cos(t) + 0.0005 * np.cos(40 * t)
+    return lat, lon
+
+
+class TestRangsVisvalingam:
+    """Tests du classement des points"""
+
+    def test_permutation_extremites_en_tete(self):
+        # GIVEN
+        lat, lon = trace_sinueuse(1000)
+
+        # WHEN
+        rangs = rangs_visvalingam(lat, lon)
+
+        # THEN
+        assert sorted(rangs.tolist()) == list(range(1000))
+        assert rangs[:2].tolist() == [0, 999]
+
+    def test_angle_conserve_en_premier(self):
+        # GIVEN - Deux lignes droites formant un angle au point 6
+        lat = np.concatenate((np.linspace(48.0, 48.06, 7), np.full(5, 48.06)))
+        lon = np.concatenate((np.full(7, -1.7), np.linspace(-1.69, -1.65, 5)))
+
+        # WHEN / THEN - L'angle est le plus important des points intérieurs
+        assert rangs_visvalingam(lat, lon)[2] == 6
+
+
+class TestPyramideLOD:
+    """Tests des niveaux de détail"""
+
+    def test_niveaux_ordonnes(self):
+        # GIVEN
+        lat, lon = trace_sinueuse(20_000)
+
+        # WHEN
+        pyramide = PyramideLOD(lat, lon)
+
+        # THEN - Chaque niveau garde les extrémités et l'ordre de la trace
+        assert list(pyramide.niveaux) == [50, 500, 5000]
+        for indices in pyramide.niveaux.values():
+            assert indices[0] == 0 and indices[-1] == 19_999
+            assert (np.diff(indices) > 0).all()
+
+    def test_niveau_selon_le_zoom(self):
+        # GIVEN
+        pyramide = PyramideLOD(*trace_sinueuse(20_000))
+
+        # THEN - Plus de détail en zoomant, la trace complète sans zoom
+        niveaux = [pyramide.niveau_pour_zoom(zoom) for zoom in (8, 13, 16, 20)]
+        assert niveaux == sorted(niveaux)
+        assert niveaux[0] == 50
+        assert niveaux[-1] == pyramide.niveau_pour_zoom(None) == 20_000
+
+    def test_carte_allegee(self):
+        # GIVEN - Une carte de ville (zoom 13)
+        lat, lon = trace_sinueuse(20_000)
+        complete = json.dumps(np.column_stack((lat, lon)).tolist())
+
+        # WHEN
+        simplifiee = json.dumps(PyramideLOD(lat, lon).coordonnees(13))
+
+        # THEN
+        assert len(simplifiee) < 0.1 * len(complete)
+
+    def test_petite_trace(self):
+        # GIVEN - Moins de points que le plus petit niveau
+        pyramide = PyramideLOD([48.0, 48.1], [-1.6, -1.6])
+
+        # THEN
+        assert pyramide.niveaux == {}
+        assert pyramide.coordonnees(10) == [[48.0, -1.6], [48.1, -1.6]]
@@ -0,0 +1,91 @@
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from utils.gpx_ingestion import ingest_gpx
+from utils.track_splits import decouper, splits_trace
+
+GPX = Path(__file__).parent / "gpx"
+
+
+class TestDecouper:
+    """Tests du découpage en tronçons"""
+
+    def test_allure_reguliere(self):
+        # GIVEN - 2,5 km à 1 m/s, en montée de 1 %
+        distance = np.arange(0, 2501, 10.0)
+
+        # WHEN
+        splits = decouper(distance, distance.copy(), distance * 0.01, 1000)
+
+        # THEN - Deux kilomètres complets puis un tronçon partiel
+        np.testing.assert_allclose(splits["distance"], [1000, 1000, 500])
+        np.testing.assert_allclose(splits["duree"], [1000, 1000, 500])
+        np.testing.assert_allclose(splits["denivele_positif"], [10, 10, 5])
+        np.testing.assert_allclose(splits["denivele_negatif"], [0, 0, 0], atol=1e-9)
+
+    def test_passage_interpole(self):
+        # GIVEN - Aucun point ne tombe sur la borne du kilomètre
+        distance = np.array([0.0, 600.0, 1400.0, 2000.0])
+        temps = np.array([0.0, 60.0, 140.0, 200.0])
+
+        # WHEN
+        splits = decouper(distance, temps, np.full(4, np.nan), 1000)
+
+        # THEN - Passage au kilomètre interpolé à 100 s
+        np.testing.assert_allclose(splits["duree"], [100, 100])
+        assert np.isnan(splits["denivele_positif"]).all()
+
+    def test_reliquat_rattache(self):
+        # GIVEN - 2 005 m : les 5 derniers mètres ne font pas un tronçon
+        distance = np.linspace(0, 2005, 50)
+
+        # WHEN
+        splits = decouper(distance, distance.copy(), np.zeros(50), 1000)
+
+        # THEN
+        np.testing.assert_allclose(splits["distance"], [1000, 1005])
+
+    def test_temps_manquants(self):
+        # GIVEN - Un temps sur deux manque
+        distance = np.arange(0, 2001, 100.0)
+        temps = distance / 2
+        temps[1::2] = np.nan
+
+        # WHEN
+        splits = decouper(distance, temps, np.zeros(21), 1000)
+
+        # THEN - Les temps manquants sont interpolés le long de la distance
+        np.testing.assert_allclose(splits["duree"], [500, 500])
+
+
+class TestSplitsTrace:
+    """Tests des splits d'une trace"""
+
+    @pytest.mark.parametrize("unite", ["km", "mile"])
+    def test_distance_totale(self, unite):
+        # GIVEN
+        ingestion = ingest_gpx(str(GPX / "velo_segments.gpx"))
+
+        # WHEN
+        splits = splits_trace(ingestion.track, unite)
+
+        # THEN - Les tronçons couvrent la distance du résumé
+        longueur = 1000 if unite == "km" else 1609.344
+        total = sum(split["distance"] for split in splits) * longueur
+        assert total == pytest.approx(ingestion.resume["distance"], abs=len(splits))
+        assert [split["numero"] for split in splits] == list(range(1, len(splits) + 1))
+        assert all(split[f"allure_min_{unite}"] > 0 for split in splits)
+
+    def test_sans_altitude(self):
+        # WHEN
+        splits = splits_trace(ingest_gpx(str(GPX / "sans_altitude.gpx")).track)
+
+        # THEN
+        assert splits[0]["denivele_positif"] is None
+        assert splits[0]["duree_s"] > 0
+
+    def test_unite_inconnue(self):
+        with pytest.raises(ValueError):
+            splits_trace(ingest_gpx(str(GPX / "course.gpx")).track, "lieue")
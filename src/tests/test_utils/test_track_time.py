@@ -0,0 +1,88 @@
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pytest
+
+from utils.track import TrackBuilder
+from utils.track_time import (
+    TEMPS_ABSENT,
+    datetime_vers_ms,
+    decoder_horodatages,
+    horodatage_ms,
+    ms_vers_datetime,
+)
+
+
+class TestDecoderHorodatages:
+    """Tests du décodage en bloc des horodatages"""
+
+    @pytest.mark.parametrize(
+        "forme", ["%Y-%m-%dT%H:%M:%SZ", "%Y-%m-%dT%H:%M:%S.%fZ", "%Y-%m-%dT%H:%M:%S"]
+    )
+    def test_identique_au_chemin_lent(self, forme):
+        # GIVEN - Des dates variées : fins de mois, années bissextiles, avant 1970
+        rng = np.random.default_rng(0)
+        secondes = rng.integers(-(10**9), 4 * 10**9, size=2000)
+        textes = [
+            (
+                datetime(1970, 1, 1) + timedelta(seconds=int(s), microseconds=int(s % 10**6))
+            ).strftime(forme)
+            for s in secondes
+        ]
+
+        # WHEN
+        rapide = decoder_horodatages(textes)
+
+        # THEN
+        assert rapide.tolist() == [horodatage_ms(texte) for texte in textes]
+
+    def test_formes_irregulieres(self):
+        # GIVEN - Décalage horaire, fraction courte, texte illisible, absent
+        textes = [
+            "2025-05-01T10:00:00+02:00",
+            "2025-05-01T08:00:00.5Z",
+            "2025-02-29T08:00:00Z",
+            "pas une date",
+            None,
+            "2025-05-01T08:00:00Z",
+        ]
+
+        # WHEN
+        valeurs = decoder_horodatages(textes)
+
+        # THEN - Seuls les textes illisibles sont absents
+        debut = datetime_vers_ms(datetime(2025, 5, 1, 8, tzinfo=timezone.utc))
+        assert valeurs.tolist() == [
+            debut,
+            debut + 500,
+            TEMPS_ABSENT,
+            TEMPS_ABSENT,
+            TEMPS_ABSENT,
+            debut,
+        ]
+
+    def test_aller_retour_datetime(self):
+        # GIVEN
+        instant = datetime(2025, 5, 1, 8, 0, 0, 250000, tzinfo=timezone.utc)
+
+        # THEN
+        assert ms_vers_datetime(datetime_vers_ms(instant)) == instant
+
+
+class TestTrackBuilderHorodatages:
+    """Les horodatages sont décodés par lots à la construction de la trace"""
+
+    def test_lots_successifs(self, monkeypatch):
+        # GIVEN - Des lots plus petits que le nombre de points
+        monkeypatch.setattr(TrackBuilder, "TAILLE_LOT", 3)
+        builder = TrackBuilder()
+        for i in range(10):
+            builder.add(48.0, -1.6, None, f"2025-05-01T08:00:{i:02d}Z" if i != 4 else None)
+
+        # WHEN
+        trace = builder.build()
+
+        # THEN
+        assert trace.time.dtype == np.int64
+        assert trace.has_time.tolist() == [i != 4 for i in range(10)]
+        assert np.diff(trace.time[5:]).tolist() == [1000] * 4
@@ -0,0 +1,93 @@
+"""
+Meilleurs efforts d'une trace : temps le plus court sur 1 km, 5 km, 10 km,
+semi-marathon et marathon
+
+Fenêtre glissante sur la distance cumulée : pour chaque point d'arrivée, le
+départ est situé exactement `distance` mètres plus tôt, son instant étant
+interpolé entre les deux points qui l'encadrent. Ce « pointeur de départ » ne
+fait qu'avancer quand l'arrivée avance : `np.interp` reçoit des positions
+croissantes et reprend sa recherche là où elle s'est arrêtée, ce qui fait de
+tout le parcours une seule passe linéaire, au lieu de comparer chaque paire
+de points. La fenêtre est glissée dans les deux sens (arrivée puis départ sur
+un point), où se trouve toujours le minimum d'un temps interpolé.
+"""
+
+from typing import Dict, Optional
+
+import numpy as np
+
+from utils import track_metrics
+from utils.track import Track
+
+# Distances de référence (m), par nom d'effort
+DISTANCES_EFFORT = {
+    "1k": 1000.0,
+    "5k": 5000.0,
+    "10k": 10000.0,
+    "semi": 21097.5,
+    "marathon": 42195.0,
+}
+
+
+def meilleur_temps(
+    distance_cumulee: np.ndarray, temps: np.ndarray, distance: float
+) -> Optional[float]:
+    """Temps le plus court (s) pour parcourir `distance` mètres d'un seul tenant
+
+    Parameters
+    ----------
+    distance_cumulee : np.ndarray
+        Distance (m) depuis le départ à chaque point, croissante
+    temps : np.ndarray
+        Secondes écoulées à chaque point, complètes
+    distance : float
+        Distance de l'effort en mètres
+
+    Returns
+    -------
+    float or None
+        None si la trace est plus courte que la distance
+    """
+    n = len(distance_cumulee)
+    if n < 2 or distance_cumulee[-1] - distance_cumulee[0] < distance:
+        return None
+
+    # Arrivée sur un point : départ au dernier passage `distance` mètres avant
+    arrivees = np.flatnonzero(distance_cumulee >= distance_cumulee[0] + distance)
+    departs = np.interp(distance_cumulee[arrivees] - distance, distance_cumulee, temps)
+    durees_arrivee = temps[arrivees] - departs
+
+    # Départ sur un point : arrivée au premier passage `distance` mètres après,
+    # soit le dernier passage de la trace parcourue à l'envers
+    debuts = np.flatnonzero(distance_cumulee <= distance_cumulee[-1] - distance)
+    fins = -np.interp(
+        -(distance_cumulee[debuts[::-1]] + distance), -distance_cumulee[::-1], -temps[::-1]
+    )[::-1]
+    durees_depart = fins - temps[debuts]
+
+    durees = np.concatenate((durees_arrivee, durees_depart))
+    durees = durees[durees > 0]
+    return float(durees.min()) if durees.size else None
+
+
+def meilleurs_efforts(track: Track) -> Dict[str, float]:
+    """Meilleurs efforts d'une trace, en secondes, par nom d'effort
+
+    Seules les distances couvertes par la trace figurent dans le résultat ;
+    une trace sans horodatage n'en a aucun.
+    """
+    distance_cumulee = track_metrics.gpxpy_distance_cumulee(
+        track.lat, track.lon, track.ele, track.segments
+    )
+    temps = track_metrics.interpoler_manquants(
+        track_metrics.secondes_ecoulees(track.time), distance_cumulee, minimum=2
+    )
+    if not len(track) or np.isnan(temps).any():
+        return {}
+
+    efforts = {}
+    for nom, distance in DISTANCES_EFFORT.items():
+        duree = meilleur_temps(distance_cumulee, temps, distance)
+        if duree is not None:
+            efforts[nom] = round(duree, 1)
+    return efforts
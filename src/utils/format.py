@@ -12,3 +12,17 @@ def format_h_m(hours: float) -> str:
 
     return f"{h}h{m:02d}"
 
+
+
+def format_chrono(secondes: float) -> str:
+    """Convertit une durée en secondes en chrono m:ss (ou h:mm:ss)."""
+    if secondes is None:
+        return "-"
+
+    total = int(round(secondes))
+    h, reste = divmod(total, 3600)
+    m, s = divmod(reste, 60)
+
+    if h:
+        return f"{h}:{m:02d}:{s:02d}"
+    return f"{m}:{s:02d}"
@@ -0,0 +1,75 @@
+"""
+Comparaison des backends du moteur d'ingestion GPX
+
+Usage (depuis la racine du projet) :
+    python src/utils/gpx_benchmark.py [fichier.gpx ...] [--repetitions N]
+
+Sans fichier, une trace synthétique de 100 000 points est générée. Pour
+chaque fichier et chaque backend, le meilleur temps sur N lectures est
+affiché, ainsi que l'écart de distance avec le backend gpxpy.
+"""
+
+import argparse
+import os
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.abspath(os.path.join(current_dir, "..")))
+
+from utils.gpx_ingestion import BACKEND_GPXPY, BACKENDS, ingest_gpx  # noqa: E402
+
+
+def trace_synthetique(nb_points: int = 100_000) -> bytes:
+    """Génère une trace GPX 1.1 d'un point par seconde."""
+    debut = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    lignes = [
+        '<?xml version="1.0" encoding="UTF-8"?>',
+        '<gpx version="1.1" creator="benchmark" xmlns="http://www.topografix.com/GPX/1/1">',
+        "<trk><name>Synthetique</name><trkseg>",
+    ]
+    for i in range(nb_points):
+        instant = (debut + timedelta(seconds=i)).strftime("%Y-%m-%dT%H:%M:%SZ")
+        lignes.append(
+            f'<trkpt lat="{48.0 + i * 1e-5:.6f}" lon="{-1.6 + i * 1e-5:.6f}">'
+            f"<ele>{50 + (i % 100) / 10:.1f}</ele><time>{instant}</time></trkpt>"
+        )
+    lignes.append("</trkseg></trk></gpx>")
+    return "\n".join(lignes).encode()
+
+
+def mesurer(contenu: bytes, backend: str, repetitions: int):
+    """Meilleur temps (s) sur `repetitions` lectures, et le dernier résultat."""
+    meilleur = float("inf")
+    for _ in range(repetitions):
+        debut = time.perf_counter()
+        ingestion = ingest_gpx(contenu, backend)
+        meilleur = min(meilleur, time.perf_counter() - debut)
+    return meilleur, ingestion
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("fichiers", nargs="*", help="Fichiers GPX à mesurer")
+    parser.add_argument("--repetitions", type=int, default=3)
+    args = parser.parse_args()
+
+    sources = [(chemin, open(chemin, "rb").read()) for chemin in args.fichiers]
+    if not sources:
+        sources = [("synthetique (100 000 points)", trace_synthetique())]
+
+    for nom, contenu in sources:
+        print(f"\n{nom} - {len(contenu) / 1e6:.1f} Mo")
+        resultats = {b: mesurer(contenu, b, args.repetitions) for b in BACKENDS}
+        reference = resultats[BACKEND_GPXPY]
+        for backend, (duree, ingestion) in resultats.items():
+            ecart = abs(ingestion.distance - reference[1].distance)
+            print(
+                f"  {backend:<6} {duree * 1000:9.1f} ms  x{reference[0] / duree:5.1f}"
+                f"  {ingestion.nb_points} points  écart distance {ecart:.2e} m"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Cache des fichiers GPX déjà analysés
+
+Le formulaire de création envoie le même fichier deux fois : à
+/activities/upload-gpx pour pré-remplir les champs, puis à POST /activities.
+Les résultats d'ingestion sont conservés dans un cache LRU borné en octets,
+indexé par l'empreinte SHA-256 du contenu, pour qu'un même fichier ne soit
+analysé qu'une fois.
+"""
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from utils.gpx_ingestion import GPXIngestion, IngestionIncrementale, ingest_gpx
+from utils.singleton import Singleton
+
+# Coût fixe estimé d'une entrée (objets Python, résumé, clé)
+TAILLE_ENTREE_MIN = 1024
+
+
+class GPXCache(metaclass=Singleton):
+    """Cache LRU des ingestions GPX, limité par un budget en octets
+
+    Les ingestions renvoyées sont partagées entre les appels : leurs traces
+    doivent être traitées en lecture seule.
+    """
+
+    def __init__(self, budget_octets: Optional[int] = None):
+        if budget_octets is None:
+            budget_octets = int(os.environ.get("GPX_CACHE_BYTES", 64 * 1024 * 1024))
+        self.budget_octets = budget_octets
+        self._entrees: "OrderedDict[str, Tuple[GPXIngestion, int]]" = OrderedDict()
+        self._taille = 0
+        self._verrou = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entrees)
+
+    @property
+    def taille(self) -> int:
+        """Octets actuellement occupés (estimation)."""
+        return self._taille
+
+    @staticmethod
+    def cle(content: bytes) -> str:
+        """Empreinte SHA-256 du contenu."""
+        return hashlib.sha256(content).hexdigest()
+
+    def get(self, cle: str) -> Optional[GPXIngestion]:
+        """Renvoie l'ingestion associée à la clé, None si absente."""
+        with self._verrou:
+            entree = self._entrees.get(cle)
+            if entree is None:
+                self.misses += 1
+                return None
+            self._entrees.move_to_end(cle)
+            self.hits += 1
+            return entree[0]
+
+    def put(self, cle: str, ingestion: GPXIngestion):
+        """Ajoute une ingestion puis évince les moins récemment utilisées."""
+        taille = ingestion.track.nbytes + TAILLE_ENTREE_MIN
+        if taille > self.budget_octets:
+            return
+        with self._verrou:
+            ancienne = self._entrees.pop(cle, None)
+            if ancienne is not None:
+                self._taille -= ancienne[1]
+            self._entrees[cle] = (ingestion, taille)
+            self._taille += taille
+            while self._taille > self.budget_octets:
+                _, (_, taille_evincee) = self._entrees.popitem(last=False)
+                self._taille -= taille_evincee
+
+    def get_or_ingest(self, content: bytes) -> Tuple[GPXIngestion, bool]:
+        """Ingestion du contenu, depuis le cache si possible
+
+        Returns
+        -------
+        tuple
+            (ingestion, True si le résultat vient du cache)
+        """
+        cle = self.cle(content)
+        ingestion = self.get(cle)
+        if ingestion is not None:
+            return ingestion, True
+
+        ingestion = ingest_gpx(content)
+        self.put(cle, ingestion)
+        return ingestion, False
+
+    def finish(self, flux: IngestionIncrementale) -> Tuple[GPXIngestion, bool]:
+        """Termine une ingestion incrémentale, sauf si le même contenu est en cache
+
+        Returns
+        -------
+        tuple
+            (ingestion, True si le résultat vient du cache)
+        """
+        ingestion = self.get(flux.cle)
+        if ingestion is not None:
+            return ingestion, True
+
+        ingestion = flux.finish()
+        self.put(flux.cle, ingestion)
+        return ingestion, False
+
+    def clear(self):
+        """Vide le cache et remet les compteurs à zéro."""
+        with self._verrou:
+            self._entrees.clear()
+            self._taille = 0
+            self.hits = 0
+            self.misses = 0
@@ -0,0 +1,132 @@
+"""
+Lecture des fichiers GPX compressés (gzip, bzip2, zip)
+
+Le format est reconnu à sa signature (premiers octets), quelle que soit
+l'extension du fichier. gzip et bzip2 sont décompressés en flux, par blocs
+de taille bornée, directement vers le parseur : aucune copie décompressée
+complète n'est créée. Une archive zip peut contenir plusieurs fichiers GPX,
+lus chacun en flux depuis l'archive.
+"""
+
+import bz2
+import zipfile
+import zlib
+from typing import IO, Iterator, List, Optional
+
+FORMAT_GZIP = "gzip"
+FORMAT_BZIP2 = "bz2"
+FORMAT_ZIP = "zip"
+
+SIGNATURES = (
+    (b"\x1f\x8b", FORMAT_GZIP),
+    (b"BZh", FORMAT_BZIP2),
+    (b"PK\x03\x04", FORMAT_ZIP),
+)
+
+# Octets nécessaires pour reconnaître toutes les signatures
+TAILLE_SIGNATURE = max(len(signature) for signature, _ in SIGNATURES)
+
+# Taille maximale d'un bloc décompressé
+TAILLE_BLOC = 64 * 1024
+
+
+def detecter_format(debut: bytes) -> Optional[str]:
+    """Format de compression d'après les premiers octets, None pour du XML brut."""
+    for signature, format_ in SIGNATURES:
+        if debut.startswith(signature):
+            return format_
+    return None
+
+
+class DecompresseurFlux:
+    """Décompresse un flux gzip ou bzip2 reçu par blocs
+
+    Chaque appel à `decompresser` produit des blocs d'au plus TAILLE_BLOC
+    octets. Les flux à plusieurs membres (fichiers concaténés) sont pris en
+    charge.
+    """
+
+    def __init__(self, format_: str):
+        if format_ not in (FORMAT_GZIP, FORMAT_BZIP2):
+            raise ValueError(f"Format de flux non pris en charge : {format_}")
+        self.format = format_
+        self._nouveau_membre()
+
+    def _nouveau_membre(self):
+        if self.format == FORMAT_GZIP:
+            # wbits=31 : en-tête et contrôle gzip
+            self._d = zlib.decompressobj(wbits=31)
+        else:
+            self._d = bz2.BZ2Decompressor()
+
+    @property
+    def termine(self) -> bool:
+        """Vrai si le dernier membre reçu est complet."""
+        return self._d.eof
+
+    def decompresser(self, data: bytes) -> Iterator[bytes]:
+        """Décompresse un bloc reçu ; lève ValueError si le flux est corrompu."""
+        try:
+            if self.format == FORMAT_GZIP:
+                yield from self._gzip(data)
+            else:
+                yield from self._bzip2(data)
+        except (zlib.error, OSError) as exc:
+            raise ValueError(f"Flux {self.format} invalide : {exc}") from exc
+
+    def _gzip(self, data: bytes) -> Iterator[bytes]:
+        while data:
+            if self._d.eof:
+                self._nouveau_membre()
+            bloc = self._d.decompress(data, TAILLE_BLOC)
+            if bloc:
+                yield bloc
+            data = self._d.unused_data if self._d.eof else self._d.unconsumed_tail
+
+    def _bzip2(self, data: bytes) -> Iterator[bytes]:
+        while True:
+            if self._d.eof:
+                if not data:
+                    return
+                self._nouveau_membre()
+            bloc = self._d.decompress(data, TAILLE_BLOC)
+            if bloc:
+                yield bloc
+            if self._d.eof:
+                data = self._d.unused_data
+            elif self._d.needs_input:
+                return
+            else:
+                # Sortie limitée à TAILLE_BLOC : redemander la suite
+                data = b""
+
+
+def decompresser(contenu: bytes) -> bytes:
+    """Contenu décompressé d'un fichier gzip ou bzip2 ; inchangé sinon."""
+    format_ = detecter_format(contenu[:TAILLE_SIGNATURE])
+    if format_ not in (FORMAT_GZIP, FORMAT_BZIP2):
+        return contenu
+    decompresseur = DecompresseurFlux(format_)
+    blocs = list(decompresseur.decompresser(contenu))
+    if not decompresseur.termine:
+        raise ValueError(f"Flux {format_} tronqué")
+    return b"".join(blocs)
+
+
+def membres_gpx(archive: zipfile.ZipFile) -> List[zipfile.ZipInfo]:
+    """Fichiers GPX d'une archive zip (dossiers et métadonnées macOS exclus)."""
+    return [
+        membre
+        for membre in archive.infolist()
+        if not membre.is_dir()
+        and membre.filename.lower().endswith((".gpx", ".gpx.gz"))
+        and not membre.filename.startswith("__MACOSX/")
+    ]
+
+
+def ouvrir_zip(fichier: IO[bytes]) -> zipfile.ZipFile:
+    """Ouvre une archive zip ; lève ValueError si elle est invalide."""
+    try:
+        return zipfile.ZipFile(fichier)
+    except zipfile.BadZipFile as exc:
+        raise ValueError(f"Archive zip invalide : {exc}") from exc
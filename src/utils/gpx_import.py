@@ -0,0 +1,259 @@
+"""
+Import de fichiers GPX en lot
+
+L'analyse des fichiers est répartie sur un `ProcessPoolExecutor` : chaque
+processus lit ses fichiers avec le moteur d'ingestion et renvoie le résumé,
+les meilleurs efforts et l'empreinte (quelques centaines d'octets), ainsi
+que la trace encodée par `encoder_trace`, de taille proportionnelle au
+nombre de points (quelques octets par point) mais bien plus légère qu'une
+Track à sérialiser. Un lot peut être une liste de fichiers, compressés ou
+non, ou une archive zip.
+"""
+
+import io
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from utils.best_efforts import meilleurs_efforts
+from utils.gpx_compression import (
+    FORMAT_ZIP,
+    TAILLE_SIGNATURE,
+    detecter_format,
+    membres_gpx,
+    ouvrir_zip,
+)
+from utils.gpx_ingestion import IngestionIncrementale, TailleMaxDepassee
+from utils.gpx_parser import GPXStreamReader
+from utils.track_codec import encoder_trace
+from utils.track_fingerprint import empreinte_trace
+
+SPORTS_VALIDES = {"course", "cyclisme", "natation", "randonnee"}
+
+# Types d'activité GPX (Strava, Garmin...) vers les sports de l'application
+TYPES_GPX_SPORT = {
+    "running": "course",
+    "run": "course",
+    "trail_running": "course",
+    "cycling": "cyclisme",
+    "ride": "cyclisme",
+    "biking": "cyclisme",
+    "swimming": "natation",
+    "swim": "natation",
+    "hiking": "randonnee",
+    "hike": "randonnee",
+    "walking": "randonnee",
+    "walk": "randonnee",
+}
+
+# En dessous de ce nombre de fichiers, l'analyse reste dans le processus courant
+SEUIL_PARALLELE = 4
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+def _nb_workers() -> int:
+    """Nombre de processus d'analyse : GPX_IMPORT_WORKERS, sinon un par cœur."""
+    return int(os.environ.get("GPX_IMPORT_WORKERS", 0)) or os.cpu_count() or 1
+
+
+def _executor() -> ProcessPoolExecutor:
+    """Pool de processus partagé, créé à la première utilisation."""
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=_nb_workers())
+    return _pool
+
+
+def _taille_max_xml(taille_max: Optional[int]) -> Optional[int]:
+    """Octets décompressés autorisés pour un fichier de `taille_max` octets."""
+    if taille_max is None:
+        return None
+    return taille_max * IngestionIncrementale.RATIO_COMPRESSION_MAX
+
+
+def _ingerer(contenu: bytes, taille_max: Optional[int]):
+    """Lit le contenu en flux ; le XML décompressé est borné comme pour un envoi seul."""
+    flux = IngestionIncrementale(taille_max_xml=_taille_max_xml(taille_max), empreinte=False)
+    vue = memoryview(contenu)
+    for debut in range(0, len(vue), GPXStreamReader.TAILLE_BLOC):
+        flux.feed(bytes(vue[debut : debut + GPXStreamReader.TAILLE_BLOC]))
+    return flux.finish()
+
+
+def analyser_fichier(
+    fichier: Tuple[str, bytes], taille_max: Optional[int] = None
+) -> Dict[str, Any]:
+    """Analyse un fichier GPX ; exécuté dans un processus du pool
+
+    Parameters
+    ----------
+    fichier : tuple
+        (nom du fichier, contenu)
+    taille_max : int, optional
+        Taille maximale d'un fichier envoyé : le XML décompressé est refusé
+        au-delà de RATIO_COMPRESSION_MAX fois cette taille
+
+    Returns
+    -------
+    dict
+        {'fichier', 'resume' (format de /upload-gpx), 'date_debut', 'trace'
+        (points encodés par `encoder_trace`, plus légers à renvoyer au
+        processus principal qu'une Track), 'efforts' (meilleurs efforts),
+        'empreinte' (voir `empreinte_trace`)}
+        ou {'fichier', 'erreur'}
+    """
+    nom, contenu = fichier
+    try:
+        ingestion = _ingerer(contenu, taille_max)
+    except Exception as exc:
+        return {"fichier": nom, "erreur": f"Fichier GPX illisible: {exc}"}
+    if not ingestion.nb_points:
+        return {"fichier": nom, "erreur": "Aucun point de trace dans le fichier"}
+    return {
+        "fichier": nom,
+        "resume": ingestion.as_strava_dict(),
+        "date_debut": ingestion.date_debut,
+        "trace": encoder_trace(ingestion.track),
+        "efforts": meilleurs_efforts(ingestion.track),
+        "empreinte": empreinte_trace(ingestion.track),
+    }
+
+
+def analyser_lot(
+    fichiers: List[Tuple[str, bytes]], taille_max: Optional[int] = None
+) -> List[Dict[str, Any]]:
+    """Analyse un lot de fichiers, en parallèle au-delà de SEUIL_PARALLELE
+
+    Les résultats sont renvoyés dans l'ordre des fichiers ; `taille_max` est
+    celle de `analyser_fichier`.
+    """
+    analyser = partial(analyser_fichier, taille_max=taille_max)
+    if len(fichiers) < SEUIL_PARALLELE:
+        return [analyser(f) for f in fichiers]
+
+    # Des paquets de fichiers limitent les allers-retours entre processus
+    paquet = max(1, len(fichiers) // (4 * _nb_workers()))
+    return list(_executor().map(analyser, fichiers, chunksize=paquet))
+
+
+def est_zip(contenu: bytes) -> bool:
+    """Vrai si le contenu est une archive zip (d'après sa signature)."""
+    return detecter_format(contenu[:TAILLE_SIGNATURE]) == FORMAT_ZIP
+
+
+def extraire_zip(
+    nom: str,
+    contenu: bytes,
+    taille_max: Optional[int] = None,
+    taille_totale_max: Optional[int] = None,
+    nb_max: Optional[int] = None,
+) -> List[Tuple[str, bytes]]:
+    """Fichiers GPX (éventuellement compressés) contenus dans une archive zip
+
+    Chaque fichier est décompressé en flux : la lecture s'arrête dès qu'une
+    limite est dépassée, une bombe de décompression n'est jamais dépliée en
+    entier.
+
+    Parameters
+    ----------
+    nom : str
+        Nom de l'archive, préfixe des noms de fichiers renvoyés
+    contenu : bytes
+        Archive zip
+    taille_max : int, optional
+        Taille maximale d'un fichier envoyé : un fichier de l'archive est
+        refusé au-delà de RATIO_COMPRESSION_MAX fois cette taille, comme le
+        XML décompressé d'un envoi seul
+    taille_totale_max : int, optional
+        Octets décompressés autorisés pour l'ensemble de l'archive
+    nb_max : int, optional
+        Nombre maximal de fichiers GPX dans l'archive
+
+    Raises
+    ------
+    TailleMaxDepassee
+        Si une limite est dépassée
+    ValueError
+        Si l'archive est invalide
+    """
+    with ouvrir_zip(io.BytesIO(contenu)) as archive:
+        membres = membres_gpx(archive)
+        if nb_max is not None and len(membres) > nb_max:
+            raise TailleMaxDepassee(f"Archive trop volumineuse (maximum {nb_max} fichiers GPX)")
+        fichiers = []
+        for membre in membres:
+            donnees = _lire_membre(archive, membre, _taille_max_xml(taille_max), taille_totale_max)
+            if taille_totale_max is not None:
+                taille_totale_max -= len(donnees)
+            fichiers.append((f"{nom}/{membre.filename}", donnees))
+        return fichiers
+
+
+def _lire_membre(archive, membre, *tailles_max: Optional[int]) -> bytes:
+    """Décompresse un fichier de l'archive par blocs, sans dépasser `tailles_max`."""
+    limite = min((t for t in tailles_max if t is not None), default=None)
+    blocs, taille = [], 0
+    with archive.open(membre) as fichier:
+        while bloc := fichier.read(GPXStreamReader.TAILLE_BLOC):
+            taille += len(bloc)
+            if limite is not None and taille > limite:
+                raise TailleMaxDepassee(
+                    f"{membre.filename} trop volumineux une fois décompressé "
+                    f"(maximum {limite} octets)"
+                )
+            blocs.append(bloc)
+    return b"".join(blocs)
+
+
+def sport_depuis_type(type_gpx: Optional[str], sport_defaut: Optional[str] = None) -> str:
+    """Sport de l'application correspondant au type GPX
+
+    Raises
+    ------
+    ValueError
+        Si le type n'est pas reconnu et qu'aucun sport par défaut n'est fourni
+    """
+    if type_gpx:
+        type_gpx = type_gpx.strip().lower()
+        if type_gpx in SPORTS_VALIDES:
+            return type_gpx
+        if type_gpx in TYPES_GPX_SPORT:
+            return TYPES_GPX_SPORT[type_gpx]
+    if sport_defaut in SPORTS_VALIDES:
+        return sport_defaut
+    raise ValueError(f"Type d'activite inconnu: {type_gpx}. Precisez le sport.")
+
+
+def activite_depuis_analyse(
+    analyse: Dict[str, Any], id_user: int, sport_defaut: Optional[str] = None
+) -> Dict[str, Any]:
+    """Construit le dictionnaire d'activité à partir de l'analyse d'un fichier
+
+    Raises
+    ------
+    ValueError
+        Si le sport est inconnu ou la distance nulle
+    """
+    resume = analyse["resume"]
+    if not resume["distance_km"] or resume["distance_km"] <= 0:
+        raise ValueError("Distance nulle")
+
+    nom_fichier = os.path.splitext(os.path.basename(analyse["fichier"]))[0]
+    duree = resume["temps_mouvement_heures"] or resume["duree_heures"]
+    date_debut = analyse.get("date_debut")
+    return {
+        "titre": resume["nom"] or nom_fichier,
+        "description": "",
+        "sport": sport_depuis_type(resume["type"], sport_defaut),
+        "date_activite": date_debut.replace(tzinfo=None) if date_debut else datetime.now(),
+        "lieu": "",
+        "distance": resume["distance_km"],
+        "duree": duree or None,
+        "id_user": id_user,
+        "trace": analyse.get("trace"),
+        "efforts": analyse.get("efforts"),
+        "empreinte": analyse.get("empreinte"),
+    }
@@ -0,0 +1,420 @@
+"""
+Moteur d'ingestion des fichiers GPX
+
+Point d'entrée unique pour lire un fichier GPX, quel que soit l'appelant
+(API, CLI, objets métier). Le backend de lecture est interchangeable :
+
+- "fast" : lecture en flux par blocs (`GPXStreamReader`) et métriques
+  vectorisées (`track_metrics.gpxpy_summary`) ;
+- "gpxpy" : compatibilité, lecture, distance et durée déléguées à la
+  bibliothèque gpxpy.
+
+Les deux backends produisent un `GPXIngestion` : même trace en colonnes,
+mêmes règles de calcul (distance 3D, durée par segment), et les routes
+(<rte>) ne servent qu'en l'absence de trace. Les données de mouvement sont
+calculées dans les deux cas sur la trace filtrée (`track_filter.mouvement`).
+Le backend par défaut peut être choisi avec la variable d'environnement
+GPX_BACKEND. Les contenus compressés (gzip, bzip2, zip) sont reconnus à leur
+signature et décompressés en flux (voir `utils.gpx_compression`).
+"""
+
+import hashlib
+import io
+import os
+import tempfile
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import gpxpy
+import gpxpy.gpx
+
+from utils import track_filter, track_metrics
+from utils.gpx_compression import (
+    FORMAT_ZIP,
+    TAILLE_SIGNATURE,
+    DecompresseurFlux,
+    decompresser,
+    detecter_format,
+    membres_gpx,
+    ouvrir_zip,
+)
+from utils.gpx_parser import GPXStreamReader, _strava_summary
+from utils.track import NAN, Track
+from utils.track_simplification import PyramideLOD
+from utils.track_time import TEMPS_ABSENT, datetime_vers_ms
+
+BACKEND_RAPIDE = "fast"
+BACKEND_GPXPY = "gpxpy"
+
+
+class GPXIngestion:
+    """Résultat de l'ingestion d'un fichier GPX
+
+    Attributs
+    ----------
+    track : Track
+        Points de la trace en colonnes (ou de la route à défaut de trace)
+    nom, type : str ou None
+        Nom et type de la première trace
+    resume : dict
+        Métriques de `track_metrics.gpxpy_summary` et de `track_filter.mouvement`
+    backend : str
+        Backend ayant produit le résultat
+    """
+
+    __slots__ = ("track", "nom", "type", "resume", "backend", "_pyramide")
+
+    def __init__(
+        self,
+        track: Track,
+        nom: Optional[str] = None,
+        type_: Optional[str] = None,
+        resume: Optional[dict] = None,
+        backend: str = BACKEND_RAPIDE,
+    ):
+        self.track = track
+        self.nom = nom
+        self.type = type_
+        if resume is None:
+            colonnes = (track.lat, track.lon, track.ele, track.time, track.segments)
+            resume = {
+                **track_metrics.gpxpy_summary(*colonnes),
+                **track_filter.mouvement(*colonnes),
+            }
+        self.resume = resume
+        self.backend = backend
+        self._pyramide = None
+
+    def __repr__(self) -> str:
+        return f"<GPXIngestion backend={self.backend} points={self.nb_points}>"
+
+    @property
+    def nb_points(self) -> int:
+        return len(self.track)
+
+    @property
+    def distance(self) -> float:
+        """Distance 3D en mètres."""
+        return self.resume["distance"] or 0.0
+
+    @property
+    def duree(self) -> Optional[float]:
+        """Durée en secondes, None si l'horodatage est incomplet."""
+        return self.resume["duree"]
+
+    @property
+    def duree_timedelta(self) -> Optional[timedelta]:
+        """Durée sous forme de timedelta, None si elle est nulle ou inconnue."""
+        return timedelta(seconds=self.duree) if self.duree else None
+
+    @property
+    def date_debut(self) -> Optional[datetime]:
+        """Premier horodatage (UTC) de la trace."""
+        return self.track.first_datetime()
+
+    @property
+    def denivele(self) -> Tuple[float, float]:
+        """Dénivelés positif et négatif en mètres."""
+        return track_metrics.elevation_gain(self.track.ele)
+
+    @property
+    def pyramide(self) -> PyramideLOD:
+        """Niveaux de détail de la trace pour la carte, calculés au premier accès."""
+        if self._pyramide is None:
+            self._pyramide = PyramideLOD(self.track.lat, self.track.lon)
+        return self._pyramide
+
+    def as_strava_dict(self) -> Dict[str, Any]:
+        """Résumé au format de /activities/upload-gpx."""
+        return _strava_summary(self.nom, self.type, self.resume)
+
+
+class TailleMaxDepassee(ValueError):
+    """Le contenu reçu dépasse la taille autorisée."""
+
+
+class IngestionIncrementale:
+    """Ingestion d'un contenu reçu par blocs, avec le backend rapide
+
+    Chaque bloc est poussé dans le parseur dès sa réception et l'empreinte
+    SHA-256 du contenu est calculée au fil de l'eau : l'analyse avance
+    pendant le transfert et le contenu complet n'est jamais conservé.
+
+    Le format est reconnu sur les premiers octets : gzip et bzip2 sont
+    décompressés bloc par bloc vers le parseur ; une archive zip, qui ne
+    peut être lue qu'une fois complète, est conservée compressée (sur disque
+    au-delà de TAILLE_MEMOIRE_ARCHIVE) puis ses fichiers GPX sont lus en flux.
+
+    Parameters
+    ----------
+    taille_max : int, optional
+        Octets reçus au-delà desquels `feed` lève `TailleMaxDepassee`
+    taille_max_xml : int, optional
+        Octets XML décompressés autorisés, par défaut RATIO_COMPRESSION_MAX
+        fois `taille_max`
+    empreinte : bool
+        Calculer l'empreinte SHA-256 (clé du cache) des octets reçus
+    """
+
+    # Au-delà, le XML décompressé est refusé (protection contre les bombes)
+    RATIO_COMPRESSION_MAX = 30
+    TAILLE_MEMOIRE_ARCHIVE = 1024 * 1024
+
+    def __init__(
+        self,
+        taille_max: Optional[int] = None,
+        taille_max_xml: Optional[int] = None,
+        empreinte: bool = True,
+    ):
+        self.taille_max = taille_max
+        if taille_max_xml is None and taille_max is not None:
+            taille_max_xml = taille_max * self.RATIO_COMPRESSION_MAX
+        self.taille_max_xml = taille_max_xml
+        self.taille = 0
+        self.taille_xml = 0
+        self.format = None
+        self._detecte = False
+        self._debut = b""
+        self._reader = GPXStreamReader()
+        self._decompresseur = None
+        self._archive = None
+        self._lot = None
+        self._empreinte = hashlib.sha256() if empreinte else None
+
+    def feed(self, bloc: bytes):
+        """Analyse un bloc (lève ET.ParseError si le XML est invalide, ValueError
+        si le flux compressé est corrompu)."""
+        self.taille += len(bloc)
+        _verifier_taille(self.taille, self.taille_max)
+        if self._empreinte is not None:
+            self._empreinte.update(bloc)
+
+        if not self._detecte:
+            self._debut += bloc
+            if len(self._debut) < TAILLE_SIGNATURE:
+                return
+            bloc, self._debut = self._debut, b""
+            self._detecter(bloc)
+        self._recevoir(bloc)
+
+    @property
+    def cle(self) -> str:
+        """Empreinte SHA-256 des octets reçus, au format de `GPXCache.cle`."""
+        return self._empreinte.hexdigest()
+
+    def _detecter(self, debut: bytes):
+        self._detecte = True
+        self.format = detecter_format(debut[:TAILLE_SIGNATURE])
+        if self.format == FORMAT_ZIP:
+            self._archive = tempfile.SpooledTemporaryFile(max_size=self.TAILLE_MEMOIRE_ARCHIVE)
+        elif self.format is not None:
+            self._decompresseur = DecompresseurFlux(self.format)
+
+    def _recevoir(self, bloc: bytes):
+        if self._archive is not None:
+            self._archive.write(bloc)
+        elif self._decompresseur is not None:
+            for xml in self._decompresseur.decompresser(bloc):
+                self._analyser(xml)
+        else:
+            self._analyser(bloc)
+
+    def _analyser(self, xml: bytes):
+        self.taille_xml += len(xml)
+        _verifier_taille(self.taille_xml, self.taille_max_xml)
+        self._reader.feed(xml)
+
+    def _terminer_detection(self):
+        """Contenu plus court qu'une signature : il est analysé tel quel."""
+        if not self._detecte:
+            debut, self._debut = self._debut, b""
+            self._detecter(debut)
+            self._recevoir(debut)
+
+    def finish(self) -> GPXIngestion:
+        """Termine la lecture et calcule les métriques
+
+        Raises
+        ------
+        ValueError
+            Si le flux compressé est tronqué, ou si l'archive zip ne contient
+            pas exactement un fichier GPX (voir `finish_lot`)
+        """
+        self._terminer_detection()
+        if self.format == FORMAT_ZIP:
+            lot = self.finish_lot()
+            if len(lot) != 1:
+                raise ValueError(f"L'archive contient {len(lot)} fichiers GPX au lieu d'un seul")
+            return lot[0][1]
+
+        if self._decompresseur is not None and not self._decompresseur.termine:
+            raise ValueError(f"Flux {self.format} tronqué")
+        return _depuis_lecteur(self._reader.finish())
+
+    def finish_lot(self) -> List[Tuple[Optional[str], GPXIngestion]]:
+        """Termine la lecture d'un contenu pouvant regrouper plusieurs fichiers
+
+        Returns
+        -------
+        list
+            (nom dans l'archive, ingestion) pour chaque fichier GPX d'une
+            archive zip ; [(None, ingestion)] pour un fichier seul
+        """
+        self._terminer_detection()
+        if self.format != FORMAT_ZIP:
+            return [(None, self.finish())]
+
+        if self._lot is None:
+            self._archive.seek(0)
+            with ouvrir_zip(self._archive) as archive:
+                self._lot = [
+                    (membre.filename, self._lire_membre(archive, membre))
+                    for membre in membres_gpx(archive)
+                ]
+            self._archive.close()
+        return self._lot
+
+    def _lire_membre(self, archive, membre) -> GPXIngestion:
+        """Lit un fichier de l'archive en flux, sans l'extraire."""
+        flux = IngestionIncrementale(self.taille_max_xml, empreinte=False)
+        with archive.open(membre) as fichier:
+            while bloc := fichier.read(GPXStreamReader.TAILLE_BLOC):
+                flux.feed(bloc)
+        return flux.finish()
+
+
+def _verifier_taille(taille: int, taille_max: Optional[int]):
+    if taille_max is not None and taille > taille_max:
+        raise TailleMaxDepassee(f"Fichier trop volumineux (maximum {taille_max} octets)")
+
+
+def _depuis_lecteur(reader: GPXStreamReader) -> GPXIngestion:
+    """Ingestion à partir d'un lecteur terminé ; la route sert à défaut de trace."""
+    track = reader.track
+    if not len(track):
+        track = reader.route
+    return GPXIngestion(track, reader.nom, reader.type, backend=BACKEND_RAPIDE)
+
+
+def _ingest_fast(source) -> GPXIngestion:
+    """Backend rapide : une lecture en flux, métriques vectorisées."""
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        if detecter_format(bytes(source[:TAILLE_SIGNATURE])) is None:
+            return _depuis_lecteur(GPXStreamReader.read(source))
+        flux = IngestionIncrementale(empreinte=False)
+        vue = memoryview(source)
+        for debut in range(0, len(vue), GPXStreamReader.TAILLE_BLOC):
+            flux.feed(bytes(vue[debut : debut + GPXStreamReader.TAILLE_BLOC]))
+        return flux.finish()
+
+    if isinstance(source, str):
+        with open(source, "rb") as fichier:
+            return _ingest_fast(fichier)
+
+    flux = IngestionIncrementale(empreinte=False)
+    while bloc := source.read(GPXStreamReader.TAILLE_BLOC):
+        flux.feed(bloc)
+    return flux.finish()
+
+
+def _ingest_gpxpy(source) -> GPXIngestion:
+    """Backend de compatibilité : distance et durée calculées par gpxpy."""
+    if isinstance(source, str):
+        with open(source, "rb") as f:
+            source = f.read()
+    elif not isinstance(source, (bytes, bytearray, memoryview)):
+        source = source.read()
+    gpx = gpxpy.parse(_xml_decompresse(bytes(source)))
+
+    if not gpx.get_track_points_no():
+        gpx.tracks = [_route_as_track(gpx)]
+
+    lat, lon, ele, time, segments = [], [], [], [], []
+    for trk in gpx.tracks:
+        for segment in trk.segments:
+            if segment.points:
+                segments.append(len(lat))
+            for point in segment.points:
+                lat.append(point.latitude)
+                lon.append(point.longitude)
+                ele.append(NAN if point.elevation is None else point.elevation)
+                time.append(datetime_vers_ms(point.time) if point.time else TEMPS_ABSENT)
+
+    track = Track(lat, lon, ele, time, segments)
+    resume = {
+        "distance": gpx.length_3d(),
+        "duree": gpx.get_duration(),
+        **track_filter.mouvement(track.lat, track.lon, track.ele, track.time, track.segments),
+    }
+
+    premiere = gpx.tracks[0] if gpx.tracks else None
+    return GPXIngestion(
+        track,
+        premiere.name if premiere else None,
+        premiere.type if premiere else None,
+        resume,
+        backend=BACKEND_GPXPY,
+    )
+
+
+def _xml_decompresse(contenu: bytes) -> bytes:
+    """XML d'un contenu éventuellement compressé (zip : un seul fichier GPX)."""
+    if detecter_format(contenu[:TAILLE_SIGNATURE]) != FORMAT_ZIP:
+        return decompresser(contenu)
+
+    with ouvrir_zip(io.BytesIO(contenu)) as archive:
+        membres = membres_gpx(archive)
+        if len(membres) != 1:
+            raise ValueError(f"L'archive contient {len(membres)} fichiers GPX au lieu d'un seul")
+        return decompresser(archive.read(membres[0]))
+
+
+def _route_as_track(gpx) -> gpxpy.gpx.GPXTrack:
+    """Regroupe les points de route dans une trace à un segment."""
+    segment = gpxpy.gpx.GPXTrackSegment()
+    for route in gpx.routes:
+        for point in route.points:
+            segment.points.append(
+                gpxpy.gpx.GPXTrackPoint(
+                    point.latitude, point.longitude, elevation=point.elevation, time=point.time
+                )
+            )
+    trace = gpxpy.gpx.GPXTrack()
+    trace.segments.append(segment)
+    return trace
+
+
+BACKENDS: Dict[str, Callable[[Any], GPXIngestion]] = {
+    BACKEND_RAPIDE: _ingest_fast,
+    BACKEND_GPXPY: _ingest_gpxpy,
+}
+
+
+def ingest_gpx(source, backend: Optional[str] = None) -> GPXIngestion:
+    """Lit un fichier GPX avec le backend demandé
+
+    Parameters
+    ----------
+    source : bytes, str ou fichier binaire
+        Contenu du fichier, chemin, ou objet fichier ouvert en lecture
+    backend : str, optional
+        "fast" ou "gpxpy" ; par défaut GPX_BACKEND, sinon "fast"
+
+    Returns
+    -------
+    GPXIngestion
+        Trace et métriques du fichier
+
+    Raises
+    ------
+    ValueError
+        Si le backend est inconnu
+    """
+    backend = backend or os.environ.get("GPX_BACKEND", BACKEND_RAPIDE)
+    try:
+        lecteur = BACKENDS[backend]
+    except KeyError:
+        raise ValueError(
+            f"Backend GPX inconnu : {backend} (attendu : {', '.join(BACKENDS)})"
+        ) from None
+    return lecteur(source)
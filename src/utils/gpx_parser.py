@@ -5,11 +5,16 @@ Module pour parser les fichiers GPX et extraire les données d'activités sporti
 import logging
 import xml.etree.ElementTree as ET
 from datetime import datetime, timedelta
-from typing import Any, Dict, List, Optional, Tuple
+from math import atan2, cos, radians, sin, sqrt
+from typing import Any, Dict, Optional, Tuple
 
-import gpxpy
+import numpy as np
 from fastapi import HTTPException
 
+from utils import track_metrics
+from utils.track import Track, TrackBuilder
+from utils.track_time import TEMPS_ABSENT
+
 
 class GPXParser:
     """Classe pour parser les fichiers GPX"""
@@ -18,13 +23,16 @@ class GPXParser:
     GPX_NS = {"gpx": "http://www.topografix.com/GPX/1/1"}
 
     @staticmethod
-    def parse_gpx_file(filepath: str) -> dict:
+    def parse_gpx_file(filepath: str, streaming: bool = False) -> dict:
         """Parse un fichier GPX et extrait les informations principales
 
         Parameters
         ----------
         filepath : str
             Chemin vers le fichier GPX
+        streaming : bool
+            Si True, délègue à `parse_gpx_stream` : mémoire constante,
+            mais les points ne sont pas conservés
 
         Returns
         -------
@@ -34,35 +42,29 @@ class GPXParser:
                 'distance': float (en mètres),
                 'duree': timedelta,
                 'date_activite': datetime,
-                'points': list of dict avec lat, lon, ele, time
+                'points': Track (colonnes lat, lon, ele, time),
+                'nb_points': int
             }
         """
-        try:
-            tree = ET.parse(filepath)
-            root = tree.getroot()
+        if streaming:
+            return GPXParser.parse_gpx_stream(filepath)
 
-            # Extraire les points de trace
-            points = GPXParser._extract_track_points(root)
+        # Import local : le moteur d'ingestion s'appuie sur ce module
+        from utils.gpx_ingestion import ingest_gpx
+
+        try:
+            ingestion = ingest_gpx(filepath)
 
-            if not points:
+            if not ingestion.nb_points:
                 logging.warning("Aucun point de trace trouvé dans le fichier GPX")
                 return None
 
-            # Calculer la distance totale
-            distance = GPXParser._calculate_total_distance(points)
-
-            # Calculer la durée
-            duree = GPXParser._calculate_duration(points)
-
-            # Date de l'activité (premier point)
-            date_activite = points[0].get("time") if points else None
-
             return {
-                "distance": distance,
-                "duree": duree,
-                "date_activite": date_activite,
-                "points": points,
-                "nb_points": len(points),
+                "distance": ingestion.distance,
+                "duree": ingestion.duree_timedelta,
+                "date_activite": ingestion.date_debut,
+                "points": ingestion.track,
+                "nb_points": ingestion.nb_points,
             }
 
         except ET.ParseError as e:
@@ -73,103 +75,63 @@ class GPXParser:
             return None
 
     @staticmethod
-    def _extract_track_points(root) -> List[dict]:
-        """Extrait les points de trace du fichier GPX
-
-        Parameters
-        ----------
-        root : Element
-            Élément racine du XML
-
-        Returns
-        -------
-        list
-            Liste de dictionnaires contenant les données de chaque point
-        """
-        points = []
-
-        # Chercher dans les tracks
-        for trk in root.findall(".//gpx:trk", GPXParser.GPX_NS):
-            for trkseg in trk.findall(".//gpx:trkseg", GPXParser.GPX_NS):
-                for trkpt in trkseg.findall(".//gpx:trkpt", GPXParser.GPX_NS):
-                    point = GPXParser._parse_track_point(trkpt)
-                    if point:
-                        points.append(point)
-
-        # Si pas de tracks, chercher dans les routes
-        if not points:
-            for rte in root.findall(".//gpx:rte", GPXParser.GPX_NS):
-                for rtept in rte.findall(".//gpx:rtept", GPXParser.GPX_NS):
-                    point = GPXParser._parse_track_point(rtept)
-                    if point:
-                        points.append(point)
-
-        return points
+    def parse_gpx_stream(source) -> Optional[dict]:
+        """Parse un fichier GPX de façon incrémentale, à mémoire constante
 
-    @staticmethod
-    def _parse_track_point(trkpt) -> Optional[dict]:
-        """Parse un point de trace individuel
+        Le document est lu par blocs avec `GPXStreamReader`, comme pour
+        `parse_gpx_file`, mais les points sont cumulés au fil de la lecture au
+        lieu d'être conservés. Distance et durée suivent les mêmes règles que
+        le moteur d'ingestion (`utils.gpx_ingestion`).
 
         Parameters
         ----------
-        trkpt : Element
-            Élément XML du point de trace
+        source : str ou fichier binaire
+            Chemin vers le fichier GPX, ou objet fichier ouvert en lecture
 
         Returns
         -------
         dict ou None
-            Dictionnaire avec lat, lon, ele (optionnel), time (optionnel)
+            Mêmes clés que `parse_gpx_file` sans 'points', avec en plus
+            'denivele_positif', 'denivele_negatif' (en mètres) et 'bbox'
+            (lat_min, lon_min, lat_max, lon_max)
         """
-        try:
-            lat = float(trkpt.get("lat"))
-            lon = float(trkpt.get("lon"))
-
-            point = {"lat": lat, "lon": lon}
+        traces = _TraceAccumulator()
+        routes = _TraceAccumulator()
 
-            # Élévation (optionnel)
-            ele = trkpt.find("gpx:ele", GPXParser.GPX_NS)
-            if ele is not None and ele.text:
-                point["ele"] = float(ele.text)
-
-            # Temps (optionnel)
-            time = trkpt.find("gpx:time", GPXParser.GPX_NS)
-            if time is not None and time.text:
-                point["time"] = datetime.fromisoformat(time.text.replace("Z", "+00:00"))
+        try:
+            GPXStreamReader.read(source, traces=traces, routes=routes)
 
-            return point
+        except ET.ParseError as e:
+            logging.error(f"Erreur de parsing XML: {e}")
+            return None
+        except Exception as e:
+            logging.error(f"Erreur lors du parsing du fichier GPX: {e}")
+            return None
 
-        except (ValueError, AttributeError) as e:
-            logging.warning(f"Erreur lors du parsing d'un point: {e}")
+        # Les routes ne servent qu'en l'absence de trace
+        accumulateur = traces if len(traces) else routes
+        if not len(accumulateur):
+            logging.warning("Aucun point de trace trouvé dans le fichier GPX")
             return None
 
+        return accumulateur.resultat()
+
     @staticmethod
-    def _calculate_total_distance(points: List[dict]) -> float:
+    def _calculate_total_distance(points) -> float:
         """Calcule la distance totale en mètres à partir des points
 
         Parameters
         ----------
-        points : list
-            Liste des points avec lat, lon
+        points : Track ou list
+            Trace, ou liste des points avec lat, lon
 
         Returns
         -------
         float
             Distance totale en mètres
         """
-        if len(points) < 2:
-            return 0.0
-
-        total_distance = 0.0
-        for i in range(len(points) - 1):
-            dist = GPXParser._haversine_distance(
-                points[i]["lat"],
-                points[i]["lon"],
-                points[i + 1]["lat"],
-                points[i + 1]["lon"],
-            )
-            total_distance += dist
-
-        return total_distance
+        track = _as_track(points)
+        return float(track_metrics.segment_distances(track.lat, track.lon).sum())
 
     @staticmethod
     def _haversine_distance(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
@@ -187,9 +149,7 @@ class GPXParser:
         float
             Distance en mètres
         """
-        from math import atan2, cos, radians, sin, sqrt
-
-        R = 6371000  # Rayon de la Terre en mètres
+        R = track_metrics.RAYON_TERRE  # Rayon de la Terre en mètres
 
         lat1_rad = radians(lat1)
         lat2_rad = radians(lat2)
@@ -203,79 +163,344 @@ class GPXParser:
         return distance
 
     @staticmethod
-    def _calculate_duration(points: List[dict]) -> Optional[timedelta]:
+    def _calculate_duration(points) -> Optional[timedelta]:
         """Calcule la durée de l'activité à partir des timestamps
 
         Parameters
         ----------
-        points : list
-            Liste des points avec time
+        points : Track ou list
+            Trace, ou liste des points avec time
 
         Returns
         -------
         timedelta ou None
             Durée de l'activité
         """
-        points_with_time = [p for p in points if "time" in p]
+        track = _as_track(points)
+        temps = track.time[track.has_time]
 
-        if len(points_with_time) < 2:
+        if len(temps) < 2:
             return None
 
-        start_time = points_with_time[0]["time"]
-        end_time = points_with_time[-1]["time"]
-
-        return end_time - start_time
+        return timedelta(milliseconds=int(temps[-1] - temps[0]))
 
     @staticmethod
-    def get_elevation_gain(points: List[dict]) -> Tuple[float, float]:
+    def get_elevation_gain(points) -> Tuple[float, float]:
         """Calcule le dénivelé positif et négatif
 
         Parameters
         ----------
-        points : list
-            Liste des points avec ele
+        points : Track ou list
+            Trace, ou liste des points avec ele
 
         Returns
         -------
         tuple
             (dénivelé_positif, dénivelé_négatif) en mètres
         """
-        points_with_ele = [p for p in points if "ele" in p]
+        return track_metrics.elevation_gain(_as_track(points).ele)
+
+    @staticmethod
+    def compute_metrics(
+        lat: np.ndarray,
+        lon: np.ndarray,
+        ele: Optional[np.ndarray] = None,
+        time: Optional[np.ndarray] = None,
+    ) -> dict:
+        """Calcule distances, dénivelé, vitesses et durée sur des colonnes NumPy
+
+        Voir `utils.track_metrics.compute_metrics` pour le détail du résultat.
+
+        Parameters
+        ----------
+        lat, lon : np.ndarray
+            Coordonnées en degrés (float64)
+        ele : np.ndarray, optional
+            Élévations en mètres, NaN si absente
+        time : np.ndarray, optional
+            Millisecondes epoch (colonne `Track.time`), ou secondes epoch
+            float64 avec NaN si absent
+
+        Returns
+        -------
+        dict
+            Métriques de la trace
+        """
+        return track_metrics.compute_metrics(lat, lon, ele, time)
+
+
+def _as_track(points) -> Track:
+    """Accepte une Track ou l'ancienne liste de dictionnaires de points."""
+    return points if isinstance(points, Track) else Track.from_points(points)
+
+
+_NOMS_LOCAUX: Dict[str, str] = {}
+
+
+def _local_name(tag: str) -> str:
+    """Retire l'espace de noms d'une balise ElementTree ('{ns}trkpt' -> 'trkpt')."""
+    nom = _NOMS_LOCAUX.get(tag)
+    if nom is None:
+        nom = _NOMS_LOCAUX[tag] = tag.rsplit("}", 1)[-1]
+    return nom
+
+
+class _TraceAccumulator:
+    """Cumule les métriques d'une suite de points sans les conserver
+
+    Les points du segment courant passent par un tampon borné, traité par
+    blocs avec les noyaux de `track_metrics` (horodatages compris, décodés
+    en bloc) ; le dernier point d'un bloc est repris en tête du suivant pour
+    ne perdre aucune paire.
+    """
+
+    TAILLE_TAMPON = 4096
+
+    def __init__(self):
+        self.nb_points = 0
+        self.distance = 0.0
+        self.denivele_positif = 0.0
+        self.denivele_negatif = 0.0
+        self.duree = 0.0
+        self.date_activite = None
+        self.lat_min = self.lon_min = float("inf")
+        self.lat_max = self.lon_max = float("-inf")
+        self._tampon = TrackBuilder()
+        self._dernier_point = None
+        self._ele_precedente = None
+        self._temps_debut = []
+        self._temps_fin = []
+
+    def __len__(self) -> int:
+        return self.nb_points
+
+    def new_segment(self):
+        """Clôt le segment courant : aucune distance n'est comptée entre deux segments."""
+        self._vider()
+        self._dernier_point = None
+        self._cloturer_duree()
+
+    def add(self, lat: float, lon: float, ele: Optional[float], time: Optional[str]):
+        """Intègre un point ; `time` est l'horodatage ISO 8601, None si absent."""
+        self._tampon.add(lat, lon, ele, time)
+        self.nb_points += 1
+        if len(self._tampon) >= self.TAILLE_TAMPON:
+            self._vider()
+
+    def _vider(self):
+        """Traite le contenu du tampon."""
+        bloc, self._tampon = self._tampon.build(), TrackBuilder()
+        if not len(bloc):
+            return
+
+        lat, lon, ele = bloc.lat, bloc.lon, bloc.ele
+        if self._dernier_point is not None:
+            lat, lon, ele = (
+                np.insert(colonne, 0, valeur)
+                for colonne, valeur in zip((lat, lon, ele), self._dernier_point)
+            )
+        self.distance += float(track_metrics.gpxpy_distances(lat, lon, ele).sum())
+        self._dernier_point = (lat[-1], lon[-1], ele[-1])
+
+        self.lat_min = min(self.lat_min, float(bloc.lat.min()))
+        self.lat_max = max(self.lat_max, float(bloc.lat.max()))
+        self.lon_min = min(self.lon_min, float(bloc.lon.min()))
+        self.lon_max = max(self.lon_max, float(bloc.lon.max()))
+
+        elevations = bloc.ele[bloc.has_ele]
+        if elevations.size:
+            if self._ele_precedente is not None:
+                elevations = np.concatenate(([self._ele_precedente], elevations))
+            positif, negatif = track_metrics.elevation_gain(elevations)
+            self.denivele_positif += positif
+            self.denivele_negatif += negatif
+            self._ele_precedente = float(elevations[-1])
+
+        if self.date_activite is None:
+            self.date_activite = bloc.first_datetime()
+        # Durée d'un segment : deux premiers et deux derniers horodatages
+        temps = bloc.time.tolist()
+        self._temps_debut = (self._temps_debut + temps[:2])[:2]
+        self._temps_fin = (self._temps_fin + temps[-2:])[-2:]
+
+    def _cloturer_duree(self):
+        """Ajoute la durée du segment courant, selon la règle de gpxpy."""
+        debut, fin = self._temps_debut, self._temps_fin
+        self._temps_debut, self._temps_fin = [], []
+        if len(debut) < 2 or self.duree is None:
+            return
+        premier = debut[0] if debut[0] != TEMPS_ABSENT else debut[1]
+        dernier = fin[-1] if fin[-1] != TEMPS_ABSENT else fin[-2]
+        if TEMPS_ABSENT in (premier, dernier) or dernier < premier:
+            self.duree = None
+        else:
+            self.duree += (dernier - premier) / 1000
+
+    def resultat(self) -> dict:
+        """Renvoie les cumuls au format de `GPXParser.parse_gpx_file`."""
+        self.new_segment()
+
+        return {
+            "distance": self.distance,
+            "duree": timedelta(seconds=self.duree) if self.duree else None,
+            "date_activite": self.date_activite,
+            "nb_points": self.nb_points,
+            "denivele_positif": self.denivele_positif,
+            "denivele_negatif": self.denivele_negatif,
+            "bbox": (self.lat_min, self.lon_min, self.lat_max, self.lon_max),
+        }
+
+
+class GPXStreamReader:
+    """Lecture d'un document GPX en une seule passe, par blocs
+
+    Les octets sont poussés dans un `XMLParser` dont ce lecteur est la cible :
+    aucun arbre XML n'est construit, chaque point est rangé dans une `Track`
+    dès sa balise fermante. Les points de trace (<trkpt>) et de route
+    (<rtept>) sont séparés, et le nom et le type de la première trace sont
+    relevés au passage.
+    """
+
+    TAILLE_BLOC = 64 * 1024
+
+    def __init__(self, traces=None, routes=None):
+        self._parser = ET.XMLParser(target=self)
+        # Destinataires des points : TrackBuilder par défaut, ou tout objet
+        # exposant add() et new_segment() (cumul sans conservation des points)
+        self._traces = traces if traces is not None else TrackBuilder()
+        self._routes = routes if routes is not None else TrackBuilder()
+        self._nb_traces = 0
+        self._profondeur = 0
+        self._profondeur_trace = None
+        self._point = None
+        self._texte = None
+        self.nom = None
+        self.type = None
+
+    @classmethod
+    def read(cls, source, traces=None, routes=None) -> "GPXStreamReader":
+        """Lit entièrement un contenu GPX (bytes, chemin ou fichier binaire)."""
+        reader = cls(traces, routes)
+        if isinstance(source, (bytes, bytearray, memoryview)):
+            vue = memoryview(source)
+            for debut in range(0, len(vue), cls.TAILLE_BLOC):
+                reader.feed(vue[debut : debut + cls.TAILLE_BLOC])
+        elif isinstance(source, str):
+            with open(source, "rb") as fichier:
+                reader.feed_file(fichier)
+        else:
+            reader.feed_file(source)
+        return reader.finish()
+
+    def feed_file(self, fichier):
+        """Pousse le contenu d'un fichier binaire, bloc par bloc."""
+        while bloc := fichier.read(self.TAILLE_BLOC):
+            self.feed(bloc)
+
+    def feed(self, data: bytes):
+        """Pousse un bloc d'octets dans le parseur."""
+        self._parser.feed(bytes(data))
+
+    def finish(self) -> "GPXStreamReader":
+        """Termine la lecture (lève ET.ParseError si le document est incomplet)."""
+        self._parser.close()
+        return self
+
+    @property
+    def track(self) -> Track:
+        """Points des traces (<trk>), découpés en segments."""
+        return self._traces.build()
+
+    @property
+    def route(self) -> Track:
+        """Points des routes (<rte>)."""
+        return self._routes.build()
+
+    # --- Interface cible de xml.etree.ElementTree.XMLParser ---
+
+    def start(self, tag: str, attrib: dict):
+        self._profondeur += 1
+        tag = _local_name(tag)
+        if tag in ("trkpt", "rtept"):
+            self._point = [attrib.get("lat"), attrib.get("lon"), None, None]
+        elif tag in ("ele", "time") and self._point is not None:
+            self._texte = []
+        elif tag == "trk":
+            self._nb_traces += 1
+            self._profondeur_trace = self._profondeur
+        elif tag == "trkseg":
+            self._traces.new_segment()
+        elif tag in ("name", "type") and self._nb_traces == 1 and self._point is None:
+            # Seuls les enfants directs de la première trace nous intéressent
+            if self._profondeur == (self._profondeur_trace or 0) + 1:
+                self._texte = []
+
+    def data(self, data: str):
+        if self._texte is not None:
+            self._texte.append(data)
+
+    def end(self, tag: str):
+        self._profondeur -= 1
+        tag = _local_name(tag)
+        if tag in ("trkpt", "rtept"):
+            valeurs = self._point_valide(self._point)
+            if valeurs:
+                (self._traces if tag == "trkpt" else self._routes).add(*valeurs)
+            self._point = None
+        elif self._texte is not None and tag in ("ele", "time", "name", "type"):
+            texte = "".join(self._texte).strip() or None
+            self._texte = None
+            if self._point is not None:
+                self._point[2 if tag == "ele" else 3] = texte
+            elif tag == "name" and self.nom is None:
+                self.nom = texte
+            elif tag == "type" and self.type is None:
+                self.type = texte
+
+    def close(self):
+        return None
+
+    @staticmethod
+    def _point_valide(point):
+        """Convertit (lat, lon, ele) textuels ; None si le point est invalide.
+
+        L'horodatage reste textuel : il est décodé en bloc par le destinataire.
+        """
+        lat, lon, ele, time = point
+        try:
+            return (float(lat), float(lon), float(ele) if ele is not None else None, time)
+        except (TypeError, ValueError) as e:
+            logging.warning(f"Erreur lors du parsing d'un point: {e}")
+            return None
 
-        if len(points_with_ele) < 2:
-            return 0.0, 0.0
 
-        denivele_positif = 0.0
-        denivele_negatif = 0.0
+def parse_strava_gpx(content: bytes, backend: Optional[str] = None) -> Dict[str, Any]:
+    """Parse un fichier GPX et renvoie les donnees principales en km/h.
 
-        for i in range(len(points_with_ele) - 1):
-            diff = points_with_ele[i + 1]["ele"] - points_with_ele[i]["ele"]
-            if diff > 0:
-                denivele_positif += diff
-            else:
-                denivele_negatif += abs(diff)
+    Delegue au moteur d'ingestion (`utils.gpx_ingestion`), backend rapide
+    par defaut.
+    """
+    from utils.gpx_ingestion import ingest_gpx
 
-        return denivele_positif, denivele_negatif
+    return ingest_gpx(content, backend).as_strava_dict()
 
 
-def parse_strava_gpx(content: bytes) -> Dict[str, Any]:
-    """Parse un fichier GPX et renvoie les donnees principales en km/h."""
-    gpx = gpxpy.parse(content)
-    distance_m = gpx.length_3d() or 0.0
-    duration_s = gpx.get_duration() or 0.0
-    moving = gpx.get_moving_data()
-    moving_time_s = moving.moving_time if moving and moving.moving_time else 0.0
-    moving_distance_m = moving.moving_distance if moving and moving.moving_distance else 0.0
+def _strava_summary(nom: Optional[str], type_: Optional[str], resume: dict) -> Dict[str, Any]:
+    """Met en forme le resume d'une trace pour /activities/upload-gpx."""
+    distance_m = resume["distance"] or 0.0
+    duration_s = resume["duree"] or 0.0
+    moving_time_s = resume["temps_mouvement"] or 0.0
+    moving_distance_m = resume["distance_mouvement"] or 0.0
 
     distance_km = round(distance_m / 1000, 3)
     duree_heures = round(duration_s / 3600, 3)
     temps_mouvement_heures = round(moving_time_s / 3600, 3)
     vitesse_moyenne = (moving_distance_m / moving_time_s) * 3.6 if moving_time_s > 0 else 0.0
-    vitesse_max = moving.max_speed * 3.6 if moving and moving.max_speed else 0.0
+    vitesse_max = resume["vitesse_max"] * 3.6 if resume["vitesse_max"] else 0.0
 
     return {
-        "nom": gpx.tracks[0].name if gpx.tracks else None,
-        "type": gpx.tracks[0].type if gpx.tracks else None,
+        "nom": nom,
+        "type": type_,
         "distance_km": distance_km,
         "distance totale (km)": distance_km,
         "duree_heures": duree_heures,
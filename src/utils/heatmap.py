@@ -0,0 +1,386 @@
+"""
+Heatmap des traces : tuiles PNG (256 × 256, projection Web Mercator) où
+chaque pixel est coloré selon le nombre de points GPS qu'il contient
+
+Usage (depuis la racine du projet), pour reconstruire toutes les couches :
+    python src/utils/heatmap.py [--zoom-max 16]
+
+Les comptes sont calculés en bloc sur les colonnes lat/lon : les pixels de
+tous les points au zoom maximal sont dénombrés une fois (`np.unique`), puis
+chaque zoom inférieur s'obtient en regroupant les pixels déjà comptés
+(coordonnées divisées par deux, `np.bincount`), sans revenir aux points.
+
+Chaque tuile non vide est conservée sur disque sous forme de comptes creux
+(pixel, nombre de points, nombre d'utilisateurs) ; son image PNG en est
+tirée à la première demande, puis gardée à côté. Une nouvelle activité ajoute ses points aux
+comptes des tuiles qu'elle traverse et supprime leurs images. Ces
+lectures-écritures se font sous un verrou de fichier (`flock`) partagé par
+tous les processus qui utilisent le même dossier : plusieurs workers uvicorn
+ne perdent pas leurs ajouts.
+"""
+
+import argparse
+import io
+import os
+import shutil
+import struct
+import sys
+import tempfile
+import threading
+import zlib
+from contextlib import contextmanager
+from typing import Iterable, Iterator, Optional, Tuple
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows : le verrou ne vaut que pour le processus courant
+    fcntl = None
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.abspath(os.path.join(current_dir, "..")))
+
+TAILLE_TUILE = 256
+ZOOM_MAX = 16
+
+# Latitude limite de la projection Web Mercator
+LATITUDE_MAX = 85.05112878
+
+# Comptes creux d'une tuile : indice du pixel (ligne × 256 + colonne), nombre de
+# points et nombre d'utilisateurs distincts qui y sont passés
+COMPTES = np.dtype([("pixel", "<u2"), ("compte", "<u4"), ("utilisateurs", "<u4")])
+
+# Palette : transparent sans point, puis rouge, jaune et blanc aux plus fréquentés
+_NIVEAUX = np.linspace(0.0, 1.0, 256)
+PALETTE = np.stack(
+    [
+        np.interp(_NIVEAUX, [0, 0.4, 1], [180, 255, 255]),
+        np.interp(_NIVEAUX, [0, 0.4, 0.8, 1], [0, 40, 220, 255]),
+        np.interp(_NIVEAUX, [0, 0.8, 1], [0, 0, 230]),
+        np.interp(_NIVEAUX, [0, 0.05, 0.6, 1], [0, 110, 230, 255]),
+    ],
+    axis=1,
+).astype(np.uint8)
+PALETTE[0] = 0
+
+
+def coordonnees_normalisees(lat, lon) -> Tuple[np.ndarray, np.ndarray]:
+    """Position Web Mercator de chaque point, dans [0, 1) sur les deux axes."""
+    phi = np.radians(np.clip(np.asarray(lat, dtype=float), -LATITUDE_MAX, LATITUDE_MAX))
+    u = (np.asarray(lon, dtype=float) + 180.0) / 360.0
+    v = (1.0 - np.log(np.tan(phi) + 1.0 / np.cos(phi)) / np.pi) / 2.0
+    borne = np.nextafter(1.0, 0.0)
+    return np.clip(u, 0.0, borne), np.clip(v, 0.0, borne)
+
+
+def pyramide_comptes(
+    lat, lon, zoom_max: int = ZOOM_MAX, zoom_min: int = 0
+) -> Iterator[Tuple[int, np.ndarray, np.ndarray, np.ndarray]]:
+    """Nombre de points par pixel, du zoom maximal au zoom minimal
+
+    Yields
+    ------
+    tuple
+        (zoom, px, py, comptes) : coordonnées globales (en pixels, à ce zoom)
+        des pixels non vides et leur nombre de points
+    """
+    u, v = coordonnees_normalisees(lat, lon)
+    echelle = float(TAILLE_TUILE << zoom_max)
+    px = (u * echelle).astype(np.int64)
+    py = (v * echelle).astype(np.int64)
+    cles, comptes = np.unique((px << 32) | py, return_counts=True)
+    for zoom in range(zoom_max, zoom_min - 1, -1):
+        if zoom < zoom_max:
+            # Quatre pixels du zoom supérieur forment un pixel de ce zoom
+            cles, inverse = np.unique(
+                ((cles >> 33) << 32) | ((cles & 0xFFFFFFFF) >> 1), return_inverse=True
+            )
+            comptes = np.bincount(inverse, weights=comptes).astype(np.int64)
+        yield zoom, cles >> 32, cles & 0xFFFFFFFF, comptes
+
+
+def tuiles(
+    px: np.ndarray, py: np.ndarray, comptes: np.ndarray
+) -> Iterator[Tuple[int, int, np.ndarray]]:
+    """Regroupe des pixels comptés par tuile : (x, y, comptes creux)."""
+    cles = ((px >> 8) << 32) | (py >> 8)
+    ordre = np.argsort(cles, kind="stable")
+    cles, px, py, comptes = cles[ordre], px[ordre], py[ordre], comptes[ordre]
+    bornes = np.concatenate(([0], np.flatnonzero(np.diff(cles)) + 1, [len(cles)]))
+    for debut, fin in zip(bornes[:-1], bornes[1:]):
+        donnees = np.empty(fin - debut, dtype=COMPTES)
+        donnees["pixel"] = ((py[debut:fin] & 0xFF) << 8) | (px[debut:fin] & 0xFF)
+        donnees["compte"] = comptes[debut:fin]
+        donnees["utilisateurs"] = 0
+        yield int(cles[debut] >> 32), int(cles[debut] & 0xFFFFFFFF), donnees
+
+
+def encoder_png(rgba: np.ndarray) -> bytes:
+    """Image PNG (RGBA 8 bits, sans filtre) d'un tableau hauteur × largeur × 4."""
+    hauteur, largeur, _ = rgba.shape
+    lignes = np.zeros((hauteur, largeur * 4 + 1), dtype=np.uint8)
+    lignes[:, 1:] = rgba.reshape(hauteur, -1)
+
+    def bloc(type_: bytes, donnees: bytes) -> bytes:
+        crc = zlib.crc32(type_ + donnees)
+        return struct.pack(">I", len(donnees)) + type_ + donnees + struct.pack(">I", crc)
+
+    entete = struct.pack(">IIBBBBB", largeur, hauteur, 8, 6, 0, 0, 0)
+    return (
+        b"\x89PNG\r\n\x1a\n"
+        + bloc(b"IHDR", entete)
+        + bloc(b"IDAT", zlib.compress(lignes.tobytes(), 6))
+        + bloc(b"IEND", b"")
+    )
+
+
+def rendre_tuile(comptes: np.ndarray, utilisateurs_min: int = 0) -> bytes:
+    """Image PNG d'une tuile à partir de ses comptes creux
+
+    L'intensité suit le logarithme du nombre de points, saturée au 99e
+    centile de la tuile pour qu'un carrefour très fréquenté n'éteigne pas
+    le reste. Les pixels parcourus par moins de `utilisateurs_min`
+    utilisateurs restent transparents.
+    """
+    comptes = comptes[comptes["utilisateurs"] >= utilisateurs_min]
+    dense = np.zeros(TAILLE_TUILE * TAILLE_TUILE)
+    dense[comptes["pixel"]] = comptes["compte"]
+    plafond = max(float(np.percentile(comptes["compte"], 99)), 2.0) if len(comptes) else 2.0
+    intensite = np.clip(np.log1p(dense) / np.log1p(plafond), 0.0, 1.0)
+    niveaux = np.ceil(intensite * 255).astype(np.uint8)
+    return encoder_png(PALETTE[niveaux].reshape(TAILLE_TUILE, TAILLE_TUILE, 4))
+
+
+TUILE_VIDE = encoder_png(np.zeros((TAILLE_TUILE, TAILLE_TUILE, 4), dtype=np.uint8))
+
+
+def tuile_valide(z: int, x: int, y: int, zoom_max: int = ZOOM_MAX) -> bool:
+    """Vrai si (z, x, y) désigne une tuile existante jusqu'au zoom maximal."""
+    return 0 <= z <= zoom_max and 0 <= x < (1 << z) and 0 <= y < (1 << z)
+
+
+_verrou_processus = threading.Lock()
+
+
+@contextmanager
+def verrou_fichier(chemin: str) -> Iterator[None]:
+    """Verrou exclusif sur `chemin`, partagé par les processus (`flock`)
+
+    Chaque appel ouvre son propre descripteur : le verrou sépare aussi les
+    threads d'un même processus. Sans `fcntl`, il se limite au processus.
+    """
+    if fcntl is None:
+        with _verrou_processus:
+            yield
+        return
+    os.makedirs(os.path.dirname(chemin) or ".", exist_ok=True)
+    with open(chemin, "a") as fichier:
+        fcntl.flock(fichier, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(fichier, fcntl.LOCK_UN)
+
+
+class CacheHeatmap:
+    """Tuiles de heatmap sur disque, par couche (globale ou par utilisateur)
+
+    Disposition : ``<dossier>/<couche>/<z>/<x>/<y>.npy`` (comptes creux) et
+    ``<y>.png`` (image, recréée après chaque invalidation). Les modifications
+    se font sous le verrou ``<dossier>.verrou``.
+
+    Une couche globale reçoit les points de chaque couche d'utilisateur
+    (paramètre `globale`) : un pixel y compte un utilisateur de plus quand il
+    apparaît dans la couche de cet utilisateur.
+    """
+
+    def __init__(self, dossier: str, zoom_max: int = ZOOM_MAX):
+        self.dossier = dossier
+        self.zoom_max = zoom_max
+
+    def _chemin(self, couche: str, z: int, x: int, y: int, extension: str) -> str:
+        return os.path.join(self.dossier, couche, str(z), str(x), f"{y}.{extension}")
+
+    def verrou(self):
+        """Verrou du dossier, à côté de lui pour ne pas se mêler aux couches."""
+        return verrou_fichier(f"{os.path.normpath(self.dossier)}.verrou")
+
+    def comptes(self, couche: str, z: int, x: int, y: int) -> Optional[np.ndarray]:
+        """Comptes creux d'une tuile, None si aucun point n'y tombe."""
+        chemin = self._chemin(couche, z, x, y, "npy")
+        if not os.path.exists(chemin):
+            return None
+        comptes = np.load(chemin)
+        if comptes.dtype != COMPTES:
+            # Tuile écrite sans le nombre d'utilisateurs : masquée jusqu'à la
+            # prochaine reconstruction
+            anciens, comptes = comptes, np.zeros(len(comptes), dtype=COMPTES)
+            comptes["pixel"], comptes["compte"] = anciens["pixel"], anciens["compte"]
+        return comptes
+
+    def png(self, couche: str, z: int, x: int, y: int, utilisateurs_min: int = 0) -> bytes:
+        """Image PNG d'une tuile, rendue et gardée si besoin ; TUILE_VIDE sans point.
+
+        `utilisateurs_min` doit rester le même pour une couche donnée : l'image
+        gardée en dépend.
+        """
+        chemin = self._chemin(couche, z, x, y, "png")
+        try:
+            with open(chemin, "rb") as fichier:
+                return fichier.read()
+        except FileNotFoundError:
+            pass
+        # Sous le verrou : une image rendue ne peut pas survivre à l'ajout
+        # qui invalide ses comptes
+        with self.verrou():
+            comptes = self.comptes(couche, z, x, y)
+            if comptes is None:
+                return TUILE_VIDE
+            image = rendre_tuile(comptes, utilisateurs_min)
+            _ecrire(chemin, image)
+        return image
+
+    def ajouter(self, couche: str, lat, lon, globale: Optional[str] = None) -> int:
+        """Ajoute des points à une couche (et à la couche `globale`) et invalide
+        les images des tuiles touchées ; renvoie le nombre de tuiles mises à jour."""
+        if not len(lat):
+            return 0
+        with self.verrou():
+            return self._ajouter(couche, lat, lon, globale)
+
+    def _ajouter(self, couche: str, lat, lon, globale: Optional[str] = None) -> int:
+        nombre = 0
+        for zoom, px, py, comptes in pyramide_comptes(lat, lon, self.zoom_max):
+            for x, y, nouveaux in tuiles(px, py, comptes):
+                anciens = self.comptes(couche, zoom, x, y)
+                # Pixels absents de la couche : un utilisateur de plus
+                if anciens is None:
+                    nouveaux["utilisateurs"] = 1
+                else:
+                    nouveaux["utilisateurs"] = ~np.isin(nouveaux["pixel"], anciens["pixel"])
+                self._fusionner_tuile(couche, zoom, x, y, nouveaux, anciens)
+                nombre += 1
+                if globale is not None:
+                    self._fusionner_tuile(globale, zoom, x, y, nouveaux)
+                    nombre += 1
+        return nombre
+
+    def _fusionner_tuile(
+        self, couche: str, z: int, x: int, y: int, nouveaux: np.ndarray, anciens=None
+    ):
+        """Ajoute des comptes à une tuile (dont les `anciens`, s'ils sont déjà lus)
+        et supprime son image."""
+        if anciens is None:
+            anciens = self.comptes(couche, z, x, y)
+        if anciens is not None:
+            nouveaux = _fusionner(anciens, nouveaux)
+        _ecrire(self._chemin(couche, z, x, y, "npy"), _npy(nouveaux))
+        image = self._chemin(couche, z, x, y, "png")
+        if os.path.exists(image):
+            os.remove(image)
+
+    def reconstruire(
+        self, lots: Iterable[Tuple[str, np.ndarray, np.ndarray]], globale: Optional[str] = None
+    ) -> int:
+        """Remplace toutes les couches par les tuiles des lots de points fournis
+
+        Chaque lot (couche, lat, lon) est compté à part puis fusionné aux tuiles
+        déjà construites, dans un dossier provisoire : la mémoire dépend de la
+        taille d'un lot, pas du nombre total de points. Avec `globale`, chaque
+        lot compte aussi pour cette couche. Les couches construites remplacent
+        ensuite les anciennes ; celles qui ne reçoivent plus aucun point
+        disparaissent.
+
+        Le verrou est tenu du début à la fin : un ajout concurrent attend la
+        nouvelle couche au lieu d'être perdu avec l'ancienne.
+
+        Returns
+        -------
+        int
+            Nombre de tuiles de la nouvelle pyramide
+        """
+        os.makedirs(self.dossier, exist_ok=True)
+        with self.verrou():
+            provisoire = tempfile.mkdtemp(prefix=".reconstruction.", dir=self.dossier)
+            anciennes = tempfile.mkdtemp(prefix=".anciennes.", dir=self.dossier)
+            try:
+                cache = CacheHeatmap(provisoire, self.zoom_max)
+                for couche, lat, lon in lots:
+                    if len(lat):
+                        cache._ajouter(couche, lat, lon, globale)
+                nombre = sum(
+                    nom.endswith(".npy")
+                    for _, _, fichiers in os.walk(provisoire)
+                    for nom in fichiers
+                )
+                # Anciennes couches (et restes d'une reconstruction interrompue)
+                # mises de côté, puis nouvelles couches mises en place
+                for nom in os.listdir(self.dossier):
+                    if nom not in (os.path.basename(provisoire), os.path.basename(anciennes)):
+                        os.rename(os.path.join(self.dossier, nom), os.path.join(anciennes, nom))
+                for nom in os.listdir(provisoire):
+                    os.rename(os.path.join(provisoire, nom), os.path.join(self.dossier, nom))
+            finally:
+                shutil.rmtree(provisoire, ignore_errors=True)
+        shutil.rmtree(anciennes, ignore_errors=True)
+        return nombre
+
+
+def _fusionner(anciens: np.ndarray, nouveaux: np.ndarray) -> np.ndarray:
+    """Somme de deux comptes creux d'une même tuile."""
+    pixels = np.concatenate((anciens["pixel"], nouveaux["pixel"]))
+
+    def somme(champ: str) -> np.ndarray:
+        return np.bincount(
+            pixels,
+            weights=np.concatenate((anciens[champ], nouveaux[champ])),
+            minlength=TAILLE_TUILE * TAILLE_TUILE,
+        )
+
+    dense = somme("compte")
+    pixels_non_vides = np.flatnonzero(dense)
+    resultat = np.empty(len(pixels_non_vides), dtype=COMPTES)
+    resultat["pixel"] = pixels_non_vides
+    resultat["compte"] = dense[pixels_non_vides]
+    resultat["utilisateurs"] = somme("utilisateurs")[pixels_non_vides]
+    return resultat
+
+
+def _npy(tableau: np.ndarray) -> bytes:
+    """Contenu d'un fichier .npy."""
+    tampon = io.BytesIO()
+    np.save(tampon, tableau)
+    return tampon.getvalue()
+
+
+def _ecrire(chemin: str, contenu: bytes):
+    """Écrit un fichier d'un seul coup (fichier temporaire puis os.replace)."""
+    os.makedirs(os.path.dirname(chemin), exist_ok=True)
+    descripteur, provisoire = tempfile.mkstemp(dir=os.path.dirname(chemin))
+    try:
+        with os.fdopen(descripteur, "wb") as fichier:
+            fichier.write(contenu)
+        os.replace(provisoire, chemin)
+    except BaseException:
+        os.remove(provisoire)
+        raise
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--zoom-max", type=int, default=None, help="zoom le plus fin généré")
+    parser.add_argument("--lot", type=int, default=500, help="traces lues par aller-retour")
+    args = parser.parse_args()
+
+    from service.heatmap_service import HeatmapService
+
+    service = HeatmapService()
+    if args.zoom_max is not None:
+        service.cache.zoom_max = args.zoom_max
+    nb_points, nb_tuiles = service.reconstruire(taille_lot=args.lot)
+    print(f"{nb_points} points, {nb_tuiles} tuiles générées dans {service.cache.dossier}")
+
+
+if __name__ == "__main__":
+    main()
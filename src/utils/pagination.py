@@ -0,0 +1,35 @@
+"""
+Curseurs de pagination par clé (keyset)
+
+Une page s'arrête sur une activité ; la suivante reprend strictement avant
+elle dans l'ordre (date_activite, id_activite) décroissant. Le curseur donné
+au client encode ce couple en base64 URL-safe : le client le renvoie tel quel,
+sans en connaître le contenu.
+"""
+
+import base64
+import binascii
+from datetime import datetime
+from typing import Tuple
+
+
+def encoder_curseur(date_activite: datetime, id_activite: int) -> str:
+    """Curseur opaque désignant la position (date_activite, id_activite)."""
+    brut = f"{date_activite.isoformat()}|{id_activite}".encode()
+    return base64.urlsafe_b64encode(brut).decode().rstrip("=")
+
+
+def decoder_curseur(curseur: str) -> Tuple[datetime, int]:
+    """Position (date_activite, id_activite) d'un curseur
+
+    Raises
+    ------
+    ValueError
+        Si le curseur n'a pas été produit par `encoder_curseur`
+    """
+    try:
+        brut = base64.urlsafe_b64decode(curseur + "=" * (-len(curseur) % 4)).decode()
+        date_activite, id_activite = brut.split("|")
+        return datetime.fromisoformat(date_activite), int(id_activite)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise ValueError("Curseur invalide")
@@ -0,0 +1,239 @@
+"""
+Détection des passages d'une trace sur des segments (portions de parcours nommées)
+
+Comparer chaque nouvelle trace à chaque segment, point par point, coûterait
+O(segments × points). Un index réduit d'abord les candidats, en bloc :
+
+1. grille : le départ et l'arrivée de chaque segment sont rangés dans une
+   cellule de TAILLE_CELLULE degrés ; un segment n'est candidat que si la
+   trace passe dans (ou à côté de) ses deux cellules ;
+2. boîte englobante : le segment doit tenir dans celle de la trace.
+
+Chaque candidat est ensuite vérifié, en colonnes NumPy : la trace doit passer
+à moins de RAYON_EXTREMITE mètres du départ puis de l'arrivée, et la portion
+comprise entre les deux doit rester dans un couloir de LARGEUR_COULOIR mètres
+autour du segment, et le couvrir entièrement (distance de Hausdorff discrète,
+dans les deux sens, sur le segment rééchantillonné tous les PAS_ECHANTILLON
+mètres).
+"""
+
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from utils import track_metrics
+from utils.track import Track
+
+# Côté d'une cellule de la grille, en degrés (environ 550 m en latitude)
+TAILLE_CELLULE = 0.005
+
+# Distance maximale (m) entre la trace et le départ ou l'arrivée du segment
+RAYON_EXTREMITE = 30.0
+
+# Écart maximal (m) entre la trace et le segment sur tout le parcours
+LARGEUR_COULOIR = 35.0
+
+# Espacement (m) des points du segment lors de la vérification
+PAS_ECHANTILLON = 10.0
+
+# Nombre maximal de points de la portion de trace comparés au segment
+POINTS_PORTION_MAX = 1000
+
+# Rapport admis entre la longueur parcourue et celle du segment
+RAPPORT_LONGUEUR = (0.8, 1.25)
+
+METRES_PAR_DEGRE = np.pi / 180 * track_metrics.RAYON_TERRE
+
+# Décalage des indices de cellule, pour des clés positives
+_DECALAGE = 1 << 20
+_VOISINS = np.array([dy * (1 << 32) + dx for dy in (-1, 0, 1) for dx in (-1, 0, 1)])
+
+
+def cles_cellules(lat, lon) -> np.ndarray:
+    """Clé (int64) de la cellule de grille de chaque point."""
+    ligne = np.floor(np.asarray(lat) / TAILLE_CELLULE).astype(np.int64) + _DECALAGE
+    colonne = np.floor(np.asarray(lon) / TAILLE_CELLULE).astype(np.int64) + _DECALAGE
+    return ligne * (1 << 32) + colonne
+
+
+class IndexSegments:
+    """Index spatial des segments, pour la détection à l'ingestion
+
+    Parameters
+    ----------
+    segments : iterable
+        Tuples (id_segment, sport, lat, lon) décrivant chaque segment
+    """
+
+    def __init__(self, segments: Iterable[Tuple[int, str, Sequence[float], Sequence[float]]] = ()):
+        self.ids = np.zeros(0, dtype=np.int64)
+        self.sports = np.zeros(0, dtype=object)
+        self._departs = np.zeros(0, dtype=np.int64)
+        self._arrivees = np.zeros(0, dtype=np.int64)
+        self._boites = np.zeros((0, 4))
+        self._formes = []
+        self.ajouter_tous(segments)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def ajouter(self, id_segment: int, sport: str, lat, lon):
+        """Ajoute un segment à l'index."""
+        self.ajouter_tous([(id_segment, sport, lat, lon)])
+
+    def ajouter_tous(self, segments: Iterable[Tuple[int, str, Sequence[float], Sequence[float]]]):
+        """Ajoute des segments à l'index, en un seul agrandissement des colonnes."""
+        ids, sports, extremites, boites = [], [], [], []
+        for id_segment, sport, lat, lon in segments:
+            forme = _reechantillonner(np.asarray(lat, float), np.asarray(lon, float))
+            ids.append(id_segment)
+            sports.append(sport)
+            extremites.append((forme[0][0], forme[1][0], forme[0][-1], forme[1][-1]))
+            boites.append((forme[0].min(), forme[0].max(), forme[1].min(), forme[1].max()))
+            self._formes.append(forme)
+        if not ids:
+            return
+        extremites = np.array(extremites)
+        self.ids = np.append(self.ids, ids)
+        self.sports = np.append(self.sports, np.array(sports, dtype=object))
+        self._departs = np.append(self._departs, cles_cellules(extremites[:, 0], extremites[:, 1]))
+        self._arrivees = np.append(
+            self._arrivees, cles_cellules(extremites[:, 2], extremites[:, 3])
+        )
+        self._boites = np.vstack((self._boites, boites))
+
+    def retirer(self, id_segment: int):
+        """Retire un segment de l'index (sans effet s'il n'y figure pas)."""
+        garder = self.ids != id_segment
+        if garder.all():
+            return
+        self._formes = [forme for forme, g in zip(self._formes, garder) if g]
+        self.ids, self.sports = self.ids[garder], self.sports[garder]
+        self._departs, self._arrivees = self._departs[garder], self._arrivees[garder]
+        self._boites = self._boites[garder]
+
+    def candidats(self, track: Track, sport: Optional[str] = None) -> np.ndarray:
+        """Positions (dans l'index) des segments que la trace peut parcourir."""
+        if not len(self) or not len(track):
+            return np.zeros(0, dtype=np.int64)
+        # Cellules traversées par la trace, et leurs voisines
+        cellules = np.unique(cles_cellules(track.lat, track.lon))
+        cellules = np.unique((cellules[:, None] + _VOISINS).ravel())
+
+        marge = RAYON_EXTREMITE / METRES_PAR_DEGRE
+        echelle = max(np.cos(np.radians(np.abs(track.lat).max())), 0.01)
+        garder = (
+            np.isin(self._departs, cellules)
+            & np.isin(self._arrivees, cellules)
+            & (self._boites[:, 0] >= track.lat.min() - marge)
+            & (self._boites[:, 1] <= track.lat.max() + marge)
+            & (self._boites[:, 2] >= track.lon.min() - marge / echelle)
+            & (self._boites[:, 3] <= track.lon.max() + marge / echelle)
+        )
+        if sport is not None:
+            garder &= self.sports == sport
+        return np.flatnonzero(garder)
+
+    def passages(self, track: Track, sport: Optional[str] = None) -> List[Tuple[int, int, int]]:
+        """Passages (id_segment, indice de début, indice de fin) de la trace sur les
+        segments de l'index, un par tour."""
+        resultat = []
+        distance_cumulee = None
+        for position in self.candidats(track, sport):
+            if distance_cumulee is None:
+                distance_cumulee = np.concatenate(
+                    ([0.0], np.cumsum(track_metrics.segment_distances(track.lat, track.lon)))
+                )
+            id_segment = int(self.ids[position])
+            for debut, fin in _parcours(track, distance_cumulee, self._formes[position]):
+                resultat.append((id_segment, debut, fin))
+        return resultat
+
+
+def _reechantillonner(lat: np.ndarray, lon: np.ndarray):
+    """Points du segment tous les PAS_ECHANTILLON mètres, et sa longueur."""
+    distance_cumulee = np.concatenate(([0.0], np.cumsum(track_metrics.segment_distances(lat, lon))))
+    longueur = float(distance_cumulee[-1]) if len(lat) else 0.0
+    nombre = max(int(np.ceil(longueur / PAS_ECHANTILLON)) + 1, 2)
+    positions = np.linspace(0.0, longueur, nombre)
+    return (
+        np.interp(positions, distance_cumulee, lat),
+        np.interp(positions, distance_cumulee, lon),
+        longueur,
+    )
+
+
+def _metres(lat, lon, lat0: float, lon0: float):
+    """Projection équirectangulaire locale, en mètres autour de (lat0, lon0)."""
+    y = (np.asarray(lat) - lat0) * METRES_PAR_DEGRE
+    x = (np.asarray(lon) - lon0) * METRES_PAR_DEGRE * np.cos(np.radians(lat0))
+    return x, y
+
+
+def _passages_proches(x: np.ndarray, y: np.ndarray) -> np.ndarray:
+    """Indice du point le plus proche de l'origine, pour chaque passage à moins
+    de RAYON_EXTREMITE mètres (suite de points consécutifs)."""
+    carres = x * x + y * y
+    proches = np.flatnonzero(carres <= RAYON_EXTREMITE**2)
+    if not proches.size:
+        return proches
+    debuts = np.concatenate(([0], np.flatnonzero(np.diff(proches) > 1) + 1))
+    fins = np.append(debuts[1:], proches.size)
+    return np.array([proches[d + np.argmin(carres[proches[d:f]])] for d, f in zip(debuts, fins)])
+
+
+def _parcours(track: Track, distance_cumulee: np.ndarray, forme) -> List[Tuple[int, int]]:
+    """Passages (début, fin) de la trace sur un segment déjà rééchantillonné."""
+    seg_lat, seg_lon, longueur = forme
+    lat0, lon0 = seg_lat[0], seg_lon[0]
+    x, y = _metres(track.lat, track.lon, lat0, lon0)
+    seg_x, seg_y = _metres(seg_lat, seg_lon, lat0, lon0)
+
+    departs = _passages_proches(x, y)
+    arrivees = _passages_proches(x - seg_x[-1], y - seg_y[-1])
+    resultat = []
+    fin_precedente = -1
+    for debut in departs:
+        if debut <= fin_precedente:
+            continue
+        suivantes = arrivees[arrivees > debut]
+        if not suivantes.size:
+            break
+        fin = int(suivantes[0])
+        parcouru = distance_cumulee[fin] - distance_cumulee[debut]
+        if not RAPPORT_LONGUEUR[0] * longueur <= parcouru <= RAPPORT_LONGUEUR[1] * longueur:
+            continue
+        if _dans_couloir(x[debut : fin + 1], y[debut : fin + 1], seg_x, seg_y):
+            resultat.append((int(debut), fin))
+            fin_precedente = fin
+    return resultat
+
+
+def _dans_couloir(x, y, seg_x, seg_y) -> bool:
+    """Vrai si la portion reste près du segment et le couvre entièrement."""
+    pas = max(len(x) // POINTS_PORTION_MAX, 1)
+    x, y = x[::pas], y[::pas]
+    carres = (x[None, :] - seg_x[:, None]) ** 2 + (y[None, :] - seg_y[:, None]) ** 2
+    limite = (LARGEUR_COULOIR + PAS_ECHANTILLON / 2) ** 2
+    # Chaque point du segment est longé, et la trace ne s'écarte jamais du segment
+    return bool((carres.min(axis=1) <= limite).all() and (carres.min(axis=0) <= limite).all())
+
+
+def portion(track: Track, debut: float, fin: float) -> Track:
+    """Points de la trace compris entre `debut` et `fin` mètres depuis le départ
+
+    Lève ValueError si la portion compte moins de deux points.
+    """
+    distance_cumulee = np.concatenate(
+        ([0.0], np.cumsum(track_metrics.segment_distances(track.lat, track.lon)))
+    )
+    premier, dernier = np.searchsorted(distance_cumulee, [debut, fin], side="left")
+    dernier = min(int(dernier), len(track) - 1)
+    if dernier - premier < 1:
+        raise ValueError("La portion doit contenir au moins deux points de la trace")
+    return Track(track.lat[premier : dernier + 1], track.lon[premier : dernier + 1])
+
+
+def longueur(lat, lon) -> float:
+    """Longueur (m) d'une polyligne."""
+    return float(track_metrics.segment_distances(np.asarray(lat), np.asarray(lon)).sum())
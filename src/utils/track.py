@@ -0,0 +1,177 @@
+"""
+Représentation en colonnes (struct-of-arrays) d'une trace GPS
+
+Une trace est stockée sous forme de quatre colonnes contiguës de 8 octets
+(lat, lon, ele en float64, temps en millisecondes epoch int64), soit 32
+octets par point, au lieu d'un dictionnaire par point. Une élévation absente
+vaut NaN, un temps absent TEMPS_ABSENT ; les masques de validité en sont
+déduits.
+"""
+
+from array import array
+from datetime import datetime
+from typing import Iterable, Optional
+
+import numpy as np
+
+from utils.track_time import TEMPS_ABSENT, datetime_vers_ms, decoder_horodatages, ms_vers_datetime
+
+NAN = float("nan")
+
+
+class Track:
+    """Trace GPS en colonnes NumPy
+
+    Attributs
+    ----------
+    lat, lon : np.ndarray
+        Coordonnées en degrés
+    ele : np.ndarray
+        Élévation en mètres, NaN si absente
+    time : np.ndarray
+        Millisecondes depuis l'epoch (UTC, int64), TEMPS_ABSENT si absent
+    segments : np.ndarray
+        Indices de début de chaque segment (<trkseg>), commence par 0
+    """
+
+    __slots__ = ("lat", "lon", "ele", "time", "segments")
+
+    def __init__(self, lat, lon, ele=None, time=None, segments=None):
+        self.lat = np.asarray(lat, dtype=np.float64)
+        self.lon = np.asarray(lon, dtype=np.float64)
+        n = self.lat.shape[0]
+        self.ele = np.full(n, np.nan) if ele is None else np.asarray(ele, dtype=np.float64)
+        if time is None:
+            self.time = np.full(n, TEMPS_ABSENT, dtype=np.int64)
+        else:
+            self.time = np.asarray(time, dtype=np.int64)
+        if not (self.lon.shape[0] == self.ele.shape[0] == self.time.shape[0] == n):
+            raise ValueError("Les colonnes d'une trace doivent avoir la même longueur.")
+        if segments is None:
+            segments = [0] if n else []
+        self.segments = np.asarray(segments, dtype=np.int64)
+
+    @classmethod
+    def from_points(cls, points: Iterable[dict]) -> "Track":
+        """Construit une trace à partir de l'ancien format liste de dictionnaires."""
+        points = list(points)
+        return cls(
+            [p["lat"] for p in points],
+            [p["lon"] for p in points],
+            [NAN if p.get("ele") is None else p["ele"] for p in points],
+            [
+                TEMPS_ABSENT if p.get("time") is None else datetime_vers_ms(p["time"])
+                for p in points
+            ],
+        )
+
+    def __len__(self) -> int:
+        return self.lat.shape[0]
+
+    def __getitem__(self, index):
+        """Une tranche renvoie une vue (sans copie), un entier renvoie le point."""
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            segments = None
+            if step == 1:
+                interieurs = self.segments[(self.segments > start) & (self.segments < stop)]
+                segments = np.concatenate(([0], interieurs - start)) if stop > start else []
+            return Track(
+                self.lat[index], self.lon[index], self.ele[index], self.time[index], segments
+            )
+
+        point = {"lat": float(self.lat[index]), "lon": float(self.lon[index])}
+        if not np.isnan(self.ele[index]):
+            point["ele"] = float(self.ele[index])
+        if self.time[index] != TEMPS_ABSENT:
+            point["time"] = self.datetime_at(index)
+        return point
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def __repr__(self) -> str:
+        return f"<Track points={len(self)}>"
+
+    @property
+    def has_ele(self) -> np.ndarray:
+        """Masque des points dont l'élévation est renseignée."""
+        return ~np.isnan(self.ele)
+
+    @property
+    def has_time(self) -> np.ndarray:
+        """Masque des points horodatés."""
+        return self.time != TEMPS_ABSENT
+
+    @property
+    def nbytes(self) -> int:
+        """Taille des colonnes en octets."""
+        return self.lat.nbytes + self.lon.nbytes + self.ele.nbytes + self.time.nbytes
+
+    def datetime_at(self, index: int) -> Optional[datetime]:
+        """Horodatage (UTC) du point, ou None s'il est absent."""
+        value = self.time[index]
+        if value == TEMPS_ABSENT:
+            return None
+        return ms_vers_datetime(value)
+
+    def first_datetime(self) -> Optional[datetime]:
+        """Premier horodatage renseigné de la trace."""
+        indices = np.flatnonzero(self.has_time)
+        return self.datetime_at(indices[0]) if indices.size else None
+
+
+class TrackBuilder:
+    """Accumule des points dans des `array` puis les expose sans copie
+
+    Les horodatages sont reçus sous forme de texte et décodés par lots de
+    TAILLE_LOT avec `decoder_horodatages`, plutôt qu'un par point.
+    """
+
+    TAILLE_LOT = 4096
+
+    def __init__(self):
+        self._lat = array("d")
+        self._lon = array("d")
+        self._ele = array("d")
+        self._time = array("q")
+        self._textes_time = []
+        self._segments = array("q")
+
+    def __len__(self) -> int:
+        return len(self._lat)
+
+    def new_segment(self):
+        """Marque le début d'un nouveau segment au prochain point ajouté."""
+        if not self._segments or self._segments[-1] != len(self._lat):
+            self._segments.append(len(self._lat))
+
+    def add(self, lat: float, lon: float, ele: Optional[float], time: Optional[str]):
+        """Ajoute un point ; `time` est l'horodatage ISO 8601 du fichier, None si absent."""
+        if not self._segments:
+            self._segments.append(0)
+        self._lat.append(lat)
+        self._lon.append(lon)
+        self._ele.append(NAN if ele is None else ele)
+        self._textes_time.append(time)
+        if len(self._textes_time) >= self.TAILLE_LOT:
+            self._decoder_horodatages()
+
+    def _decoder_horodatages(self):
+        """Décode les horodatages en attente."""
+        if self._textes_time:
+            self._time.frombytes(decoder_horodatages(self._textes_time).tobytes())
+            self._textes_time = []
+
+    def build(self) -> Track:
+        """Crée la trace ; les tableaux NumPy partagent la mémoire des buffers."""
+        self._decoder_horodatages()
+        return Track(
+            np.frombuffer(self._lat, dtype=np.float64),
+            np.frombuffer(self._lon, dtype=np.float64),
+            np.frombuffer(self._ele, dtype=np.float64),
+            np.frombuffer(self._time, dtype=np.int64),
+            # Un segment ouvert sans point à la fin n'a pas de début réel
+            [i for i in self._segments if i < len(self._lat)],
+        )
@@ -0,0 +1,280 @@
+"""
+Archive binaire des traces de toutes les activités, pour les analyses en lot
+
+Usage (depuis la racine du projet) :
+    python src/utils/track_archive.py archive.trk
+
+Les traces stockées en base (table activite_trace) sont exportées dans un
+fichier à disposition fixe, lu par `np.memmap` : chaque colonne (lat, lon,
+ele, time) de toutes les traces est contiguë, et un index trié par
+id_activite donne la position de chaque trace. Une analyse parcourt ainsi
+des millions de points sans créer un seul objet Python par point, et
+`ArchiveTraces.trace` renvoie des vues sans copie sur le fichier.
+
+Disposition (petit-boutiste, sections alignées sur 64 octets) :
+
+- en-tête : MAGIC, version, nombre d'activités, de points, de segments
+- index : une entrée INDEX par activité, triée par id_activite
+- lat, lon, ele (float64), time (int64, ms epoch) : une valeur par point
+- segments (int64) : débuts de segment, relatifs au début de chaque trace
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+from typing import Iterator, Tuple
+
+import numpy as np
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.abspath(os.path.join(current_dir, "..")))
+
+from utils.track import Track  # noqa: E402
+from utils.track_codec import decoder_trace  # noqa: E402
+
+MAGIC = b"STRVTRAK"
+VERSION = 1
+ALIGNEMENT = 64
+
+ENTETE = np.dtype(
+    [
+        ("magic", "S8"),
+        ("version", "<u8"),
+        ("nb_activites", "<u8"),
+        ("nb_points", "<u8"),
+        ("nb_segments", "<u8"),
+    ]
+)
+INDEX = np.dtype(
+    [
+        ("id_activite", "<i8"),
+        ("debut", "<i8"),
+        ("nb_points", "<i8"),
+        ("debut_segments", "<i8"),
+        ("nb_segments", "<i8"),
+    ]
+)
+COLONNES = (("lat", "<f8"), ("lon", "<f8"), ("ele", "<f8"), ("time", "<i8"))
+
+
+def _aligner(position: int) -> int:
+    return -(-position // ALIGNEMENT) * ALIGNEMENT
+
+
+def _sections(nb_activites: int, nb_points: int, nb_segments: int) -> dict:
+    """Position (début, fin) en octets de chaque section du fichier."""
+    tailles = [("index", nb_activites * INDEX.itemsize)]
+    tailles += [(nom, nb_points * 8) for nom, _ in COLONNES]
+    tailles.append(("segments", nb_segments * 8))
+    sections, position = {}, _aligner(ENTETE.itemsize)
+    for nom, taille in tailles:
+        sections[nom] = (position, position + taille)
+        position = _aligner(position + taille)
+    return sections
+
+
+class EcrivainArchive:
+    """Écrit une archive trace par trace, sans la garder en mémoire
+
+    Chaque colonne est d'abord écrite dans un fichier temporaire ; à la
+    fermeture, l'archive est assemblée puis substituée à l'ancienne d'un seul
+    coup (os.replace) : les lecteurs en cours gardent l'ancienne version.
+
+    Exemple
+    -------
+    >>> with EcrivainArchive("archive.trk") as ecrivain:
+    ...     ecrivain.ajouter(12, track)
+    """
+
+    def __init__(self, chemin: str):
+        self.chemin = chemin
+        dossier = os.path.dirname(os.path.abspath(chemin))
+        self._colonnes = {
+            nom: tempfile.TemporaryFile(dir=dossier) for nom, _ in COLONNES + (("segments", ""),)
+        }
+        self._index = []
+        self._ids = set()
+        self._nb_points = 0
+        self._nb_segments = 0
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def __enter__(self) -> "EcrivainArchive":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.fermer()
+        else:
+            self._liberer()
+
+    def ajouter(self, id_activite: int, track: Track):
+        """Ajoute la trace d'une activité ; lève ValueError si l'ID est déjà présent."""
+        if id_activite in self._ids:
+            raise ValueError(f"Activité {id_activite} déjà présente dans l'archive")
+        self._ids.add(id_activite)
+        for nom, type_ in COLONNES:
+            self._colonnes[nom].write(np.ascontiguousarray(getattr(track, nom), dtype=type_))
+        self._colonnes["segments"].write(np.ascontiguousarray(track.segments, dtype="<i8"))
+        self._index.append(
+            (id_activite, self._nb_points, len(track), self._nb_segments, len(track.segments))
+        )
+        self._nb_points += len(track)
+        self._nb_segments += len(track.segments)
+
+    def fermer(self):
+        """Assemble l'archive et la met en place."""
+        index = np.array(self._index, dtype=INDEX)
+        index.sort(order="id_activite")
+        entete = np.array(
+            [(MAGIC, VERSION, len(index), self._nb_points, self._nb_segments)], dtype=ENTETE
+        )
+        sections = _sections(len(index), self._nb_points, self._nb_segments)
+
+        provisoire = f"{self.chemin}.tmp"
+        try:
+            with open(provisoire, "wb") as sortie:
+                sortie.write(entete.tobytes())
+                sortie.seek(sections["index"][0])
+                sortie.write(index.tobytes())
+                for nom, fichier in self._colonnes.items():
+                    sortie.seek(sections[nom][0])
+                    fichier.seek(0)
+                    shutil.copyfileobj(fichier, sortie, 1 << 20)
+                sortie.truncate(max(fin for _, fin in sections.values()))
+            os.replace(provisoire, self.chemin)
+        finally:
+            self._liberer()
+            if os.path.exists(provisoire):
+                os.remove(provisoire)
+
+    def _liberer(self):
+        for fichier in self._colonnes.values():
+            fichier.close()
+
+
+class ArchiveTraces:
+    """Lecture d'une archive par projection en mémoire (np.memmap)
+
+    Attributs
+    ----------
+    index : np.ndarray
+        Entrées INDEX, triées par id_activite
+    lat, lon, ele, time : np.ndarray
+        Colonnes de tous les points de l'archive, bout à bout
+    segments : np.ndarray
+        Débuts de segment de toutes les traces, relatifs à chaque trace
+
+    Tous les tableaux sont des vues en lecture seule sur le fichier : seules
+    les pages effectivement lues sont chargées, par le système.
+    """
+
+    __slots__ = ("chemin", "index", "lat", "lon", "ele", "time", "segments")
+
+    def __init__(self, chemin: str):
+        self.chemin = chemin
+        memoire = np.memmap(chemin, dtype=np.uint8, mode="r")
+        if memoire.size < ENTETE.itemsize:
+            raise ValueError("Archive de traces tronquée")
+        entete = memoire[: ENTETE.itemsize].view(ENTETE)[0]
+        if entete["magic"] != MAGIC or entete["version"] != VERSION:
+            raise ValueError("Archive de traces inconnue")
+        sections = _sections(
+            int(entete["nb_activites"]), int(entete["nb_points"]), int(entete["nb_segments"])
+        )
+        if memoire.size < sections["segments"][1]:
+            raise ValueError("Archive de traces tronquée")
+
+        def section(nom, type_):
+            debut, fin = sections[nom]
+            return np.asarray(memoire[debut:fin]).view(type_)
+
+        self.index = section("index", INDEX)
+        for nom, type_ in COLONNES:
+            setattr(self, nom, section(nom, type_))
+        self.segments = section("segments", "<i8")
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def __contains__(self, id_activite: int) -> bool:
+        return self._position(id_activite) is not None
+
+    def __iter__(self) -> Iterator[Tuple[int, Track]]:
+        """Parcourt les traces (id_activite, Track) par ID croissant."""
+        for entree in self.index:
+            yield int(entree["id_activite"]), self._trace(entree)
+
+    @property
+    def ids(self) -> np.ndarray:
+        """ID des activités archivées, triés."""
+        return self.index["id_activite"]
+
+    def trace(self, id_activite: int) -> Track:
+        """Trace d'une activité, en vues sans copie ; KeyError si absente."""
+        position = self._position(id_activite)
+        if position is None:
+            raise KeyError(id_activite)
+        return self._trace(self.index[position])
+
+    def _position(self, id_activite: int):
+        position = int(np.searchsorted(self.ids, id_activite))
+        if position < len(self) and self.ids[position] == id_activite:
+            return position
+        return None
+
+    def _trace(self, entree) -> Track:
+        debut, fin = int(entree["debut"]), int(entree["debut"] + entree["nb_points"])
+        debut_segments = int(entree["debut_segments"])
+        return Track(
+            self.lat[debut:fin],
+            self.lon[debut:fin],
+            self.ele[debut:fin],
+            self.time[debut:fin],
+            self.segments[debut_segments : debut_segments + int(entree["nb_segments"])],
+        )
+
+
+def exporter_archive(chemin: str, activity_dao=None, taille_lot: int = 500) -> int:
+    """Exporte toutes les traces stockées en base dans une archive
+
+    Parameters
+    ----------
+    chemin : str
+        Fichier de l'archive, remplacé à la fin de l'export
+    activity_dao : ActivityDAO, optional
+        DAO à utiliser (par défaut celui de la base configurée)
+    taille_lot : int
+        Nombre de traces lues à chaque aller-retour avec la base
+
+    Returns
+    -------
+    int
+        Nombre de traces archivées
+    """
+    if activity_dao is None:
+        from dao.activite_dao import ActivityDAO
+
+        activity_dao = ActivityDAO()
+    with EcrivainArchive(chemin) as ecrivain:
+        for id_activite, donnees in activity_dao.iter_traces(taille_lot):
+            ecrivain.ajouter(id_activite, decoder_trace(donnees))
+        return len(ecrivain)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("chemin", help="fichier de l'archive à (re)créer")
+    parser.add_argument("--lot", type=int, default=500, help="traces lues par aller-retour")
+    args = parser.parse_args()
+
+    nombre = exporter_archive(args.chemin, taille_lot=args.lot)
+    archive = ArchiveTraces(args.chemin)
+    print(f"{nombre} traces, {len(archive.lat)} points archivés dans {args.chemin}")
+
+
+if __name__ == "__main__":
+    main()
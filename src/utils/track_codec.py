@@ -0,0 +1,173 @@
+"""
+Encodage compact d'une trace pour le stockage en base (BYTEA)
+
+Chaque colonne est quantifiée en entiers, codée en écarts successifs
+(delta), puis en varint LEB128 après un codage zigzag qui ramène les écarts
+négatifs vers de petits entiers positifs. Un point GPS enregistré chaque
+seconde ne diffère du précédent que de quelques dizaines d'unités : la
+plupart des écarts tiennent sur un ou deux octets. Le tout est enfin
+compressé avec zlib, qui absorbe les écarts répétés (horodatage régulier).
+
+Format (version 1), avant compression ; chaque flux est précédé de sa
+longueur en octets (varint) :
+
+- en-tête : version (1 octet), nombre de points, nombre de segments (varint)
+- segments : indices de début, en écarts
+- lat, lon : degrés × 1e7 (environ 1 cm), écarts zigzag
+- ele : masque de présence (bits), puis centimètres des points renseignés,
+  écarts zigzag
+- time : masque de présence (bits), puis millisecondes epoch des points
+  horodatés, écarts zigzag
+
+Le codage est exact pour des coordonnées à 7 décimales au plus et des
+élévations au centimètre, soit la précision des fichiers GPX usuels.
+"""
+
+import zlib
+from typing import List, Tuple
+
+import numpy as np
+
+from utils.track import Track
+from utils.track_time import TEMPS_ABSENT
+
+VERSION = 1
+ECHELLE_COORDONNEES = 10**7
+ECHELLE_ELEVATION = 100
+
+
+def encoder_trace(track: Track) -> bytes:
+    """Encode une trace en octets compacts
+
+    Parameters
+    ----------
+    track : Track
+        Trace à encoder
+
+    Returns
+    -------
+    bytes
+        Contenu à stocker, relu par `decoder_trace`
+    """
+    has_ele, has_time = track.has_ele, track.has_time
+    flux = [
+        _varints(np.diff(track.segments, prepend=0)),
+        _varints(_zigzag(_deltas(np.rint(track.lat * ECHELLE_COORDONNEES)))),
+        _varints(_zigzag(_deltas(np.rint(track.lon * ECHELLE_COORDONNEES)))),
+        np.packbits(has_ele).tobytes(),
+        _varints(_zigzag(_deltas(np.rint(track.ele[has_ele] * ECHELLE_ELEVATION)))),
+        np.packbits(has_time).tobytes(),
+        _varints(_zigzag(_deltas(track.time[has_time]))),
+    ]
+    contenu = [bytes([VERSION]), _varints(np.array([len(track), len(track.segments)]))]
+    for octets in flux:
+        contenu.append(_varints(np.array([len(octets)])))
+        contenu.append(octets)
+    return zlib.compress(b"".join(contenu))
+
+
+def decoder_trace(donnees: bytes) -> Track:
+    """Décode le contenu produit par `encoder_trace`
+
+    Lève ValueError si le contenu est illisible ou d'une version inconnue.
+    """
+    try:
+        octets = np.frombuffer(zlib.decompress(donnees), dtype=np.uint8)
+    except zlib.error as exc:
+        raise ValueError(f"Trace illisible : {exc}") from exc
+    if not octets.size or octets[0] != VERSION:
+        raise ValueError("Version de trace inconnue")
+
+    (n, nb_segments), position = _lire_entiers(octets, 1, 2)
+    flux = []
+    for _ in range(7):
+        (taille,), position = _lire_entiers(octets, position, 1)
+        flux.append(octets[position : position + taille])
+        position += taille
+    segments, lat, lon, bits_ele, ele, bits_time, time = flux
+
+    has_ele = np.unpackbits(bits_ele, count=n).astype(bool)
+    has_time = np.unpackbits(bits_time, count=n).astype(bool)
+    colonne_ele = np.full(n, np.nan)
+    colonne_ele[has_ele] = np.cumsum(_unzigzag(_lire_varints(ele))) / ECHELLE_ELEVATION
+    colonne_time = np.full(n, TEMPS_ABSENT, dtype=np.int64)
+    colonne_time[has_time] = np.cumsum(_unzigzag(_lire_varints(time)))
+
+    return Track(
+        np.cumsum(_unzigzag(_lire_varints(lat))) / ECHELLE_COORDONNEES,
+        np.cumsum(_unzigzag(_lire_varints(lon))) / ECHELLE_COORDONNEES,
+        colonne_ele,
+        colonne_time,
+        np.cumsum(_lire_varints(segments).astype(np.int64))[:nb_segments],
+    )
+
+
+def nb_points_trace(donnees: bytes) -> int:
+    """Nombre de points d'une trace encodée, sans la décoder entièrement."""
+    debut = zlib.decompressobj().decompress(donnees, 32)
+    (n,), _ = _lire_entiers(np.frombuffer(debut, dtype=np.uint8), 1, 1)
+    return n
+
+
+def _deltas(valeurs: np.ndarray) -> np.ndarray:
+    return np.diff(valeurs.astype(np.int64), prepend=0)
+
+
+def _zigzag(valeurs: np.ndarray) -> np.ndarray:
+    """Entiers signés -> non signés : 0, -1, 1, -2... deviennent 0, 1, 2, 3..."""
+    valeurs = valeurs.astype(np.int64)
+    return ((valeurs << 1) ^ (valeurs >> 63)).view(np.uint64)
+
+
+def _unzigzag(valeurs: np.ndarray) -> np.ndarray:
+    return (valeurs >> np.uint64(1)).view(np.int64) ^ -(valeurs & np.uint64(1)).view(np.int64)
+
+
+def _varints(valeurs: np.ndarray) -> bytes:
+    """Encode des entiers positifs en varint LEB128, en colonnes."""
+    valeurs = valeurs.astype(np.uint64)
+    if not valeurs.size:
+        return b""
+    # Nombre d'octets de chaque valeur : 7 bits utiles par octet
+    nb_octets = np.ones(valeurs.size, dtype=np.int64)
+    reste = valeurs >> np.uint64(7)
+    while reste.any():
+        nb_octets += reste > 0
+        reste >>= np.uint64(7)
+
+    largeur = int(nb_octets.max())
+    matrice = np.empty((valeurs.size, largeur), dtype=np.uint8)
+    for k in range(largeur):
+        groupe = (valeurs >> np.uint64(7 * k)) & np.uint64(0x7F)
+        suite = np.where(nb_octets > k + 1, 0x80, 0)
+        matrice[:, k] = groupe.astype(np.uint8) | suite.astype(np.uint8)
+    # Lecture ligne par ligne des seuls octets utiles
+    return matrice[np.arange(largeur) < nb_octets[:, None]].tobytes()
+
+
+def _lire_varints(octets: np.ndarray) -> np.ndarray:
+    """Décode une suite complète de varints LEB128, en colonnes."""
+    if not octets.size:
+        return np.zeros(0, dtype=np.uint64)
+    fins = np.flatnonzero(octets < 0x80)
+    debuts = np.concatenate(([0], fins[:-1] + 1))
+    rang = np.arange(octets.size) - np.repeat(debuts, fins - debuts + 1)
+    morceaux = (octets & 0x7F).astype(np.uint64) << (7 * rang).astype(np.uint64)
+    # Les morceaux d'une valeur n'ont aucun bit commun : la somme vaut le OU
+    return np.add.reduceat(morceaux, debuts)
+
+
+def _lire_entiers(octets: np.ndarray, position: int, nombre: int) -> Tuple[List[int], int]:
+    """Lit `nombre` varints à partir de `position` ; renvoie (valeurs, position suivante)."""
+    valeurs = []
+    for _ in range(nombre):
+        valeur = decalage = 0
+        while True:
+            octet = int(octets[position])
+            position += 1
+            valeur |= (octet & 0x7F) << decalage
+            decalage += 7
+            if octet < 0x80:
+                break
+        valeurs.append(valeur)
+    return valeurs, position
@@ -0,0 +1,192 @@
+"""
+Filtrage du bruit GPS et détection du mouvement (NumPy)
+
+Les données de mouvement (temps et distance en mouvement, vitesse maximale)
+sont calculées en une passe sur les colonnes d'une trace, en trois étapes :
+
+1. points aberrants : un saut GPS (quelques points atteints et quittés à plus
+   de VITESSE_ABERRANTE) est écarté, et les distances recalculées sans lui ;
+2. lissage : médiane glissante des vitesses sur FENETRE_MEDIANE intervalles,
+   au sein d'un même segment ;
+3. arrêts : détection avec hystérésis sur les vitesses lissées, le mouvement
+   reprend au-dessus de SEUIL_DEPART_KMH et s'interrompt sous SEUIL_ARRET_KMH
+   (ou sur un intervalle sans déplacement), ce qui évite d'alterner arrêt et
+   mouvement autour d'un seuil unique.
+
+La vitesse maximale est la plus haute vitesse lissée en mouvement : un pic
+isolé ne la fausse pas, contrairement à `GPX.get_moving_data` de gpxpy.
+"""
+
+import numpy as np
+
+from utils.track_metrics import ecarts_secondes, gpxpy_distances, haversine, secondes_ecoulees
+
+VITESSE_ABERRANTE = 50.0  # m/s, soit 180 km/h
+LONGUEUR_MAX_SAUT = 3
+FENETRE_MEDIANE = 5
+SEUIL_DEPART_KMH = 2.5
+SEUIL_ARRET_KMH = 1.0
+
+
+def numeros_segments(n: int, segments) -> np.ndarray:
+    """Numéro de segment de chaque point, taille n."""
+    segments = np.asarray(segments, dtype=np.int64)
+    debuts = np.zeros(n, dtype=np.int64)
+    debuts[segments[(segments > 0) & (segments < n)]] = 1
+    return np.cumsum(debuts)
+
+
+def _distances(lat, lon, ele) -> np.ndarray:
+    """Distances entre points consécutifs ; l'élévation ne compte que si elle
+    est renseignée et non nulle des deux côtés."""
+    ele_non_nulle = ~np.isnan(ele) & (ele != 0)
+    return gpxpy_distances(lat, lon, ele, ele_non_nulle[1:] & ele_non_nulle[:-1])
+
+
+def _vitesses(distances: np.ndarray, secondes: np.ndarray, internes: np.ndarray) -> np.ndarray:
+    """Vitesses (m/s) des intervalles, NaN entre deux segments ou sans durée."""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(internes & (secondes > 0), distances / secondes, np.nan)
+
+
+def _vitesses_ecart(lat, lon, secondes, numeros, ecart: int) -> np.ndarray:
+    """Vitesses (m/s) entre chaque point et celui situé `ecart` points plus loin,
+    NaN d'un segment à l'autre ou sans durée (taille n - ecart)."""
+    distances = haversine(lat[:-ecart], lon[:-ecart], lat[ecart:], lon[ecart:])
+    internes = numeros[:-ecart] == numeros[ecart:]
+    return _vitesses(distances, secondes[ecart:] - secondes[:-ecart], internes)
+
+
+def points_aberrants(
+    lat, lon, time, segments, vitesse_aberrante: float = VITESSE_ABERRANTE
+) -> np.ndarray:
+    """Masque des points à écarter (sauts GPS), taille n
+
+    Un saut est une suite d'au plus LONGUEUR_MAX_SAUT points atteinte et
+    quittée à plus de `vitesse_aberrante`, alors que la trace la contournant
+    reste sous cette vitesse. Le premier (dernier) point d'un segment est
+    écarté si seul l'intervalle qui le suit (précède) est trop rapide.
+
+    Parameters
+    ----------
+    lat, lon, time : np.ndarray
+        Colonnes de la trace (voir `Track`)
+    segments : np.ndarray
+        Indices de début des segments
+    vitesse_aberrante : float
+        Vitesse (m/s) au-delà de laquelle un intervalle est suspect
+
+    Returns
+    -------
+    np.ndarray
+        Masque booléen, True pour les points écartés
+    """
+    n = len(lat)
+    numeros = numeros_segments(n, segments)
+    ecartes = np.zeros(n, dtype=bool)
+    if n < 3:
+        return ecartes
+    secondes = secondes_ecoulees(time)
+    with np.errstate(invalid="ignore"):
+        rapides = _vitesses_ecart(lat, lon, secondes, numeros, 1) > vitesse_aberrante
+        for longueur in range(1, min(LONGUEUR_MAX_SAUT, n - 2) + 1):
+            # Saut des points i..i+longueur-1 : entrée, sortie, et contournement
+            contournement = _vitesses_ecart(lat, lon, secondes, numeros, longueur + 1)
+            sauts = rapides[: n - 1 - longueur] & rapides[longueur:]
+            debuts = np.flatnonzero(sauts & (contournement <= vitesse_aberrante)) + 1
+            for decalage in range(longueur):
+                ecartes[debuts + decalage] = True
+
+    # Premier et dernier point d'un segment : seul leur intervalle est trop rapide
+    meme_segment = numeros[2:] == numeros[:-2]
+    ecartes[:-2] |= (
+        meme_segment & rapides[:-1] & ~rapides[1:] & (numeros[:-2] != np.r_[-1, numeros[:-3]])
+    )
+    ecartes[2:] |= (
+        meme_segment & rapides[1:] & ~rapides[:-1] & (numeros[2:] != np.r_[numeros[3:], -1])
+    )
+    return ecartes
+
+
+def mediane_glissante(valeurs: np.ndarray, numeros: np.ndarray, fenetre: int = FENETRE_MEDIANE):
+    """Médiane glissante centrée, sans mélanger deux segments ; les NaN sont ignorés."""
+    if not len(valeurs):
+        return valeurs
+    demi = fenetre // 2
+    bords = np.full(demi, np.nan)
+    fenetres = np.lib.stride_tricks.sliding_window_view(
+        np.concatenate((bords, valeurs, bords)), fenetre
+    ).copy()
+    voisins = np.lib.stride_tricks.sliding_window_view(
+        np.concatenate((bords - 1, numeros, bords - 1)), fenetre
+    )
+    fenetres[voisins != numeros[:, None]] = np.nan
+    # Médiane des valeurs connues : le tri range les NaN en fin de fenêtre
+    # (plus rapide que np.nanmedian ; une fenêtre sans valeur donne NaN)
+    connues = fenetres.shape[1] - np.isnan(fenetres).sum(axis=1)
+    fenetres.sort(axis=1)
+    lignes = np.arange(len(fenetres))
+    return (fenetres[lignes, (connues - 1) // 2] + fenetres[lignes, connues // 2]) / 2
+
+
+def etats_mouvement(vitesses: np.ndarray, numeros: np.ndarray) -> np.ndarray:
+    """Mouvement (True) ou arrêt de chaque intervalle, par hystérésis
+
+    Chaque segment commence à l'arrêt ; l'état ne change qu'au franchissement
+    de SEUIL_DEPART_KMH (vers le mouvement) ou de SEUIL_ARRET_KMH (vers l'arrêt),
+    et se propage d'un intervalle à l'autre entre les deux seuils.
+    """
+    kmh = vitesses * 3.6
+    with np.errstate(invalid="ignore"):
+        depart = kmh > SEUIL_DEPART_KMH
+        decide = depart | (kmh < SEUIL_ARRET_KMH)
+    if not len(kmh):
+        return depart
+    # Le premier intervalle de chaque segment fixe l'état initial
+    premiers = np.ones(len(kmh), dtype=bool)
+    premiers[1:] = numeros[1:] != numeros[:-1]
+    decide |= premiers
+    dernier = np.maximum.accumulate(np.where(decide, np.arange(len(kmh)), 0))
+    return depart[dernier]
+
+
+def mouvement(lat, lon, ele, time, segments) -> dict:
+    """Temps et distance en mouvement, vitesse maximale d'une trace filtrée
+
+    Parameters
+    ----------
+    lat, lon, ele, time : np.ndarray
+        Colonnes de la trace (voir `Track`)
+    segments : np.ndarray
+        Indices de début des segments
+
+    Returns
+    -------
+    dict
+        'temps_mouvement' (s), 'distance_mouvement' (m), 'vitesse_max' (m/s)
+    """
+    resultat = {"temps_mouvement": 0.0, "distance_mouvement": 0.0, "vitesse_max": 0.0}
+    lat = np.asarray(lat, dtype=np.float64)
+    lon = np.asarray(lon, dtype=np.float64)
+    ele = np.asarray(ele, dtype=np.float64)
+    time = np.asarray(time)
+    if len(lat) < 2:
+        return resultat
+
+    gardes = ~points_aberrants(lat, lon, time, segments)
+    numeros = numeros_segments(len(lat), segments)[gardes]
+    lat, lon, ele, time = lat[gardes], lon[gardes], ele[gardes], time[gardes]
+
+    internes = numeros[1:] == numeros[:-1]
+    distances = _distances(lat, lon, ele)
+    secondes = ecarts_secondes(time)
+    lissees = mediane_glissante(_vitesses(distances, secondes, internes), numeros[1:])
+
+    # Un intervalle sans déplacement reste un arrêt, quelle que soit la médiane
+    etats = etats_mouvement(np.where(distances > 0, lissees, 0.0), numeros[1:])
+    en_mouvement = etats & internes & (secondes > 0)
+    if en_mouvement.any():
+        resultat["temps_mouvement"] = float(secondes[en_mouvement].sum())
+        resultat["distance_mouvement"] = float(distances[en_mouvement].sum())
+        resultat["vitesse_max"] = float(np.nanmax(lissees[en_mouvement]))
+    return resultat
@@ -0,0 +1,122 @@
+"""
+Empreinte d'une activité, pour reconnaître une même sortie enregistrée deux
+fois (depuis la montre, puis depuis l'export du téléphone)
+
+L'empreinte assemble trois composantes grossières, stables d'un appareil à
+l'autre :
+
+- la tranche de l'heure de départ (TRANCHE_DEPART secondes) ;
+- la tranche de distance (écarts entre segments exclus, comme la distance
+  de l'activité), sur une échelle logarithmique de raison RAPPORT_DISTANCE ;
+- un hachage de la suite des cellules geohash (PRECISION_GEOHASH caractères,
+  environ 5 km de côté) où la trace parcourt au moins LONGUEUR_MIN_CELLULE
+  mètres, dans l'ordre de première visite.
+
+Elle est calculée en une passe sur les colonnes lat/lon et comparée par
+égalité dans un index : aucune trace n'est relue. Deux enregistrements d'une
+même sortie pouvant tomber de part et d'autre d'une limite de tranche,
+`empreintes_proches` donne aussi les empreintes des tranches voisines.
+
+Les cellules à peine effleurées (un virage qui mord sur la cellule voisine,
+un coin coupé) sont ignorées : un enregistrement décalé de quelques mètres
+qui y entre, ou non, garde la même suite. Reste une limite connue : une
+sortie qui longe une limite de cellule sur plus de LONGUEUR_MIN_CELLULE
+mètres peut être vue d'un côté par un appareil et de l'autre par le second ;
+les deux empreintes diffèrent alors et le doublon n'est pas reconnu.
+"""
+
+import calendar
+import hashlib
+import math
+from datetime import datetime
+from typing import List, Optional
+
+import numpy as np
+
+from utils import track_metrics
+from utils.track import Track
+
+TRANCHE_DEPART = 600
+RAPPORT_DISTANCE = 1.05
+PRECISION_GEOHASH = 5
+LONGUEUR_MIN_CELLULE = 250.0
+
+BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+
+def geohash_entiers(lat, lon, precision: int = PRECISION_GEOHASH) -> np.ndarray:
+    """Geohash de chaque point, sous forme d'entier (5 bits par caractère)."""
+    bits = 5 * precision
+    bits_lon, bits_lat = (bits + 1) // 2, bits // 2
+    qlon = np.floor((np.asarray(lon, dtype=float) + 180.0) / 360.0 * (1 << bits_lon))
+    qlat = np.floor((np.asarray(lat, dtype=float) + 90.0) / 180.0 * (1 << bits_lat))
+    qlon = qlon.clip(0, (1 << bits_lon) - 1).astype(np.int64)
+    qlat = qlat.clip(0, (1 << bits_lat) - 1).astype(np.int64)
+
+    # Bits entrelacés, en commençant par la longitude
+    code = np.zeros(qlon.shape, dtype=np.int64)
+    for i in range(bits_lon):
+        code |= ((qlon >> (bits_lon - 1 - i)) & 1) << (bits - 1 - 2 * i)
+    for i in range(bits_lat):
+        code |= ((qlat >> (bits_lat - 1 - i)) & 1) << (bits - 2 - 2 * i)
+    return code
+
+
+def geohash(lat: float, lon: float, precision: int = PRECISION_GEOHASH) -> str:
+    """Geohash (texte) d'un point."""
+    code = int(geohash_entiers([lat], [lon], precision)[0])
+    return "".join(BASE32[(code >> (5 * i)) & 31] for i in reversed(range(precision)))
+
+
+def _secondes(moment: datetime) -> int:
+    """Secondes depuis l'epoch ; un datetime naïf est lu en UTC."""
+    return calendar.timegm(moment.utctimetuple())
+
+
+def _cellules_parcourues(track: Track, distances: np.ndarray) -> np.ndarray:
+    """Cellules geohash où la trace parcourt au moins LONGUEUR_MIN_CELLULE mètres,
+    dans l'ordre de première visite ; chaque pas compte pour la cellule de son départ."""
+    cellules = geohash_entiers(track.lat, track.lon)
+    uniques, premieres, inverse = np.unique(cellules, return_index=True, return_inverse=True)
+    parcours = np.bincount(inverse[:-1], weights=distances, minlength=len(uniques))
+    retenues = np.flatnonzero(parcours >= LONGUEUR_MIN_CELLULE)
+    return uniques[retenues[np.argsort(premieres[retenues])]]
+
+
+def empreinte_trace(track: Track, debut: Optional[datetime] = None) -> Optional[str]:
+    """Empreinte d'une activité d'après sa trace
+
+    Parameters
+    ----------
+    track : Track
+        Trace GPS de l'activité
+    debut : datetime, optional
+        Heure de départ, utilisée si la trace n'est pas horodatée
+
+    Returns
+    -------
+    str or None
+        None pour une trace vide, ou sans heure de départ connue
+    """
+    if not len(track):
+        return None
+    depart = track.first_datetime() or (debut if isinstance(debut, datetime) else None)
+    if depart is None:
+        return None
+
+    cumul = track_metrics.gpxpy_distance_cumulee(track.lat, track.lon, track.ele, track.segments)
+    tranche_distance = math.floor(math.log(max(cumul[-1], 1.0)) / math.log(RAPPORT_DISTANCE))
+
+    hachage = hashlib.blake2b(
+        _cellules_parcourues(track, np.diff(cumul)).astype("<i8").tobytes(), digest_size=8
+    ).hexdigest()
+
+    return f"{_secondes(depart) // TRANCHE_DEPART}:{tranche_distance}:{hachage}"
+
+
+def empreintes_proches(empreinte: str) -> List[str]:
+    """L'empreinte et celles des tranches de départ et de distance voisines (9 au total)."""
+    depart, distance, hachage = empreinte.split(":")
+    return [
+        f"{int(depart) + d}:{int(distance) + e}:{hachage}" for d in (0, -1, 1) for e in (0, -1, 1)
+    ]
@@ -0,0 +1,273 @@
+"""
+Calcul vectorisé des métriques d'une trace GPS (NumPy)
+
+Les fonctions prennent des colonnes contiguës (lat, lon, ele, temps) plutôt
+qu'une liste de points : chaque métrique se ramène à quelques opérations sur
+tableaux. Une élévation manquante vaut NaN. Le temps est la colonne int64 de
+millisecondes epoch d'une `Track` (TEMPS_ABSENT si manquant) ; des secondes
+epoch en float64 (NaN si manquant) sont aussi acceptées.
+"""
+
+from typing import Optional
+
+import numpy as np
+
+from utils.track_time import TEMPS_ABSENT
+
+RAYON_TERRE = 6371000  # Rayon de la Terre en mètres
+
+
+def haversine(lat1, lon1, lat2, lon2) -> np.ndarray:
+    """Distance de Haversine, en mètres, entre des tableaux de points
+
+    Parameters
+    ----------
+    lat1, lon1, lat2, lon2 : array-like
+        Coordonnées en degrés (diffusées selon les règles NumPy)
+
+    Returns
+    -------
+    np.ndarray
+        Distances en mètres
+    """
+    lat1 = np.radians(lat1)
+    lat2 = np.radians(lat2)
+    delta_lat = lat2 - lat1
+    delta_lon = np.radians(np.asarray(lon2) - np.asarray(lon1))
+
+    a = np.sin(delta_lat / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin(delta_lon / 2) ** 2
+    return RAYON_TERRE * 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+
+
+def segment_distances(lat: np.ndarray, lon: np.ndarray) -> np.ndarray:
+    """Distances (m) entre points consécutifs, tableau de taille n-1."""
+    if len(lat) < 2:
+        return np.zeros(0)
+    # Radians et cosinus calculés une fois par point, pas une fois par paire
+    phi = np.radians(np.asarray(lat, dtype=np.float64))
+    lam = np.radians(np.asarray(lon, dtype=np.float64))
+    cos_phi = np.cos(phi)
+
+    a = np.sin(np.diff(phi) / 2) ** 2 + cos_phi[:-1] * cos_phi[1:] * np.sin(np.diff(lam) / 2) ** 2
+    return RAYON_TERRE * 2 * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def elevation_gain(ele: Optional[np.ndarray]) -> tuple[float, float]:
+    """Dénivelés positif et négatif (m) sur les élévations renseignées."""
+    if ele is None:
+        return 0.0, 0.0
+    ele = np.asarray(ele, dtype=np.float64)
+    ele = ele[~np.isnan(ele)]
+    if ele.size < 2:
+        return 0.0, 0.0
+    diff = np.diff(ele)
+    return float(diff[diff > 0].sum()), float(-diff[diff < 0].sum())
+
+
+def compute_metrics(
+    lat: np.ndarray,
+    lon: np.ndarray,
+    ele: Optional[np.ndarray] = None,
+    time: Optional[np.ndarray] = None,
+) -> dict:
+    """Calcule en bloc les métriques d'une trace
+
+    Parameters
+    ----------
+    lat, lon : np.ndarray
+        Coordonnées en degrés
+    ele : np.ndarray, optional
+        Élévations en mètres (NaN si absente)
+    time : np.ndarray, optional
+        Millisecondes epoch int64 (TEMPS_ABSENT si absent), ou secondes
+        epoch float64 (NaN si absent)
+
+    Returns
+    -------
+    dict
+        {
+            'distances': np.ndarray (m, taille n-1),
+            'distance_cumulee': np.ndarray (m, taille n, commence à 0),
+            'distance': float (m),
+            'denivele_positif': float (m),
+            'denivele_negatif': float (m),
+            'vitesses': np.ndarray (m/s, taille n-1, NaN si temps inconnu),
+            'duree': float (s) ou None
+        }
+    """
+    distances = segment_distances(lat, lon)
+    distance_cumulee = np.concatenate(([0.0], np.cumsum(distances)))
+    denivele_positif, denivele_negatif = elevation_gain(ele)
+
+    vitesses = np.full(distances.shape, np.nan)
+    duree = None
+    if time is not None:
+        time = np.asarray(time)
+        valides = time[horodates(time)]
+        if valides.size >= 2:
+            duree = float(valides[-1] - valides[0]) / _unites_par_seconde(time)
+        dt = ecarts_secondes(time)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            np.divide(distances, dt, out=vitesses, where=dt > 0)
+
+    return {
+        "distances": distances,
+        "distance_cumulee": distance_cumulee,
+        "distance": float(distance_cumulee[-1]) if distance_cumulee.size else 0.0,
+        "denivele_positif": denivele_positif,
+        "denivele_negatif": denivele_negatif,
+        "vitesses": vitesses,
+        "duree": duree,
+    }
+
+
+def horodates(time: np.ndarray) -> np.ndarray:
+    """Masque des temps renseignés d'une colonne de temps."""
+    if time.dtype.kind == "f":
+        return ~np.isnan(time)
+    return time != TEMPS_ABSENT
+
+
+def _unites_par_seconde(time: np.ndarray) -> int:
+    return 1 if time.dtype.kind == "f" else 1000
+
+
+def ecarts_secondes(time: np.ndarray) -> np.ndarray:
+    """Écarts en secondes entre points consécutifs, NaN si un temps manque (taille n-1)."""
+    presents = horodates(time)
+    paires = presents[1:] & presents[:-1]
+    ecarts = np.full(paires.shape, np.nan)
+    # Une différence avec TEMPS_ABSENT déborde, mais ces paires sont écartées
+    ecarts[paires] = np.diff(time)[paires] / _unites_par_seconde(time)
+    return ecarts
+
+
+def secondes_ecoulees(time: np.ndarray) -> np.ndarray:
+    """Secondes écoulées depuis le premier temps renseigné, NaN si un temps manque."""
+    time = np.asarray(time)
+    presents = horodates(time)
+    secondes = np.full(time.shape, np.nan)
+    if presents.any():
+        valides = time[presents]
+        secondes[presents] = (valides - valides[0]) / _unites_par_seconde(time)
+    return secondes
+
+
+def interpoler_manquants(
+    colonne: np.ndarray, distance_cumulee: np.ndarray, minimum: int = 1
+) -> np.ndarray:
+    """Interpole les valeurs manquantes (NaN) le long de la distance cumulée
+
+    Entièrement NaN s'il y a moins de `minimum` valeurs connues.
+    """
+    connues = ~np.isnan(colonne)
+    if connues.all():
+        return colonne
+    if connues.sum() < minimum:
+        return np.full(colonne.shape, np.nan)
+    return np.interp(distance_cumulee, distance_cumulee[connues], colonne[connues])
+
+
+# Constantes reprises de gpxpy, pour des résultats identiques à la bibliothèque
+GPXPY_RAYON_TERRE = 6378.137 * 1000
+GPXPY_UN_DEGRE = (2 * np.pi * GPXPY_RAYON_TERRE) / 360
+
+
+def _pair_mask(n: int, segments: np.ndarray) -> np.ndarray:
+    """Masque des paires (i, i+1) internes à un segment, taille n-1."""
+    masque = np.ones(max(n - 1, 0), dtype=bool)
+    debuts = segments[(segments > 0) & (segments < n)]
+    masque[debuts - 1] = False
+    return masque
+
+
+def gpxpy_distances(
+    lat: np.ndarray, lon: np.ndarray, ele: np.ndarray, use_elevation: Optional[np.ndarray] = None
+) -> np.ndarray:
+    """Distances entre points consécutifs selon la formule de `gpxpy.geo.distance`
+
+    Approximation équirectangulaire pour les points proches, Haversine au-delà
+    de 0.2 degré d'écart. L'élévation est prise en compte quand elle est
+    renseignée des deux côtés (ou selon `use_elevation` si fourni).
+    """
+    if len(lat) < 2:
+        return np.zeros(0)
+    d_lat = lat[1:] - lat[:-1]
+    d_lon = lon[1:] - lon[:-1]
+
+    coef = np.cos(np.radians(lat[1:]))
+    distance_2d = np.sqrt(d_lat * d_lat + (d_lon * coef) ** 2) * GPXPY_UN_DEGRE
+
+    lointains = (np.abs(d_lat) > 0.2) | (np.abs(d_lon) > 0.2)
+    if lointains.any():
+        phi1 = np.radians(lat[1:][lointains])
+        phi2 = np.radians(lat[:-1][lointains])
+        a = np.sin((phi1 - phi2) / 2) ** 2 + np.sin(np.radians(d_lon[lointains]) / 2) ** 2 * np.cos(
+            phi1
+        ) * np.cos(phi2)
+        distance_2d[lointains] = GPXPY_RAYON_TERRE * 2 * np.arcsin(np.sqrt(a))
+
+    d_ele = ele[1:] - ele[:-1]
+    if use_elevation is None:
+        use_elevation = ~np.isnan(d_ele)
+    use_elevation = use_elevation & ~lointains & (d_ele != 0)
+    return np.where(use_elevation, np.sqrt(distance_2d**2 + np.nan_to_num(d_ele) ** 2), distance_2d)
+
+
+def gpxpy_distance_cumulee(lat, lon, ele, segments) -> np.ndarray:
+    """Distance 3D cumulée (m) à chaque point, taille n, commence à 0
+
+    Les écarts entre deux segments ne comptent pas, comme dans `GPX.length_3d` :
+    la dernière valeur est la distance de `gpxpy_summary`.
+    """
+    n = len(lat)
+    distances = np.where(_pair_mask(n, np.asarray(segments)), gpxpy_distances(lat, lon, ele), 0.0)
+    return np.concatenate(([0.0], np.cumsum(distances))) if n else np.zeros(0)
+
+
+def gpxpy_summary(lat, lon, ele, time, segments) -> dict:
+    """Distance 3D et durée, calculées comme gpxpy
+
+    Reproduit en une passe vectorisée `GPX.length_3d` et `GPX.get_duration`
+    à partir des colonnes d'une trace. Les données de mouvement sont calculées
+    à part, sur la trace filtrée (voir `track_filter.mouvement`).
+
+    Parameters
+    ----------
+    lat, lon, ele, time : np.ndarray
+        Colonnes de la trace (voir `Track`)
+    segments : np.ndarray
+        Indices de début des segments
+
+    Returns
+    -------
+    dict
+        'distance' (m), 'duree' (s, None si horodatage incomplet)
+    """
+    n = len(lat)
+    segments = np.asarray(segments, dtype=np.int64)
+    resultat = {"distance": 0.0, "duree": 0.0}
+    if n == 0:
+        return resultat
+
+    internes = _pair_mask(n, segments)
+    distances_3d = gpxpy_distances(lat, lon, ele)
+    resultat["distance"] = float(distances_3d[internes].sum())
+
+    # Durée : premier/dernier point de chaque segment (ou leur voisin)
+    fins = np.append(segments[1:], n)
+    time = np.asarray(time)
+    presents = horodates(time)
+    duree = 0.0
+    for debut, fin in zip(segments, fins):
+        if fin - debut < 2:
+            continue
+        premier = debut if presents[debut] else debut + 1
+        dernier = fin - 1 if presents[fin - 1] else fin - 2
+        if not (presents[premier] and presents[dernier]) or time[dernier] < time[premier]:
+            duree = None
+            break
+        duree += float(time[dernier] - time[premier]) / _unites_par_seconde(time)
+    resultat["duree"] = duree
+
+    return resultat
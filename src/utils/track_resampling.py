@@ -0,0 +1,226 @@
+"""
+Rééchantillonnage d'une trace pour les graphiques et les comparaisons
+
+Deux usages :
+
+- grille uniforme (`par_temps`, `par_distance`) : les colonnes de la trace
+  sont interpolées (`np.interp`) sur une grille régulière en secondes ou en
+  mètres, pour superposer deux activités point à point ;
+- graphique (`serie_graphique`) : une série d'au plus `nb_points` points,
+  choisis par LTTB (Largest-Triangle-Three-Buckets), qui garde l'allure de la
+  courbe (pics, creux) sans envoyer tous les points au navigateur.
+
+Les tableaux produits ont une taille fixe, connue à l'avance ; les valeurs
+inconnues (temps ou élévation absents) valent NaN, ou None dans l'API.
+"""
+
+import math
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from utils import track_metrics
+from utils.track import Track
+from utils.track_filter import mediane_glissante, numeros_segments
+
+ABSCISSES = ("distance", "temps")
+NB_POINTS_GRAPHIQUE = 1000
+
+
+def colonnes_trace(track: Track) -> Dict[str, np.ndarray]:
+    """Grandeurs de chaque point de la trace
+
+    Returns
+    -------
+    dict
+        'distance' (m, cumulée), 'temps' (s écoulées), 'altitude' (m) et
+        'vitesse' (km/h, lissée par médiane glissante), taille n. Les temps et
+        altitudes manquants sont interpolés le long de la distance ; NaN si
+        la trace n'en a pas assez.
+    """
+    distance = track_metrics.gpxpy_distance_cumulee(track.lat, track.lon, track.ele, track.segments)
+    temps = track_metrics.interpoler_manquants(
+        track_metrics.secondes_ecoulees(track.time), distance, minimum=2
+    )
+    altitude = track_metrics.interpoler_manquants(track.ele, distance, minimum=1)
+
+    vitesse = np.full(len(distance), np.nan)
+    if len(distance) > 1 and not np.isnan(temps).any():
+        with np.errstate(divide="ignore", invalid="ignore"):
+            brute = np.gradient(distance, temps) * 3.6
+        brute[~np.isfinite(brute)] = np.nan
+        vitesse = mediane_glissante(brute, numeros_segments(len(distance), track.segments))
+    return {"distance": distance, "temps": temps, "altitude": altitude, "vitesse": vitesse}
+
+
+def grille(fin: float, nb_points: Optional[int] = None, pas: Optional[float] = None) -> np.ndarray:
+    """Grille régulière de 0 à `fin`, de `nb_points` points ou au pas `pas`
+
+    Avec `pas`, le dernier point est `fin` si `fin` n'est pas un multiple du pas.
+    """
+    if (nb_points is None) == (pas is None):
+        raise ValueError("Indiquer soit nb_points, soit pas")
+    if pas is not None:
+        if pas <= 0:
+            raise ValueError("Le pas doit être positif")
+        return np.append(np.arange(0.0, fin, pas), fin)
+    if nb_points < 2:
+        raise ValueError("Il faut au moins 2 points")
+    return np.linspace(0.0, fin, nb_points)
+
+
+def reechantillonner(
+    abscisse: np.ndarray, colonnes: Dict[str, np.ndarray], points: np.ndarray
+) -> Dict[str, np.ndarray]:
+    """Interpole chaque colonne aux abscisses `points`
+
+    `abscisse` doit être croissante ; une colonne entièrement inconnue reste NaN.
+    """
+    resultat = {}
+    for cle, colonne in colonnes.items():
+        connues = ~np.isnan(colonne)
+        if not connues.any():
+            resultat[cle] = np.full(len(points), np.nan)
+        else:
+            resultat[cle] = np.interp(points, abscisse[connues], colonne[connues])
+    return resultat
+
+
+def _temps_croissant(temps: np.ndarray) -> np.ndarray:
+    """Temps écoulés utilisables comme abscisse ; ValueError si la trace n'est pas horodatée."""
+    if not len(temps) or np.isnan(temps).any():
+        raise ValueError("Trace sans horodatage")
+    # Une horloge qui recule ne doit pas rompre la croissance de l'abscisse
+    return np.maximum.accumulate(temps)
+
+
+def par_distance(
+    track: Track, nb_points: Optional[int] = None, pas: Optional[float] = None
+) -> Dict[str, np.ndarray]:
+    """Trace rééchantillonnée à distance régulière (`pas` en mètres)
+
+    Returns
+    -------
+    dict
+        Colonnes de `colonnes_trace`, une valeur par point de la grille
+    """
+    colonnes = colonnes_trace(track)
+    distance = colonnes["distance"]
+    points = grille(float(distance[-1]) if len(distance) else 0.0, nb_points, pas)
+    if not len(distance):
+        return {cle: np.full(len(points), np.nan) for cle in colonnes}
+    return reechantillonner(distance, colonnes, points)
+
+
+def par_temps(
+    track: Track, nb_points: Optional[int] = None, pas: Optional[float] = None
+) -> Dict[str, np.ndarray]:
+    """Trace rééchantillonnée à intervalle de temps régulier (`pas` en secondes)
+
+    Lève ValueError si la trace n'est pas horodatée.
+    """
+    colonnes = colonnes_trace(track)
+    temps = colonnes["temps"] = _temps_croissant(colonnes["temps"])
+    return reechantillonner(temps, colonnes, grille(float(temps[-1]), nb_points, pas))
+
+
+def _triangles(x, y, positions, sommets, suivants) -> np.ndarray:
+    """Point de chaque seau formant le plus grand triangle avec le sommet
+    précédent et le point suivant (moyenne du seau suivant)."""
+    ax, ay = sommets
+    sx, sy = suivants
+    bx, by = x[positions], y[positions]
+    aires = np.abs(
+        (ax - sx)[:, None] * (by - ay[:, None]) - (ax[:, None] - bx) * (sy - ay)[:, None]
+    )
+    return positions[np.arange(len(positions)), aires.argmax(axis=1)]
+
+
+def lttb(x: np.ndarray, y: np.ndarray, nb_points: int) -> np.ndarray:
+    """Indices des points retenus par LTTB (Largest-Triangle-Three-Buckets)
+
+    Le premier et le dernier point sont gardés ; les autres sont répartis en
+    `nb_points - 2` seaux, dont on garde le point formant le plus grand
+    triangle avec le point retenu dans le seau précédent et la moyenne du
+    seau suivant. Pour rester vectorisé, le point précédent est d'abord
+    estimé par la moyenne de son seau, puis remplacé par le point retenu lors
+    de cette première passe.
+
+    Parameters
+    ----------
+    x, y : np.ndarray
+        Abscisses (croissantes) et ordonnées, sans NaN
+    nb_points : int
+        Nombre de points voulu (au moins 3)
+
+    Returns
+    -------
+    np.ndarray
+        Indices croissants, `min(nb_points, len(x))` valeurs
+    """
+    n = len(x)
+    if n <= nb_points or nb_points < 3:
+        return np.arange(n) if n <= nb_points else np.array([0, n - 1])
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+
+    # Bornes des seaux entre le premier et le dernier point, et leurs moyennes
+    bornes = np.linspace(1, n - 1, nb_points - 1).astype(np.int64)
+    tailles = np.diff(bornes)
+    cumul_x = np.concatenate(([0.0], np.cumsum(x)))
+    cumul_y = np.concatenate(([0.0], np.cumsum(y)))
+    moyenne_x = (cumul_x[bornes[1:]] - cumul_x[bornes[:-1]]) / tailles
+    moyenne_y = (cumul_y[bornes[1:]] - cumul_y[bornes[:-1]]) / tailles
+    suivants = (np.append(moyenne_x[1:], x[-1]), np.append(moyenne_y[1:], y[-1]))
+
+    # Seaux en tableau 2D ; les seaux courts répètent leur dernier point
+    positions = bornes[:-1, None] + np.arange(tailles.max())
+    positions = np.minimum(positions, bornes[1:, None] - 1)
+
+    sommets = (np.append(x[0], moyenne_x[:-1]), np.append(y[0], moyenne_y[:-1]))
+    retenus = _triangles(x, y, positions, sommets, suivants)
+    sommets = (np.append(x[0], x[retenus[:-1]]), np.append(y[0], y[retenus[:-1]]))
+    retenus = _triangles(x, y, positions, sommets, suivants)
+    return np.concatenate(([0], retenus, [n - 1]))
+
+
+def _liste(valeurs: np.ndarray, decimales: int) -> List[Optional[float]]:
+    """Valeurs arrondies, NaN -> None pour la réponse JSON."""
+    return [v if math.isfinite(v) else None for v in np.round(valeurs, decimales).tolist()]
+
+
+def serie_graphique(
+    track: Track, abscisse: str = "distance", nb_points: int = NB_POINTS_GRAPHIQUE
+) -> Dict[str, Any]:
+    """Profils d'altitude et de vitesse d'une trace, prêts pour plotly
+
+    Chaque profil est réduit par LTTB à au plus `nb_points` points, sur ses
+    propres abscisses : un pic de vitesse reste visible même s'il ne tombe pas
+    sur un point retenu pour l'altitude.
+
+    Lève ValueError si `abscisse` n'est pas dans ABSCISSES, ou vaut "temps"
+    pour une trace non horodatée.
+
+    Returns
+    -------
+    dict
+        'abscisse' ("distance" en km ou "temps" en s), puis 'altitude' (m) et
+        'vitesse' (km/h), chacun de la forme {"x": [...], "y": [...]}
+    """
+    if abscisse not in ABSCISSES:
+        raise ValueError(f"Abscisse inconnue : {abscisse}")
+    colonnes = colonnes_trace(track)
+    if abscisse == "distance":
+        x = colonnes["distance"] / 1000
+    else:
+        x = _temps_croissant(colonnes["temps"])
+
+    resultat: Dict[str, Any] = {"abscisse": abscisse}
+    for cle in ("altitude", "vitesse"):
+        connus = np.flatnonzero(~np.isnan(colonnes[cle]))
+        retenus = connus[lttb(x[connus], colonnes[cle][connus], nb_points)]
+        resultat[cle] = {
+            "x": _liste(x[retenus], 3 if abscisse == "distance" else 0),
+            "y": _liste(colonnes[cle][retenus], 1),
+        }
+    return resultat
@@ -0,0 +1,152 @@
+"""
+Simplification multi-résolution d'une trace pour l'affichage cartographique
+
+Les points sont classés une fois pour toutes par l'algorithme de
+Visvalingam-Whyatt (élimination successive du point dont le triangle formé
+avec ses voisins a la plus petite aire), en O(n log n) grâce à un tas. Ce
+classement donne directement chaque niveau de détail : les k points les plus
+importants, dans l'ordre de la trace. Une petite pyramide de niveaux
+(NIVEAUX_DETAIL) est précalculée ; la carte choisit le niveau adapté au
+zoom, d'après l'étendue de la trace en pixels.
+"""
+
+import heapq
+import math
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+# Nombre de points de chaque niveau de détail précalculé
+NIVEAUX_DETAIL = (50, 500, 5000)
+
+# Écart visé entre deux points affichés, en pixels
+PIXELS_PAR_POINT = 4
+
+# Largeur d'une tuile web (Web Mercator) en pixels
+TAILLE_TUILE = 256
+
+# Décimales conservées dans les coordonnées renvoyées (environ 1 m)
+DECIMALES = 5
+
+
+def rangs_visvalingam(lat: np.ndarray, lon: np.ndarray) -> np.ndarray:
+    """Classe les points d'une trace du plus important au moins important
+
+    Parameters
+    ----------
+    lat, lon : np.ndarray
+        Coordonnées en degrés
+
+    Returns
+    -------
+    np.ndarray
+        Indices des points ; les deux extrémités viennent en premier, puis les
+        points dans l'ordre inverse de leur élimination
+    """
+    n = len(lat)
+    if n <= 2:
+        return np.arange(n)
+
+    # Projection équirectangulaire autour de la latitude moyenne
+    y = np.radians(np.asarray(lat, dtype=np.float64))
+    x = np.radians(np.asarray(lon, dtype=np.float64)) * math.cos(float(y.mean()))
+    aires = [math.inf] * n
+    aires[1:-1] = _aires_triangles(x[:-2], y[:-2], x[1:-1], y[1:-1], x[2:], y[2:]).tolist()
+    x, y = x.tolist(), y.tolist()
+
+    precedent = list(range(-1, n - 1))
+    suivant = list(range(1, n + 1))
+    tas = [(aires[i], i) for i in range(1, n - 1)]
+    heapq.heapify(tas)
+    elimines = []
+    aire_eliminee = 0.0
+
+    while tas:
+        aire, i = heapq.heappop(tas)
+        if aire != aires[i]:
+            continue  # entrée périmée, le point a été réévalué depuis
+        # Aire effective : jamais inférieure à celle du point éliminé avant
+        aire_eliminee = max(aire_eliminee, aire)
+        aires[i] = None
+        elimines.append(i)
+
+        a, c = precedent[i], suivant[i]
+        suivant[a], precedent[c] = c, a
+        for j in (a, c):
+            if 0 < j < n - 1:
+                k, m = precedent[j], suivant[j]
+                nouvelle = max(aire_eliminee, _aire_triangle(x[k], y[k], x[j], y[j], x[m], y[m]))
+                if nouvelle != aires[j]:
+                    aires[j] = nouvelle
+                    heapq.heappush(tas, (nouvelle, j))
+
+    elimines.reverse()
+    return np.array([0, n - 1] + elimines, dtype=np.int64)
+
+
+def _aires_triangles(x1, y1, x2, y2, x3, y3) -> np.ndarray:
+    return np.abs((x2 - x1) * (y3 - y1) - (x3 - x1) * (y2 - y1)) / 2
+
+
+def _aire_triangle(x1, y1, x2, y2, x3, y3) -> float:
+    return abs((x2 - x1) * (y3 - y1) - (x3 - x1) * (y2 - y1)) / 2
+
+
+class PyramideLOD:
+    """Niveaux de détail précalculés d'une trace
+
+    Attributs
+    ----------
+    lat, lon : np.ndarray
+        Coordonnées de la trace complète
+    niveaux : dict
+        Nombre de points -> indices des points retenus, dans l'ordre de la
+        trace ; la trace complète n'y figure pas
+    """
+
+    __slots__ = ("lat", "lon", "niveaux")
+
+    def __init__(self, lat, lon, niveaux: Sequence[int] = NIVEAUX_DETAIL):
+        self.lat = np.asarray(lat, dtype=np.float64)
+        self.lon = np.asarray(lon, dtype=np.float64)
+        n = len(self.lat)
+        rangs = rangs_visvalingam(self.lat, self.lon)
+        self.niveaux = {k: np.sort(rangs[:k]) for k in sorted(niveaux) if k < n}
+
+    @classmethod
+    def depuis_coordonnees(cls, coordonnees: Sequence[Sequence[float]], **kwargs):
+        """Construit la pyramide d'une liste de couples (lat, lon)."""
+        tableau = np.asarray(coordonnees, dtype=np.float64).reshape(-1, 2)
+        return cls(tableau[:, 0], tableau[:, 1], **kwargs)
+
+    def __len__(self) -> int:
+        return len(self.lat)
+
+    def niveau_pour_zoom(self, zoom: Optional[float]) -> int:
+        """Plus petit niveau assez détaillé pour le zoom (Web Mercator) demandé
+
+        Un point tous les PIXELS_PAR_POINT pixels sur l'étendue de la trace
+        suffit ; sans zoom, le niveau le plus fin est renvoyé.
+        """
+        if zoom is None or not len(self):
+            return len(self)
+        etendue = max(np.ptp(self.lat), np.ptp(self.lon))
+        pixels = etendue / 360 * TAILLE_TUILE * 2 ** float(zoom)
+        besoin = pixels / PIXELS_PAR_POINT
+        for nb_points in self.niveaux:
+            if nb_points >= besoin:
+                return nb_points
+        return len(self)
+
+    def indices(self, zoom: Optional[float] = None) -> np.ndarray:
+        """Indices des points du niveau choisi pour le zoom."""
+        nb_points = self.niveau_pour_zoom(zoom)
+        if nb_points == len(self):
+            return np.arange(nb_points)
+        return self.niveaux[nb_points]
+
+    def coordonnees(self, zoom: Optional[float] = None) -> List[List[float]]:
+        """Couples [lat, lon] du niveau choisi, arrondis pour alléger la réponse."""
+        indices = self.indices(zoom)
+        points = np.column_stack((self.lat[indices], self.lon[indices]))
+        return np.round(points, DECIMALES).tolist()
@@ -0,0 +1,125 @@
+"""
+Découpage d'une trace en tronçons (splits) au kilomètre ou au mile
+
+Les bornes des tronçons (1, 2, 3... km) sont placées sur la distance cumulée
+en une seule recherche dichotomique (`np.searchsorted`) ; le temps et le
+dénivelé cumulé y sont interpolés linéairement entre les deux points qui
+encadrent chaque borne. Chaque tronçon se déduit ensuite par différence entre
+bornes consécutives, sans boucle sur les points.
+"""
+
+import math
+from typing import Any, Dict, List
+
+import numpy as np
+
+from utils import track_metrics
+from utils.track import Track
+
+# Longueur d'un tronçon selon l'unité, en mètres
+LONGUEURS_SPLIT = {"km": 1000.0, "mile": 1609.344}
+
+# Reste (m) en dessous duquel la fin de la trace est rattachée au dernier tronçon
+RELIQUAT_MIN = 10.0
+
+
+def decouper(
+    distance_cumulee: np.ndarray, temps: np.ndarray, ele: np.ndarray, longueur: float
+) -> Dict[str, np.ndarray]:
+    """Découpe une trace en tronçons de `longueur` mètres
+
+    Parameters
+    ----------
+    distance_cumulee : np.ndarray
+        Distance (m) depuis le départ à chaque point, croissante
+    temps : np.ndarray
+        Secondes écoulées à chaque point, NaN si inconnu
+    ele : np.ndarray
+        Élévation (m) à chaque point, NaN si inconnue
+    longueur : float
+        Longueur d'un tronçon en mètres
+
+    Returns
+    -------
+    dict
+        Un tableau par grandeur, une valeur par tronçon : 'distance' (m),
+        'duree' (s), 'denivele_positif' et 'denivele_negatif' (m) ; NaN
+        quand les temps ou élévations manquent. Le dernier tronçon peut être
+        plus court.
+    """
+    n = len(distance_cumulee)
+    total = float(distance_cumulee[-1]) if n else 0.0
+    if n < 2 or total <= 0:
+        vide = np.zeros(0)
+        return {"distance": vide, "duree": vide, "denivele_positif": vide, "denivele_negatif": vide}
+
+    nb_complets = int(total // longueur)
+    bornes = np.arange(nb_complets + 1) * float(longueur)
+    if total - bornes[-1] > RELIQUAT_MIN or nb_complets == 0:
+        bornes = np.append(bornes, total)
+    else:
+        bornes[-1] = total
+
+    # Point qui suit chaque borne ; la dernière tombe sur le dernier point
+    suivant = np.searchsorted(distance_cumulee, bornes, side="left").clip(1, n - 1)
+    suivant[-1] = n - 1
+    avant = distance_cumulee[suivant - 1]
+    ecart = distance_cumulee[suivant] - avant
+    fraction = np.ones_like(bornes)
+    np.divide(bornes - avant, ecart, out=fraction, where=ecart > 0)
+    fraction[-1] = 1.0
+
+    def aux_bornes(colonne: np.ndarray) -> np.ndarray:
+        return colonne[suivant - 1] + fraction * (colonne[suivant] - colonne[suivant - 1])
+
+    temps = track_metrics.interpoler_manquants(temps, distance_cumulee, minimum=2)
+    ele = track_metrics.interpoler_manquants(ele, distance_cumulee, minimum=1)
+    variations = np.diff(ele)
+    montee = np.concatenate(([0.0], np.cumsum(np.maximum(variations, 0.0))))
+    descente = np.concatenate(([0.0], np.cumsum(np.minimum(variations, 0.0))))
+
+    return {
+        "distance": np.diff(bornes),
+        "duree": np.diff(aux_bornes(temps)),
+        "denivele_positif": np.diff(aux_bornes(montee)),
+        "denivele_negatif": -np.diff(aux_bornes(descente)),
+    }
+
+
+def splits_trace(track: Track, unite: str = "km") -> List[Dict[str, Any]]:
+    """Tronçons d'une trace, mis en forme pour l'API
+
+    Lève ValueError si l'unité n'est pas une clé de LONGUEURS_SPLIT.
+    """
+    if unite not in LONGUEURS_SPLIT:
+        raise ValueError(f"Unite de split inconnue : {unite}")
+    longueur = LONGUEURS_SPLIT[unite]
+
+    distance_cumulee = track_metrics.gpxpy_distance_cumulee(
+        track.lat, track.lon, track.ele, track.segments
+    )
+    temps = track_metrics.secondes_ecoulees(track.time)
+    colonnes = decouper(distance_cumulee, temps, track.ele, longueur)
+
+    distance = colonnes["distance"]
+    duree = colonnes["duree"]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        allure = duree / 60 / (distance / longueur)
+        vitesse = distance / duree * 3.6
+    valeurs = {
+        "distance": np.round(distance / longueur, 3),
+        "duree_s": np.round(duree, 1),
+        f"allure_min_{unite}": np.round(allure, 2),
+        "vitesse_kmh": np.round(vitesse, 2),
+        "denivele_positif": np.round(colonnes["denivele_positif"], 1),
+        "denivele_negatif": np.round(colonnes["denivele_negatif"], 1),
+    }
+    # NaN (temps ou élévation inconnus) -> None dans la réponse JSON
+    listes = {
+        cle: [v if math.isfinite(v) else None for v in tableau.tolist()]
+        for cle, tableau in valeurs.items()
+    }
+    return [
+        {"numero": numero, **{cle: liste[numero - 1] for cle, liste in listes.items()}}
+        for numero in range(1, len(distance) + 1)
+    ]
@@ -0,0 +1,165 @@
+"""
+Décodage en bloc des horodatages GPX
+
+Les horodatages d'un fichier GPX ont presque toujours la même forme fixe
+(`AAAA-MM-JJTHH:MM:SS[.fff]Z`). Ils sont décodés par lots, sans créer de
+datetime par point : les textes de même forme sont rangés dans une matrice
+d'octets dont chaque colonne est un caractère, et les champs sont calculés
+colonne par colonne avec NumPy. Seuls les textes irréguliers (décalage
+horaire, séparateur inhabituel...) passent par `datetime.fromisoformat`.
+
+Le résultat est une colonne int64 de millisecondes epoch (UTC), où
+TEMPS_ABSENT marque un horodatage manquant ou illisible.
+"""
+
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Sequence
+
+import numpy as np
+
+# Valeur d'un horodatage absent dans une colonne int64
+TEMPS_ABSENT = np.iinfo(np.int64).min
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+UNE_MS = timedelta(milliseconds=1)
+
+# Forme fixe 'AAAA-MM-JJTHH:MM:SS' : position des chiffres et des séparateurs
+LONGUEUR_BASE = 19
+CHIFFRES = np.array([0, 1, 2, 3, 5, 6, 8, 9, 11, 12, 14, 15, 17, 18])
+SEPARATEURS = {4: "-", 7: "-", 10: "T", 13: ":", 16: ":"}
+JOURS_PAR_MOIS = np.array([0, 31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31])
+
+
+def datetime_vers_ms(instant: datetime) -> int:
+    """Millisecondes epoch d'un datetime ; un datetime naïf est considéré en UTC."""
+    if instant.tzinfo is None:
+        instant = instant.replace(tzinfo=timezone.utc)
+    return (instant - EPOCH) // UNE_MS
+
+
+def ms_vers_datetime(ms: int) -> datetime:
+    """Datetime UTC correspondant à des millisecondes epoch."""
+    return EPOCH + timedelta(milliseconds=int(ms))
+
+
+def horodatage_ms(texte: str) -> int:
+    """Décode un horodatage ISO 8601 quelconque (chemin lent)
+
+    Lève ValueError si le texte n'est pas un horodatage ISO 8601.
+    """
+    return datetime_vers_ms(datetime.fromisoformat(texte.strip().replace("Z", "+00:00")))
+
+
+def decoder_horodatages(textes: Sequence[Optional[str]]) -> np.ndarray:
+    """Décode une suite d'horodatages ISO 8601 en millisecondes epoch
+
+    Parameters
+    ----------
+    textes : Sequence[str ou None]
+        Horodatages tels qu'ils apparaissent dans le fichier, None si absents
+
+    Returns
+    -------
+    np.ndarray
+        Colonne int64 (ms epoch UTC), TEMPS_ABSENT pour un horodatage absent
+        ou illisible
+    """
+    n = len(textes)
+    resultat = np.full(n, TEMPS_ABSENT, dtype=np.int64)
+    textes = [texte or "" for texte in textes]
+    longueurs = np.fromiter(map(len, textes), dtype=np.int64, count=n)
+    # Un caractère non ASCII devient '?' : un octet par caractère, ligne non conforme
+    octets = np.frombuffer("".join(textes).encode("ascii", "replace"), dtype=np.uint8)
+    debuts = np.cumsum(longueurs) - longueurs
+
+    for longueur in np.unique(longueurs[longueurs > 0]).tolist():
+        indices = np.flatnonzero(longueurs == longueur)
+        if indices.size == n:
+            # Cas courant : tous les textes ont la même longueur, aucune copie
+            car = octets.reshape(n, longueur)
+        else:
+            car = octets[debuts[indices, None] + np.arange(longueur)]
+        utc = car[:, -1] == ord("Z")
+        for forme, z in ((utc, True), (~utc, False)):
+            if forme.all():
+                lot, car_lot = indices, car
+            elif forme.any():
+                lot, car_lot = indices[forme], car[forme]
+            else:
+                continue
+            valeurs, decodes = _decoder_forme_fixe(car_lot, z)
+            resultat[lot[decodes]] = valeurs[decodes]
+            for i in lot[~decodes]:
+                resultat[i] = _horodatage_ou_absent(textes[i])
+    return resultat
+
+
+def _horodatage_ou_absent(texte: str) -> int:
+    """Chemin lent ; un horodatage illisible est ignoré, comme le fait gpxpy."""
+    try:
+        return horodatage_ms(texte)
+    except ValueError:
+        logging.warning(f"Horodatage illisible ignoré : {texte!r}")
+        return TEMPS_ABSENT
+
+
+def _decoder_forme_fixe(car: np.ndarray, utc: bool):
+    """Décode des textes de même longueur supposés de forme fixe
+
+    `car` contient un texte par ligne, un caractère par colonne. Renvoie
+    (valeurs, decodes) : les millisecondes epoch et le masque des textes
+    effectivement conformes à la forme fixe.
+    """
+    n, longueur = car.shape
+    # Nombre de chiffres après le point des secondes (0 : pas de fraction)
+    fraction = max(longueur - utc - LONGUEUR_BASE - 1, 0)
+    if longueur - utc != LONGUEUR_BASE and fraction == 0:
+        return np.zeros(n, dtype=np.int64), np.zeros(n, dtype=bool)
+
+    # Une ligne par caractère : chaque champ se lit sur des lignes contiguës
+    colonnes = np.ascontiguousarray(car.T)
+    # En uint8, un caractère hors de '0'..'9' donne une valeur > 9
+    chiffres = colonnes - np.uint8(ord("0"))
+
+    positions = list(CHIFFRES) + list(range(LONGUEUR_BASE + 1, LONGUEUR_BASE + 1 + fraction))
+    conformes = (chiffres[positions] <= 9).all(axis=0)
+    for position, separateur in SEPARATEURS.items():
+        conformes &= colonnes[position] == ord(separateur)
+    if fraction > 0:
+        conformes &= colonnes[LONGUEUR_BASE] == ord(".")
+
+    def nombre(debut, fin):
+        valeur = np.zeros(n, dtype=np.int64)
+        for position in range(debut, fin):
+            valeur *= 10
+            valeur += chiffres[position]
+        return valeur
+
+    annee, mois, jour = nombre(0, 4), nombre(5, 7), nombre(8, 10)
+    heure, minute, seconde = nombre(11, 13), nombre(14, 16), nombre(17, 19)
+    # Millisecondes : trois premiers chiffres de la fraction, tronqués
+    ms = nombre(LONGUEUR_BASE + 1, LONGUEUR_BASE + 1 + min(fraction, 3))
+    ms *= 10 ** max(0, 3 - fraction)
+
+    bissextile = (annee % 4 == 0) & ((annee % 100 != 0) | (annee % 400 == 0))
+    mois_borne = np.clip(mois, 1, 12)
+    jours_du_mois = JOURS_PAR_MOIS[mois_borne] + ((mois_borne == 2) & bissextile)
+    conformes &= (mois >= 1) & (mois <= 12) & (jour >= 1) & (jour <= jours_du_mois)
+    # Une seconde intercalaire (60) est laissée au chemin lent
+    conformes &= (heure < 24) & (minute < 60) & (seconde < 60)
+
+    jours = _jours_depuis_epoch(annee, mois_borne, jour)
+    valeurs = ((jours * 24 + heure) * 60 + minute) * 60 + seconde
+    return valeurs * 1000 + ms, conformes
+
+
+def _jours_depuis_epoch(annee, mois, jour):
+    """Nombre de jours depuis le 1970-01-01 d'une date du calendrier grégorien
+    (algorithme `days_from_civil` de H. Hinnant), en colonnes."""
+    annee = annee - (mois <= 2)
+    ere = annee // 400
+    annee_ere = annee - ere * 400
+    jour_annee = (153 * (mois + np.where(mois > 2, -3, 9)) + 2) // 5 + jour - 1
+    jour_ere = annee_ere * 365 + annee_ere // 4 - annee_ere // 100 + jour_annee
+    return ere * 146097 + jour_ere - 719468
@@ -5,8 +5,8 @@ from datetime import datetime
 
 from view.vue_abstraite import VueAbstraite
 from service.activity_service import ActivityService
-from utils.gpx_parser import parse_gpx_file
-from session import Session
+from utils.gpx_ingestion import ingest_gpx
+from utils.session import Session
 
 
 class CreerActiviteVue(VueAbstraite):
@@ -90,7 +90,7 @@ class CreerActiviteVue(VueAbstraite):
         # Parser le fichier GPX
         try:
             print("\n⏳ Analyse du fichier GPX en cours...")
-            gpx_data = parse_gpx_file(fichier_gpx)
+            gpx_data = self._lire_gpx(fichier_gpx)
             
             if not gpx_data:
                 print("❌ Impossible de lire le fichier GPX")
@@ -106,6 +106,20 @@ class CreerActiviteVue(VueAbstraite):
         # Compléter avec les informations manquantes
         return self._completer_infos_activite(utilisateur, gpx_data)
 
+    def _lire_gpx(self, fichier_gpx):
+        """Lit le fichier avec le moteur d'ingestion ; None s'il ne contient aucun point"""
+        ingestion = ingest_gpx(fichier_gpx)
+        if not ingestion.nb_points:
+            return None
+
+        date_debut = ingestion.date_debut
+        return {
+            "distance": ingestion.distance / 1000,
+            "duration_minutes": (ingestion.duree or 0) / 60,
+            "elevation_gain": ingestion.denivele[0],
+            "start_time": date_debut.date() if date_debut else None,
+        }
+
     def _afficher_donnees_gpx(self, gpx_data):
         """Affiche les données extraites du GPX"""
         print("\n📊 Données extraites du fichier:")
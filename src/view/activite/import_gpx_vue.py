@@ -0,0 +1,88 @@
+import os
+
+from InquirerPy import inquirer
+from InquirerPy.validator import PathValidator
+
+from view.vue_abstraite import VueAbstraite
+from service.activity_service import ActivityService
+from utils.session import Session
+
+
+class ImportGpxVue(VueAbstraite):
+    """Vue pour importer en une fois un dossier de fichiers GPX ou une archive zip"""
+
+    def __init__(self, message=""):
+        super().__init__(message)
+        self.activity_service = ActivityService()
+        self.session = Session()
+
+    def choisir_menu(self):
+        """Processus d'import en lot"""
+
+        utilisateur = self.session.utilisateur
+        if not utilisateur:
+            print("Erreur : Aucun utilisateur connecté")
+            from view.connexion_vue import ConnexionVue
+            return ConnexionVue("Veuillez vous connecter")
+
+        print("\n" + "=" * 70)
+        print("📦 IMPORTER DES FICHIERS GPX")
+        print("=" * 70)
+        print("Indiquez un dossier contenant des fichiers .gpx, ou une archive .zip.")
+        print("-" * 70 + "\n")
+
+        chemin = inquirer.filepath(
+            message="Dossier ou archive zip:",
+            validate=PathValidator(message="Le chemin n'existe pas"),
+        ).execute()
+
+        fichiers = self._lire_fichiers(chemin)
+        if not fichiers:
+            from view.activite.liste_activites_vue import ListeActivitesVue
+            return ListeActivitesVue("❌ Aucun fichier GPX trouvé")
+
+        sport = inquirer.select(
+            message="Sport à utiliser quand le fichier ne le précise pas:",
+            choices=[
+                {"name": "Aucun (ignorer ces fichiers)", "value": None},
+                {"name": "Course à pied", "value": "course"},
+                {"name": "Cyclisme", "value": "cyclisme"},
+                {"name": "Natation", "value": "natation"},
+                {"name": "Randonnée", "value": "randonnee"},
+            ],
+        ).execute()
+
+        print(f"\n⏳ Analyse de {len(fichiers)} fichier(s) en cours...")
+        statuts = self.activity_service.importer_gpx(fichiers, utilisateur.id_user, sport)
+        importes = self._afficher_statuts(statuts)
+
+        from view.activite.liste_activites_vue import ListeActivitesVue
+        return ListeActivitesVue(f"✅ {importes}/{len(statuts)} activité(s) importée(s)")
+
+    def _lire_fichiers(self, chemin):
+        """Renvoie la liste (nom, contenu) des fichiers à importer"""
+        if os.path.isfile(chemin):
+            with open(chemin, "rb") as f:
+                return [(os.path.basename(chemin), f.read())]
+
+        fichiers = []
+        for dossier, _, noms in os.walk(chemin):
+            for nom in sorted(noms):
+                if nom.lower().endswith((".gpx", ".zip")):
+                    with open(os.path.join(dossier, nom), "rb") as f:
+                        fichiers.append((nom, f.read()))
+        return fichiers
+
+    def _afficher_statuts(self, statuts):
+        """Affiche le résultat de chaque fichier et renvoie le nombre d'imports réussis"""
+        print("\n" + "-" * 70)
+        importes = 0
+        for statut in statuts:
+            if statut["statut"] == "importe":
+                importes += 1
+                print(f"  ✅ {statut['fichier']} : {statut['titre']} ({statut['distance']:.2f} km)")
+            else:
+                print(f"  ❌ {statut['fichier']} : {statut.get('detail', 'erreur')}")
+        print("-" * 70)
+        print(f"{importes} importé(s), {len(statuts) - importes} erreur(s)\n")
+        return importes
@@ -36,6 +36,7 @@ class ListeActivitesVue(VueAbstraite):
                     'message': 'Que voulez-vous faire ?',
                     'choices': [
                         'Créer une activité',
+                        'Importer des fichiers GPX',
                         'Retour au menu principal'
                     ]
                 }
@@ -44,6 +45,9 @@ class ListeActivitesVue(VueAbstraite):
             if choix['action'] == 'Créer une activité':
                 from view.activite.creer_activite_vue import CreerActiviteVue
                 return CreerActiviteVue()
+            elif choix['action'] == 'Importer des fichiers GPX':
+                from view.activite.import_gpx_vue import ImportGpxVue
+                return ImportGpxVue()
             else:
                 from view.menu_utilisateur_vue import MenuUtilisateurVue
                 return MenuUtilisateurVue()
@@ -67,6 +71,7 @@ class ListeActivitesVue(VueAbstraite):
         # Ajouter les options de menu
         choix_activites.extend([
             {'name': 'Créer une nouvelle activité', 'value': 'creer'},
+            {'name': 'Importer des fichiers GPX', 'value': 'importer'},
             {'name': 'Retour au menu principal', 'value': 'retour'}
         ])
 
@@ -86,6 +91,9 @@ class ListeActivitesVue(VueAbstraite):
         if reponse['choix'] == 'creer':
             from view.activite.creer_activite_vue import CreerActiviteVue
             return CreerActiviteVue()
+        elif reponse['choix'] == 'importer':
+            from view.activite.import_gpx_vue import ImportGpxVue
+            return ImportGpxVue()
         elif reponse['choix'] == 'retour':
             from view.menu_utilisateur_vue import MenuUtilisateurVue
             return MenuUtilisateurVue()